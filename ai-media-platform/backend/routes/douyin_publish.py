@@ -23,23 +23,15 @@ if str(SOCIAL_ROOT) not in sys.path:
     sys.path.insert(0, str(SOCIAL_ROOT))
 
 try:
-    # 优先使用GitHub优化版本
-    from routes.douyin_upload_github import DouYinVideo
     from conf import BASE_DIR
-    from utils.files_times import generate_schedule_time_next_day
     SOCIAL_AUTO_UPLOAD_AVAILABLE = True
-    logger.info("GitHub优化版抖音发布模块导入成功")
-except ImportError:
-    try:
-        # 回退到原版
-        from conf import BASE_DIR
-        from uploader.douyin_uploader.main import DouYinVideo
-        from utils.files_times import generate_schedule_time_next_day
-        SOCIAL_AUTO_UPLOAD_AVAILABLE = True
-        logger.info("原版抖音发布模块导入成功")
-    except ImportError as e:
-        logger.error(f"无法导入social-auto-upload模块: {e}")
-        SOCIAL_AUTO_UPLOAD_AVAILABLE = False
+    logger.info("social-auto-upload模块导入成功")
+except ImportError as e:
+    logger.error(f"无法导入social-auto-upload模块: {e}")
+    SOCIAL_AUTO_UPLOAD_AVAILABLE = False
+
+# 抖音上传实现统一来自平台注册表
+from services.myUtils.platforms import publish_video
 
 router = APIRouter()
 
@@ -156,6 +148,7 @@ async def get_publish_status(task_id: str):
         "message": task_info.get("message", ""),
         "created_at": task_info["created_at"],
         "updated_at": task_info.get("updated_at"),
+        "progress": task_info.get("progress"),
         "error": task_info.get("error")
     }
 
@@ -170,6 +163,7 @@ async def list_publish_tasks():
                 "status": task_info["status"],
                 "title": task_info["title"],
                 "created_at": task_info["created_at"],
+                "progress": task_info.get("progress"),
                 "message": task_info.get("message", "")
             }
             for task_id, task_info in publish_tasks.items()
@@ -179,7 +173,7 @@ async def list_publish_tasks():
 
 async def execute_douyin_publish(task_id: str):
     """
-    执行抖音发布任务 - 使用social-auto-upload的DouYinVideo类
+    执行抖音发布任务 - 使用平台注册表中的抖音上传实现
     """
     task_info = publish_tasks[task_id]
 
@@ -191,18 +185,17 @@ async def execute_douyin_publish(task_id: str):
 
         logger.info(f"开始执行抖音发布任务 {task_id}: {task_info['title']}")
 
-        # 使用social-auto-upload的DouYinVideo类
-        video_obj = DouYinVideo(
-            title=task_info["title"],
-            file_path=task_info["video_path"],
-            tags=task_info["tags"],
-            publish_date=task_info.get("publish_time") or datetime.now(),
-            account_file=task_info["account_file"],
-            thumbnail_path=None
-        )
-
-        # 执行上传
-        await video_obj.main()
+        # 上传进度写入任务记录，状态接口在上传过程中即可查询
+        def on_progress(progress: float):
+            task_info["progress"] = progress
+            task_info["updated_at"] = datetime.now()
+
+        # 在上传运行时中执行，预检、发布预算和并发限制与其他发布入口一致
+        result = await publish_video("douyin", task_info["title"], Path(task_info["video_path"]),
+                                     task_info["tags"], Path(task_info["account_file"]),
+                                     task_info.get("publish_time"), on_progress=on_progress)
+        if not result["success"]:
+            raise Exception(result["error"])
 
         # 任务完成
         task_info["status"] = "completed"
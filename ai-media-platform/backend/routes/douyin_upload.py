@@ -18,6 +18,15 @@ except ImportError:
     logger.warning("Playwright未安装，将无法执行抖音上传")
     PLAYWRIGHT_AVAILABLE = False
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from services.myUtils.launch_profile import get_launch_profile
+from services.myUtils.publish_engine import PublishJob
+from services.myUtils.publish_scheduler import PublishSlot, get_publish_governor
+from services.myUtils.upload_runtime import get_upload_runtime
+
+# 同一账号两次上传之间的间隔（秒），避免频繁操作
+ACCOUNT_INTERVAL = 2
+
 
 async def set_init_script(context):
     """设置初始化脚本，模拟真实浏览器环境"""
@@ -41,11 +50,13 @@ async def set_init_script(context):
 
 
 class DouYinVideoUploader:
-    """抖音视频上传器"""
+    """抖音视频上传器（在上传运行时中执行，共享运行时的浏览器）"""
 
-    def __init__(self, account_file: str, headless: bool = False):
+    def __init__(self, account_file: str, headless: Optional[bool] = None):
         self.account_file = account_file
-        self.headless = headless
+        # 未指定时按social_upload.providers.douyin配置，默认无头
+        self.profile = get_launch_profile("douyin")
+        self.headless = self.profile.headless if headless is None else headless
         self.local_executable_path = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
 
     async def cookie_auth(self) -> bool:
@@ -53,29 +64,27 @@ class DouYinVideoUploader:
         if not PLAYWRIGHT_AVAILABLE:
             return False
 
-        async with async_playwright() as playwright:
-            browser = await playwright.chromium.launch(headless=True)
-            context = await browser.new_context(storage_state=self.account_file)
-
-            try:
-                page = await context.new_page()
-                await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-                await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
+        browser = await get_upload_runtime().browser(headless=True)
+        context = await self.profile.route_context(await browser.new_context(storage_state=self.account_file))
 
-                # 检查是否需要登录
-                if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count():
-                    logger.warning("Cookie已失效，需要重新登录")
-                    return False
-                else:
-                    logger.info("Cookie验证通过")
-                    return True
+        try:
+            page = await context.new_page()
+            await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
 
-            except Exception as e:
-                logger.warning(f"Cookie验证失败: {e}")
+            # 检查是否需要登录
+            if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count():
+                logger.warning("Cookie已失效，需要重新登录")
                 return False
-            finally:
-                await context.close()
-                await browser.close()
+            else:
+                logger.info("Cookie验证通过")
+                return True
+
+        except Exception as e:
+            logger.warning(f"Cookie验证失败: {e}")
+            return False
+        finally:
+            await context.close()
 
   
     async def set_schedule_time(self, page: Page, publish_date: datetime):
@@ -115,214 +124,210 @@ class DouYinVideoUploader:
 
         self.file_path = file_path
 
-        async with async_playwright() as playwright:
-            # 启动浏览器
-            if self.local_executable_path and Path(self.local_executable_path).exists():
-                browser = await playwright.chromium.launch(
-                    headless=self.headless,
-                    executable_path=self.local_executable_path
-                )
-            else:
-                browser = await playwright.chromium.launch(headless=self.headless)
+        # 使用上传运行时的共享浏览器，每次上传只新建上下文
+        executable_path = self.local_executable_path if Path(self.local_executable_path).exists() else None
+        browser = await get_upload_runtime().browser(headless=self.headless, executable_path=executable_path)
+        context = None
 
-            try:
-                # 创建上下文
-                context = await browser.new_context(storage_state=self.account_file)
-                await set_init_script(context)
+        try:
+            # 创建上下文
+            context = await self.profile.new_context(browser, init_script=False, storage_state=self.account_file)
+            await set_init_script(context)
+
+            page = await context.new_page()
 
-                page = await context.new_page()
+            # 访问上传页面
+            await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+            logger.info(f'正在上传视频: {title}')
 
-                # 访问上传页面
-                await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-                logger.info(f'正在上传视频: {title}')
+            # 等待页面加载
+            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
+            await asyncio.sleep(5)
 
-                # 等待页面加载
-                await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
-                await asyncio.sleep(5)
+            # 检查登录状态
+            if await page.locator("text=扫码登录").count() > 0:
+                logger.error("检测到登录页面，cookie可能已失效")
+                return False
 
-                # 检查登录状态
-                if await page.locator("text=扫码登录").count() > 0:
-                    logger.error("检测到登录页面，cookie可能已失效")
-                    return False
+            # 上传视频文件 - 添加调试和更新的选择器
+            logger.info("开始查找上传元素...")
+
+            # 先打印页面内容用于调试
+            try:
+                page_content = await page.content()
+                logger.info(f"当前页面URL: {page.url}")
+                # 查找所有包含"上传"的文本
+                upload_texts = await page.locator("text=上传").count()
+                logger.info(f"找到 {upload_texts} 个包含'上传'的元素")
+
+                # 查找所有file input
+                file_inputs = await page.locator("input[type='file']").count()
+                logger.info(f"找到 {file_inputs} 个file input元素")
+            except Exception as e:
+                logger.warning(f"调试信息获取失败: {e}")
+
+            upload_selectors = [
+                # 新的抖音创作者中心选择器
+                "input[type='file'][accept*='video']",
+                "input[type='file'][accept*='mp4']",
+                "input[type='file'][accept*='video/*']",
+                "input[type='file'][accept='.mp4,.mov,.avi']",
+                # 基于class的选择器
+                ".upload-input input[type='file']",
+                ".upload-zone input[type='file']",
+                ".upload-area input[type='file']",
+                ".upload-container input[type='file']",
+                "div[class*='upload'] input[type='file']",
+                "div[class*='Upload'] input[type='file']",
+                # 更通用的选择器
+                "input[type='file']",
+                # 尝试通过按钮文本查找
+                "text=上传视频 >> .. >> input[type='file']",
+                "text=点击上传 >> .. >> input[type='file']",
+                "text=选择视频 >> .. >> input[type='file']",
+                # 通过特定区域查找
+                "[class*='content'] input[type='file']",
+                "[class*='creator'] input[type='file']",
+                # 新的尝试 - 通过可见性
+                "input[type='file']:visible",
+                "input[type='file']:not([style*='display: none'])",
+                "input[type='file']:not([hidden])"
+            ]
+
+            upload_success = False
+            for i, selector in enumerate(upload_selectors):
+                try:
+                    logger.info(f"尝试选择器 {i+1}: {selector}")
+                    element_count = await page.locator(selector).count()
+                    logger.info(f"找到 {element_count} 个匹配元素")
+
+                    if element_count > 0:
+                        # 尝试设置文件
+                        await page.locator(selector).first.set_input_files(file_path)
+                        logger.info(f"使用选择器 '{selector}' 成功上传文件")
+                        upload_success = True
+                        break
+                except Exception as e:
+                    logger.debug(f"选择器 '{selector}' 失败: {e}")
+                    continue
 
-                # 上传视频文件 - 添加调试和更新的选择器
-                logger.info("开始查找上传元素...")
+            if not upload_success:
+                logger.error("所有上传选择器都失败")
+                # 尝试等待页面完全加载
+                logger.info("等待页面完全加载...")
+                await asyncio.sleep(3)
 
-                # 先打印页面内容用于调试
+                # 再次尝试最基本的选择器
                 try:
-                    page_content = await page.content()
-                    logger.info(f"当前页面URL: {page.url}")
-                    # 查找所有包含"上传"的文本
-                    upload_texts = await page.locator("text=上传").count()
-                    logger.info(f"找到 {upload_texts} 个包含'上传'的元素")
-
-                    # 查找所有file input
-                    file_inputs = await page.locator("input[type='file']").count()
-                    logger.info(f"找到 {file_inputs} 个file input元素")
+                    await page.locator("input[type='file']").first.set_input_files(file_path)
+                    logger.info("使用基本选择器成功上传文件")
+                    upload_success = True
                 except Exception as e:
-                    logger.warning(f"调试信息获取失败: {e}")
-
-                upload_selectors = [
-                    # 新的抖音创作者中心选择器
-                    "input[type='file'][accept*='video']",
-                    "input[type='file'][accept*='mp4']",
-                    "input[type='file'][accept*='video/*']",
-                    "input[type='file'][accept='.mp4,.mov,.avi']",
-                    # 基于class的选择器
-                    ".upload-input input[type='file']",
-                    ".upload-zone input[type='file']",
-                    ".upload-area input[type='file']",
-                    ".upload-container input[type='file']",
-                    "div[class*='upload'] input[type='file']",
-                    "div[class*='Upload'] input[type='file']",
-                    # 更通用的选择器
-                    "input[type='file']",
-                    # 尝试通过按钮文本查找
-                    "text=上传视频 >> .. >> input[type='file']",
-                    "text=点击上传 >> .. >> input[type='file']",
-                    "text=选择视频 >> .. >> input[type='file']",
-                    # 通过特定区域查找
-                    "[class*='content'] input[type='file']",
-                    "[class*='creator'] input[type='file']",
-                    # 新的尝试 - 通过可见性
-                    "input[type='file']:visible",
-                    "input[type='file']:not([style*='display: none'])",
-                    "input[type='file']:not([hidden])"
-                ]
-
-                upload_success = False
-                for i, selector in enumerate(upload_selectors):
-                    try:
-                        logger.info(f"尝试选择器 {i+1}: {selector}")
-                        element_count = await page.locator(selector).count()
-                        logger.info(f"找到 {element_count} 个匹配元素")
-
-                        if element_count > 0:
-                            # 尝试设置文件
-                            await page.locator(selector).first.set_input_files(file_path)
-                            logger.info(f"使用选择器 '{selector}' 成功上传文件")
-                            upload_success = True
-                            break
-                    except Exception as e:
-                        logger.debug(f"选择器 '{selector}' 失败: {e}")
-                        continue
-
-                if not upload_success:
-                    logger.error("所有上传选择器都失败")
-                    # 尝试等待页面完全加载
-                    logger.info("等待页面完全加载...")
-                    await asyncio.sleep(3)
-
-                    # 再次尝试最基本的选择器
-                    try:
-                        await page.locator("input[type='file']").first.set_input_files(file_path)
-                        logger.info("使用基本选择器成功上传文件")
-                        upload_success = True
-                    except Exception as e:
-                        logger.error(f"基本选择器也失败: {e}")
-                        return False
+                    logger.error(f"基本选择器也失败: {e}")
+                    return False
 
-                # 等待进入发布页面
-                while True:
+            # 等待进入发布页面
+            while True:
+                try:
+                    await page.wait_for_url(
+                        "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page",
+                        timeout=3000
+                    )
+                    logger.info("成功进入version_1发布页面")
+                    break
+                except:
                     try:
                         await page.wait_for_url(
-                            "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page",
+                            "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
                             timeout=3000
                         )
-                        logger.info("成功进入version_1发布页面")
+                        logger.info("成功进入version_2发布页面")
                         break
                     except:
-                        try:
-                            await page.wait_for_url(
-                                "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
-                                timeout=3000
-                            )
-                            logger.info("成功进入version_2发布页面")
-                            break
-                        except:
-                            await asyncio.sleep(0.5)
-
-                # 填充标题和话题
-                await asyncio.sleep(1)
-                logger.info('正在填充标题和话题...')
+                        await asyncio.sleep(0.5)
+
+            # 填充标题和话题
+            await asyncio.sleep(1)
+            logger.info('正在填充标题和话题...')
 
+            try:
+                title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
+                if await title_container.count():
+                    await title_container.fill(title[:30])
+                else:
+                    titlecontainer = page.locator(".notranslate")
+                    await titlecontainer.click()
+                    await page.keyboard.press("Backspace")
+                    await page.keyboard.press("Control+KeyA")
+                    await page.keyboard.press("Delete")
+                    await page.keyboard.type(title)
+                    await page.keyboard.press("Enter")
+            except Exception as e:
+                logger.warning(f"填充标题失败: {e}")
+
+            # 添加话题标签
+            css_selector = ".zone-container"
+            for index, tag in enumerate(tags, start=1):
                 try:
-                    title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
-                    if await title_container.count():
-                        await title_container.fill(title[:30])
-                    else:
-                        titlecontainer = page.locator(".notranslate")
-                        await titlecontainer.click()
-                        await page.keyboard.press("Backspace")
-                        await page.keyboard.press("Control+KeyA")
-                        await page.keyboard.press("Delete")
-                        await page.keyboard.type(title)
-                        await page.keyboard.press("Enter")
+                    await page.type(css_selector, "#" + tag)
+                    await page.press(css_selector, "Space")
                 except Exception as e:
-                    logger.warning(f"填充标题失败: {e}")
+                    logger.warning(f"添加话题 {tag} 失败: {e}")
 
-                # 添加话题标签
-                css_selector = ".zone-container"
-                for index, tag in enumerate(tags, start=1):
-                    try:
-                        await page.type(css_selector, "#" + tag)
-                        await page.press(css_selector, "Space")
-                    except Exception as e:
-                        logger.warning(f"添加话题 {tag} 失败: {e}")
-
-                logger.info(f'总共添加{len(tags)}个话题')
+            logger.info(f'总共添加{len(tags)}个话题')
 
-                # 等待视频上传完成
-                while True:
-                    try:
-                        number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-                        if number > 0:
-                            logger.info("视频上传完毕")
-                            break
-                        else:
-                            logger.info("正在上传视频中...")
-                            await asyncio.sleep(2)
-
-                            if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-                                logger.warning("发现上传出错，准备重试")
-                                await self.handle_upload_error(page)
-                    except:
+            # 等待视频上传完成
+            while True:
+                try:
+                    number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
+                    if number > 0:
+                        logger.info("视频上传完毕")
+                        break
+                    else:
                         logger.info("正在上传视频中...")
                         await asyncio.sleep(2)
 
-                # 设置定时发布
-                if publish_date and publish_date != 0:
-                    await self.set_schedule_time(page, publish_date)
+                        if await page.locator('div.progress-div > div:has-text("上传失败")').count():
+                            logger.warning("发现上传出错，准备重试")
+                            await self.handle_upload_error(page)
+                except:
+                    logger.info("正在上传视频中...")
+                    await asyncio.sleep(2)
 
-                # 发布视频
-                while True:
-                    try:
-                        publish_button = page.get_by_role('button', name="发布", exact=True)
-                        if await publish_button.count():
-                            await publish_button.click()
+            # 设置定时发布
+            if publish_date and publish_date != 0:
+                await self.set_schedule_time(page, publish_date)
 
-                        await page.wait_for_url(
-                            "https://creator.douyin.com/creator-micro/content/manage**",
-                            timeout=3000
-                        )
-                        logger.success("视频发布成功")
-                        return True
+            # 发布视频
+            while True:
+                try:
+                    publish_button = page.get_by_role('button', name="发布", exact=True)
+                    if await publish_button.count():
+                        await publish_button.click()
+
+                    await page.wait_for_url(
+                        "https://creator.douyin.com/creator-micro/content/manage**",
+                        timeout=3000
+                    )
+                    logger.success("视频发布成功")
+                    return True
 
-                    except Exception as e:
-                        logger.info("视频正在发布中...")
-                        await asyncio.sleep(0.5)
+                except Exception as e:
+                    logger.info("视频正在发布中...")
+                    await asyncio.sleep(0.5)
 
-                # 保存cookie
-                await context.storage_state(path=self.account_file)
-                logger.info('Cookie更新完毕')
+            # 保存cookie
+            await context.storage_state(path=self.account_file)
+            logger.info('Cookie更新完毕')
 
-            except Exception as e:
-                logger.error(f"上传视频失败: {e}")
-                import traceback
-                traceback.print_exc()
-                return False
-            finally:
-                await browser.close()
+        except Exception as e:
+            logger.error(f"上传视频失败: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+        finally:
+            if context is not None:
+                await context.close()
 
 
 async def generate_douyin_cookie(account_file: str) -> bool:
@@ -407,80 +412,75 @@ async def upload_douyin_video(title: str, file_list: List[str], tags: List[str],
     logger.info(f"  账号文件: {account_list}")
     logger.info(f"  定时发布: {enable_timer}")
 
-    # 处理定时发布时间
-    publish_dates = []
-    if enable_timer:
-        # 简单的定时发布逻辑
-        from datetime import datetime, timedelta
-        base_time = datetime.now() + timedelta(days=start_days)
-
-        for i, file_path in enumerate(file_list):
-            for time_str in daily_times[:videos_per_day]:
-                hour, minute = map(int, time_str.split(':'))
-                publish_time = base_time + timedelta(days=i, hours=hour, minutes=minute)
-                publish_dates.append(publish_time)
-    else:
-        publish_dates = [None] * len(file_list)
-
-    # 对每个视频和账号组合进行上传
-    success_count = 0
+    # 按抖音的发布预算为每个账号安排发布时间：定时发布跳过配额已满的日期并与其他账号错开，同时预约配额
+    governor = get_publish_governor()
+    slots = governor.plan("douyin", account_list, len(file_list), enable_timer,
+                          videos_per_day, daily_times, start_days, file_list)
+
+    # 每个账号只验证一次Cookie，验证失败的账号记为None；同一账号的任务依次执行，不会重复验证
+    account_uploaders: Dict[str, Optional[DouYinVideoUploader]] = {}
+
+    async def get_uploader(account_file: str, full_account_path: Path) -> Optional[DouYinVideoUploader]:
+        if account_file in account_uploaders:
+            return account_uploaders[account_file]
+
+        uploader = DouYinVideoUploader(str(full_account_path))
+        if not await uploader.cookie_auth():
+            if auto_login:
+                logger.info(f"账号 {account_file} 的Cookie已失效，尝试自动登录...")
+                # 尝试重新生成Cookie
+                if await generate_douyin_cookie(str(full_account_path)):
+                    logger.info(f"账号 {account_file} 重新登录成功")
+                    # 重新创建uploader对象
+                    uploader = DouYinVideoUploader(str(full_account_path))
+                else:
+                    logger.error(f"账号 {account_file} 重新登录失败，跳过")
+                    uploader = None
+            else:
+                logger.warning(f"账号 {account_file} 的Cookie已失效，跳过")
+                uploader = None
+
+        account_uploaders[account_file] = uploader
+        return uploader
+
+    def make_job(file_path: str, full_file_path: Path, account_file: str, full_account_path: Path,
+                 slot: PublishSlot) -> PublishJob:
+        async def run() -> bool:
+            uploader = await get_uploader(account_file, full_account_path)
+            if uploader is None:
+                return False
+            return await uploader.upload_video(
+                title=title,
+                file_path=str(full_file_path),
+                tags=tags,
+                publish_date=slot.publish_at
+            )
+        return PublishJob(account_file, file_path, run, platform="douyin", reservation=slot.reservation)
+
+    # 构建(视频, 账号)任务，不同账号并发上传，同一账号依次上传
+    jobs = []
     total_tasks = len(file_list) * len(account_list)
 
     for file_index, file_path in enumerate(file_list):
         full_file_path = video_dir / file_path
         if not full_file_path.exists():
             logger.error(f"视频文件不存在: {full_file_path}")
+            for account_file in account_list:
+                governor.release(slots[account_file][file_index].reservation, "视频文件不存在")
             continue
 
-        publish_date = publish_dates[file_index] if file_index < len(publish_dates) else None
-
         for account_file in account_list:
             full_account_path = cookie_dir / account_file
             if not full_account_path.exists():
                 logger.error(f"账号Cookie文件不存在: {full_account_path}")
+                governor.release(slots[account_file][file_index].reservation, "账号Cookie文件不存在")
                 continue
+            jobs.append(make_job(file_path, full_file_path, account_file, full_account_path,
+                                 slots[account_file][file_index]))
 
-            logger.info(f"正在上传: {file_path} -> {account_file}")
-
-            uploader = DouYinVideoUploader(str(full_account_path), headless=False)
-
-            # 验证cookie有效性
-            cookie_valid = await uploader.cookie_auth()
-            if not cookie_valid:
-                if auto_login:
-                    logger.info(f"账号 {account_file} 的Cookie已失效，尝试自动登录...")
-                    # 尝试重新生成Cookie
-                    if await generate_douyin_cookie(str(full_account_path)):
-                        logger.info(f"账号 {account_file} 重新登录成功")
-                        # 重新创建uploader对象
-                        uploader = DouYinVideoUploader(str(full_account_path), headless=False)
-                    else:
-                        logger.error(f"账号 {account_file} 重新登录失败，跳过")
-                        continue
-                else:
-                    logger.warning(f"账号 {account_file} 的Cookie已失效，跳过")
-                    continue
-
-            # 执行上传
-            try:
-                success = await uploader.upload_video(
-                    title=title,
-                    file_path=str(full_file_path),
-                    tags=tags,
-                    publish_date=publish_date
-                )
-
-                if success:
-                    success_count += 1
-                    logger.info(f"上传成功: {file_path} -> {account_file}")
-                else:
-                    logger.error(f"上传失败: {file_path} -> {account_file}")
-
-            except Exception as e:
-                logger.error(f"上传过程出错: {file_path} -> {account_file}, 错误: {e}")
-
-            # 等待一段时间避免频繁操作
-            await asyncio.sleep(2)
+    # 任务在上传运行时中执行，共享运行时的浏览器、账号锁和浏览器槽位
+    results = await get_upload_runtime().publish(jobs, account_interval=ACCOUNT_INTERVAL)
+    success_count = sum(1 for result in results if result["success"])
 
     logger.info(f"抖音上传任务完成: {success_count}/{total_tasks} 成功")
     return success_count > 0
\ No newline at end of file
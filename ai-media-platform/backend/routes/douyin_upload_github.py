@@ -1,250 +0,0 @@
-"""
-抖音上传模块 - 严格按照GitHub原始实现
-"""
-
-import asyncio
-import os
-import sys
-from datetime import datetime
-from pathlib import Path
-from typing import Optional
-from loguru import logger
-
-try:
-    from playwright.async_api import Playwright, async_playwright, Page
-    PLAYWRIGHT_AVAILABLE = True
-except ImportError:
-    logger.warning("Playwright未安装，将无法执行抖音上传")
-    PLAYWRIGHT_AVAILABLE = False
-
-# 设置路径以便导入social-auto-upload的模块
-sys.path.append(str(Path(__file__).parent.parent.parent.parent / "social-auto-upload"))
-
-try:
-    from utils.base_social_media import set_init_script
-    from utils.log import douyin_logger
-    from conf import LOCAL_CHROME_PATH
-    SOCIAL_AUTO_UPLOAD_AVAILABLE = True
-except ImportError as e:
-    logger.warning(f"无法导入social-auto-upload模块: {e}")
-    SOCIAL_AUTO_UPLOAD_AVAILABLE = False
-
-
-class DouYinVideo(object):
-    """抖音视频上传器 - 完全按照GitHub原始实现"""
-
-    def __init__(self, title, file_path, tags, publish_date: datetime, account_file, thumbnail_path=None):
-        self.title = title  # 视频标题
-        self.file_path = file_path
-        self.tags = tags
-        self.publish_date = publish_date
-        self.account_file = account_file
-        self.date_format = '%Y年%m月%d日 %H:%M'
-        self.local_executable_path = LOCAL_CHROME_PATH if SOCIAL_AUTO_UPLOAD_AVAILABLE else "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-        self.thumbnail_path = thumbnail_path
-
-    async def set_schedule_time_douyin(self, page, publish_date):
-        """设置定时发布时间 - GitHub原始实现"""
-        # 选择包含特定文本内容的 label 元素
-        label_element = page.locator("[class^='radio']:has-text('定时发布')")
-        # 在选中的 label 元素下点击 checkbox
-        await label_element.click()
-        await asyncio.sleep(1)
-        publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
-
-        await asyncio.sleep(1)
-        await page.locator('.semi-input[placeholder="日期和时间"]').click()
-        await page.keyboard.press("Control+KeyA")
-        await page.keyboard.type(str(publish_date_hour))
-        await page.keyboard.press("Enter")
-
-        await asyncio.sleep(1)
-
-    async def handle_upload_error(self, page):
-        """处理上传错误 - GitHub原始实现"""
-        douyin_logger.info('视频出错了，重新上传中')
-        await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
-
-    async def upload(self, playwright: Playwright) -> None:
-        """上传方法 - 严格按照GitHub原始实现"""
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=False)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-        douyin_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        douyin_logger.info(f'[-] 正在打开主页...')
-        await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
-        # 点击 "上传视频" 按钮 - 使用GitHub原始选择器
-        await page.locator("div[class^='container'] input").set_input_files(self.file_path)
-
-        # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 尝试等待第一个 URL
-                await page.wait_for_url(
-                    "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page", timeout=3000)
-                douyin_logger.info("[+] 成功进入version_1发布页面!")
-                break  # 成功进入页面后跳出循环
-            except Exception:
-                try:
-                    # 如果第一个 URL 超时，再尝试等待第二个 URL
-                    await page.wait_for_url(
-                        "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
-                        timeout=3000)
-                    douyin_logger.info("[+] 成功进入version_2发布页面!")
-                    break  # 成功进入页面后跳出循环
-                except:
-                    print("  [-] 超时未进入视频发布页面，重新尝试...")
-                    await asyncio.sleep(0.5)  # 等待 0.5 秒后重新尝试
-
-        # 填充标题和话题 - 使用GitHub原始逻辑
-        await asyncio.sleep(1)
-        douyin_logger.info(f'  [-] 正在填充标题和话题...')
-        title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
-        if await title_container.count():
-            await title_container.fill(self.title[:30])
-        else:
-            titlecontainer = page.locator(".notranslate")
-            await titlecontainer.click()
-            await page.keyboard.press("Backspace")
-            await page.keyboard.press("Control+KeyA")
-            await page.keyboard.press("Delete")
-            await page.keyboard.type(self.title)
-            await page.keyboard.press("Enter")
-        css_selector = ".zone-container"
-        for index, tag in enumerate(self.tags, start=1):
-            await page.type(css_selector, "#" + tag)
-            await page.press(css_selector, "Space")
-        douyin_logger.info(f'总共添加{len(self.tags)}个话题')
-
-        while True:
-            # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
-            try:
-                #  新版：定位重新上传
-                number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-                if number > 0:
-                    douyin_logger.success("  [-]视频上传完毕")
-                    break
-                else:
-                    douyin_logger.info("  [-] 正在上传视频中...")
-                    await asyncio.sleep(2)
-
-                    if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-                        douyin_logger.error("  [-] 发现上传出错了... 准备重试")
-                        await self.handle_upload_error(page)
-            except:
-                douyin_logger.info("  [-] 正在上传视频中...")
-                await asyncio.sleep(2)
-
-        #上传视频封面
-        await self.set_thumbnail(page, self.thumbnail_path)
-
-        # 更换可见元素
-        await self.set_location(page, "杭州市")
-
-        # 頭條/西瓜
-        third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
-        # 定位是否有第三方平台
-        if await page.locator(third_part_element).count():
-            # 检测是否是已选中状态
-            if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
-                await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
-
-        if self.publish_date != 0:
-            await self.set_schedule_time_douyin(page, self.publish_date)
-
-        # 判断视频是否发布成功
-        while True:
-            # 判断视频是否发布成功
-            try:
-                publish_button = page.get_by_role('button', name="发布", exact=True)
-                if await publish_button.count():
-                    await publish_button.click()
-                await page.wait_for_url("https://creator.douyin.com/creator-micro/content/manage**",
-                                        timeout=3000)  # 如果自动跳转到作品页面，则代表发布成功
-                douyin_logger.success("  [-]视频发布成功")
-                break
-            except:
-                douyin_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        douyin_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
-
-    async def set_thumbnail(self, page: Page, thumbnail_path: str):
-        """设置缩略图 - GitHub原始实现"""
-        if thumbnail_path:
-            await page.click('text="选择封面"')
-            await page.wait_for_selector("div.semi-modal-content:visible")
-            await page.click('text="设置竖封面"')
-            await page.wait_for_timeout(2000)  # 等待2秒
-            # 定位到上传区域并点击
-            await page.locator("div[class^='semi-upload upload'] >> input.semi-upload-hidden-input").set_input_files(thumbnail_path)
-            await page.wait_for_timeout(2000)  # 等待2秒
-            await page.locator("div[class^='extractFooter'] button:visible:has-text('完成')").click()
-
-    async def set_location(self, page: Page, location: str = "杭州市"):
-        """设置地理位置 - GitHub原始实现"""
-        # todo supoort location later
-        # await page.get_by_text('添加标签').locator("..").locator("..").locator("xpath=following-sibling::div").locator(
-        #     "div.semi-select-single").nth(0).click()
-        try:
-            await page.locator('div.semi-select span:has-text("输入地理位置")').click()
-            await page.keyboard.press("Backspace")
-            await page.wait_for_timeout(2000)
-            await page.keyboard.type(location)
-            await page.wait_for_selector('div[role="listbox"] [role="option"]', timeout=5000)
-            await page.locator('div[role="listbox"] [role="option"]').first.click()
-        except Exception as e:
-            douyin_logger.warning(f"  [-] 地理位置设置失败，跳过: {str(e)}")
-
-    async def main(self):
-        """主方法 - GitHub原始实现"""
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
-
-
-# 兼容性接口
-class DouYinVideoUploader:
-    """兼容性包装器"""
-
-    def __init__(self, account_file: str, headless: bool = False):
-        self.account_file = account_file
-        self.headless = headless
-
-    async def upload_video(self, title: str, file_path: str, tags: list,
-                         publish_date: Optional[datetime] = None,
-                         thumbnail_path: Optional[str] = None) -> bool:
-        """兼容性上传方法"""
-        try:
-            # 创建GitHub格式的对象
-            video_obj = DouYinVideo(
-                title=title,
-                file_path=file_path,
-                tags=tags,
-                publish_date=publish_date or datetime.now(),
-                account_file=self.account_file,
-                thumbnail_path=thumbnail_path
-            )
-
-            # 执行上传
-            await video_obj.main()
-            return True
-        except Exception as e:
-            logger.error(f"上传失败: {e}")
-            return False
\ No newline at end of file
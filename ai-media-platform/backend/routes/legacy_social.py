@@ -6,6 +6,7 @@ import sqlite3
 import threading
 import time
 import uuid
+from datetime import datetime
 from pathlib import Path
 from queue import Queue
 from typing import AsyncGenerator, Dict, List, Optional
@@ -16,6 +17,8 @@ from loguru import logger
 
 import sys
 
+from services.myUtils.upload_runtime import get_upload_runtime
+
 # -----------------------------
 # 初始化依赖路径
 # -----------------------------
@@ -35,18 +38,9 @@ try:
 
     from conf import BASE_DIR  # type: ignore
     from myUtils.auth import check_cookie  # type: ignore
-    from myUtils.login import (  # type: ignore
-        douyin_cookie_gen,
-        get_ks_cookie,
-        get_tencent_cookie,
-        xiaohongshu_cookie_gen,
-    )
-    from myUtils.postVideo import (  # type: ignore
-        post_video_DouYin,
-        post_video_ks,
-        post_video_tencent,
-        post_video_xhs,
-    )
+    # 上传运行时等共享单例统一通过services.myUtils导入，与主服务共用同一个实例
+    from services.myUtils.platforms import get_platform_uploader, track_progress
+    from services.myUtils.postVideo import PUBLISH_JOB_BUILDERS
     SOCIAL_AUTO_UPLOAD_AVAILABLE = True
     logger.info("social-auto-upload模块导入成功")
 except ImportError as exc:  # pragma: no cover - 环境问题
@@ -63,6 +57,9 @@ COOKIE_STORAGE = BASE_DIR / "cookiesFile"
 
 VIDEO_STORAGE.mkdir(parents=True, exist_ok=True)
 
+# 发布任务记录 {task_id: 任务信息}，上传过程中的状态和进度通过 /postVideo/status/{task_id} 查询
+publish_tasks: Dict[str, Dict] = {}
+
 # -----------------------------
 # 工具函数
 # -----------------------------
@@ -317,8 +314,8 @@ async def post_video(payload: Dict):
         "发布任务: type={} files={} accounts={}", type_, file_list, account_list
     )
 
-    # 对于抖音上传，使用我们独立实现的模块
-    if type_ == 3:
+    # social-auto-upload模块不可用时，抖音使用独立实现的模块；可用时所有平台统一走平台注册表
+    if type_ == 3 and not SOCIAL_AUTO_UPLOAD_AVAILABLE:
         try:
             from .douyin_upload import upload_douyin_video
             # 自动登录功能，默认关闭避免意外打开浏览器
@@ -346,64 +343,77 @@ async def post_video(payload: Dict):
             logger.error(f"抖音上传失败: {e}")
             return {"code": 500, "msg": f"抖音上传出错: {str(e)}", "data": None}
 
-    # 对于其他平台，尝试使用原始social-auto-upload实现
+    # 平台注册表中的上传实现
     if SOCIAL_AUTO_UPLOAD_AVAILABLE:
+        task_info: Optional[Dict] = None
         try:
-            async def run_post():
-                match type_:
-                    case 1:
-                        await _run_in_thread(
-                            post_video_xhs,
-                            title,
-                            file_list,
-                            tags,
-                            account_list,
-                            category,
-                            enable_timer,
-                            videos_per_day,
-                            daily_times,
-                            start_days,
-                        )
-                    case 2:
-                        await _run_in_thread(
-                            post_video_tencent,
-                            title,
-                            file_list,
-                            tags,
-                            account_list,
-                            category,
-                            enable_timer,
-                            videos_per_day,
-                            daily_times,
-                            start_days,
-                        )
-                    case 4:
-                        await _run_in_thread(
-                            post_video_ks,
-                            title,
-                            file_list,
-                            tags,
-                            account_list,
-                            category,
-                            enable_timer,
-                            videos_per_day,
-                            daily_times,
-                            start_days,
-                        )
-                    case _:
-                        raise HTTPException(status_code=400, detail="不支持的平台类型")
-
-            await run_post()
-            return {"code": 200, "msg": None, "data": None}
+            build_jobs = PUBLISH_JOB_BUILDERS.get(type_)
+            if build_jobs is None:
+                raise HTTPException(status_code=400, detail="不支持的平台类型")
+
+            jobs = build_jobs(
+                title,
+                file_list,
+                tags,
+                account_list,
+                category,
+                enable_timer,
+                videos_per_day,
+                daily_times,
+                start_days,
+            )
+            # 接口在发布完成后才返回，调用方可传入taskId，在上传过程中查询进度
+            task_id = payload.get("taskId") or str(uuid.uuid4())
+            task_info = publish_tasks[task_id] = {
+                "task_id": task_id,
+                "status": "uploading",
+                "title": title,
+                "created_at": datetime.now(),
+                "progress": None,
+                "error": None,
+            }
+            track_progress(jobs, task_info)
+            # 提交到上传运行时执行，不占用线程池线程
+            results = await get_upload_runtime().publish(jobs)
+            failed = [result for result in results if not result["success"]]
+            task_info["updated_at"] = datetime.now()
+            if failed:
+                logger.error("发布失败: {}/{} 个任务失败", len(failed), len(results))
+                task_info["status"] = "failed"
+                task_info["error"] = failed[0]["error"]
+                return {
+                    "code": 500,
+                    "msg": f"{len(failed)}/{len(results)} 个发布任务失败: {failed[0]['error']}",
+                    "data": [{"account": r["account"], "file": r["file"], "error": r["error"]} for r in failed],
+                }
+            task_info["status"] = "completed"
+            return {"code": 200, "msg": None, "data": {"task_id": task_id}}
 
         except Exception as e:
             logger.error(f"发布失败: {e}")
+            if task_info is not None:
+                task_info.update(status="failed", error=str(e), updated_at=datetime.now())
             return {"code": 500, "msg": f"发布失败: {str(e)}", "data": None}
     else:
         logger.error(f"不支持的平台类型 {type_}，social-auto-upload模块不可用")
         return {"code": 400, "msg": f"不支持的平台类型或模块缺失: {type_}", "data": None}
 
 
+@router.get("/postVideo/status/{task_id}")
+async def get_post_video_status(task_id: str):
+    """查询发布任务的状态和上传进度"""
+    task_info = publish_tasks.get(task_id)
+    if task_info is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"code": 200, "msg": None, "data": task_info}
+
+
+@router.on_event("shutdown")
+async def close_upload_runtime():
+    """应用关闭时停止上传运行时（与抖音独立上传模块共用同一个运行时）"""
+    await asyncio.to_thread(get_upload_runtime().shutdown)
+
+
 @router.post("/postVideoBatch")
 async def post_video_batch(batch_payload: List[Dict]):
     if not isinstance(batch_payload, list):
@@ -423,28 +433,19 @@ active_queues: Dict[str, Queue] = {}
 
 
 def run_async_login(type_: str, account_name: str, status_queue: Queue):
-    if type_ == "1":
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(xiaohongshu_cookie_gen(account_name, status_queue))
-        loop.close()
-    elif type_ == "2":
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(get_tencent_cookie(account_name, status_queue))
-        loop.close()
-    elif type_ == "3":
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(douyin_cookie_gen(account_name, status_queue))
-        loop.close()
-    elif type_ == "4":
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(get_ks_cookie(account_name, status_queue))
-        loop.close()
-    else:
+    # 扫码登录函数由平台注册表按平台类型提供
+    try:
+        uploader = get_platform_uploader(type_)
+    except ValueError:
+        status_queue.put("500")
+        return
+    if not uploader.cookie_generator:
         status_queue.put("500")
+        return
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(uploader.login(account_name, status_queue))
+    loop.close()
 
 
 @router.get("/login")
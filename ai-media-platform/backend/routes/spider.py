@@ -4,10 +4,12 @@
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional, Dict, Any
 from loguru import logger
 import asyncio
+import json
 import time
 from datetime import datetime
 
@@ -16,6 +18,15 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+# 调度器只依赖标准库，回退实现同样需要，按完整包路径导入
+from backend.services.spider.crawl_scheduler import CrawlScheduler
+
+try:
+    from services.crawl_store import get_crawl_store
+    CRAWL_STORE_AVAILABLE = True
+except ImportError:
+    CRAWL_STORE_AVAILABLE = False
+
 # 导入优化的爬虫服务
 try:
     from services.spider.spider_service_optimized import get_spider_service
@@ -27,6 +38,12 @@ except ImportError as e:
 
 router = APIRouter(prefix="/api/v1/spider", tags=["智能爬虫"])
 
+# 单次批量抓取的URL上限
+MAX_BATCH_URLS = 500
+
+# 优化服务不可用时，回退实现使用的调度器
+_fallback_scheduler = CrawlScheduler()
+
 # 全局爬虫服务实例
 _spider_service = None
 
@@ -40,13 +57,22 @@ def get_spider_service_instance():
     return _spider_service
 
 
+@router.on_event("shutdown")
+async def close_spider_service():
+    """应用关闭时释放爬虫服务的共享HTTP会话"""
+    if _spider_service is not None:
+        await _spider_service.close()
+
+
 class SpiderRequest(BaseModel):
     """爬虫请求模型"""
     url: HttpUrl
-    mode: str = "content"  # full, content, title, images, videos, social
+    mode: str = "content"  # full, content, title, metadata, images, videos, social
     depth: int = 1
     filters: List[str] = ["ads", "scripts"]
     delay: float = 1.0
+    reuse: bool = False  # 为True时优先返回已存储的结果，不重新抓取
+    max_age: Optional[float] = None  # 复用结果的最长时间（秒）
 
 
 class SpiderResponse(BaseModel):
@@ -62,7 +88,37 @@ class BatchSpiderRequest(BaseModel):
     mode: str = "content"
     depth: int = 1
     filters: List[str] = ["ads", "scripts"]
+    delay: float = 1.0  # 同一域名两次请求之间的最小间隔，不同域名并发抓取
+    stream: bool = False  # 为True时以NDJSON逐条返回完成的结果
+    drop_duplicates: bool = False  # 为True时近似重复的文章不返回正文
+
+
+class SiteCrawlRequest(BaseModel):
+    """增量站点抓取请求模型"""
+    seeds: List[HttpUrl]  # 种子页面，如热榜、列表页，每次运行都会重新抓取
+    job: Optional[str] = None  # 任务名，相同任务共享已见URL集合；默认由种子生成
+    max_depth: int = 1
+    max_pages: int = 100
+    allowed_domains: Optional[List[str]] = None  # 默认为种子所在站点
+    follow_patterns: Optional[List[str]] = None  # 跟随链接的URL正则，默认按站点选择文章URL规则
+    mode: str = "content"
+    filters: List[str] = ["ads", "scripts"]
     delay: float = 1.0
+    drop_duplicates: bool = False
+
+
+class DedupArticle(BaseModel):
+    """待检查重复的文章"""
+    content: str
+    url: Optional[str] = None
+    title: Optional[str] = None
+    platform: Optional[str] = None
+
+
+class DedupCheckRequest(BaseModel):
+    """近似重复检查请求模型"""
+    articles: List[DedupArticle]
+    register: bool = False  # 为True时把不重复的文章收录到去重索引
 
 
 async def crawl_single_url(url: str, mode: str = "content") -> Dict[str, Any]:
@@ -292,6 +348,16 @@ async def crawl_url(request: SpiderRequest):
         if not request.url:
             raise HTTPException(status_code=400, detail="URL不能为空")
 
+        if request.reuse and CRAWL_STORE_AVAILABLE:
+            stored = get_crawl_store().get_by_url(str(request.url), request.max_age)
+            if stored is not None:
+                logger.info(f"使用已存储的抓取结果: id={stored['id']}")
+                return SpiderResponse(
+                    success=True,
+                    message="使用已存储的结果",
+                    data={**stored, "from_store": True}
+                )
+
         # 优先使用优化服务
         spider_service = get_spider_service_instance()
         if spider_service:
@@ -340,50 +406,195 @@ async def crawl_url(request: SpiderRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def iter_batch_results(request: BatchSpiderRequest):
+    """按完成顺序产出批量抓取结果，每条结果带有输入序号和success标记"""
+    urls = [str(url) for url in request.urls]
+    spider_service = get_spider_service_instance()
+
+    if spider_service:
+        async for item in spider_service.batch_crawl_stream(
+            urls,
+            delay=request.delay,
+            drop_duplicates=request.drop_duplicates,
+            mode=request.mode,
+            depth=request.depth,
+            filters=request.filters
+        ):
+            if item["status"] == "duplicate":
+                yield item["index"], {"url": item["url"], "duplicate_of": item["duplicate_of"], "success": False}
+                continue
+            result = item.get("data") or {"error": item.get("error"), "url": item["url"]}
+            yield item["index"], {**result, "success": item["status"] == "success"}
+        return
+
+    async def crawl(url: str) -> Dict[str, Any]:
+        return await crawl_single_url(url, request.mode)
+
+    async for index, url, result, error in _fallback_scheduler.crawl(urls, crawl, min_interval=request.delay):
+        if error is not None:
+            logger.error(f"批量爬取失败 {url}: {error}")
+            result = {"success": False, "error": str(error), "url": url}
+        yield index + 1, result
+
+
 @router.post("/batch-crawl")
 async def batch_crawl_urls(request: BatchSpiderRequest, background_tasks: BackgroundTasks):
-    """批量爬取URLs"""
+    """批量爬取URLs
+
+    不同域名并发抓取，同一域名遵守并发数和最小间隔(delay)。
+    stream为True时以NDJSON逐条返回完成的结果，最后一行为汇总。
+    """
     if not request.urls:
         raise HTTPException(status_code=400, detail="URL列表不能为空")
 
-    if len(request.urls) > 10:
-        raise HTTPException(status_code=400, detail="一次最多批量爬取10个URL")
+    if len(request.urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"一次最多批量爬取{MAX_BATCH_URLS}个URL")
 
-    results = []
+    total = len(request.urls)
 
-    for i, url in enumerate(request.urls):
-        try:
-            # 每个请求之间添加延迟
-            if i > 0:
-                await asyncio.sleep(request.delay)
+    if request.stream:
+        async def generate():
+            success_count = 0
+            async for index, result in iter_batch_results(request):
+                success_count += 1 if result.get("success", False) else 0
+                line = {"type": "result", "index": index, "result": result}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            summary = {"total": total, "success": success_count, "failed": total - success_count}
+            yield json.dumps({"type": "summary", "summary": summary}, ensure_ascii=False) + "\n"
 
-            result = await crawl_single_url(str(url), request.mode)
-            results.append(result)
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
 
-        except Exception as e:
-            logger.error(f"批量爬取失败 {url}: {e}")
-            results.append({
-                "success": False,
-                "error": str(e),
-                "url": str(url)
-            })
+    indexed_results = [item async for item in iter_batch_results(request)]
+    indexed_results.sort(key=lambda item: item[0])
+    results = [result for _, result in indexed_results]
 
     success_count = sum(1 for r in results if r.get("success", False))
 
     return {
         "success": True,
-        "message": f"批量爬取完成，成功 {success_count}/{len(request.urls)} 个",
+        "message": f"批量爬取完成，成功 {success_count}/{total} 个",
         "data": {
             "results": results,
             "summary": {
-                "total": len(request.urls),
+                "total": total,
                 "success": success_count,
-                "failed": len(request.urls) - success_count
+                "failed": total - success_count
             }
         }
     }
 
 
+@router.post("/site-crawl")
+async def crawl_site(request: SiteCrawlRequest):
+    """增量抓取站点
+
+    从种子页面出发按深度和域名范围跟随链接，只抓取该任务未处理过的URL，中断后以同一任务名继续。
+    以NDJSON逐条返回完成的结果，最后一行为汇总。
+    """
+    spider_service = get_spider_service_instance()
+    if not spider_service:
+        raise HTTPException(status_code=503, detail="增量抓取需要优化爬虫服务")
+    if not request.seeds:
+        raise HTTPException(status_code=400, detail="种子URL不能为空")
+    if request.max_pages > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"单次最多抓取{MAX_BATCH_URLS}个页面")
+
+    seeds = [str(url) for url in request.seeds]
+    job = request.job or spider_service.frontier.job_name_for(seeds)
+
+    async def generate():
+        total = success_count = 0
+        async for item in spider_service.crawl_site(
+            seeds,
+            job=job,
+            max_depth=request.max_depth,
+            max_pages=request.max_pages,
+            allowed_domains=request.allowed_domains,
+            follow_patterns=request.follow_patterns,
+            delay=request.delay,
+            drop_duplicates=request.drop_duplicates,
+            mode=request.mode,
+            filters=request.filters
+        ):
+            total += 1
+            success_count += 1 if item["status"] == "success" else 0
+            yield json.dumps({"type": "result", "result": item}, ensure_ascii=False) + "\n"
+        summary = {"job": job, "total": total, "success": success_count, "failed": total - success_count}
+        yield json.dumps({"type": "summary", "summary": summary}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/site-crawl/{job}")
+async def get_site_crawl_job(job: str):
+    """查询增量抓取任务的队列状态"""
+    spider_service = get_spider_service_instance()
+    if not spider_service:
+        raise HTTPException(status_code=503, detail="增量抓取需要优化爬虫服务")
+    stats = spider_service.frontier.stats(job)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"success": True, "data": stats}
+
+
+@router.post("/dedup/check")
+async def check_duplicate_articles(request: DedupCheckRequest):
+    """检查文章是否与已抓取的文章近似重复，供文本优化前过滤转载稿"""
+    spider_service = get_spider_service_instance()
+    if not spider_service or spider_service.dedup_index is None:
+        raise HTTPException(status_code=503, detail="去重索引不可用")
+    if len(request.articles) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=400, detail=f"一次最多检查{MAX_BATCH_URLS}篇文章")
+
+    results = await spider_service.check_duplicates(
+        [article.dict() for article in request.articles], register=request.register
+    )
+    duplicates = sum(1 for result in results if result["duplicate_of"])
+    return {
+        "success": True,
+        "message": f"检查完成，近似重复 {duplicates}/{len(results)} 篇",
+        "data": {"results": results, "index": spider_service.dedup_index.stats()}
+    }
+
+
+def get_crawl_store_instance():
+    """获取爬取结果存储，不可用时返回503"""
+    if not CRAWL_STORE_AVAILABLE:
+        raise HTTPException(status_code=503, detail="爬取结果存储不可用")
+    return get_crawl_store()
+
+
+@router.get("/articles")
+async def list_crawled_articles(platform: Optional[str] = None, keyword: Optional[str] = None,
+                                since: Optional[float] = None, until: Optional[float] = None,
+                                limit: int = 20, offset: int = 0):
+    """列出已抓取的文章（不含正文），keyword按标题搜索，since/until为抓取时间戳范围"""
+    limit = min(max(limit, 1), 100)
+    offset = max(offset, 0)
+    items, total = get_crawl_store_instance().search(platform, keyword, since, until, limit, offset)
+    return {
+        "success": True,
+        "data": {"items": items, "total": total, "limit": limit, "offset": offset}
+    }
+
+
+@router.get("/articles/{article_id}")
+async def get_crawled_article(article_id: int):
+    """获取已抓取文章的完整内容"""
+    article = get_crawl_store_instance().get(article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail="文章不存在")
+    return {"success": True, "data": article}
+
+
+@router.delete("/articles/{article_id}")
+async def delete_crawled_article(article_id: int):
+    """删除已抓取的文章"""
+    if not get_crawl_store_instance().delete(article_id):
+        raise HTTPException(status_code=404, detail="文章不存在")
+    return {"success": True, "message": "删除成功"}
+
+
 @router.get("/recommend-sites")
 async def get_recommend_sites():
     """获取推荐网站"""
@@ -428,5 +639,5 @@ async def spider_health():
         "service": "spider",
         "timestamp": datetime.now().isoformat(),
         "supported_sites": ["csdn.net", "zhihu.com", "juejin.cn", "general"],
-        "features": ["single_crawl", "batch_crawl", "content_extraction", "image_extraction"]
+        "features": ["single_crawl", "batch_crawl", "site_crawl", "dedup", "content_extraction", "image_extraction"]
     }
\ No newline at end of file
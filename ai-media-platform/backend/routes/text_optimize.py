@@ -20,6 +20,12 @@ except ImportError as e:
     logger.warning(f"优化文本服务导入失败: {e}，使用模拟服务")
     TEXT_SERVICE_AVAILABLE = False
 
+try:
+    from services.crawl_store import get_crawl_store
+    CRAWL_STORE_AVAILABLE = True
+except ImportError:
+    CRAWL_STORE_AVAILABLE = False
+
 router = APIRouter(prefix="/api/v1/llm", tags=["文本优化"])
 
 # 全局文本服务实例
@@ -37,7 +43,8 @@ def get_text_service_instance():
 
 class TextOptimizeRequest(BaseModel):
     """文本优化请求模型"""
-    text: str
+    text: str = ""
+    article_id: Optional[int] = None  # 已抓取文章的id，text为空时使用该文章的正文
     provider: str = "zhipu"  # zhipu, openai, moonshot, doubao, qwen
     mode: str = "creative"   # creative, professional, concise, seo, social
     custom_prompt: Optional[str] = None
@@ -67,6 +74,14 @@ class ProviderTestRequest(BaseModel):
 async def optimize_text(request: TextOptimizeRequest):
     """优化文本"""
     try:
+        if not request.text.strip() and request.article_id is not None:
+            if not CRAWL_STORE_AVAILABLE:
+                raise HTTPException(status_code=503, detail="爬取结果存储不可用")
+            article = get_crawl_store().get(request.article_id)
+            if article is None:
+                raise HTTPException(status_code=404, detail=f"文章不存在: {request.article_id}")
+            request.text = article.get("content", "")
+
         if not request.text.strip():
             raise HTTPException(status_code=400, detail="文本内容不能为空")
 
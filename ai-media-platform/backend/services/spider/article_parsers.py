@@ -0,0 +1,272 @@
+"""
+主服务爬虫的文章解析 - 按平台提取标题、作者、正文等字段
+解析函数为模块级纯函数，由ParsePool在解析进程中执行，解析大页面时不占用API进程的GIL
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER_FEATURES = "lxml"
+except ImportError:
+    HTML_PARSER_FEATURES = "html.parser"
+
+
+def parse_article(html: str, url: str, platform: str) -> Dict[str, Any]:
+    """解析文章：按平台选择解析函数；安装了lxml时使用C实现的树构建器"""
+    soup = BeautifulSoup(html, HTML_PARSER_FEATURES)
+
+    # 根据不同平台使用不同的解析策略
+    if platform == "csdn":
+        return parse_csdn_article(soup, url)
+    elif platform == "juejin":
+        return parse_juejin_article(soup, url)
+    elif platform == "zhihu":
+        return parse_zhihu_article(soup, url)
+    else:
+        return parse_general_article(soup, url, platform)
+
+
+def parse_csdn_article(soup: BeautifulSoup, url: str):
+    """解析CSDN文章"""
+    # 提取标题
+    title_elem = soup.find('h1', class_='article-title')
+    if not title_elem:
+        title_elem = soup.find('title')
+    title = title_elem.get_text().strip() if title_elem else "未知标题"
+
+    # 提取作者
+    author_elem = soup.find('a', class_='author')
+    if not author_elem:
+        author_elem = soup.find('span', class_='author-name')
+    author = author_elem.get_text().strip() if author_elem else "未知作者"
+
+    # 提取发布时间
+    time_elem = soup.find('span', class_='time')
+    if not time_elem:
+        time_elem = soup.find('div', class_='article-info-box').find('span') if soup.find('div', class_='article-info-box') else None
+    publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
+
+    # 提取内容
+    content_elem = soup.find('div', class_='article-content')
+    if not content_elem:
+        content_elem = soup.find('div', id='content_views')
+    if not content_elem:
+        content_elem = soup.find('article')
+
+    content = ""
+    if content_elem:
+        # 移除不需要的标签
+        for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside']):
+            tag.decompose()
+        content = content_elem.get_text().strip()
+
+    # 提取标签
+    tags = []
+    tag_elems = soup.find_all('a', class_='tag')
+    for tag_elem in tag_elems:
+        tag_text = tag_elem.get_text().strip()
+        if tag_text:
+            tags.append(tag_text)
+
+    # 提取阅读量
+    read_count = 0
+    read_elem = soup.find('span', class_='read-count')
+    if read_elem:
+        try:
+            read_text = read_elem.get_text().strip()
+            read_num = re.findall(r'\d+', read_text)
+            if read_num:
+                read_count = int(read_num[0])
+        except:
+            pass
+
+    # 生成内容摘要
+    summary = content[:200] + "..." if len(content) > 200 else content
+
+    return {
+        "title": title,
+        "content": content,
+        "summary": summary,
+        "author": author,
+        "publish_time": publish_time,
+        "url": url,
+        "platform": "csdn",
+        "tags": tags,
+        "read_count": read_count,
+        "like_count": 0,
+        "crawl_time": datetime.now().isoformat(),
+        "word_count": len(content),
+        "status": "success"
+    }
+
+
+def parse_juejin_article(soup: BeautifulSoup, url: str):
+    """解析掘金文章"""
+    # 提取标题
+    title_elem = soup.find('h1', class_='article-title')
+    if not title_elem:
+        title_elem = soup.find('title')
+    title = title_elem.get_text().strip() if title_elem else "未知标题"
+
+    # 提取作者
+    author_elem = soup.find('a', class_='username')
+    if not author_elem:
+        author_elem = soup.find('span', class_='user-name')
+    author = author_elem.get_text().strip() if author_elem else "未知作者"
+
+    # 提取发布时间
+    time_elem = soup.find('time')
+    publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
+
+    # 提取内容
+    content_elem = soup.find('div', class_='article-content')
+    if not content_elem:
+        content_elem = soup.find('div', class_='markdown-body')
+
+    content = ""
+    if content_elem:
+        for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside']):
+            tag.decompose()
+        content = content_elem.get_text().strip()
+
+    # 提取标签
+    tags = []
+    tag_elems = soup.find_all('a', class_='tag')
+    for tag_elem in tag_elems:
+        tag_text = tag_elem.get_text().strip()
+        if tag_text:
+            tags.append(tag_text)
+
+    # 生成摘要
+    summary = content[:200] + "..." if len(content) > 200 else content
+
+    return {
+        "title": title,
+        "content": content,
+        "summary": summary,
+        "author": author,
+        "publish_time": publish_time,
+        "url": url,
+        "platform": "juejin",
+        "tags": tags,
+        "read_count": 0,
+        "like_count": 0,
+        "crawl_time": datetime.now().isoformat(),
+        "word_count": len(content),
+        "status": "success"
+    }
+
+
+def parse_zhihu_article(soup: BeautifulSoup, url: str):
+    """解析知乎文章"""
+    # 提取标题
+    title_elem = soup.find('h1', class_='Post-Title')
+    if not title_elem:
+        title_elem = soup.find('h1')
+    if not title_elem:
+        title_elem = soup.find('title')
+    title = title_elem.get_text().strip() if title_elem else "未知标题"
+
+    # 提取作者
+    author_elem = soup.find('span', class_='UserLink-link')
+    if not author_elem:
+        author_elem = soup.find('a', class_='author-link')
+    author = author_elem.get_text().strip() if author_elem else "未知作者"
+
+    # 提取发布时间
+    time_elem = soup.find('time')
+    publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
+
+    # 提取内容
+    content_elem = soup.find('div', class_='Post-RichText')
+    if not content_elem:
+        content_elem = soup.find('div', class_='RichText')
+
+    content = ""
+    if content_elem:
+        for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside']):
+            tag.decompose()
+        content = content_elem.get_text().strip()
+
+    # 生成摘要
+    summary = content[:200] + "..." if len(content) > 200 else content
+
+    return {
+        "title": title,
+        "content": content,
+        "summary": summary,
+        "author": author,
+        "publish_time": publish_time,
+        "url": url,
+        "platform": "zhihu",
+        "tags": [],
+        "read_count": 0,
+        "like_count": 0,
+        "crawl_time": datetime.now().isoformat(),
+        "word_count": len(content),
+        "status": "success"
+    }
+
+
+def parse_general_article(soup: BeautifulSoup, url: str, platform: str):
+    """通用文章解析"""
+    # 提取标题
+    title_elem = soup.find('title')
+    title = title_elem.get_text().strip() if title_elem else "未知标题"
+
+    # 提取内容 - 通用方法
+    content = ""
+
+    # 尝试多种常见的内容选择器
+    content_selectors = [
+        'article',
+        '.article-content',
+        '.post-content',
+        '.entry-content',
+        '.content',
+        '#content',
+        '.main-content',
+        'main'
+    ]
+
+    for selector in content_selectors:
+        content_elem = soup.select_one(selector)
+        if content_elem:
+            # 移除不需要的标签
+            for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside', 'header']):
+                tag.decompose()
+            content = content_elem.get_text().strip()
+            if len(content) > 100:  # 内容长度合理
+                break
+
+    # 如果没有找到合适的内容，尝试获取body文本
+    if not content:
+        body_elem = soup.find('body')
+        if body_elem:
+            for tag in body_elem.find_all(['script', 'style', 'nav', 'footer', 'aside', 'header']):
+                tag.decompose()
+            content = body_elem.get_text().strip()
+
+    # 生成摘要
+    summary = content[:200] + "..." if len(content) > 200 else content
+
+    return {
+        "title": title,
+        "content": content,
+        "summary": summary,
+        "author": "未知作者",
+        "publish_time": datetime.now().strftime('%Y-%m-%d'),
+        "url": url,
+        "platform": platform,
+        "tags": [],
+        "read_count": 0,
+        "like_count": 0,
+        "crawl_time": datetime.now().isoformat(),
+        "word_count": len(content),
+        "status": "success"
+    }
@@ -0,0 +1,82 @@
+"""
+爬取调度器 - 跨域名并发抓取，同一域名遵守并发数和最小请求间隔
+批量抓取的吞吐量随不同主机数增长，结果按完成顺序返回
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class _DomainState:
+    """单个域名的礼貌性限制状态"""
+
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.next_allowed = 0.0
+
+
+class CrawlScheduler:
+    """爬取调度器
+
+    - max_concurrency: 全局同时进行的抓取数
+    - per_domain_concurrency: 同一域名同时进行的抓取数
+    - min_interval: 同一域名两次请求开始之间的最小间隔（秒）
+
+    域名状态在多次批量抓取之间共享，并发的批量任务同样遵守同一域名的限制。
+    """
+
+    def __init__(self, max_concurrency: int = 16, per_domain_concurrency: int = 2,
+                 min_interval: float = 1.0):
+        self.max_concurrency = max_concurrency
+        self.per_domain_concurrency = per_domain_concurrency
+        self.min_interval = min_interval
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._domains: Dict[str, _DomainState] = {}
+
+    def _domain_state(self, url: str) -> _DomainState:
+        domain = urlparse(url).netloc.lower()
+        state = self._domains.get(domain)
+        if state is None:
+            state = _DomainState(self.per_domain_concurrency)
+            self._domains[domain] = state
+        return state
+
+    async def _wait_turn(self, state: _DomainState, min_interval: float):
+        """等待同一域名的请求间隔"""
+        async with state.lock:
+            delay = state.next_allowed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            state.next_allowed = time.monotonic() + min_interval
+
+    async def _run_one(self, index: int, url: str, crawl: Callable[[str], Awaitable[Any]],
+                       min_interval: float) -> Tuple[int, str, Any, Optional[Exception]]:
+        state = self._domain_state(url)
+        # 先占域名槽位再占全局槽位，等待礼貌间隔时不占用其他域名可用的全局并发
+        async with state.semaphore:
+            await self._wait_turn(state, min_interval)
+            async with self._global:
+                try:
+                    return index, url, await crawl(url), None
+                except Exception as e:
+                    return index, url, None, e
+
+    async def crawl(self, urls: List[str], crawl: Callable[[str], Awaitable[Any]],
+                    min_interval: Optional[float] = None) -> AsyncIterator[Tuple[int, str, Any, Optional[Exception]]]:
+        """并发抓取urls，按完成顺序产出 (序号, url, 结果, 异常)"""
+        interval = self.min_interval if min_interval is None else min_interval
+        tasks = [
+            asyncio.create_task(self._run_one(index, url, crawl, interval))
+            for index, url in enumerate(urls)
+        ]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            # 调用方中途停止迭代（如客户端断开）时取消剩余抓取
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,158 @@
+"""
+近似重复文章检测 - 基于正文的64位SimHash指纹
+同一篇文章被转载到多个平台时指纹的海明距离很小。指纹切成6段（4段11位、2段10位）存入SQLite并分别建索引，
+由抽屉原理，海明距离不超过5的两个指纹至少有一段完全相同，查询只需比较少量候选
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .http_cache import normalize_url
+
+DEFAULT_DEDUP_PATH = Path("./cache/spider_dedup.db")
+
+FINGERPRINT_BITS = 64
+BAND_WIDTHS = (11, 11, 11, 11, 10, 10)
+BAND_COUNT = len(BAND_WIDTHS)
+DEFAULT_MAX_DISTANCE = BAND_COUNT - 1
+
+# 正文太短时指纹区分度不够，不参与去重
+MIN_CONTENT_CHARS = 80
+SHINGLE_SIZE = 4
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def simhash(text: str) -> Optional[int]:
+    """计算正文的SimHash：去掉空白和标点后按4字切片，每个切片哈希后按位投票"""
+    normalized = _NON_WORD.sub('', text.lower())
+    if len(normalized) < MIN_CONTENT_CHARS:
+        return None
+
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+    # 按字节统计各取值出现次数，最后再展开到位，避免对每个切片逐位循环
+    byte_counts = [[0] * 256 for _ in range(FINGERPRINT_BITS // 8)]
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest()
+        for position, value in enumerate(digest):
+            byte_counts[position][value] += 1
+
+    threshold = len(shingles) / 2
+    fingerprint = 0
+    for position, counts in enumerate(byte_counts):
+        for bit in range(8):
+            ones = sum(count for value, count in enumerate(counts) if value >> bit & 1)
+            if ones > threshold:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def content_fingerprint(text: str) -> Optional[str]:
+    """正文指纹的16位十六进制表示，正文过短时为None"""
+    value = simhash(text)
+    return None if value is None else f"{value:016x}"
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _bands(fingerprint: int):
+    bands = []
+    for width in BAND_WIDTHS:
+        bands.append(fingerprint & ((1 << width) - 1))
+        fingerprint >>= width
+    return bands
+
+
+def _to_signed(value: int) -> int:
+    """SQLite整数为有符号64位"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class DedupIndex:
+    """持久化的SimHash分段索引（SQLite）"""
+
+    def __init__(self, db_path: Path = DEFAULT_DEDUP_PATH, max_distance: int = DEFAULT_MAX_DISTANCE):
+        if max_distance >= BAND_COUNT:
+            raise ValueError(f"max_distance不能超过{BAND_COUNT - 1}，否则分段索引可能漏检")
+        self.db_path = Path(db_path)
+        self.max_distance = max_distance
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        band_columns = ", ".join(f"band{i} INTEGER NOT NULL" for i in range(BAND_COUNT))
+        with self._connect() as conn:
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS article_fingerprints (
+                    url_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    platform TEXT,
+                    fingerprint INTEGER NOT NULL,
+                    {band_columns},
+                    created_at REAL NOT NULL
+                )
+            ''')
+            for i in range(BAND_COUNT):
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS idx_fingerprint_band{i} ON article_fingerprints(band{i})'
+                )
+            conn.commit()
+
+    def find(self, fingerprint: str, exclude_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """查找海明距离最近且不超过max_distance的已收录文章"""
+        value = int(fingerprint, 16)
+        exclude_key = normalize_url(exclude_url) if exclude_url else None
+        query = " UNION ".join(
+            f"SELECT url_key, url, title, platform, fingerprint FROM article_fingerprints WHERE band{i} = ?"
+            for i in range(BAND_COUNT)
+        )
+        with self._connect() as conn:
+            candidates = conn.execute(query, _bands(value)).fetchall()
+
+        best = None
+        for url_key, url, title, platform, stored in candidates:
+            if url_key == exclude_key:
+                continue
+            distance = hamming_distance(value, stored & ((1 << 64) - 1))
+            if distance <= self.max_distance and (best is None or distance < best["distance"]):
+                best = {"url": url, "title": title, "platform": platform, "distance": distance}
+        return best
+
+    def add(self, fingerprint: str, url: str, title: Optional[str] = None, platform: Optional[str] = None):
+        """收录文章指纹，同一URL重复收录时覆盖"""
+        value = int(fingerprint, 16)
+        band_names = ", ".join(f"band{i}" for i in range(BAND_COUNT))
+        placeholders = ", ".join("?" for _ in range(BAND_COUNT))
+        with self._connect() as conn:
+            conn.execute(f'''
+                INSERT OR REPLACE INTO article_fingerprints (
+                    url_key, url, title, platform, fingerprint, {band_names}, created_at
+                ) VALUES (?, ?, ?, ?, ?, {placeholders}, ?)
+            ''', (normalize_url(url), url, title, platform, _to_signed(value), *_bands(value), time.time()))
+            conn.commit()
+
+    def check(self, fingerprint: Optional[str], url: str, title: Optional[str] = None,
+              platform: Optional[str] = None, register: bool = True) -> Optional[Dict[str, Any]]:
+        """返回近似重复的已收录文章；不重复且register为True时收录该文章"""
+        if not fingerprint:
+            return None
+        duplicate = self.find(fingerprint, exclude_url=url)
+        if duplicate is None and register:
+            self.add(fingerprint, url, title, platform)
+        return duplicate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM article_fingerprints').fetchone()[0]
+        return {"articles": count, "max_distance": self.max_distance}
@@ -0,0 +1,311 @@
+"""
+爬取边界(frontier) - 持久化的待抓取URL优先队列和已见集合
+已见集合由内存布隆过滤器加SQLite组成：布隆过滤器判定未见过的URL直接入队，判定可能见过的再查库确认；
+队列按深度优先级出队，进程重启后未完成的URL重新回到待抓取状态
+"""
+
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from .http_cache import normalize_url
+
+DEFAULT_FRONTIER_PATH = Path("./cache/spider_frontier.db")
+
+# 常见站点的文章URL规则，未指定跟随规则时按种子所在站点使用
+ARTICLE_URL_PATTERNS = {
+    "blog.csdn.net": [r"/article/details/\d+"],
+    "juejin.cn": [r"/post/\d+"],
+    "zhihu.com": [r"/question/\d+", r"zhuanlan\.zhihu\.com/p/\d+"],
+    "toutiao.com": [r"/article/\d+", r"/group/\d+"],
+}
+
+
+class BloomFilter:
+    """布隆过滤器，按预期元素数和误判率确定位数组大小和哈希次数"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # 双重哈希：由一个128位摘要派生k个位置
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class FrontierJob:
+    """一个增量抓取任务的范围设置"""
+
+    def __init__(self, name: str, seeds: List[str], max_depth: int, allowed_domains: List[str],
+                 follow_patterns: List[str]):
+        self.name = name
+        self.seeds = seeds
+        self.max_depth = max_depth
+        self.allowed_domains = allowed_domains
+        self.follow_patterns = follow_patterns
+        self._compiled = [re.compile(pattern) for pattern in follow_patterns]
+
+    def in_scope(self, url: str) -> bool:
+        """URL是否在域名范围内并符合跟随规则"""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https"):
+            return False
+        host = parsed.hostname or ""
+        if not any(host == domain or host.endswith("." + domain) for domain in self.allowed_domains):
+            return False
+        return not self._compiled or any(pattern.search(url) for pattern in self._compiled)
+
+
+class FrontierEntry:
+    """出队的待抓取URL"""
+
+    def __init__(self, url: str, depth: int, parent: Optional[str]):
+        self.url = url
+        self.depth = depth
+        self.parent = parent
+
+
+def _site_domain(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def default_follow_patterns(seeds: Iterable[str]) -> List[str]:
+    """按种子所在站点选择文章URL规则"""
+    patterns: List[str] = []
+    for seed in seeds:
+        host = urlparse(seed).hostname or ""
+        for site, site_patterns in ARTICLE_URL_PATTERNS.items():
+            if host == site or host.endswith("." + site):
+                patterns.extend(p for p in site_patterns if p not in patterns)
+    return patterns
+
+
+class CrawlFrontier:
+    """持久化的抓取边界（SQLite）"""
+
+    def __init__(self, db_path: Path = DEFAULT_FRONTIER_PATH, bloom_capacity: int = 1_000_000):
+        self.db_path = Path(db_path)
+        self.bloom_capacity = bloom_capacity
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._blooms: Dict[str, BloomFilter] = {}
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS frontier_jobs (
+                    name TEXT PRIMARY KEY,
+                    seeds TEXT NOT NULL,
+                    max_depth INTEGER NOT NULL,
+                    allowed_domains TEXT NOT NULL,
+                    follow_patterns TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS frontier_urls (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job TEXT NOT NULL,
+                    url_key TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    depth INTEGER NOT NULL,
+                    priority REAL NOT NULL,
+                    parent TEXT,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    discovered_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    UNIQUE (job, url_key)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_frontier_pending
+                ON frontier_urls(job, status, priority, seq)
+            ''')
+            # 上次运行中断时正在抓取的URL重新排队
+            conn.execute(
+                "UPDATE frontier_urls SET status = 'pending', updated_at = ? WHERE status = 'in_progress'",
+                (time.time(),)
+            )
+            conn.commit()
+
+    @staticmethod
+    def job_name_for(seeds: Iterable[str]) -> str:
+        """由种子URL生成默认任务名，相同种子的多次运行共享已见集合"""
+        keys = sorted(normalize_url(seed) for seed in seeds)
+        return "site-" + hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()[:12]
+
+    def open_job(self, seeds: List[str], name: Optional[str] = None, max_depth: int = 1,
+                 allowed_domains: Optional[List[str]] = None,
+                 follow_patterns: Optional[List[str]] = None) -> FrontierJob:
+        """创建或继续一个任务
+
+        种子页面（如热榜、列表页）每次运行都重新抓取以发现新文章，其余URL只抓取一次。
+        """
+        name = name or self.job_name_for(seeds)
+        if allowed_domains is None:
+            allowed_domains = sorted({_site_domain(seed) for seed in seeds})
+        if follow_patterns is None:
+            follow_patterns = default_follow_patterns(seeds)
+        job = FrontierJob(name, seeds, max_depth, allowed_domains, follow_patterns)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO frontier_jobs (name, seeds, max_depth, allowed_domains, follow_patterns,
+                                           created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    seeds = excluded.seeds,
+                    max_depth = excluded.max_depth,
+                    allowed_domains = excluded.allowed_domains,
+                    follow_patterns = excluded.follow_patterns,
+                    updated_at = excluded.updated_at
+            ''', (name, json.dumps(seeds), max_depth, json.dumps(allowed_domains),
+                  json.dumps(follow_patterns), now, now))
+
+            for seed in seeds:
+                conn.execute('''
+                    INSERT INTO frontier_urls (job, url_key, url, depth, priority, parent, status,
+                                               discovered_at, updated_at)
+                    VALUES (?, ?, ?, 0, 0, NULL, 'pending', ?, ?)
+                    ON CONFLICT(job, url_key) DO UPDATE SET
+                        status = 'pending', depth = 0, priority = 0, updated_at = excluded.updated_at
+                ''', (name, normalize_url(seed), seed, now, now))
+            conn.commit()
+
+        bloom = self._bloom(name)
+        for seed in seeds:
+            bloom.add(normalize_url(seed))
+        return job
+
+    def _bloom(self, job: str) -> BloomFilter:
+        """任务的布隆过滤器，首次使用时从数据库重建"""
+        bloom = self._blooms.get(job)
+        if bloom is None:
+            bloom = BloomFilter(self.bloom_capacity)
+            with self._connect() as conn:
+                for (url_key,) in conn.execute('SELECT url_key FROM frontier_urls WHERE job = ?', (job,)):
+                    bloom.add(url_key)
+            self._blooms[job] = bloom
+        return bloom
+
+    def add_links(self, job: FrontierJob, urls: Iterable[str], depth: int, parent: Optional[str] = None) -> int:
+        """把范围内且未见过的链接加入队列，返回新增数量"""
+        if depth > job.max_depth:
+            return 0
+
+        bloom = self._bloom(job.name)
+        candidates: Dict[str, str] = {}
+        for url in urls:
+            if not job.in_scope(url):
+                continue
+            key = normalize_url(url)
+            if key not in candidates:
+                candidates[key] = url
+        if not candidates:
+            return 0
+
+        now = time.time()
+        added = 0
+        with self._connect() as conn:
+            for key, url in candidates.items():
+                # 布隆过滤器判定可能见过时查库确认，避免误判漏掉新文章
+                if key in bloom and conn.execute(
+                    'SELECT 1 FROM frontier_urls WHERE job = ? AND url_key = ?', (job.name, key)
+                ).fetchone():
+                    continue
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO frontier_urls (job, url_key, url, depth, priority, parent, status,
+                                                         discovered_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)
+                ''', (job.name, key, url, depth, depth, parent, now, now))
+                added += cursor.rowcount
+                bloom.add(key)
+            conn.commit()
+        return added
+
+    def claim(self, job: FrontierJob, limit: int) -> List[FrontierEntry]:
+        """按优先级取出一批待抓取URL并标记为抓取中"""
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT seq, url, depth, parent FROM frontier_urls
+                WHERE job = ? AND status = 'pending'
+                ORDER BY priority, seq
+                LIMIT ?
+            ''', (job.name, limit)).fetchall()
+            conn.executemany(
+                "UPDATE frontier_urls SET status = 'in_progress', updated_at = ? WHERE seq = ?",
+                [(time.time(), seq) for seq, _, _, _ in rows]
+            )
+            conn.commit()
+        return [FrontierEntry(url, depth, parent) for _, url, depth, parent in rows]
+
+    def finish(self, job: FrontierJob, url: str, error: Optional[str] = None):
+        """标记URL抓取完成或失败"""
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE frontier_urls SET status = ?, error = ?, updated_at = ? WHERE job = ? AND url_key = ?',
+                ("failed" if error else "done", error, time.time(), job.name, normalize_url(url))
+            )
+            conn.commit()
+
+    def requeue(self, job: FrontierJob, urls: Iterable[str]):
+        """把已取出但未完成的URL放回待抓取状态"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE frontier_urls SET status = 'pending', updated_at = ? "
+                "WHERE job = ? AND url_key = ? AND status = 'in_progress'",
+                [(now, job.name, normalize_url(url)) for url in urls]
+            )
+            conn.commit()
+
+    def stats(self, name: str) -> Optional[Dict[str, Any]]:
+        """任务的队列统计"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT seeds, max_depth, allowed_domains, follow_patterns, updated_at FROM frontier_jobs WHERE name = ?',
+                (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            counts = dict(conn.execute(
+                'SELECT status, COUNT(*) FROM frontier_urls WHERE job = ? GROUP BY status', (name,)
+            ).fetchall())
+
+        seeds, max_depth, allowed_domains, follow_patterns, updated_at = row
+        return {
+            "job": name,
+            "seeds": json.loads(seeds),
+            "max_depth": max_depth,
+            "allowed_domains": json.loads(allowed_domains),
+            "follow_patterns": json.loads(follow_patterns),
+            "updated_at": updated_at,
+            "pending": counts.get("pending", 0) + counts.get("in_progress", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+        }
@@ -0,0 +1,113 @@
+"""
+HTML流式读取 - 按块读取响应正文并限制最大字节数，增量检测编码并解码；
+只需要元数据时，读到停止标记（如</head>或正文容器的开始标签）即提前结束，避免下载整页
+"""
+
+import codecs
+import re
+from typing import Optional, Pattern, Tuple
+
+# 允许抓取的内容类型，未声明类型时按HTML处理
+HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# 在正文开头查找<meta charset>声明的范围
+_SNIFF_BYTES = 2048
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.I)
+
+# 停止标记可能跨块，检查时保留上一块的末尾
+_STOP_OVERLAP = 512
+
+# 中文站点常把GBK页面声明为gb2312，统一按超集gb18030解码
+_CHARSET_ALIASES = {"gb2312": "gb18030", "gbk": "gb18030"}
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def is_html_content_type(content_type: Optional[str]) -> bool:
+    """判断Content-Type是否为HTML"""
+    if not content_type:
+        return True
+    return content_type.split(";", 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def _codec_name(charset: Optional[str]) -> Optional[str]:
+    if not charset:
+        return None
+    try:
+        name = codecs.lookup(charset.strip()).name
+    except LookupError:
+        return None
+    return _CHARSET_ALIASES.get(name, name)
+
+
+def sniff_charset(head: bytes, declared: Optional[str] = None) -> str:
+    """检测编码：BOM > Content-Type声明 > <meta>声明 > utf-8"""
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name
+
+    name = _codec_name(declared)
+    if name:
+        return name
+
+    match = _META_CHARSET.search(head[:_SNIFF_BYTES])
+    if match:
+        name = _codec_name(match.group(1).decode("ascii"))
+        if name:
+            return name
+    return "utf-8"
+
+
+async def read_html(response, max_bytes: int = DEFAULT_MAX_BYTES,
+                    stop_pattern: Optional[Pattern[str]] = None) -> Tuple[str, bool]:
+    """流式读取aiohttp响应的HTML正文
+
+    返回 (文本, 是否读完整页)；超过max_bytes或匹配到stop_pattern时停止读取。
+    """
+    decoder = None
+    pending = b""
+    parts = []
+    received = 0
+    tail = ""
+    complete = True
+
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        if received + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - received]
+            complete = False
+        received += len(chunk)
+
+        if decoder is None:
+            # 先攒够预扫描长度再确定编码
+            pending += chunk
+            if len(pending) < _SNIFF_BYTES and complete:
+                continue
+            decoder = codecs.getincrementaldecoder(sniff_charset(pending, response.charset))(errors="replace")
+            chunk, pending = pending, b""
+
+        text = decoder.decode(chunk)
+        parts.append(text)
+
+        if stop_pattern is not None:
+            window = tail + text
+            if stop_pattern.search(window):
+                complete = False
+                break
+            tail = window[-_STOP_OVERLAP:]
+
+        if not complete:
+            break
+
+    if decoder is None:
+        # 正文短于预扫描长度
+        decoder = codecs.getincrementaldecoder(sniff_charset(pending, response.charset))(errors="replace")
+    parts.append(decoder.decode(pending, final=True))
+
+    return "".join(parts), complete
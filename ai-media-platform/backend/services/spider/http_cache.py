@@ -0,0 +1,163 @@
+"""
+爬虫HTTP条件请求缓存 - 保存页面正文、ETag/Last-Modified和解析结果
+重新抓取时携带If-None-Match/If-Modified-Since，304时直接返回缓存的解析结果；
+服务端不支持条件请求时，正文哈希未变化也复用解析结果。总大小超过上限时按LRU淘汰
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+DEFAULT_CACHE_PATH = Path("./cache/spider_http_cache.db")
+
+# 规范化URL时去掉的跟踪参数
+_TRACKING_PARAMS = {"spm", "from", "share_token", "utm_source", "utm_medium", "utm_campaign",
+                    "utm_term", "utm_content", "fbclid", "gclid"}
+
+
+def normalize_url(url: str) -> str:
+    """规范化URL：小写协议和主机、去掉默认端口和片段、过滤跟踪参数并排序查询参数"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "http"
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS
+    ))
+    return urlunparse((scheme, netloc, path, "", query, ""))
+
+
+class CachedPage:
+    """缓存的页面"""
+
+    def __init__(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str],
+                 body_hash: str, parsed: Dict[str, Any]):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body_hash = body_hash
+        self.parsed = parsed  # 按抓取模式保存的解析结果
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """重新抓取时附加的条件请求头"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class SpiderHttpCache:
+    """磁盘HTTP缓存（SQLite），正文zlib压缩存储"""
+
+    def __init__(self, db_path: Path = DEFAULT_CACHE_PATH, max_bytes: int = 512 * 1024 * 1024):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url_key TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    parsed TEXT,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_accessed ON http_cache(accessed_at)')
+            conn.commit()
+
+    @staticmethod
+    def hash_body(body: str) -> str:
+        return hashlib.sha1(body.encode("utf-8", errors="ignore")).hexdigest()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """读取缓存并刷新访问时间"""
+        key = normalize_url(url)
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT etag, last_modified, body, body_hash, parsed FROM http_cache WHERE url_key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE http_cache SET accessed_at = ? WHERE url_key = ?', (time.time(), key))
+            conn.commit()
+
+        etag, last_modified, body, body_hash, parsed = row
+        return CachedPage(
+            url=key,
+            body=zlib.decompress(body).decode("utf-8", errors="ignore"),
+            etag=etag,
+            last_modified=last_modified,
+            body_hash=body_hash,
+            parsed=json.loads(parsed) if parsed else {}
+        )
+
+    def put(self, url: str, body: str, etag: Optional[str], last_modified: Optional[str],
+            parsed: Dict[str, Any]):
+        """写入缓存，超过大小上限时淘汰最久未访问的条目"""
+        key = normalize_url(url)
+        compressed = zlib.compress(body.encode("utf-8", errors="ignore"))
+        parsed_json = json.dumps(parsed, ensure_ascii=False)
+        size = len(compressed) + len(parsed_json.encode("utf-8"))
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO http_cache (
+                    url_key, etag, last_modified, body, body_hash, parsed, size, fetched_at, accessed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, etag, last_modified, compressed, self.hash_body(body), parsed_json, size, now, now))
+            self._evict(conn)
+            conn.commit()
+
+    def update_parsed(self, url: str, parsed: Dict[str, Any]):
+        """更新解析结果（新增抓取模式时），并刷新访问时间"""
+        key = normalize_url(url)
+        parsed_json = json.dumps(parsed, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE http_cache
+                SET parsed = ?, size = length(body) + ?, accessed_at = ?
+                WHERE url_key = ?
+            ''', (parsed_json, len(parsed_json.encode("utf-8")), time.time(), key))
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute('SELECT url_key, size FROM http_cache ORDER BY accessed_at').fetchall()
+        evicted = []
+        for url_key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((url_key,))
+            total -= size
+        conn.executemany('DELETE FROM http_cache WHERE url_key = ?', evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM http_cache').fetchone()
+        return {"entries": count, "size_bytes": total, "max_bytes": self.max_bytes}
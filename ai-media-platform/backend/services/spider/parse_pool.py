@@ -0,0 +1,88 @@
+"""
+解析进程池 - 把HTML解析放到独立进程，避免CPU密集的解析阻塞API事件循环
+较大的页面先写入共享内存文件系统(/dev/shm)上的临时文件，只把路径传给工作进程，
+避免把整页HTML作为大字符串序列化；提取逻辑为模块级纯函数（如extract_article），第一个参数为HTML
+"""
+
+import asyncio
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .parsers import extract_article
+
+# 小于该大小的页面直接传字符串，写临时文件反而更慢
+INLINE_LIMIT = 64 * 1024
+
+# 优先使用内存文件系统存放待解析的页面
+_SHM_DIR = Path("/dev/shm")
+
+
+def _call_from_file(func: Callable[..., Dict[str, Any]], path: str, *args) -> Dict[str, Any]:
+    """工作进程入口：从临时文件读取HTML后调用解析函数"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        html = f.read()
+    return func(html, *args)
+
+
+class ParsePool:
+    """HTML解析执行器
+
+    mode为process时使用进程池（默认，大小为CPU核数），为thread时使用线程池（调试或不支持多进程的环境）。
+    """
+
+    def __init__(self, mode: str = "process", max_workers: Optional[int] = None,
+                 inline_limit: int = INLINE_LIMIT):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"不支持的解析执行模式: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.inline_limit = inline_limit
+        self.temp_dir = str(_SHM_DIR) if _SHM_DIR.is_dir() else tempfile.gettempdir()
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="spider-parse")
+        return self._executor
+
+    async def extract(self, html: str, url: str, platform: str, backend_name: str) -> Dict[str, Any]:
+        """在执行器中提取文章字段"""
+        return await self.run(extract_article, html, url, platform, backend_name)
+
+    async def run(self, func: Callable[..., Dict[str, Any]], html: str, *args) -> Dict[str, Any]:
+        """在执行器中执行func(html, *args)，func须为可被工作进程导入的模块级函数"""
+        loop = asyncio.get_running_loop()
+
+        if self.mode == "thread" or len(html) < self.inline_limit:
+            return await self._submit(loop, func, html, *args)
+
+        fd, path = tempfile.mkstemp(prefix="spider_page_", suffix=".html", dir=self.temp_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(html)
+            return await self._submit(loop, _call_from_file, func, path, *args)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    async def _submit(self, loop: asyncio.AbstractEventLoop, func, *args) -> Dict[str, Any]:
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # 工作进程异常退出（如内存不足被杀）后重建进程池并重试一次
+            self.shutdown()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
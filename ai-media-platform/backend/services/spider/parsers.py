@@ -0,0 +1,349 @@
+"""
+文章解析后端 - 可插拔的HTML解析实现
+按 selectolax > lxml > BeautifulSoup 的顺序选择可用的解析库；
+各平台的字段选择器以CSS声明，lxml后端在每个解析线程中预编译为XPath，解析函数不依赖服务实例，可在线程池中执行
+"""
+
+import functools
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Pattern
+from urllib.parse import urljoin
+
+from .dedup import content_fingerprint
+
+try:
+    # selectolax 1.0起只保留lexbor后端，旧版本回退到Modest后端
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+        SELECTOLAX_AVAILABLE = True
+    except ImportError:
+        SELECTOLAX_AVAILABLE = False
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from bs4 import BeautifulSoup
+    BS4_AVAILABLE = True
+except ImportError:
+    BS4_AVAILABLE = False
+
+
+def _class_fallbacks(tags: List[str], classes: List[str]) -> List[str]:
+    """按 类名优先、标签其次 的顺序展开选择器"""
+    return [f"{tag}.{cls}" for cls in classes for tag in tags]
+
+
+# 各平台字段选择器，按优先级排列，取第一个命中的元素
+PLATFORM_SELECTORS: Dict[str, Dict[str, List[str]]] = {
+    "csdn": {
+        "title": ["h1.article-title", "h1", "title"],
+        "author": ["a.author", "span.author-name"],
+        "publish_time": ["span.time", "div.article-info-box"],
+        "content": ["div.article-content", "div#content_views", "article"],
+    },
+    "juejin": {
+        "title": ["h1.article-title", "h1"],
+        "author": ["span.username", "a.user-name"],
+        "publish_time": ["span.meta-time", "time"],
+        "content": ["div.article-content", "div.markdown-body"],
+    },
+    "zhihu": {
+        "title": ["h1.QuestionHeader-title", "h1"],
+        "author": ["span.UserLink-link", "a.author-link"],
+        "publish_time": ["span.ContentItem-time", "time"],
+        "content": ["div.RichText", "div.Post-RichText"],
+    },
+    "toutiao": {
+        "title": ["h1.article-title", "h1"],
+        "author": ["a.user-name", "span.name"],
+        "publish_time": ["time", "span.time"],
+        "content": ["div.article-content", "div.content"],
+    },
+    "xiaohongshu": {
+        "title": ["div.title", "h1"],
+        "author": ["span.username", "a.author"],
+        "publish_time": ["span.publish-time", "time"],
+        "content": ["div.content", "div.desc"],
+    },
+    "general": {
+        "title": ["title", "h1"],
+        "author": _class_fallbacks(["span", "div", "a"], ["author", "byline", "username", "user-name", "writer"]),
+        "publish_time": ["time"] + _class_fallbacks(
+            ["span", "div"], ["publish-time", "date", "timestamp", "meta-time"]
+        ),
+        "content": ["div.content", "article", "main"] + _class_fallbacks(
+            ["div"], ["article-content", "post-content", "entry-content", "main-content"]
+        ) + ["body"],
+    },
+}
+
+KEYWORD_META_SELECTOR = "meta[name=keywords]"
+KEYWORD_TAG_SELECTOR = ", ".join(
+    f"{tag}[class*={word}]" for tag in ("span", "a") for word in ("tag", "category", "label")
+)
+IMAGE_SELECTOR = "img"
+LINK_SELECTOR = "a[href]"
+
+FIELD_DEFAULTS = {
+    "title": "未知标题",
+    "author": "未知作者",
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+_SIMPLE_SELECTOR = re.compile(r'([a-z0-9]+)(?:([.#])([\w-]+))?')
+
+
+def _start_tag_regex(selector: str) -> str:
+    """把 tag / tag.class / tag#id 形式的选择器转换为匹配其开始标签的正则"""
+    tag, kind, name = _SIMPLE_SELECTOR.fullmatch(selector).groups()
+    if kind is None:
+        return rf'<{tag}\b'
+    attr = "class" if kind == "." else "id"
+    return rf'<{tag}\b[^>]*\b{attr}\s*=\s*["\']?(?:[^"\'>]*\s)?{re.escape(name)}(?=["\'\s>])'
+
+
+@functools.lru_cache(maxsize=None)
+def metadata_stop_pattern(platform: str) -> Pattern[str]:
+    """只提取标题等元数据时的停止读取标记
+
+    通用页面读到</head>为止；已知平台的标题、作者在正文之前，读到正文容器的开始标签为止。
+    """
+    if platform == "general" or platform not in PLATFORM_SELECTORS:
+        return re.compile(r'</head\s*>', re.I)
+    content_selectors = PLATFORM_SELECTORS[platform]["content"]
+    return re.compile("|".join(_start_tag_regex(selector) for selector in content_selectors), re.I)
+
+
+class ParserBackend:
+    """解析后端接口：只需实现文档解析、选择和取文本/属性几个基本操作"""
+
+    name = "base"
+
+    def parse(self, html: str):
+        raise NotImplementedError
+
+    def select_first(self, node, selector: str):
+        raise NotImplementedError
+
+    def select_all(self, node, selector: str) -> list:
+        raise NotImplementedError
+
+    def text(self, node) -> str:
+        """元素的文本（不含script/style）"""
+        raise NotImplementedError
+
+    def attr(self, node, name: str) -> Optional[str]:
+        raise NotImplementedError
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax（lexbor，C实现）"""
+
+    name = "selectolax"
+
+    def parse(self, html: str):
+        return HTMLParser(html)
+
+    def select_first(self, node, selector: str):
+        return node.css_first(selector)
+
+    def select_all(self, node, selector: str) -> list:
+        return node.css(selector)
+
+    def text(self, node) -> str:
+        for child in node.css("script, style"):
+            child.decompose()
+        return node.text(separator=" ")
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.attributes.get(name)
+
+
+class LxmlBackend(ParserBackend):
+    """lxml（libxml2，C实现），CSS选择器预编译为XPath并缓存"""
+
+    name = "lxml"
+
+    def __init__(self):
+        # 编译后的XPath对象不跨线程共享，每个解析线程各自编译一份
+        self._local = threading.local()
+
+    def _cache(self) -> Dict[str, Any]:
+        cache = getattr(self._local, "selectors", None)
+        if cache is None:
+            cache = {}
+            self._local.selectors = cache
+            self._local.text_xpath = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+            self.precompile()
+        return cache
+
+    def _compiled(self, selector: str) -> "CSSSelector":
+        cache = self._cache()
+        compiled = cache.get(selector)
+        if compiled is None:
+            compiled = CSSSelector(selector)
+            cache[selector] = compiled
+        return compiled
+
+    def precompile(self):
+        """为当前线程预编译所有平台选择器"""
+        for fields in PLATFORM_SELECTORS.values():
+            for selectors in fields.values():
+                for selector in selectors:
+                    self._compiled(selector)
+        for selector in (KEYWORD_META_SELECTOR, KEYWORD_TAG_SELECTOR, IMAGE_SELECTOR, LINK_SELECTOR):
+            self._compiled(selector)
+
+    def parse(self, html: str):
+        try:
+            return lxml.html.fromstring(html)
+        except ValueError:
+            # 带XML编码声明的字符串需要按字节解析
+            return lxml.html.fromstring(html.encode("utf-8"))
+
+    def select_first(self, node, selector: str):
+        matches = self._compiled(selector)(node)
+        return matches[0] if matches else None
+
+    def select_all(self, node, selector: str) -> list:
+        return self._compiled(selector)(node)
+
+    def text(self, node) -> str:
+        self._cache()
+        return " ".join(self._local.text_xpath(node))
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+
+class BeautifulSoupBackend(ParserBackend):
+    """BeautifulSoup，安装了lxml时使用lxml树构建器"""
+
+    name = "bs4"
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, "lxml" if LXML_AVAILABLE else "html.parser")
+
+    def select_first(self, node, selector: str):
+        return node.select_one(selector)
+
+    def select_all(self, node, selector: str) -> list:
+        return node.select(selector)
+
+    def text(self, node) -> str:
+        for child in node(["script", "style"]):
+            child.decompose()
+        return node.get_text(" ")
+
+    def attr(self, node, name: str) -> Optional[str]:
+        value = node.get(name)
+        return " ".join(value) if isinstance(value, list) else value
+
+
+_BACKEND_CLASSES = {
+    "selectolax": (SelectolaxBackend, SELECTOLAX_AVAILABLE),
+    "lxml": (LxmlBackend, LXML_AVAILABLE),
+    "bs4": (BeautifulSoupBackend, BS4_AVAILABLE),
+}
+
+_backends: Dict[str, ParserBackend] = {}
+
+
+def get_parser_backend(name: str = "auto") -> ParserBackend:
+    """获取解析后端实例，auto按 selectolax > lxml > bs4 选择已安装的库"""
+    if name == "auto":
+        candidates = [key for key, (_, available) in _BACKEND_CLASSES.items() if available]
+        if not candidates:
+            raise RuntimeError("没有可用的HTML解析库，请安装selectolax、lxml或beautifulsoup4")
+        name = candidates[0]
+
+    if name not in _BACKEND_CLASSES:
+        raise ValueError(f"不支持的解析后端: {name}")
+    backend_class, available = _BACKEND_CLASSES[name]
+    if not available:
+        raise RuntimeError(f"解析后端 {name} 对应的库未安装")
+
+    backend = _backends.get(name)
+    if backend is None:
+        backend = backend_class()
+        _backends[name] = backend
+    return backend
+
+
+def _absolute_url(value: str, base_url: str) -> str:
+    if value.startswith('//'):
+        return 'https:' + value
+    if value.startswith(('http://', 'https://', 'mailto:', 'tel:')):
+        return value
+    return urljoin(base_url, value)
+
+
+def extract_article(html: str, url: str, platform: str, backend_name: str = "auto") -> Dict[str, Any]:
+    """从HTML中提取文章字段（纯CPU计算，不访问网络和服务状态）"""
+    backend = get_parser_backend(backend_name)
+    doc = backend.parse(html)
+    selectors = PLATFORM_SELECTORS.get(platform, PLATFORM_SELECTORS["general"])
+
+    def first_match(field: str):
+        for selector in selectors[field]:
+            node = backend.select_first(doc, selector)
+            if node is not None:
+                return node
+        return None
+
+    fields: Dict[str, str] = {}
+    for field in ("title", "author", "publish_time"):
+        node = first_match(field)
+        text = _WHITESPACE.sub(' ', backend.text(node)).strip() if node is not None else ""
+        fields[field] = text or FIELD_DEFAULTS.get(field) or datetime.now().strftime('%Y-%m-%d')
+
+    content_node = first_match("content")
+    content = _WHITESPACE.sub(' ', backend.text(content_node)).strip() if content_node is not None else ""
+
+    images = []
+    for img in backend.select_all(doc, IMAGE_SELECTOR):
+        src = backend.attr(img, 'src') or backend.attr(img, 'data-src') or backend.attr(img, 'data-original')
+        if src:
+            images.append({"url": _absolute_url(src, url), "alt": backend.attr(img, 'alt') or ''})
+
+    links = []
+    for link in backend.select_all(doc, LINK_SELECTOR):
+        href = backend.attr(link, 'href')
+        text = _WHITESPACE.sub(' ', backend.text(link)).strip()
+        if href and text:
+            links.append({"url": _absolute_url(href, url), "text": text})
+
+    keywords = []
+    meta_keywords = backend.select_first(doc, KEYWORD_META_SELECTOR)
+    if meta_keywords is not None:
+        meta_content = backend.attr(meta_keywords, 'content') or ''
+        keywords.extend(kw.strip() for kw in meta_content.split(',') if kw.strip())
+    for tag_node in backend.select_all(doc, KEYWORD_TAG_SELECTOR):
+        tag_text = backend.text(tag_node).strip()
+        if tag_text and len(tag_text) < 20:  # 避免长文本
+            keywords.append(tag_text)
+
+    return {
+        "title": fields["title"],
+        "author": fields["author"],
+        "publish_time": fields["publish_time"],
+        "content": content,
+        "images": images,
+        "links": links,
+        "keywords": list(set(keywords)),  # 去重
+        "simhash": content_fingerprint(content),  # 近似重复检测用的正文指纹
+        "url": url,
+        "platform": platform if platform in PLATFORM_SELECTORS else "general"
+    }
@@ -4,15 +4,40 @@
 
 import asyncio
 import aiohttp
+import copy
 import json
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator, Pattern, Tuple
 from datetime import datetime
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import re
 from pathlib import Path
 
+from .crawl_scheduler import CrawlScheduler
+from .dedup import DedupIndex, content_fingerprint, hamming_distance
+from .frontier import CrawlFrontier
+from .html_stream import DEFAULT_MAX_BYTES, is_html_content_type, read_html
+from .http_cache import SpiderHttpCache, CachedPage
+from .parse_pool import ParsePool
+from .parsers import PLATFORM_SELECTORS, get_parser_backend, metadata_stop_pattern
+
+try:
+    # 爬取结果存储与主服务共用
+    from services.crawl_store import get_crawl_store
+    CRAWL_STORE_AVAILABLE = True
+except ImportError:
+    CRAWL_STORE_AVAILABLE = False
+
+try:
+    # 客户端渲染页面的浏览器渲染池与主服务共用
+    from services.page_renderer import get_page_renderer, MIN_CONTENT_CHARS as RENDER_MIN_CONTENT_CHARS
+    PAGE_RENDERER_AVAILABLE = True
+except ImportError:
+    PAGE_RENDERER_AVAILABLE = False
+
+# 只需要标题等元数据的抓取模式，读到正文之前即可停止下载
+METADATA_MODES = {"title", "metadata"}
+
 
 class SpiderService:
     """智能爬虫服务类"""
@@ -69,6 +94,64 @@ class SpiderService:
             'Cache-Control': 'max-age=0'
         }
 
+        # 批量抓取调度：跨域名并发，同一域名限制并发数和请求间隔
+        self.scheduler = CrawlScheduler(
+            max_concurrency=self.config.get("batch_concurrency", 16),
+            per_domain_concurrency=self.config.get("per_domain_concurrency", 2),
+            min_interval=self.config.get("per_domain_interval", 1.0)
+        )
+
+        # HTTP条件请求缓存：页面未变化时跳过下载和解析
+        cache_config = self.config.get("http_cache", {})
+        self.http_cache: Optional[SpiderHttpCache] = None
+        if cache_config.get("enabled", True):
+            self.http_cache = SpiderHttpCache(
+                db_path=Path(cache_config.get("path", "./cache/spider_http_cache.db")),
+                max_bytes=cache_config.get("max_mb", 512) * 1024 * 1024
+            )
+
+        # 增量站点抓取的URL队列和已见集合
+        frontier_config = self.config.get("frontier", {})
+        self.frontier = CrawlFrontier(
+            db_path=Path(frontier_config.get("path", "./cache/spider_frontier.db")),
+            bloom_capacity=frontier_config.get("bloom_capacity", 1_000_000)
+        )
+
+        # 近似重复文章检测：同一篇文章在多个平台转载时只保留首次收录的一份
+        dedup_config = self.config.get("dedup", {})
+        self.dedup_index: Optional[DedupIndex] = None
+        if dedup_config.get("enabled", True):
+            self.dedup_index = DedupIndex(
+                db_path=Path(dedup_config.get("path", "./cache/spider_dedup.db")),
+                max_distance=dedup_config.get("max_distance", 5)
+            )
+
+        # 爬取结果存储：成功的结果持久化，供列表、搜索和文本优化直接读取
+        self.crawl_store = None
+        if CRAWL_STORE_AVAILABLE and self.config.get("store_results", True):
+            self.crawl_store = get_crawl_store()
+
+        # 静态正文过短时用无头浏览器渲染（需要playwright）
+        self.renderer = None
+        render_config = self.config.get("render", {})
+        if PAGE_RENDERER_AVAILABLE and render_config.get("enabled", True):
+            self.renderer = get_page_renderer(render_config)
+            if not self.renderer.available:
+                self.renderer = None
+
+        # HTML解析后端（selectolax > lxml > bs4），默认在进程池中执行，解析大页面时不阻塞事件循环
+        self.parser_backend = get_parser_backend(self.config.get("parser_backend", "auto"))
+        self.parse_pool = ParsePool(
+            mode=self.config.get("parse_mode", "process"),
+            max_workers=self.config.get("parse_workers")
+        )
+
+        # 单个页面最多读取的字节数（解压后），超出部分不再下载
+        self.max_page_bytes = self.config.get("max_page_bytes", DEFAULT_MAX_BYTES)
+
+        # 长连接会话，复用连接池、DNS缓存和TLS会话；首次抓取时创建，close()时释放
+        self._session: Optional[aiohttp.ClientSession] = None
+
         print("🕷️ 智能爬虫服务初始化完成")
 
     async def crawl_article(self, url: str, mode: str = "content", depth: int = 1,
@@ -88,13 +171,28 @@ class SpiderService:
             if delay > 0:
                 await asyncio.sleep(delay)
 
-            # 获取网页内容
-            content = await self._fetch_content(url)
+            # 获取网页内容（有缓存时发送条件请求）
+            cached = self.http_cache.get(url) if self.http_cache else None
+            stop_pattern = metadata_stop_pattern(platform) if mode in METADATA_MODES else None
+            content, validators, not_modified, complete = await self._fetch_content(url, cached, stop_pattern)
             if not content:
                 return self._create_error_response(url, platform, "无法获取页面内容")
 
-            # 解析内容
-            article_data = await self._parse_content(content, url, platform, mode)
+            # 解析内容：页面未变化且该模式已解析过时直接复用
+            unchanged = cached is not None and (
+                not_modified or SpiderHttpCache.hash_body(content) == cached.body_hash
+            )
+            if unchanged and mode in cached.parsed:
+                print("♻️ 页面未变化，复用缓存的解析结果")
+                article_data = copy.deepcopy(cached.parsed[mode])
+            else:
+                article_data = await self._parse_content(content, url, platform, mode)
+                if mode not in METADATA_MODES:
+                    article_data = await self._render_if_needed(article_data, url, platform, mode)
+                # 未读完整页（提前结束或超出大小上限）时不写缓存，避免后续完整抓取误用截断的正文
+                if complete:
+                    self._store_in_cache(url, content, validators, cached if unchanged else None,
+                                         mode, article_data)
 
             # 应用过滤器
             if filters:
@@ -112,6 +210,18 @@ class SpiderService:
                 "link_count": len(article_data.get("links", []))
             })
 
+            # 近似重复检测：标记与已收录文章重复的结果，不重复的收录到索引
+            if self.dedup_index is not None and article_data.get("simhash"):
+                article_data["duplicate_of"] = self.dedup_index.check(
+                    article_data["simhash"], url, article_data.get("title"), platform
+                )
+                if article_data["duplicate_of"]:
+                    print(f"👯 近似重复文章: {article_data['duplicate_of']['url']}")
+
+            # 元数据模式只读取了部分页面，不覆盖已存储的完整结果
+            if self.crawl_store is not None and mode not in METADATA_MODES:
+                article_data["id"] = self.crawl_store.save(article_data)
+
             print(f"✅ 抓取完成: {article_data.get('title', 'unknown')}")
             print(f"   字数: {article_data['word_count']}")
             print(f"   图片: {article_data['image_count']}张")
@@ -133,377 +243,122 @@ class SpiderService:
 
         return "general"
 
-    async def _fetch_content(self, url: str) -> Optional[str]:
-        """获取网页内容"""
-        timeout = aiohttp.ClientTimeout(total=30)
-
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.get("connection_limit", 100),
+                limit_per_host=self.config.get("connection_limit_per_host", 8),
+                ttl_dns_cache=self.config.get("dns_cache_ttl", 300),
+                keepalive_timeout=self.config.get("keepalive_timeout", 60),
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=30),
+                connector=connector
+            )
+        return self._session
+
+    async def close(self):
+        """关闭共享会话和解析进程池（应用关闭时调用）"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.parse_pool.shutdown()
+        if self.renderer is not None:
+            await self.renderer.close()
+
+    async def _fetch_content(self, url: str, cached: Optional[CachedPage] = None,
+                             stop_pattern: Optional[Pattern[str]] = None
+                             ) -> Tuple[Optional[str], Dict[str, Optional[str]], bool, bool]:
+        """获取网页内容
+
+        流式读取正文，只接受HTML类型，最多读取max_page_bytes字节；给出stop_pattern时匹配到即停止读取。
+        返回 (页面内容, 缓存校验头, 是否304未修改, 是否读完整页)；304时页面内容取自缓存。
+        """
+        headers = cached.conditional_headers() if cached else {}
         try:
-            async with aiohttp.ClientSession(headers=self.headers, timeout=timeout) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
+            session = await self.get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and cached is not None:
+                    print("📦 页面未修改(304)，使用缓存内容")
+                    return cached.body, {"etag": cached.etag, "last_modified": cached.last_modified}, True, True
+                if response.status == 200:
+                    content_type = response.headers.get("Content-Type")
+                    if not is_html_content_type(content_type):
+                        print(f"⚠️ 不支持的内容类型: {content_type}")
+                        return None, {}, False, False
+
+                    content, complete = await read_html(response, self.max_page_bytes, stop_pattern)
+                    if complete:
                         print(f"📄 页面获取成功，内容长度: {len(content)}")
-                        return content
                     else:
-                        print(f"⚠️ 页面获取失败，状态码: {response.status}")
-                        return None
+                        print(f"✂️ 提前结束读取，已读取内容长度: {len(content)}")
+                    validators = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified")
+                    }
+                    return content, validators, False, complete
+                else:
+                    print(f"⚠️ 页面获取失败，状态码: {response.status}")
+                    return None, {}, False, False
 
         except asyncio.TimeoutError:
             print(f"⏰ 请求超时: {url}")
-            return None
+            return None, {}, False, False
         except Exception as e:
             print(f"🌐 网络请求失败: {str(e)}")
-            return None
+            return None, {}, False, False
 
-    async def _parse_content(self, html: str, url: str, platform: str, mode: str) -> Dict[str, Any]:
-        """解析页面内容"""
+    def _store_in_cache(self, url: str, content: str, validators: Dict[str, Optional[str]],
+                        unchanged_page: Optional[CachedPage], mode: str, article_data: Dict[str, Any]):
+        """把页面和解析结果写入HTTP缓存，解析失败的结果不缓存"""
+        if self.http_cache is None or article_data.get("error"):
+            return
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # 根据平台选择解析策略
-            if platform == "csdn":
-                return await self._parse_csdn(soup, url, mode)
-            elif platform == "juejin":
-                return await self._parse_juejin(soup, url, mode)
-            elif platform == "zhihu":
-                return await self._parse_zhihu(soup, url, mode)
-            elif platform == "toutiao":
-                return await self._parse_toutiao(soup, url, mode)
-            elif platform == "xiaohongshu":
-                return await self._parse_xiaohongshu(soup, url, mode)
+            if unchanged_page is not None:
+                # 页面未变化，只补充新模式的解析结果
+                parsed = dict(unchanged_page.parsed)
+                parsed[mode] = article_data
+                self.http_cache.update_parsed(url, parsed)
             else:
-                return await self._parse_general(soup, url, mode)
-
+                self.http_cache.put(url, content, validators.get("etag"), validators.get("last_modified"),
+                                    {mode: article_data})
         except Exception as e:
-            print(f"🔍 内容解析失败: {str(e)}")
-            return self._create_error_response(url, platform, f"解析失败: {str(e)}")
-
-    async def _parse_csdn(self, soup: BeautifulSoup, url: str, mode: str) -> Dict[str, Any]:
-        """解析CSDN文章"""
-        # 标题
-        title_elem = soup.find('h1', class_='article-title') or soup.find('h1') or soup.find('title')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 作者
-        author_elem = soup.find('a', class_='author') or soup.find('span', class_='author-name')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 发布时间
-        time_elem = soup.find('span', class_='time') or soup.find('div', class_='article-info-box')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 内容
-        content_elem = soup.find('div', class_='article-content') or soup.find('div', id='content_views') or soup.find('article')
-        content = self._extract_text(content_elem) if content_elem else ""
-
-        # 图片和链接
-        images = self._extract_images(soup, url)
-        links = self._extract_links(soup, url)
-
-        # 关键词
-        keywords = self._extract_keywords(soup)
-
-        return {
-            "title": title,
-            "author": author,
-            "publish_time": publish_time,
-            "content": content,
-            "images": images,
-            "links": links,
-            "keywords": keywords,
-            "url": url,
-            "platform": "csdn"
-        }
-
-    async def _parse_juejin(self, soup: BeautifulSoup, url: str, mode: str) -> Dict[str, Any]:
-        """解析掘金文章"""
-        # 标题
-        title_elem = soup.find('h1', class_='article-title') or soup.find('h1')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 作者
-        author_elem = soup.find('span', class_='username') or soup.find('a', class_='user-name')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 发布时间
-        time_elem = soup.find('span', class_='meta-time') or soup.find('time')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 内容
-        content_elem = soup.find('div', class_='article-content') or soup.find('div', class_='markdown-body')
-        content = self._extract_text(content_elem) if content_elem else ""
-
-        # 图片和链接
-        images = self._extract_images(soup, url)
-        links = self._extract_links(soup, url)
-
-        # 关键词
-        keywords = self._extract_keywords(soup)
-
-        return {
-            "title": title,
-            "author": author,
-            "publish_time": publish_time,
-            "content": content,
-            "images": images,
-            "links": links,
-            "keywords": keywords,
-            "url": url,
-            "platform": "juejin"
-        }
-
-    async def _parse_zhihu(self, soup: BeautifulSoup, url: str, mode: str) -> Dict[str, Any]:
-        """解析知乎文章"""
-        # 标题
-        title_elem = soup.find('h1', class_='QuestionHeader-title') or soup.find('h1')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 作者
-        author_elem = soup.find('span', class_='UserLink-link') or soup.find('a', class_='author-link')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 发布时间
-        time_elem = soup.find('span', class_='ContentItem-time') or soup.find('time')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 内容
-        content_elem = soup.find('div', class_='RichText') or soup.find('div', class_='Post-RichText')
-        content = self._extract_text(content_elem) if content_elem else ""
-
-        # 图片和链接
-        images = self._extract_images(soup, url)
-        links = self._extract_links(soup, url)
-
-        # 关键词
-        keywords = self._extract_keywords(soup)
-
-        return {
-            "title": title,
-            "author": author,
-            "publish_time": publish_time,
-            "content": content,
-            "images": images,
-            "links": links,
-            "keywords": keywords,
-            "url": url,
-            "platform": "zhihu"
-        }
-
-    async def _parse_toutiao(self, soup: BeautifulSoup, url: str, mode: str) -> Dict[str, Any]:
-        """解析今日头条文章"""
-        # 标题
-        title_elem = soup.find('h1', class_='article-title') or soup.find('h1')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 作者
-        author_elem = soup.find('a', class_='user-name') or soup.find('span', class_='name')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 发布时间
-        time_elem = soup.find('time') or soup.find('span', class_='time')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 内容
-        content_elem = soup.find('div', class_='article-content') or soup.find('div', class_='content')
-        content = self._extract_text(content_elem) if content_elem else ""
-
-        # 图片和链接
-        images = self._extract_images(soup, url)
-        links = self._extract_links(soup, url)
-
-        # 关键词
-        keywords = self._extract_keywords(soup)
-
-        return {
-            "title": title,
-            "author": author,
-            "publish_time": publish_time,
-            "content": content,
-            "images": images,
-            "links": links,
-            "keywords": keywords,
-            "url": url,
-            "platform": "toutiao"
-        }
-
-    async def _parse_xiaohongshu(self, soup: BeautifulSoup, url: str, mode: str) -> Dict[str, Any]:
-        """解析小红书内容"""
-        # 标题
-        title_elem = soup.find('div', class_='title') or soup.find('h1')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 作者
-        author_elem = soup.find('span', class_='username') or soup.find('a', class_='author')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 发布时间
-        time_elem = soup.find('span', class_='publish-time') or soup.find('time')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 内容
-        content_elem = soup.find('div', class_='content') or soup.find('div', class_='desc')
-        content = self._extract_text(content_elem) if content_elem else ""
-
-        # 图片和链接
-        images = self._extract_images(soup, url)
-        links = self._extract_links(soup, url)
-
-        # 关键词
-        keywords = self._extract_keywords(soup)
-
-        return {
-            "title": title,
-            "author": author,
-            "publish_time": publish_time,
-            "content": content,
-            "images": images,
-            "links": links,
-            "keywords": keywords,
-            "url": url,
-            "platform": "xiaohongshu"
-        }
-
-    async def _parse_general(self, soup: BeautifulSoup, url: str, mode: str) -> Dict[str, Any]:
-        """通用解析器"""
-        # 标题
-        title_elem = soup.find('title') or soup.find('h1')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 尝试提取作者
-        author_selectors = ['author', 'byline', 'username', 'user-name', 'writer']
-        author = "未知作者"
-        for selector in author_selectors:
-            author_elem = soup.find('span', class_=selector) or soup.find('div', class_=selector) or soup.find('a', class_=selector)
-            if author_elem:
-                author = author_elem.get_text().strip()
-                break
+            print(f"⚠️ 写入HTTP缓存失败: {str(e)}")
 
-        # 尝试提取发布时间
-        time_selectors = ['time', 'publish-time', 'date', 'timestamp', 'meta-time']
-        publish_time = datetime.now().strftime('%Y-%m-%d')
-        for selector in time_selectors:
-            time_elem = soup.find('time') or soup.find('span', class_=selector) or soup.find('div', class_=selector)
-            if time_elem:
-                publish_time = time_elem.get_text().strip()
-                break
-
-        # 内容提取
-        content_selectors = ['content', 'article-content', 'post-content', 'entry-content', 'main-content']
-        content = ""
-        for selector in content_selectors:
-            content_elem = soup.find('div', class_=selector) or soup.find('article') or soup.find('main')
-            if content_elem:
-                content = self._extract_text(content_elem)
-                break
-
-        # 如果没有找到内容，尝试提取body文本
-        if not content:
-            body_elem = soup.find('body')
-            if body_elem:
-                content = self._extract_text(body_elem)
+    async def _render_if_needed(self, article_data: Dict[str, Any], url: str, platform: str,
+                                mode: str) -> Dict[str, Any]:
+        """静态提取的正文过短时（客户端渲染的页面），用无头浏览器渲染后重新解析"""
+        if self.renderer is None or article_data.get("error"):
+            return article_data
+        if len(article_data.get("content", "")) >= RENDER_MIN_CONTENT_CHARS:
+            return article_data
 
-        # 图片和链接
-        images = self._extract_images(soup, url)
-        links = self._extract_links(soup, url)
+        print(f"🖥️ 静态正文过短，使用浏览器渲染: {url}")
+        # 已知平台等正文容器出现，通用页面（正文选择器包含body）等待网络空闲
+        wait_selector = None
+        if platform in PLATFORM_SELECTORS and platform != "general":
+            wait_selector = ", ".join(PLATFORM_SELECTORS[platform]["content"])
+        html = await self.renderer.render(url, wait_selector)
+        if not html:
+            return article_data
 
-        # 关键词
-        keywords = self._extract_keywords(soup)
+        rendered = await self._parse_content(html, url, platform, mode)
+        if len(rendered.get("content", "")) > len(article_data.get("content", "")):
+            rendered["rendered"] = True
+            return rendered
+        return article_data
 
-        return {
-            "title": title,
-            "author": author,
-            "publish_time": publish_time,
-            "content": content,
-            "images": images,
-            "links": links,
-            "keywords": keywords,
-            "url": url,
-            "platform": "general"
-        }
+    async def _parse_content(self, html: str, url: str, platform: str, mode: str) -> Dict[str, Any]:
+        """解析页面内容（在解析进程池中执行）"""
+        try:
+            return await self.parse_pool.extract(html, url, platform, self.parser_backend.name)
 
-    def _extract_text(self, element) -> str:
-        """提取元素中的纯文本"""
-        if not element:
-            return ""
-
-        # 移除script和style标签
-        for script in element(["script", "style"]):
-            script.decompose()
-
-        # 获取文本内容
-        text = element.get_text()
-
-        # 清理空白字符
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        return text
-
-    def _extract_images(self, soup: BeautifulSoup, base_url: str) -> List[Dict[str, str]]:
-        """提取图片信息"""
-        images = []
-        img_elements = soup.find_all('img')
-
-        for img in img_elements:
-            src = img.get('src') or img.get('data-src') or img.get('data-original')
-            alt = img.get('alt', '')
-
-            if src:
-                # 转换为绝对URL
-                if src.startswith('//'):
-                    src = 'https:' + src
-                elif src.startswith('/'):
-                    src = urljoin(base_url, src)
-                elif not src.startswith(('http://', 'https://')):
-                    src = urljoin(base_url, src)
-
-                images.append({
-                    "url": src,
-                    "alt": alt
-                })
-
-        return images
-
-    def _extract_links(self, soup: BeautifulSoup, base_url: str) -> List[Dict[str, str]]:
-        """提取链接信息"""
-        links = []
-        link_elements = soup.find_all('a', href=True)
-
-        for link in link_elements:
-            href = link.get('href')
-            text = link.get_text().strip()
-
-            if href and text:
-                # 转换为绝对URL
-                if href.startswith('/'):
-                    href = urljoin(base_url, href)
-                elif not href.startswith(('http://', 'https://', 'mailto:', 'tel:')):
-                    href = urljoin(base_url, href)
-
-                links.append({
-                    "url": href,
-                    "text": text
-                })
-
-        return links
-
-    def _extract_keywords(self, soup: BeautifulSoup) -> List[str]:
-        """提取关键词"""
-        keywords = []
-
-        # 从meta标签提取
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords:
-            content = meta_keywords.get('content', '')
-            keywords.extend([kw.strip() for kw in content.split(',') if kw.strip()])
-
-        # 从标签云或分类提取
-        tag_elements = soup.find_all(['span', 'a'], class_=re.compile(r'tag|category|label'))
-        for tag_elem in tag_elements:
-            tag_text = tag_elem.get_text().strip()
-            if tag_text and len(tag_text) < 20:  # 避免长文本
-                keywords.append(tag_text)
-
-        return list(set(keywords))  # 去重
+        except Exception as e:
+            print(f"🔍 内容解析失败: {str(e)}")
+            return self._create_error_response(url, platform, f"解析失败: {str(e)}")
 
     def _apply_filters(self, data: Dict[str, Any], filters: List[str]) -> Dict[str, Any]:
         """应用过滤器"""
@@ -577,31 +432,140 @@ class SpiderService:
             for platform_id, info in self.platforms.items()
         ]
 
-    async def batch_crawl(self, urls: List[str], **kwargs) -> List[Dict[str, Any]]:
-        """批量抓取"""
-        results = []
-
-        for i, url in enumerate(urls):
-            print(f"🔄 批量抓取进度: {i+1}/{len(urls)} - {url}")
-
-            try:
-                result = await self.crawl_article(url, **kwargs)
-                results.append({
-                    "index": i + 1,
+    async def batch_crawl_stream(self, urls: List[str], delay: Optional[float] = None,
+                                 drop_duplicates: bool = False, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """批量抓取，按完成顺序逐条返回结果
+
+        delay为同一域名两次请求之间的最小间隔，不同域名之间并发抓取。
+        drop_duplicates为True时，近似重复的文章以duplicate状态返回，不带正文。
+        """
+        async def crawl(url: str) -> Dict[str, Any]:
+            # 间隔由调度器按域名控制，单次抓取不再额外等待
+            return await self.crawl_article(url, delay=0, **kwargs)
+
+        finished = 0
+        async for index, url, result, error in self.scheduler.crawl(urls, crawl, min_interval=delay):
+            finished += 1
+            print(f"🔄 批量抓取进度: {finished}/{len(urls)} - {url}")
+
+            if error is not None:
+                yield {
+                    "index": index + 1,
+                    "url": url,
+                    "status": "error",
+                    "error": str(error)
+                }
+            elif drop_duplicates and result.get("duplicate_of"):
+                yield {
+                    "index": index + 1,
+                    "url": url,
+                    "status": "duplicate",
+                    "duplicate_of": result["duplicate_of"]
+                }
+            else:
+                yield {
+                    "index": index + 1,
                     "url": url,
                     "status": "success" if result.get("error") is None else "error",
                     "data": result
-                })
-            except Exception as e:
-                results.append({
-                    "index": i + 1,
-                    "url": url,
-                    "status": "error",
-                    "error": str(e)
-                })
+                }
 
+    async def check_duplicates(self, articles: List[Dict[str, Any]], register: bool = False
+                               ) -> List[Dict[str, Any]]:
+        """检查文章（content、url、title）是否与已收录或同批次中靠前的文章近似重复
+
+        register为True时把不重复的文章收录到索引。
+        """
+        fingerprints = await asyncio.to_thread(
+            lambda: [content_fingerprint(article.get("content", "")) for article in articles]
+        )
+        results = []
+        seen_in_batch: List[Tuple[int, str, Dict[str, Any]]] = []
+        for index, (article, fingerprint) in enumerate(zip(articles, fingerprints)):
+            duplicate = None
+            if fingerprint and self.dedup_index is not None:
+                url = article.get("url") or f"inline://{fingerprint}"
+                duplicate = self.dedup_index.check(fingerprint, url, article.get("title"),
+                                                   article.get("platform"), register=register)
+                if duplicate is None and not register:
+                    # 未收录时同批次内的重复只能在内存中比较
+                    for other_index, other_fingerprint, other in seen_in_batch:
+                        distance = hamming_distance(int(fingerprint, 16), int(other_fingerprint, 16))
+                        if distance <= self.dedup_index.max_distance:
+                            duplicate = {"index": other_index, "url": other.get("url"),
+                                         "title": other.get("title"), "distance": distance}
+                            break
+                if duplicate is None:
+                    seen_in_batch.append((index, fingerprint, article))
+            results.append({"index": index, "simhash": fingerprint, "duplicate_of": duplicate})
         return results
 
+    async def batch_crawl(self, urls: List[str], **kwargs) -> List[Dict[str, Any]]:
+        """批量抓取，返回按输入顺序排列的结果"""
+        results = [item async for item in self.batch_crawl_stream(urls, **kwargs)]
+        results.sort(key=lambda item: item["index"])
+        return results
+
+    async def crawl_site(self, seeds: List[str], job: Optional[str] = None, max_depth: int = 1,
+                         max_pages: int = 100, allowed_domains: Optional[List[str]] = None,
+                         follow_patterns: Optional[List[str]] = None, delay: Optional[float] = None,
+                         drop_duplicates: bool = False, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """增量抓取站点，按完成顺序逐条返回结果
+
+        从种子页面出发，在深度和域名范围内跟随链接；同一任务已处理过的URL不再抓取，
+        中断后以相同任务名（默认由种子生成）再次调用即可继续。
+        """
+        frontier_job = self.frontier.open_job(seeds, job, max_depth, allowed_domains, follow_patterns)
+        print(f"🧭 增量抓取任务: {frontier_job.name}，种子 {len(seeds)} 个，最大深度 {max_depth}")
+
+        crawled = 0
+        while crawled < max_pages:
+            batch = self.frontier.claim(frontier_job, min(self.scheduler.max_concurrency, max_pages - crawled))
+            if not batch:
+                break
+
+            depths = {entry.url: entry.depth for entry in batch}
+            unfinished = set(depths)
+
+            async def crawl(url: str) -> Dict[str, Any]:
+                return await self.crawl_article(url, depth=depths[url], delay=0, **kwargs)
+
+            try:
+                async for index, url, result, error in self.scheduler.crawl(list(depths), crawl,
+                                                                             min_interval=delay):
+                    entry = batch[index]
+                    error_msg = str(error) if error is not None else result.get("error")
+                    discovered = 0
+                    if error_msg is None and entry.depth < frontier_job.max_depth:
+                        discovered = self.frontier.add_links(
+                            frontier_job, [link["url"] for link in result.get("links", [])],
+                            entry.depth + 1, parent=url
+                        )
+                    self.frontier.finish(frontier_job, url, error_msg)
+                    unfinished.discard(url)
+                    crawled += 1
+
+                    item = {
+                        "url": url,
+                        "depth": entry.depth,
+                        "parent": entry.parent,
+                        "status": "error" if error_msg else "success",
+                        "discovered": discovered
+                    }
+                    if error_msg:
+                        item["error"] = error_msg
+                    elif drop_duplicates and result.get("duplicate_of"):
+                        item["status"] = "duplicate"
+                        item["duplicate_of"] = result["duplicate_of"]
+                    else:
+                        item["data"] = result
+                    yield item
+            finally:
+                # 调用方中途停止（如客户端断开）时，未完成的URL放回队列
+                self.frontier.requeue(frontier_job, unfinished)
+
+        print(f"🧭 增量抓取结束: {frontier_job.name}，本次抓取 {crawled} 个页面")
+
 
 def get_spider_service(config: Dict = None) -> SpiderService:
     """获取爬虫服务实例"""
@@ -3,10 +3,10 @@
 完整的AI媒体平台后端服务
 """
 
-from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 import sys
 import os
@@ -20,6 +20,14 @@ import aiohttp
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from services.auth_service import batch_check_cookies
+from services.video_generation.task_registry import get_video_task_registry, VideoTaskStatus, TERMINAL_STATUSES
+from services.video_generation.admission import GpuAdmissionController, estimate_job_cost
+from services.crawl_store import get_crawl_store
+from services.page_renderer import get_page_renderer, MIN_CONTENT_CHARS as RENDER_MIN_CONTENT_CHARS
+from services.myUtils.upload_runtime import get_upload_runtime
+from services.myUtils.xhs_signer import get_xhs_signer
+from services.myUtils.publish_scheduler import get_publish_governor
+from services.myUtils.platforms import get_platform_class, get_platform_uploader, publish_video, track_progress
 try:
     # 使用简化版登录服务解决QR码登录问题
     from services.login_service_simple import run_login_process, login_service
@@ -28,9 +36,10 @@ except ImportError:
     # 回退到原版登录服务
     from services.login_service import run_login_process, login_service
     print("✅ 原版登录服务导入成功")
-from bs4 import BeautifulSoup
 from pathlib import Path
-import re
+from backend.services.spider.article_parsers import parse_article
+from backend.services.spider.html_stream import DEFAULT_MAX_BYTES, is_html_content_type, read_html
+from backend.services.spider.parse_pool import ParsePool
 
 # 添加social-auto-upload路径
 PROJECT_ROOT = Path(__file__).resolve().parent
@@ -40,32 +49,14 @@ if str(SOCIAL_ROOT) not in sys.path:
     sys.path.insert(0, str(SOCIAL_ROOT))
 
 try:
-    # 使用简化版本解决上传问题
-    from routes.douyin_upload_simple import DouYinVideo
+    # 各平台的上传实现统一来自平台注册表（services/myUtils/platforms.py），按需导入
     from conf import BASE_DIR
-    from utils.files_times import generate_schedule_time_next_day
     SOCIAL_AUTO_UPLOAD_AVAILABLE = True
-    print("✅ 简化版抖音发布模块导入成功 - 解决tabindex=-1问题")
-except ImportError:
-    try:
-        # 回退到GitHub优化版本
-        from routes.douyin_upload_github import DouYinVideo
-        from conf import BASE_DIR
-        from utils.files_times import generate_schedule_time_next_day
-        SOCIAL_AUTO_UPLOAD_AVAILABLE = True
-        print("✅ GitHub优化版抖音发布模块导入成功")
-    except ImportError:
-        try:
-            # 最后回退到原版
-            from conf import BASE_DIR
-            from uploader.douyin_uploader.main import DouYinVideo
-            from utils.files_times import generate_schedule_time_next_day
-            SOCIAL_AUTO_UPLOAD_AVAILABLE = True
-            print("✅ 原版抖音发布模块导入成功")
-        except ImportError as e:
-            print(f"⚠️ 无法导入social-auto-upload模块: {e}")
-            SOCIAL_AUTO_UPLOAD_AVAILABLE = False
-            BASE_DIR = PROJECT_ROOT / ".." / "social-auto-upload"
+    print("✅ social-auto-upload模块导入成功")
+except ImportError as e:
+    print(f"⚠️ 无法导入social-auto-upload模块: {e}")
+    SOCIAL_AUTO_UPLOAD_AVAILABLE = False
+    BASE_DIR = PROJECT_ROOT / ".." / "social-auto-upload"
 
 # 数据库路径
 DATABASE_PATH = BASE_DIR / "db" / "database.db"
@@ -120,6 +111,12 @@ LOCAL_VIDEO_DIR = Path("./generated_videos")
 LOCAL_VIDEO_DIR.mkdir(exist_ok=True)
 print(f"📁 本地视频存储目录: {LOCAL_VIDEO_DIR.absolute()}")
 
+# 视频生成任务注册表（持久化，状态查询读取本地数据）
+video_task_registry = get_video_task_registry()
+
+# 正在运行的视频生成后台任务，保留引用避免被垃圾回收
+video_generation_jobs: Dict[str, asyncio.Task] = {}
+
 # ==================== 视频生成服务 ====================
 
 class VideoRequest:
@@ -154,15 +151,40 @@ class VideoService:
         self.comfyui_api_url = "http://192.168.1.246:5001"  # ComfyUI API包装器地址
         self.comfyui_direct_url = "http://192.168.1.246:8188"  # 直接ComfyUI地址（备用）
         self.comfyui_url = self.comfyui_direct_url  # 用于视频下载的URL
+        self.expected_generation_time = 240  # 4步LoRA工作流的经验耗时（秒），用于估算进度
+        # 可用的ComfyUI节点，多个节点用逗号分隔
+        self.comfyui_nodes = [
+            url.strip() for url in os.getenv("COMFYUI_NODES", self.comfyui_direct_url).split(",") if url.strip()
+        ]
+
+    def _workflow_dimensions(self, request: VideoRequest):
+        """工作流实际使用的分辨率、帧数和步数"""
+        # 使用640x640作为默认分辨率（更高的质量）
+        width = min(max(640, min(request.width, 1024)), 1024)
+        height = min(max(640, min(request.height, 1024)), 1024)
+        # 81帧（5秒@16fps）- 优化的帧数
+        num_frames = 81
+        # 4步LoRA优化参数
+        steps = 4
+        return width, height, num_frames, steps
+
+    def estimate_cost(self, request: VideoRequest) -> int:
+        """估算任务的GPU成本，用于准入控制"""
+        return estimate_job_cost(*self._workflow_dimensions(request))
 
-    async def generate_video(self, request: VideoRequest):
-        """生成视频 - 强制使用4步LoRA优化工作流"""
+    async def generate_video(self, request: VideoRequest, task_id: Optional[str] = None,
+                             node_url: Optional[str] = None):
+        """生成视频 - 强制使用4步LoRA优化工作流
+
+        task_id不为空时，ComfyUI节点、prompt_id和进度会同步写入任务注册表。
+        node_url为准入控制分配的ComfyUI节点，默认使用comfyui_direct_url。
+        """
         print(f"收到视频生成请求: provider={request.provider}, prompt={request.prompt[:50]}...")
 
         try:
             # 强制使用4步LoRA优化工作流（跳过API包装器默认参数）
             print("🚀 强制使用4步LoRA优化工作流（跳过API包装器默认参数）")
-            return await self._generate_via_direct_comfyui(request)
+            return await self._generate_via_direct_comfyui(request, task_id, node_url)
 
             # 原来的代码：先尝试API包装器，失败后使用直接调用
             # # 优先使用API包装器
@@ -305,17 +327,19 @@ class VideoService:
             print(f"获取视频信息异常: {str(e)}")
             return None
 
-    async def _generate_via_direct_comfyui(self, request: VideoRequest):
+    async def _generate_via_direct_comfyui(self, request: VideoRequest, registry_task_id: Optional[str] = None,
+                                           node_url: Optional[str] = None):
         """直接调用ComfyUI（备用方案）"""
+        node_url = node_url or self.comfyui_direct_url
         try:
-            print(f"🎯 直接调用ComfyUI: {self.comfyui_direct_url}")
+            print(f"🎯 直接调用ComfyUI: {node_url}")
 
             # 创建优化的工作流
             workflow = self._create_optimized_workflow(request)
 
             # 提交到ComfyUI
             async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(f"{self.comfyui_direct_url}/prompt", json={
+                response = await client.post(f"{node_url}/prompt", json={
                     "prompt": workflow
                 })
                 response.raise_for_status()
@@ -325,46 +349,96 @@ class VideoService:
             print(f"ComfyUI任务已创建: {task_id}")
             print(f"开始监控任务 {task_id}...")
 
+            video_task_registry.update(
+                registry_task_id,
+                status=VideoTaskStatus.QUEUED,
+                comfyui_node=node_url,
+                prompt_id=task_id,
+                message="已提交到ComfyUI，等待执行"
+            )
+
             # 监控任务进度
-            return await self._monitor_direct_task(task_id, request)
+            return await self._monitor_direct_task(task_id, request, registry_task_id, node_url=node_url)
 
         except Exception as e:
             print(f"直接ComfyUI调用失败: {str(e)}")
             return None
 
-    async def _monitor_direct_task(self, task_id: str, request: VideoRequest):
-        """监控直接ComfyUI任务进度"""
-        start_time = asyncio.get_event_loop().time()
+    async def _monitor_direct_task(self, task_id: str, request: Optional[VideoRequest],
+                                   registry_task_id: Optional[str] = None, elapsed_before: float = 0.0,
+                                   node_url: Optional[str] = None):
+        """监控直接ComfyUI任务进度
 
-        while True:
-            try:
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(f"{self.comfyui_direct_url}/history/{task_id}")
+        elapsed_before用于服务重启后恢复监控时，沿用任务已经消耗的时间计算超时和进度。
+        """
+        node_url = node_url or self.comfyui_direct_url
+        start_time = asyncio.get_event_loop().time() - elapsed_before
+
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            while True:
+                try:
+                    response = await client.get(f"{node_url}/history/{task_id}")
                     response.raise_for_status()
                     history = response.json()
 
-                if task_id in history:
-                    task_data = history[task_id]
-                    status = task_data.get("status", {})
+                    if task_id in history:
+                        task_data = history[task_id]
+                        status = task_data.get("status", {})
 
-                    if status.get("completed", False):
-                        print(f"✅ 直接ComfyUI任务完成!")
-                        return await self._extract_video_info(task_data, start_time)
+                        if status.get("completed", False):
+                            print(f"✅ 直接ComfyUI任务完成!")
+                            return await self._extract_video_info(task_data, start_time, node_url)
+
+                        if status.get("status_str") == "error":
+                            print(f"❌ 直接ComfyUI任务执行出错")
+                            return None
 
                     elapsed = asyncio.get_event_loop().time() - start_time
                     print(f"⏳ 直接ComfyUI任务进行中... ({elapsed:.1f}秒)")
 
-                await asyncio.sleep(3)
+                    if registry_task_id:
+                        await self._report_queue_state(client, node_url, task_id, registry_task_id, elapsed)
 
-                # 超时检查
-                if asyncio.get_event_loop().time() - start_time > 600:  # 10分钟超时
-                    print(f"⏰ 直接ComfyUI任务超时")
-                    return None
+                    await asyncio.sleep(3)
 
-            except Exception as e:
-                print(f"⚠️ 监控直接ComfyUI任务时出错: {str(e)}")
-                await asyncio.sleep(3)
-                continue
+                    # 超时检查
+                    if asyncio.get_event_loop().time() - start_time > 600:  # 10分钟超时
+                        print(f"⏰ 直接ComfyUI任务超时")
+                        return None
+
+                except Exception as e:
+                    print(f"⚠️ 监控直接ComfyUI任务时出错: {str(e)}")
+                    await asyncio.sleep(3)
+                    continue
+
+    async def _report_queue_state(self, client: httpx.AsyncClient, node_url: str, prompt_id: str,
+                                  registry_task_id: str, elapsed: float):
+        """根据ComfyUI队列判断任务是排队还是执行中，并写入任务注册表"""
+        response = await client.get(f"{node_url}/queue")
+        response.raise_for_status()
+        queue = response.json()
+
+        # 队列项格式: [number, prompt_id, prompt, extra_data, outputs_to_execute]
+        running_ids = [item[1] for item in queue.get("queue_running", [])]
+        pending_ids = [item[1] for item in queue.get("queue_pending", [])]
+
+        if prompt_id in running_ids:
+            task = video_task_registry.get(registry_task_id) or {}
+            # ComfyUI的history接口不提供步骤进度，按经验耗时估算，完成前最多到95%
+            progress = max(task.get("progress", 0), min(95, int(elapsed / self.expected_generation_time * 100)))
+            video_task_registry.update(
+                registry_task_id,
+                status=VideoTaskStatus.PROCESSING,
+                progress=progress,
+                message=f"ComfyUI正在生成视频 ({elapsed:.0f}秒)"
+            )
+        elif prompt_id in pending_ids:
+            position = pending_ids.index(prompt_id) + 1
+            video_task_registry.update(
+                registry_task_id,
+                status=VideoTaskStatus.QUEUED,
+                message=f"ComfyUI队列中，前方还有 {position - 1 + len(running_ids)} 个任务"
+            )
 
     def _create_optimized_workflow(self, request: VideoRequest):
         """创建4步LoRA优化的工作流"""
@@ -374,15 +448,9 @@ class VideoService:
         # 生成唯一文件名
         filename_prefix = f"wan_video_{uuid.uuid4().hex[:8]}"
 
-        # 使用640x640作为默认分辨率（更高的质量）
-        width = min(max(640, min(request.width, 1024)), 1024)
-        height = min(max(640, min(request.height, 1024)), 1024)
-
-        # 81帧（5秒@16fps）- 优化的帧数
-        num_frames = 81
+        width, height, num_frames, steps = self._workflow_dimensions(request)
 
         # 4步LoRA优化参数
-        steps = 4
         cfg = 1.0
         shift = 5.0
 
@@ -546,7 +614,7 @@ class VideoService:
                 await asyncio.sleep(3)
                 continue
 
-    async def _extract_video_info(self, task_data: dict, start_time: float):
+    async def _extract_video_info(self, task_data: dict, start_time: float, node_url: Optional[str] = None):
         """提取视频信息"""
         try:
             outputs = task_data.get("outputs", {})
@@ -561,7 +629,7 @@ class VideoService:
                     filename = file.get("filename", "")
 
                     # 下载视频文件到本地
-                    local_file_path = await self._download_video_locally(filename)
+                    local_file_path = await self._download_video_locally(filename, node_url)
 
                     generation_time = asyncio.get_event_loop().time() - start_time
 
@@ -601,7 +669,7 @@ class VideoService:
             print(f"❌ 提取视频信息失败: {str(e)}")
             return None
 
-    async def _download_video_locally(self, filename: str):
+    async def _download_video_locally(self, filename: str, node_url: Optional[str] = None):
         """从ComfyUI服务器下载视频文件到本地"""
         try:
             print(f"📥 正在下载视频文件: {filename}")
@@ -615,7 +683,7 @@ class VideoService:
                 return local_file_path
 
             # 从ComfyUI服务器下载
-            download_url = f"{self.comfyui_url}/view"
+            download_url = f"{node_url or self.comfyui_url}/view"
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.get(download_url, params={"filename": filename})
 
@@ -639,6 +707,9 @@ class VideoService:
 
 video_service = VideoService()
 
+# GPU准入控制：限制每个ComfyUI节点的在途成本，超出部分在本地按用户公平排队
+video_admission = GpuAdmissionController(video_service.comfyui_nodes, registry=video_task_registry)
+
 # ==================== 文本优化服务 ====================
 
 class TextOptimizeService:
@@ -747,6 +818,14 @@ text_optimize_service = TextOptimizeService()
 
 # ==================== 爬虫服务 ====================
 
+# 浏览器渲染时等待出现的正文容器
+RENDER_WAIT_SELECTORS = {
+    "csdn": "#content_views, .article-content",
+    "juejin": ".article-content, .markdown-body",
+    "zhihu": ".Post-RichText, .RichText",
+    "toutiao": ".article-content, article",
+}
+
 class SpiderService:
     def __init__(self):
         self.platforms = {
@@ -762,28 +841,67 @@ class SpiderService:
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
         }
+        # 长连接会话，复用连接池、DNS缓存和TLS会话；随应用关闭释放
+        self._session: Optional[aiohttp.ClientSession] = None
+        # HTML解析进程池，大页面通过临时文件交给工作进程
+        self.parse_pool = ParsePool()
+        # 单个页面最多读取的字节数
+        self.max_page_bytes = DEFAULT_MAX_BYTES
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=100,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=30),
+                connector=connector
+            )
+        return self._session
+
+    async def close(self):
+        """关闭共享会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self.parse_pool.shutdown()
 
     async def crawl_article(self, platform: str, url: str):
         """真实爬取文章"""
         print(f"收到爬虫请求: platform={platform}, url={url}")
 
         try:
-            # 使用aiohttp获取网页内容
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with aiohttp.ClientSession(headers=self.headers, timeout=timeout) as session:
-                print(f"正在抓取页面: {url}")
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
+            # 使用共享的aiohttp会话获取网页内容
+            session = await self.get_session()
+            print(f"正在抓取页面: {url}")
+            async with session.get(url) as response:
+                if response.status == 200:
+                    content_type = response.headers.get("Content-Type")
+                    if not is_html_content_type(content_type):
+                        print(f"不支持的内容类型: {content_type}")
+                        return self.create_error_response(url, platform, f"不支持的内容类型: {content_type}")
+
+                    # 流式读取正文，超过max_page_bytes时截断
+                    html, complete = await read_html(response, self.max_page_bytes)
+                    if complete:
                         print(f"页面获取成功，内容长度: {len(html)}")
-
-                        # 解析页面内容
-                        article_data = await self.parse_article_content(html, url, platform)
-                        print(f"爬虫完成: {article_data.get('title', 'unknown')}")
-                        return article_data
                     else:
-                        print(f"页面获取失败，状态码: {response.status}")
-                        return self.create_error_response(url, platform, f"HTTP {response.status}")
+                        print(f"页面超过{self.max_page_bytes}字节，已截断，内容长度: {len(html)}")
+
+                    # 解析页面内容
+                    article_data = await self.parse_article_content(html, url, platform)
+                    article_data = await self.render_if_needed(article_data, url, platform)
+                    print(f"爬虫完成: {article_data.get('title', 'unknown')}")
+                    return article_data
+                else:
+                    print(f"页面获取失败，状态码: {response.status}")
+                    return self.create_error_response(url, platform, f"HTTP {response.status}")
 
         except asyncio.TimeoutError:
             print(f"爬虫超时: {url}")
@@ -792,262 +910,35 @@ class SpiderService:
             print(f"爬虫失败: {str(e)}")
             return self.create_error_response(url, platform, str(e))
 
+    async def render_if_needed(self, article_data: Dict[str, Any], url: str, platform: str):
+        """静态提取的正文过短时（客户端渲染的页面），用无头浏览器渲染后重新解析"""
+        if article_data.get("status") != "success" or article_data.get("word_count", 0) >= RENDER_MIN_CONTENT_CHARS:
+            return article_data
+
+        renderer = get_page_renderer()
+        if not renderer.available:
+            return article_data
+
+        print(f"🖥️ 静态正文过短({article_data.get('word_count', 0)}字)，使用浏览器渲染: {url}")
+        html = await renderer.render(url, RENDER_WAIT_SELECTORS.get(platform))
+        if not html:
+            return article_data
+
+        rendered = await self.parse_article_content(html, url, platform)
+        if rendered.get("word_count", 0) > article_data.get("word_count", 0):
+            rendered["rendered"] = True
+            return rendered
+        return article_data
+
     async def parse_article_content(self, html: str, url: str, platform: str):
-        """解析文章内容"""
+        """解析文章内容 - 在解析进程池中执行，大页面解析不阻塞事件循环"""
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-
-            # 根据不同平台使用不同的解析策略
-            if platform == "csdn":
-                return await self.parse_csdn_article(soup, url)
-            elif platform == "juejin":
-                return await self.parse_juejin_article(soup, url)
-            elif platform == "zhihu":
-                return await self.parse_zhihu_article(soup, url)
-            else:
-                return await self.parse_general_article(soup, url, platform)
+            return await self.parse_pool.run(parse_article, html, url, platform)
 
         except Exception as e:
             print(f"解析文章失败: {str(e)}")
             return self.create_error_response(url, platform, f"解析失败: {str(e)}")
 
-    async def parse_csdn_article(self, soup: BeautifulSoup, url: str):
-        """解析CSDN文章"""
-        # 提取标题
-        title_elem = soup.find('h1', class_='article-title')
-        if not title_elem:
-            title_elem = soup.find('title')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 提取作者
-        author_elem = soup.find('a', class_='author')
-        if not author_elem:
-            author_elem = soup.find('span', class_='author-name')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 提取发布时间
-        time_elem = soup.find('span', class_='time')
-        if not time_elem:
-            time_elem = soup.find('div', class_='article-info-box').find('span') if soup.find('div', class_='article-info-box') else None
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 提取内容
-        content_elem = soup.find('div', class_='article-content')
-        if not content_elem:
-            content_elem = soup.find('div', id='content_views')
-        if not content_elem:
-            content_elem = soup.find('article')
-
-        content = ""
-        if content_elem:
-            # 移除不需要的标签
-            for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside']):
-                tag.decompose()
-            content = content_elem.get_text().strip()
-
-        # 提取标签
-        tags = []
-        tag_elems = soup.find_all('a', class_='tag')
-        for tag_elem in tag_elems:
-            tag_text = tag_elem.get_text().strip()
-            if tag_text:
-                tags.append(tag_text)
-
-        # 提取阅读量
-        read_count = 0
-        read_elem = soup.find('span', class_='read-count')
-        if read_elem:
-            try:
-                read_text = read_elem.get_text().strip()
-                read_num = re.findall(r'\d+', read_text)
-                if read_num:
-                    read_count = int(read_num[0])
-            except:
-                pass
-
-        # 生成内容摘要
-        summary = content[:200] + "..." if len(content) > 200 else content
-
-        return {
-            "title": title,
-            "content": content,
-            "summary": summary,
-            "author": author,
-            "publish_time": publish_time,
-            "url": url,
-            "platform": "csdn",
-            "tags": tags,
-            "read_count": read_count,
-            "like_count": 0,
-            "crawl_time": datetime.now().isoformat(),
-            "word_count": len(content),
-            "status": "success"
-        }
-
-    async def parse_juejin_article(self, soup: BeautifulSoup, url: str):
-        """解析掘金文章"""
-        # 提取标题
-        title_elem = soup.find('h1', class_='article-title')
-        if not title_elem:
-            title_elem = soup.find('title')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 提取作者
-        author_elem = soup.find('a', class_='username')
-        if not author_elem:
-            author_elem = soup.find('span', class_='user-name')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 提取发布时间
-        time_elem = soup.find('time')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 提取内容
-        content_elem = soup.find('div', class_='article-content')
-        if not content_elem:
-            content_elem = soup.find('div', class_='markdown-body')
-
-        content = ""
-        if content_elem:
-            for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside']):
-                tag.decompose()
-            content = content_elem.get_text().strip()
-
-        # 提取标签
-        tags = []
-        tag_elems = soup.find_all('a', class_='tag')
-        for tag_elem in tag_elems:
-            tag_text = tag_elem.get_text().strip()
-            if tag_text:
-                tags.append(tag_text)
-
-        # 生成摘要
-        summary = content[:200] + "..." if len(content) > 200 else content
-
-        return {
-            "title": title,
-            "content": content,
-            "summary": summary,
-            "author": author,
-            "publish_time": publish_time,
-            "url": url,
-            "platform": "juejin",
-            "tags": tags,
-            "read_count": 0,
-            "like_count": 0,
-            "crawl_time": datetime.now().isoformat(),
-            "word_count": len(content),
-            "status": "success"
-        }
-
-    async def parse_zhihu_article(self, soup: BeautifulSoup, url: str):
-        """解析知乎文章"""
-        # 提取标题
-        title_elem = soup.find('h1', class_='Post-Title')
-        if not title_elem:
-            title_elem = soup.find('h1')
-        if not title_elem:
-            title_elem = soup.find('title')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 提取作者
-        author_elem = soup.find('span', class_='UserLink-link')
-        if not author_elem:
-            author_elem = soup.find('a', class_='author-link')
-        author = author_elem.get_text().strip() if author_elem else "未知作者"
-
-        # 提取发布时间
-        time_elem = soup.find('time')
-        publish_time = time_elem.get_text().strip() if time_elem else datetime.now().strftime('%Y-%m-%d')
-
-        # 提取内容
-        content_elem = soup.find('div', class_='Post-RichText')
-        if not content_elem:
-            content_elem = soup.find('div', class_='RichText')
-
-        content = ""
-        if content_elem:
-            for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside']):
-                tag.decompose()
-            content = content_elem.get_text().strip()
-
-        # 生成摘要
-        summary = content[:200] + "..." if len(content) > 200 else content
-
-        return {
-            "title": title,
-            "content": content,
-            "summary": summary,
-            "author": author,
-            "publish_time": publish_time,
-            "url": url,
-            "platform": "zhihu",
-            "tags": [],
-            "read_count": 0,
-            "like_count": 0,
-            "crawl_time": datetime.now().isoformat(),
-            "word_count": len(content),
-            "status": "success"
-        }
-
-    async def parse_general_article(self, soup: BeautifulSoup, url: str, platform: str):
-        """通用文章解析"""
-        # 提取标题
-        title_elem = soup.find('title')
-        title = title_elem.get_text().strip() if title_elem else "未知标题"
-
-        # 提取内容 - 通用方法
-        content = ""
-
-        # 尝试多种常见的内容选择器
-        content_selectors = [
-            'article',
-            '.article-content',
-            '.post-content',
-            '.entry-content',
-            '.content',
-            '#content',
-            '.main-content',
-            'main'
-        ]
-
-        for selector in content_selectors:
-            content_elem = soup.select_one(selector)
-            if content_elem:
-                # 移除不需要的标签
-                for tag in content_elem.find_all(['script', 'style', 'nav', 'footer', 'aside', 'header']):
-                    tag.decompose()
-                content = content_elem.get_text().strip()
-                if len(content) > 100:  # 内容长度合理
-                    break
-
-        # 如果没有找到合适的内容，尝试获取body文本
-        if not content:
-            body_elem = soup.find('body')
-            if body_elem:
-                for tag in body_elem.find_all(['script', 'style', 'nav', 'footer', 'aside', 'header']):
-                    tag.decompose()
-                content = body_elem.get_text().strip()
-
-        # 生成摘要
-        summary = content[:200] + "..." if len(content) > 200 else content
-
-        return {
-            "title": title,
-            "content": content,
-            "summary": summary,
-            "author": "未知作者",
-            "publish_time": datetime.now().strftime('%Y-%m-%d'),
-            "url": url,
-            "platform": platform,
-            "tags": [],
-            "read_count": 0,
-            "like_count": 0,
-            "crawl_time": datetime.now().isoformat(),
-            "word_count": len(content),
-            "status": "success"
-        }
-
     def create_error_response(self, url: str, platform: str, error_msg: str):
         """创建错误响应"""
         return {
@@ -1069,6 +960,18 @@ class SpiderService:
 
 spider_service = SpiderService()
 
+# 爬取结果存储，列表、搜索和文本优化直接读取已抓取的文章
+crawl_store = get_crawl_store()
+
+
+@app.on_event("shutdown")
+async def close_spider_session():
+    """应用关闭时释放爬虫的共享HTTP会话和渲染浏览器，并停止上传运行时和小红书签名服务"""
+    await spider_service.close()
+    await get_page_renderer().close()
+    await asyncio.to_thread(get_upload_runtime().shutdown)
+    await asyncio.to_thread(get_xhs_signer().shutdown)
+
 # ==================== API端点 ====================
 
 @app.get("/health")
@@ -1078,43 +981,48 @@ async def health():
 
 # 视频生成API
 @app.post("/api/v1/video/generate")
-async def generate_video(request: dict):
-    """生成视频API"""
+async def generate_video(request: dict, http_request: Request):
+    """生成视频API - 提交任务后立即返回task_id和预计开始/完成时间
+
+    生成过程在后台执行，客户端通过 /api/v1/video/status/{task_id} 查询，
+    或通过 /api/v1/video/events/{task_id} (SSE)、/api/v1/video/ws/{task_id} (WebSocket) 接收推送。
+    GPU容量不足时任务先在本地排队，按用户公平调度。
+    """
     try:
         # 解析请求数据
-        video_request = VideoRequest(
-            provider=request.get("provider", "comfyui_wan"),
-            prompt=request.get("prompt", ""),
-            duration=request.get("duration", 8),
-            width=request.get("width", 512),
-            height=request.get("height", 512),
-            fps=request.get("fps", 16),
-            seed=request.get("seed")
-        )
+        params = {
+            "provider": request.get("provider", "comfyui_wan"),
+            "prompt": request.get("prompt", ""),
+            "duration": request.get("duration", 8),
+            "width": request.get("width", 512),
+            "height": request.get("height", 512),
+            "fps": request.get("fps", 16),
+            "seed": request.get("seed")
+        }
+        video_request = VideoRequest(**params)
 
-        # 生成视频
-        video_info = await video_service.generate_video(video_request)
+        # 公平排队按用户区分，未传user_id时按客户端地址区分
+        user_id = str(request.get("user_id") or (http_request.client.host if http_request.client else "anonymous"))
+        cost = video_service.estimate_cost(video_request)
 
-        if video_info:
-            # 添加本地视频URL
-            if video_info.get("local_file_path"):
-                # 从完整路径中提取文件名
-                local_file_path = Path(video_info["local_file_path"])
-                video_url = f"http://localhost:9000/api/v1/video/file/{local_file_path.name}"
-                video_info["local_video_url"] = video_url
-                print(f"🎬 本地视频URL: {video_url}")
+        task = video_task_registry.create(params["provider"], {**params, "user_id": user_id, "cost": cost})
+        task_id = task["task_id"]
+        eta = video_admission.submit(task_id, user_id, cost)
+        start_video_generation_job(task_id, video_request)
 
-            return {
-                "success": True,
-                "data": {
-                    "video_info": video_info
-                }
-            }
-        else:
-            return {
-                "success": False,
-                "message": "视频生成失败"
+        print(f"📝 视频生成任务已提交: {task_id}")
+        return {
+            "success": True,
+            "data": {
+                "task_id": task_id,
+                "status": task["status"],
+                "eta_start": eta.get("eta_start"),
+                "eta_finish": eta.get("eta_finish"),
+                "status_url": f"/api/v1/video/status/{task_id}",
+                "events_url": f"/api/v1/video/events/{task_id}",
+                "ws_url": f"/api/v1/video/ws/{task_id}"
             }
+        }
 
     except Exception as e:
         print(f"API错误: {str(e)}")
@@ -1123,6 +1031,106 @@ async def generate_video(request: dict):
             "message": f"API错误: {str(e)}"
         }
 
+
+def start_video_generation_job(task_id: str, video_request: Optional[VideoRequest] = None,
+                               resume_prompt_id: Optional[str] = None, elapsed_before: float = 0.0,
+                               resume_node: Optional[str] = None):
+    """在后台启动（或恢复）视频生成任务"""
+    job = asyncio.create_task(
+        run_video_generation_job(task_id, video_request, resume_prompt_id, elapsed_before, resume_node)
+    )
+    video_generation_jobs[task_id] = job
+    job.add_done_callback(lambda _: video_generation_jobs.pop(task_id, None))
+    return job
+
+
+async def run_video_generation_job(task_id: str, video_request: Optional[VideoRequest],
+                                   resume_prompt_id: Optional[str] = None, elapsed_before: float = 0.0,
+                                   resume_node: Optional[str] = None):
+    """执行视频生成任务并把结果写入任务注册表
+
+    新任务先等待GPU准入控制放行，再提交到分配的ComfyUI节点；结束时释放节点容量。
+    """
+    video_info = None
+    try:
+        if resume_prompt_id:
+            print(f"🔄 恢复监控视频生成任务: {task_id} (prompt_id={resume_prompt_id})")
+            video_info = await video_service._monitor_direct_task(
+                resume_prompt_id, video_request, task_id, elapsed_before=elapsed_before, node_url=resume_node
+            )
+        else:
+            node_url = await video_admission.wait_admitted(task_id)
+            video_info = await video_service.generate_video(video_request, task_id=task_id, node_url=node_url)
+
+        if not video_info:
+            video_task_registry.update(
+                task_id,
+                status=VideoTaskStatus.FAILED,
+                message="视频生成失败",
+                error="视频生成失败"
+            )
+            return
+
+        # 添加本地视频URL
+        if video_info.get("local_file_path"):
+            # 从完整路径中提取文件名
+            local_file_path = Path(video_info["local_file_path"])
+            video_url = f"http://localhost:9000/api/v1/video/file/{local_file_path.name}"
+            video_info["local_video_url"] = video_url
+            print(f"🎬 本地视频URL: {video_url}")
+
+        video_task_registry.update(
+            task_id,
+            status=VideoTaskStatus.COMPLETED,
+            progress=100,
+            message="视频生成完成",
+            output_path=video_info.get("local_file_path"),
+            result=video_info
+        )
+
+    except Exception as e:
+        print(f"视频生成任务 {task_id} 执行失败: {str(e)}")
+        video_task_registry.update(
+            task_id,
+            status=VideoTaskStatus.FAILED,
+            message=f"视频生成失败: {str(e)}",
+            error=str(e)
+        )
+    finally:
+        video_admission.release(task_id, succeeded=bool(video_info))
+
+
+@app.on_event("startup")
+async def recover_video_generation_jobs():
+    """服务重启后恢复未完成的视频生成任务
+
+    已拿到prompt_id的任务继续监控ComfyUI结果；尚未提交到ComfyUI的任务无法恢复，标记为失败。
+    """
+    for task in video_task_registry.unfinished():
+        if task.get("prompt_id"):
+            params = task.get("params") or {}
+            # 已提交的任务继续占用其节点的GPU容量
+            video_admission.restore(
+                task["task_id"],
+                params.get("user_id", "anonymous"),
+                params.get("cost") or estimate_job_cost(640, 640, 81, 4),
+                task.get("comfyui_node") or video_service.comfyui_direct_url,
+                started_at=task["updated_at"]
+            )
+            start_video_generation_job(
+                task["task_id"],
+                resume_prompt_id=task["prompt_id"],
+                elapsed_before=time.time() - task["created_at"],
+                resume_node=task.get("comfyui_node")
+            )
+        else:
+            video_task_registry.update(
+                task["task_id"],
+                status=VideoTaskStatus.FAILED,
+                message="服务重启，任务未提交到ComfyUI",
+                error="服务重启，任务中断"
+            )
+
 @app.get("/api/v1/video/providers")
 async def get_providers():
     """获取视频生成提供商列表"""
@@ -1149,6 +1157,17 @@ async def optimize_text(request: dict):
         provider = request.get("provider", "glm")
         custom_prompt = request.get("custom_prompt", "")
 
+        # 支持直接传入已抓取文章的id
+        article_id = request.get("article_id")
+        if not text and article_id is not None:
+            article = crawl_store.get(int(article_id))
+            if article is None:
+                return {
+                    "success": False,
+                    "message": f"文章不存在: {article_id}"
+                }
+            text = article.get("content", "")
+
         if not text:
             return {
                 "success": False,
@@ -1226,8 +1245,21 @@ async def crawl_article(request: dict):
 
         print(f"爬虫请求: platform={platform}, url={url}")
 
+        # reuse为True时优先返回已存储的结果，max_age（秒）限制结果的新鲜度
+        if request.get("reuse"):
+            stored = crawl_store.get_by_url(url, request.get("max_age"))
+            if stored is not None:
+                print(f"♻️ 使用已存储的抓取结果: id={stored['id']}")
+                return {
+                    "success": True,
+                    "data": {**stored, "from_store": True}
+                }
+
         result = await spider_service.crawl_article(platform, url)
 
+        if result and result.get("status") != "failed":
+            result["id"] = crawl_store.save(result)
+
         if result:
             return {
                 "success": True,
@@ -1246,6 +1278,45 @@ async def crawl_article(request: dict):
             "message": f"API错误: {str(e)}"
         }
 
+@app.get("/api/v1/spider/articles")
+async def list_crawled_articles(platform: Optional[str] = None, keyword: Optional[str] = None,
+                                since: Optional[float] = None, until: Optional[float] = None,
+                                limit: int = 20, offset: int = 0):
+    """列出已抓取的文章（不含正文），keyword按标题搜索，since/until为抓取时间戳范围"""
+    limit = min(max(limit, 1), 100)
+    offset = max(offset, 0)
+    items, total = crawl_store.search(platform, keyword, since, until, limit, offset)
+    return {
+        "success": True,
+        "data": {
+            "items": items,
+            "total": total,
+            "limit": limit,
+            "offset": offset
+        }
+    }
+
+@app.get("/api/v1/spider/articles/{article_id}")
+async def get_crawled_article(article_id: int):
+    """获取已抓取文章的完整内容"""
+    article = crawl_store.get(article_id)
+    if article is None:
+        raise HTTPException(status_code=404, detail="文章不存在")
+    return {
+        "success": True,
+        "data": article
+    }
+
+@app.delete("/api/v1/spider/articles/{article_id}")
+async def delete_crawled_article(article_id: int):
+    """删除已抓取的文章"""
+    if not crawl_store.delete(article_id):
+        raise HTTPException(status_code=404, detail="文章不存在")
+    return {
+        "success": True,
+        "message": "删除成功"
+    }
+
 @app.get("/api/v1/spider/platforms")
 async def get_spider_platforms():
     """获取爬虫平台列表"""
@@ -2103,7 +2174,8 @@ async def post_video(request: Request, background_tasks: BackgroundTasks):
         category = data.get('category')
         enableTimer = data.get('enableTimer')
 
-        # 重复发布检测 - 检查每个文件是否正在发布中
+        # 重复发布检测 - 检查每个文件是否正在发布中；同一请求的文件共用一个任务ID，用于查询发布进度
+        task_id = str(uuid.uuid4())
         for file_name in file_list:
             # 构建文件的完整路径
             file_path = str((Path(__file__).parent / "videoFile" / file_name).resolve())
@@ -2119,7 +2191,6 @@ async def post_video(request: Request, background_tasks: BackgroundTasks):
                 }
 
             # 标记该文件正在发布
-            task_id = str(uuid.uuid4())
             publishing_videos[file_path] = task_id
             print(f"📝 标记文件正在发布: {file_name} -> {task_id}")
         if category == 0:
@@ -2264,9 +2335,8 @@ async def post_video(request: Request, background_tasks: BackgroundTasks):
                 # 尝试导入并调用发布模块
                 try:
                     # 首先导入必要的模块
-                    from myUtils.postVideo import post_video_DouYin
                     from conf import BASE_DIR
-                    from utils.constant import TencentZoneTypes
+                    uploader = get_platform_uploader(type)
 
                     print(f"🚀 开始调用 {platform_name} 实际发布功能...")
                     print(f"  - 工作目录: {os.getcwd()}")
@@ -2274,6 +2344,17 @@ async def post_video(request: Request, background_tasks: BackgroundTasks):
                     print(f"  - 文件列表: {file_list}")
                     print(f"  - 账号文件: {sau_account_files}")
 
+                    # 发布任务记录，状态和上传进度通过 /publish/status/{task_id} 查询
+                    task_info = {
+                        "task_id": task_id,
+                        "status": "pending",
+                        "title": title,
+                        "platform": platform_name,
+                        "created_at": datetime.now(),
+                        "message": "任务已创建，等待执行"
+                    }
+                    publish_tasks[task_id] = task_info
+
                     # 在后台线程中执行发布，避免阻塞API响应
                     async def execute_publish():
                         try:
@@ -2319,58 +2400,37 @@ async def post_video(request: Request, background_tasks: BackgroundTasks):
                             # 切换到social-auto-upload目录执行
                             os.chdir(sau_path)
 
-                            if type == 3:  # 抖音
-                                print(f"🎬 调用抖音发布功能...")
-                                # 使用全局导入的GitHub优化版DouYinVideo类
-                                if SOCIAL_AUTO_UPLOAD_AVAILABLE:
-                                    print("✅ 使用GitHub优化版DouYinVideo类")
-                                else:
-                                    print("❌ DouYinVideo类未可用")
-                                    raise Exception("DouYinVideo类未导入")
-
-                                for video_file in sau_video_files:
-                                    try:
-                                            print(f"开始发布视频: {video_file}")
-                                            from datetime import datetime
-                                            # 构建完整的cookie文件路径
-                                            account_file_path = None
-                                            if sau_account_files:
-                                                account_file_path = f"cookiesFile/{sau_account_files[0]}"
-
-                                            # 构建完整的视频文件路径，匹配social-auto-upload格式
-                                            video_file_path = str(Path(BASE_DIR) / "videoFile" / video_file)
-
-                                                    # 根据enableTimer设置正确的发布时间
-                                            publish_date = None
-                                            if enableTimer and enableTimer == 1:
-                                                # 使用定时发布，计算发布时间
-                                                from utils.files_times import generate_schedule_time_next_day
-                                                publish_datetimes = generate_schedule_time_next_day(
-                                                    len(sau_video_files), videos_per_day, daily_times, start_days
-                                                )
-                                                publish_date = publish_datetimes[0]  # 使用第一个文件的发布时间
-                                                print(f"📅 使用定时发布时间: {publish_date}")
-                                            else:
-                                                # 立即发布，使用当前时间
-                                                publish_date = datetime.now()
-                                                print(f"🚀 使用立即发布模式")
-
-                                            douyin_uploader = DouYinVideo(
-                                                title=title,
-                                                file_path=video_file_path,
-                                                tags=tags,
-                                                publish_date=publish_date,
-                                                account_file=account_file_path
-                                            )
-                                            await asyncio.get_event_loop().run_in_executor(
-                                                None, lambda: asyncio.run(douyin_uploader.main())
-                                            )
-                                            print(f"✅ 视频发布成功: {video_file}")
-                                    except Exception as video_error:
-                                        print(f"❌ 视频发布失败: {video_file} - {str(video_error)}")
-                                        raise video_error
-                                print(f"✅ {platform_name} 发布执行完成")
+                            # 所有平台统一通过平台注册表创建发布任务，在上传运行时中执行
+                            print(f"🎬 调用{platform_name}发布功能...")
+                            jobs = uploader.build_jobs(
+                                title,
+                                [Path(BASE_DIR) / "videoFile" / video_file for video_file in sau_video_files],
+                                tags,
+                                [Path(BASE_DIR) / "cookiesFile" / account_file for account_file in sau_account_files],
+                                category,
+                                bool(enableTimer),
+                                videos_per_day or 1,
+                                daily_times,
+                                start_days or 0,
+                            )
+                            # 上传进度写入任务记录
+                            track_progress(jobs, task_info)
+                            task_info["status"] = "uploading"
+                            task_info["message"] = f"正在上传视频到{platform_name}..."
+                            task_info["updated_at"] = datetime.now()
+                            results = await get_upload_runtime().publish(jobs)
+                            failed = [result for result in results if not result["success"]]
+                            if failed:
+                                raise Exception(f"{len(failed)}/{len(results)} 个发布任务失败: {failed[0]['error']}")
+                            task_info["status"] = "completed"
+                            task_info["message"] = "视频发布成功"
+                            task_info["updated_at"] = datetime.now()
+                            print(f"✅ {platform_name} 发布执行完成")
                         except Exception as publish_error:
+                            task_info["status"] = "failed"
+                            task_info["message"] = f"发布失败: {str(publish_error)}"
+                            task_info["error"] = str(publish_error)
+                            task_info["updated_at"] = datetime.now()
                             print(f"❌ {platform_name} 发布执行失败: {str(publish_error)}")
                             import traceback
                             traceback.print_exc()
@@ -2384,11 +2444,11 @@ async def post_video(request: Request, background_tasks: BackgroundTasks):
                     # 恢复原工作目录
                     os.chdir(original_cwd)
 
-                    # 使用social-auto-upload标准响应格式
+                    # 使用social-auto-upload标准响应格式，data中返回查询进度用的任务ID
                     return {
                         "code": 200,
                         "msg": None,
-                        "data": None
+                        "data": {"task_id": task_id}
                     }
 
                 except ImportError as import_error:
@@ -2562,84 +2622,121 @@ async def post_video_item(publish_data):
 
 # ==================== 视频状态检查 ====================
 
+def format_video_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """把任务注册表中的记录转换为状态接口的返回格式"""
+    status = task["status"]
+    response = {
+        "success": status != VideoTaskStatus.FAILED.value,
+        "status": status,
+        "progress": task["progress"],
+        "message": task.get("message") or f"任务状态: {status}",
+        "data": {
+            "task_id": task["task_id"],
+            "provider": task["provider"],
+            "comfyui_node": task.get("comfyui_node"),
+            "prompt_id": task.get("prompt_id"),
+            "output_path": task.get("output_path"),
+            "eta_start": task.get("eta_start"),
+            "eta_finish": task.get("eta_finish"),
+            "created_at": task["created_at"],
+            "updated_at": task["updated_at"]
+        }
+    }
+    if status == VideoTaskStatus.COMPLETED.value:
+        response["data"]["video_info"] = task.get("result")
+    elif status == VideoTaskStatus.FAILED.value:
+        response["error"] = task.get("error") or "unknown error"
+    return response
+
+
 @app.get("/api/v1/video/status/{task_id}")
 async def get_video_status(task_id: str):
-    """获取视频生成任务状态"""
-    try:
-        print(f"收到视频状态查询请求: task_id={task_id}")
+    """获取视频生成任务状态 - 读取本地任务注册表"""
+    task = video_task_registry.get(task_id)
+    if not task:
+        return {
+            "success": False,
+            "status": "not_found",
+            "message": f"任务不存在: {task_id}"
+        }
+    return format_video_task(task)
 
-        # 调用ComfyUI API包装器查询任务状态
-        comfyui_api_url = "http://192.168.1.246:5001"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{comfyui_api_url}/api/task_status/{task_id}",
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
+@app.get("/api/v1/video/tasks")
+async def list_video_tasks(status: Optional[str] = None, limit: int = 50):
+    """列出视频生成任务"""
+    tasks = video_task_registry.list(status=status, limit=limit)
+    return {
+        "success": True,
+        "data": {
+            "tasks": [format_video_task(task) for task in tasks],
+            "total": len(tasks)
+        }
+    }
 
-                if response.status == 200:
-                    result = await response.json()
-                    print(f"ComfyUI API包装器状态查询成功: {result}")
-
-                    # 解析并返回状态信息
-                    status = result.get("status", "unknown")
-                    message = result.get("message", "")
-
-                    if status == "completed":
-                        return {
-                            "success": True,
-                            "status": "completed",
-                            "message": "视频生成完成",
-                            "data": result.get("data", {})
-                        }
-                    elif status == "failed":
-                        return {
-                            "success": False,
-                            "status": "failed",
-                            "message": f"视频生成失败: {message}",
-                            "error": result.get("error", "unknown error")
-                        }
-                    elif status in ["submitted", "processing", "pending"]:
-                        return {
-                            "success": True,
-                            "status": status,
-                            "message": f"任务正在处理中: {message}" if message else f"任务状态: {status}"
-                        }
-                    else:
-                        return {
-                            "success": True,
-                            "status": status,
-                            "message": f"未知状态: {status}"
-                        }
 
-                elif response.status == 404:
-                    return {
-                        "success": False,
-                        "status": "not_found",
-                        "message": f"任务不存在: {task_id}"
-                    }
-                else:
-                    error_text = await response.text()
-                    print(f"ComfyUI API包装器状态查询失败: {response.status}, {error_text}")
-                    return {
-                        "success": False,
-                        "status": "error",
-                        "message": f"状态查询失败: HTTP {response.status}"
-                    }
+@app.get("/api/v1/video/admission")
+async def get_video_admission():
+    """GPU准入控制状态：各ComfyUI节点在途成本、吞吐量和本地排队情况"""
+    return {"success": True, "data": video_admission.snapshot()}
 
-    except asyncio.TimeoutError:
-        return {
-            "success": False,
-            "status": "timeout",
-            "message": "状态查询超时"
-        }
-    except Exception as e:
-        print(f"视频状态查询失败: {str(e)}")
-        return {
-            "success": False,
-            "status": "error",
-            "message": f"状态查询失败: {str(e)}"
+
+@app.get("/api/v1/video/events/{task_id}")
+async def stream_video_status(task_id: str):
+    """通过SSE推送视频生成任务状态，任务结束后关闭连接"""
+    if not video_task_registry.get(task_id):
+        raise HTTPException(status_code=404, detail=f"任务不存在: {task_id}")
+
+    async def generate():
+        queue = video_task_registry.subscribe(task_id)
+        try:
+            while True:
+                try:
+                    task = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 心跳，防止反向代理断开空闲连接
+                    yield ": keep-alive\n\n"
+                    continue
+
+                payload = json.dumps(format_video_task(task), ensure_ascii=False)
+                yield f"data: {payload}\n\n"
+                if task["status"] in TERMINAL_STATUSES:
+                    break
+        finally:
+            video_task_registry.unsubscribe(task_id, queue)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "Connection": "keep-alive"
         }
+    )
+
+
+@app.websocket("/api/v1/video/ws/{task_id}")
+async def video_status_websocket(websocket: WebSocket, task_id: str):
+    """通过WebSocket推送视频生成任务状态"""
+    await websocket.accept()
+    if not video_task_registry.get(task_id):
+        await websocket.send_json({"success": False, "status": "not_found", "message": f"任务不存在: {task_id}"})
+        await websocket.close()
+        return
+
+    queue = video_task_registry.subscribe(task_id)
+    try:
+        while True:
+            task = await queue.get()
+            await websocket.send_json(format_video_task(task))
+            if task["status"] in TERMINAL_STATUSES:
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        video_task_registry.unsubscribe(task_id, queue)
 
 # ==================== 视频文件服务 ====================
 
@@ -2710,23 +2807,17 @@ def init_account_db():
 
 def get_platform_name(type_id):
     """根据类型ID获取平台名称"""
-    type_map = {
-        1: "小红书",
-        2: "视频号",
-        3: "抖音",
-        4: "快手"
-    }
-    return type_map.get(type_id, "未知平台")
+    try:
+        return get_platform_class(type_id).name
+    except ValueError:
+        return "未知平台"
 
 def get_platform_type(platform_name):
     """根据平台名称获取类型ID"""
-    platform_map = {
-        "小红书": 1,
-        "视频号": 2,
-        "抖音": 3,
-        "快手": 4
-    }
-    return platform_map.get(platform_name, 1)
+    try:
+        return get_platform_class(platform_name).type_id or 1
+    except ValueError:
+        return 1
 
 # ==================== 抖音发布API ====================
 
@@ -2834,6 +2925,7 @@ async def get_publish_status(task_id: str):
         "message": task_info.get("message", ""),
         "created_at": task_info["created_at"],
         "updated_at": task_info.get("updated_at"),
+        "progress": task_info.get("progress"),
         "error": task_info.get("error")
     }
 
@@ -2848,6 +2940,7 @@ async def list_publish_tasks():
                 "status": task_info["status"],
                 "title": task_info["title"],
                 "created_at": task_info["created_at"],
+                "progress": task_info.get("progress"),
                 "message": task_info.get("message", "")
             }
             for task_id, task_info in publish_tasks.items()
@@ -2855,6 +2948,13 @@ async def list_publish_tasks():
     }
 
 
+@app.get("/publish/timeline")
+async def get_publish_timeline(platform: Optional[str] = None, account: Optional[str] = None, hours: float = 168):
+    """即将发布的时间线：预约的定时发布、上传中的任务、各账号今日已用配额和限流退避状态"""
+    timeline = await asyncio.to_thread(get_publish_governor().timeline, platform, account, hours)
+    return {"success": True, "data": timeline}
+
+
 @app.get("/publish/test")
 async def test_publish():
     """
@@ -2906,7 +3006,7 @@ async def test_publish():
 
 async def execute_douyin_publish(task_id: str):
     """
-    执行抖音发布任务 - 使用social-auto-upload的DouYinVideo类
+    执行抖音发布任务 - 使用平台注册表中的抖音上传实现
     """
     task_info = publish_tasks[task_id]
 
@@ -2918,18 +3018,17 @@ async def execute_douyin_publish(task_id: str):
 
         print(f"开始执行抖音发布任务 {task_id}: {task_info['title']}")
 
-        # 使用social-auto-upload的DouYinVideo类
-        video_obj = DouYinVideo(
-            title=task_info["title"],
-            file_path=task_info["video_path"],
-            tags=task_info["tags"],
-            publish_date=task_info.get("publish_time") or datetime.now(),
-            account_file=task_info["account_file"],
-            thumbnail_path=None
-        )
+        # 上传进度写入任务记录，状态接口在上传过程中即可查询
+        def on_progress(progress: float):
+            task_info["progress"] = progress
+            task_info["updated_at"] = datetime.now()
 
-        # 执行上传
-        await video_obj.main()
+        # 在上传运行时中执行，预检、发布预算和并发限制与其他发布入口一致
+        result = await publish_video("douyin", task_info["title"], Path(task_info["video_path"]),
+                                     task_info["tags"], Path(task_info["account_file"]),
+                                     task_info.get("publish_time"), on_progress=on_progress)
+        if not result["success"]:
+            raise Exception(result["error"])
 
         # 任务完成
         task_info["status"] = "completed"
@@ -3090,6 +3189,20 @@ async def add_account(request: dict):
             "message": f"添加账号失败: {str(e)}"
         }
 
+@app.post("/sign")
+async def xhs_sign(request: dict):
+    """小红书请求签名 - 即XHS_SERVER的签名接口，返回x-s和x-t"""
+    try:
+        return await get_xhs_signer().sign_async(
+            request.get("uri", ""),
+            request.get("data"),
+            a1=request.get("a1", ""),
+            web_session=request.get("web_session", "")
+        )
+    except Exception as e:
+        print(f"❌ 小红书签名失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"签名失败: {str(e)}")
+
 @app.post("/updateUserinfo")
 async def update_account(request: dict):
     """更新账号信息 - 完全兼容social-auto-upload"""
@@ -3191,7 +3304,6 @@ async def delete_account(id: int = None):
         }
 
 # SSE 登录接口 - 兼容social-auto-upload
-from fastapi.responses import StreamingResponse
 import queue
 import threading
 import asyncio
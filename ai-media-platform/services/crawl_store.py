@@ -0,0 +1,193 @@
+"""
+爬取结果存储 - 把抓取到的文章持久化到SQLite
+标题、平台、抓取时间等列单独存储并建索引，列表和搜索不需要解压正文；
+完整结果（正文、图片、链接等）序列化后用zstd压缩存储，未安装zstandard时回退到zlib
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse
+
+from loguru import logger
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+DEFAULT_DB_PATH = Path("./crawl_articles.db")
+
+ZSTD_LEVEL = 10
+
+# 列表接口返回的摘要字段
+_SUMMARY_COLUMNS = ("id", "url", "platform", "title", "author", "publish_time", "crawled_at",
+                    "word_count", "simhash")
+
+
+def url_hash(url: str) -> int:
+    """URL的64位哈希（有符号，适配SQLite整数）；忽略协议和主机大小写以及片段"""
+    parsed = urlparse(url.strip())
+    key = urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or "/",
+                      parsed.params, parsed.query, ""))
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if ZSTD_AVAILABLE:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("该记录使用zstd压缩，需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+class CrawlStore:
+    """爬取结果存储"""
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS crawl_articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url_hash INTEGER NOT NULL UNIQUE,
+                    url TEXT NOT NULL,
+                    platform TEXT,
+                    title TEXT,
+                    author TEXT,
+                    publish_time TEXT,
+                    crawled_at REAL NOT NULL,
+                    word_count INTEGER NOT NULL DEFAULT 0,
+                    simhash TEXT,
+                    codec TEXT NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_articles_platform ON crawl_articles(platform, crawled_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_articles_crawled_at ON crawl_articles(crawled_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_articles_title ON crawl_articles(title)')
+            conn.commit()
+
+    def save(self, article: Dict[str, Any]) -> Optional[int]:
+        """保存抓取结果，同一URL再次抓取时覆盖并保留原id；失败的结果不保存"""
+        url = article.get("url")
+        if not url or article.get("error"):
+            return None
+
+        codec, payload = _compress(json.dumps(article, ensure_ascii=False).encode("utf-8"))
+        row = (
+            url_hash(url), url, article.get("platform"), article.get("title"), article.get("author"),
+            article.get("publish_time"), time.time(),
+            article.get("word_count") or len(article.get("content", "")),
+            article.get("simhash"), codec, payload
+        )
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO crawl_articles (
+                    url_hash, url, platform, title, author, publish_time, crawled_at,
+                    word_count, simhash, codec, payload
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url_hash) DO UPDATE SET
+                    url = excluded.url,
+                    platform = excluded.platform,
+                    title = excluded.title,
+                    author = excluded.author,
+                    publish_time = excluded.publish_time,
+                    crawled_at = excluded.crawled_at,
+                    word_count = excluded.word_count,
+                    simhash = excluded.simhash,
+                    codec = excluded.codec,
+                    payload = excluded.payload
+            ''', row)
+            article_id = conn.execute(
+                'SELECT id FROM crawl_articles WHERE url_hash = ?', (row[0],)
+            ).fetchone()[0]
+            conn.commit()
+        return article_id
+
+    def _load(self, where: str, params: tuple) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                f'SELECT id, crawled_at, codec, payload FROM crawl_articles WHERE {where}', params
+            ).fetchone()
+        if row is None:
+            return None
+        article_id, crawled_at, codec, payload = row
+        article = json.loads(_decompress(codec, payload))
+        article["id"] = article_id
+        article["crawled_at"] = crawled_at
+        return article
+
+    def get(self, article_id: int) -> Optional[Dict[str, Any]]:
+        """按id读取完整结果"""
+        return self._load('id = ?', (article_id,))
+
+    def get_by_url(self, url: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """按URL读取完整结果，max_age（秒）限制结果的新鲜度"""
+        if max_age is None:
+            return self._load('url_hash = ?', (url_hash(url),))
+        return self._load('url_hash = ? AND crawled_at >= ?', (url_hash(url), time.time() - max_age))
+
+    def search(self, platform: Optional[str] = None, keyword: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """按条件列出结果摘要（不含正文），按抓取时间倒序，返回 (摘要列表, 总数)"""
+        conditions, params = [], []
+        if platform:
+            conditions.append('platform = ?')
+            params.append(platform)
+        if keyword:
+            conditions.append("title LIKE ? ESCAPE '\\'")
+            escaped = keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        if since is not None:
+            conditions.append('crawled_at >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('crawled_at < ?')
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._connect() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM crawl_articles {where}', params).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT {", ".join(_SUMMARY_COLUMNS)} FROM crawl_articles {where} '
+                f'ORDER BY crawled_at DESC LIMIT ? OFFSET ?',
+                (*params, limit, offset)
+            ).fetchall()
+        return [dict(zip(_SUMMARY_COLUMNS, row)) for row in rows], total
+
+    def delete(self, article_id: int) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute('DELETE FROM crawl_articles WHERE id = ?', (article_id,))
+            conn.commit()
+        return cursor.rowcount > 0
+
+
+_crawl_store: Optional[CrawlStore] = None
+
+
+def get_crawl_store(db_path: Path = DEFAULT_DB_PATH) -> CrawlStore:
+    """获取爬取结果存储实例"""
+    global _crawl_store
+    if _crawl_store is None:
+        _crawl_store = CrawlStore(db_path)
+        logger.info(f"爬取结果存储: {_crawl_store.db_path}（压缩: {'zstd' if ZSTD_AVAILABLE else 'zlib'}）")
+    return _crawl_store
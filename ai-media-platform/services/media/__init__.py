@@ -0,0 +1,16 @@
+"""
+媒体后处理模块
+"""
+
+from .ffmpeg_pool import (
+    get_ffmpeg_pool, FFmpegProcessPool, FFmpegJob, FFmpegJobStatus, FFmpegError, write_concat_manifest
+)
+
+__all__ = [
+    "get_ffmpeg_pool",
+    "FFmpegProcessPool",
+    "FFmpegJob",
+    "FFmpegJobStatus",
+    "FFmpegError",
+    "write_concat_manifest"
+]
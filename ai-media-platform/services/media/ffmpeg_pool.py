@@ -0,0 +1,335 @@
+"""
+FFmpeg进程池 - 媒体后处理任务管理
+限制同时运行的FFmpeg进程数，为每个任务分配独立临时目录，
+解析-progress输出上报进度，支持超时与取消，编码参数一致时优先直接复制流
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class FFmpegJobStatus(str, Enum):
+    """FFmpeg任务状态"""
+    PENDING = "pending"      # 等待空闲进程槽
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    TIMEOUT = "timeout"
+
+
+class FFmpegError(Exception):
+    """FFmpeg执行失败"""
+
+
+# 判断能否直接复制流时需要一致的参数
+_VIDEO_COPY_KEYS = ("codec_name", "profile", "width", "height", "pix_fmt")
+_AUDIO_COPY_KEYS = ("codec_name", "sample_rate", "channels")
+
+# 只保留stderr末尾若干行用于报错
+_STDERR_TAIL_LINES = 30
+
+
+class FFmpegJob:
+    """单个FFmpeg任务"""
+
+    def __init__(self, job_id: str, args: List[str], duration: Optional[float] = None):
+        self.job_id = job_id
+        self.args = args
+        self.duration = duration  # 输出总时长（秒），用于计算进度百分比
+        self.status = FFmpegJobStatus.PENDING
+        self.progress = 0.0
+        self.speed: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "progress": round(self.progress, 1),
+            "speed": self.speed,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class FFmpegProcessPool:
+    """FFmpeg进程池
+
+    - 同时运行的FFmpeg进程数不超过max_workers（默认CPU核数），其余任务排队
+    - 每个任务可通过job_dir()获得独立临时目录，结束后自动清理
+    - 通过-progress pipe:1解析进度，超时或取消时终止进程
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, temp_root: Path = Path("./temp"),
+                 default_timeout: float = 600):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.temp_root = Path(temp_root)
+        self.default_timeout = default_timeout
+        self.jobs: Dict[str, FFmpegJob] = {}
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+
+    @asynccontextmanager
+    async def job_dir(self, prefix: str = "ffmpeg_"):
+        """为单个任务创建独立临时目录，退出时删除"""
+        self.temp_root.mkdir(parents=True, exist_ok=True)
+        path = Path(tempfile.mkdtemp(prefix=prefix, dir=self.temp_root))
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def get_job(self, job_id: str) -> Optional[FFmpegJob]:
+        return self.jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> bool:
+        """取消任务：终止正在运行的FFmpeg进程"""
+        job = self.jobs.get(job_id)
+        if job is None or job.status not in (FFmpegJobStatus.PENDING, FFmpegJobStatus.RUNNING):
+            return False
+        job.status = FFmpegJobStatus.CANCELLED
+        await self._kill(job)
+        return True
+
+    async def run(self, args: List[str], duration: Optional[float] = None,
+                  timeout: Optional[float] = None, job_id: Optional[str] = None,
+                  on_progress: Optional[Callable[[FFmpegJob], None]] = None) -> FFmpegJob:
+        """执行一条FFmpeg命令（args不含ffmpeg本身），失败、超时或取消时抛出FFmpegError"""
+        job = FFmpegJob(job_id or uuid.uuid4().hex[:12], args, duration)
+        self.jobs[job.job_id] = job
+        timeout = timeout or self.default_timeout
+
+        try:
+            async with self._semaphore:
+                if job.status == FFmpegJobStatus.CANCELLED:
+                    raise FFmpegError(f"FFmpeg任务已取消: {job.job_id}")
+
+                job.status = FFmpegJobStatus.RUNNING
+                job.started_at = time.time()
+                job.process = await asyncio.create_subprocess_exec(
+                    "ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:1", *args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+
+                stderr_tail: List[str] = []
+                try:
+                    await asyncio.wait_for(
+                        asyncio.gather(
+                            self._read_progress(job, on_progress),
+                            self._read_stderr(job, stderr_tail),
+                            job.process.wait()
+                        ),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    job.status = FFmpegJobStatus.TIMEOUT
+                    await self._kill(job)
+                    raise FFmpegError(f"FFmpeg任务超时({timeout}s): {job.job_id}")
+                except asyncio.CancelledError:
+                    job.status = FFmpegJobStatus.CANCELLED
+                    await self._kill(job)
+                    raise
+
+                if job.status == FFmpegJobStatus.CANCELLED:
+                    raise FFmpegError(f"FFmpeg任务已取消: {job.job_id}")
+                if job.process.returncode != 0:
+                    job.status = FFmpegJobStatus.FAILED
+                    job.error = "\n".join(stderr_tail)
+                    raise FFmpegError(f"FFmpeg执行失败(code={job.process.returncode}): {job.error}")
+
+                job.status = FFmpegJobStatus.COMPLETED
+                job.progress = 100.0
+                if on_progress:
+                    on_progress(job)
+                return job
+        finally:
+            job.finished_at = time.time()
+            job.process = None
+            # 只保留最近的任务记录
+            if len(self.jobs) > 200:
+                for old_id in list(self.jobs)[:len(self.jobs) - 200]:
+                    if self.jobs[old_id].finished_at:
+                        self.jobs.pop(old_id, None)
+
+    async def _read_progress(self, job: FFmpegJob, on_progress: Optional[Callable[[FFmpegJob], None]]):
+        """解析-progress输出的key=value行"""
+        async for raw in job.process.stdout:
+            key, _, value = raw.decode(errors="ignore").strip().partition("=")
+            if key == "out_time_us" and job.duration and value.isdigit():
+                job.progress = min(99.0, int(value) / 1_000_000 / job.duration * 100)
+            elif key == "speed":
+                job.speed = value
+            elif key == "progress" and on_progress:
+                on_progress(job)
+
+    async def _read_stderr(self, job: FFmpegJob, tail: List[str]):
+        """持续读取stderr，避免管道写满阻塞FFmpeg"""
+        async for raw in job.process.stderr:
+            tail.append(raw.decode(errors="ignore").rstrip())
+            if len(tail) > _STDERR_TAIL_LINES:
+                tail.pop(0)
+
+    async def _kill(self, job: FFmpegJob):
+        process = job.process
+        if process is None or process.returncode is not None:
+            return
+        process.kill()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning(f"FFmpeg进程未能及时退出: {job.job_id}")
+
+    async def probe(self, path: str) -> Dict:
+        """使用ffprobe读取媒体流信息"""
+        process = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error", "-print_format", "json",
+            "-show_streams", "-show_format", path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise FFmpegError(f"ffprobe失败 {path}: {stderr.decode(errors='ignore')}")
+        return json.loads(stdout.decode() or "{}")
+
+    async def concat(self, inputs: List[str], output_path: str, audio_path: Optional[str] = None,
+                     timeout: Optional[float] = None, job_id: Optional[str] = None,
+                     on_progress: Optional[Callable[[FFmpegJob], None]] = None) -> str:
+        """顺序拼接多个媒体文件
+
+        所有输入编码参数一致时用concat demuxer直接复制流；否则用concat滤镜重新编码，
+        视频统一缩放到第一个输入的分辨率和帧率。audio_path不为空时在同一次调用中混入该音轨。
+        """
+        if not inputs:
+            raise ValueError("拼接输入不能为空")
+
+        probes = await asyncio.gather(*(self.probe(path) for path in inputs))
+        duration = sum(float(p.get("format", {}).get("duration") or 0) for p in probes) or None
+        has_video = all(_first_stream(p, "video") for p in probes)
+        can_copy = _streams_match(probes, "video", _VIDEO_COPY_KEYS) and \
+            _streams_match(probes, "audio", _AUDIO_COPY_KEYS)
+
+        async with self.job_dir("concat_") as work_dir:
+            if can_copy:
+                manifest_path = work_dir / "file_list.txt"
+                write_concat_manifest(manifest_path, inputs)
+                args = ["-f", "concat", "-safe", "0", "-i", str(manifest_path)]
+                if audio_path:
+                    args += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0",
+                             "-c:v", "copy", "-c:a", "aac", "-shortest"]
+                else:
+                    args += ["-c", "copy"]
+            else:
+                logger.info(f"输入编码参数不一致，重新编码拼接: {output_path}")
+                args = _build_concat_filter_args(inputs, probes, has_video, audio_path)
+
+            args += ["-y", output_path]
+            await self.run(args, duration=duration, timeout=timeout, job_id=job_id, on_progress=on_progress)
+
+        mode = "流复制" if can_copy else "重新编码"
+        logger.info(f"媒体拼接完成({mode}): {output_path}")
+        return output_path
+
+
+def _first_stream(probe: Dict, codec_type: str) -> Optional[Dict]:
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == codec_type:
+            return stream
+    return None
+
+
+def _streams_match(probes: List[Dict], codec_type: str, keys) -> bool:
+    """所有输入的某类流参数是否一致（都没有该类流也视为一致）"""
+    signatures = set()
+    for probe in probes:
+        stream = _first_stream(probe, codec_type)
+        signatures.add(tuple(stream.get(k) for k in keys) if stream else None)
+    return len(signatures) == 1
+
+
+def _build_concat_filter_args(inputs: List[str], probes: List[Dict], has_video: bool,
+                              audio_path: Optional[str]) -> List[str]:
+    """构造concat滤镜重新编码的参数"""
+    args: List[str] = []
+    for path in inputs:
+        args += ["-i", path]
+    n = len(inputs)
+    if audio_path:
+        # 输入选项必须位于输出选项之前，旁白音轨作为第n个输入
+        args += ["-i", audio_path]
+
+    with_audio = not audio_path and all(_first_stream(p, "audio") for p in probes)
+    filters: List[str] = []
+    labels = ""
+
+    if has_video:
+        first = _first_stream(probes[0], "video")
+        width, height = first.get("width"), first.get("height")
+        fps = first.get("r_frame_rate") or "30"
+        for i in range(n):
+            filters.append(
+                f"[{i}:v:0]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={fps},format=yuv420p[v{i}]"
+            )
+    for i in range(n):
+        labels += (f"[v{i}]" if has_video else "") + (f"[{i}:a:0]" if with_audio or not has_video else "")
+
+    out_audio = with_audio or not has_video
+    filters.append(f"{labels}concat=n={n}:v={1 if has_video else 0}:a={1 if out_audio else 0}"
+                   + ("[v]" if has_video else "") + ("[a]" if out_audio else ""))
+    args += ["-filter_complex", ";".join(filters)]
+
+    if has_video:
+        args += ["-map", "[v]", "-c:v", "libx264", "-preset", "veryfast", "-crf", "20"]
+    if out_audio:
+        args += ["-map", "[a]"]
+        if has_video:
+            args += ["-c:a", "aac"]
+    if audio_path:
+        args += ["-map", f"{n}:a:0", "-c:a", "aac", "-shortest"]
+    return args
+
+
+def write_concat_manifest(manifest_path: Path, media_paths: List[str]):
+    """写入FFmpeg concat demuxer文件列表
+
+    concat demuxer按文件列表所在目录解析相对路径，这里统一写入绝对路径，并转义单引号。
+    """
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        for path in media_paths:
+            escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+# 全局FFmpeg进程池实例
+_ffmpeg_pool: Optional[FFmpegProcessPool] = None
+
+
+def get_ffmpeg_pool(config: Optional[Dict] = None) -> FFmpegProcessPool:
+    """获取FFmpeg进程池实例，config为配置中的media段"""
+    global _ffmpeg_pool
+    if _ffmpeg_pool is None:
+        config = config or {}
+        _ffmpeg_pool = FFmpegProcessPool(
+            max_workers=config.get("ffmpeg_workers"),
+            default_timeout=config.get("ffmpeg_timeout", 600)
+        )
+    return _ffmpeg_pool
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+上传浏览器的启动配置 - 按平台读取config中social_upload.providers.<平台>的设置
+默认无头启动，并通过context.route拦截图片、字体、媒体和统计上报请求，减少每个上传占用的CPU和内存；
+反检测脚本（set_init_script）照常注入
+"""
+import contextlib
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+try:
+    from utils.base_social_media import set_init_script
+except ImportError:
+    try:
+        from services.base_social_media import set_init_script
+    except ImportError:
+        # Playwright未安装，不会创建上下文
+        set_init_script = None
+
+try:
+    from services.config_service import get_config_service
+    CONFIG_AVAILABLE = True
+except ImportError:
+    CONFIG_AVAILABLE = False
+
+# 上传流程不需要的资源类型
+DEFAULT_BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# 统计、埋点和性能监控域名（按域名后缀匹配），不包括平台的登录和风控接口
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "hm.baidu.com",
+    "mcs.snssdk.com",
+    "mcs.zijieapi.com",
+    "mon.zijieapi.com",
+    "aegis.qq.com",
+    "beacon.qq.com",
+    "h.trace.qq.com",
+    "apm-fe.xiaohongshu.com",
+    "t2.xiaohongshu.com",
+    "analytics.tiktok.com",
+)
+
+# 无头Chromium的默认UA带有HeadlessChrome标识，去掉该标识后作为上下文的UA（系统和版本与实际浏览器一致）
+HEADLESS_TOKEN = "HeadlessChrome"
+
+# 各浏览器版本的默认UA，按browser.version缓存
+_default_user_agents: Dict[str, str] = {}
+
+
+async def get_default_user_agent(browser) -> str:
+    """浏览器新建上下文时的默认UA"""
+    user_agent = _default_user_agents.get(browser.version)
+    if user_agent is None:
+        page = await browser.new_page()
+        try:
+            user_agent = await page.evaluate("navigator.userAgent")
+        finally:
+            await page.context.close()
+        _default_user_agents[browser.version] = user_agent
+    return user_agent
+
+
+class LaunchProfile:
+    """一个平台的上传浏览器配置
+
+    user_agent为上下文的UA，未设置时无头Chromium使用去掉HeadlessChrome标识的默认UA。
+    """
+
+    def __init__(self, headless: bool = True, block_resources: bool = True,
+                 blocked_resource_types: Iterable[str] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+                 blocked_domains: Iterable[str] = DEFAULT_BLOCKED_DOMAINS, user_agent: Optional[str] = None):
+        self.headless = headless
+        self.user_agent = user_agent
+        self.block_resources = block_resources
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.blocked_domains = tuple(domain.lower().lstrip(".") for domain in blocked_domains)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "LaunchProfile":
+        config = config or {}
+        return cls(
+            headless=config.get("headless", True),
+            block_resources=config.get("block_resources", True),
+            blocked_resource_types=config.get("blocked_resource_types", DEFAULT_BLOCKED_RESOURCE_TYPES),
+            blocked_domains=config.get("blocked_domains", DEFAULT_BLOCKED_DOMAINS),
+            user_agent=config.get("user_agent"),
+        )
+
+    def launch_options(self, executable_path: Optional[str] = None, **options) -> Dict[str, Any]:
+        """browser_type.launch的参数，options中的设置优先"""
+        launch_options = {"headless": self.headless}
+        if executable_path:
+            launch_options["executable_path"] = executable_path
+        launch_options.update(options)
+        return launch_options
+
+    async def context_options(self, browser, **options) -> Dict[str, Any]:
+        """browser.new_context的参数，options中的设置优先；无头Chromium的默认UA去掉HeadlessChrome标识"""
+        if "user_agent" in options:
+            return options
+        if self.user_agent:
+            options["user_agent"] = self.user_agent
+        elif self.headless and browser.browser_type.name == "chromium":
+            user_agent = await get_default_user_agent(browser)
+            if HEADLESS_TOKEN in user_agent:
+                options["user_agent"] = user_agent.replace(HEADLESS_TOKEN, "Chrome")
+        return options
+
+    def is_blocked(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.blocked_resource_types:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == domain or host.endswith("." + domain) for domain in self.blocked_domains)
+
+    async def _route(self, route):
+        request = route.request
+        if self.is_blocked(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def route_context(self, context):
+        """在上下文上拦截不需要的请求"""
+        if self.block_resources:
+            await context.route("**/*", self._route)
+        return context
+
+    async def new_context(self, browser, init_script: bool = True, **options):
+        """按配置新建上下文：注入反检测脚本并拦截不需要的请求"""
+        context = await browser.new_context(**await self.context_options(browser, **options))
+        if init_script:
+            context = await set_init_script(context)
+        return await self.route_context(context)
+
+    @contextlib.asynccontextmanager
+    async def open_context(self, playwright, browser=None, executable_path: Optional[str] = None,
+                           browser_type: str = "chromium", init_script: bool = True,
+                           launch_options: Optional[Dict[str, Any]] = None, **options) -> AsyncIterator[Any]:
+        """上传使用的上下文，退出时关闭（无论上传是否成功）
+
+        browser为上传运行时的共享浏览器，只在其上新建上下文；为空时按配置启动浏览器，退出时一并关闭。
+        """
+        owned = browser is None
+        if owned:
+            browser = await getattr(playwright, browser_type).launch(
+                **self.launch_options(executable_path, **(launch_options or {})))
+        try:
+            context = await self.new_context(browser, init_script, **options)
+            try:
+                yield context
+            finally:
+                await context.close()
+        finally:
+            if owned:
+                await browser.close()
+
+
+_launch_profiles: Dict[str, LaunchProfile] = {}
+
+
+def get_upload_config(platform: str) -> Dict[str, Any]:
+    """平台的上传配置（config中social_upload.providers.<平台>），没有配置时返回空字典"""
+    if not CONFIG_AVAILABLE:
+        return {}
+    try:
+        return get_config_service().get(f"social_upload.providers.{platform}") or {}
+    except FileNotFoundError:
+        return {}
+
+
+def get_launch_profile(platform: str) -> LaunchProfile:
+    """获取平台的上传浏览器配置，平台名与config中social_upload.providers的键一致"""
+    profile = _launch_profiles.get(platform)
+    if profile is None:
+        profile = _launch_profiles[platform] = LaunchProfile.from_config(get_upload_config(platform))
+    return profile
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+平台上传注册表 - 所有平台实现同一个异步上传协议：prepare（预检） → authenticate（账号检查） → upload → finalize
+每个平台声明同时上传的任务数上限，发布调度、浏览器槽位和发布引擎按统一的方式处理所有平台；
+各平台的上传实现（uploader.*）在首次创建上传对象时才导入，未安装的平台不影响其他平台
+"""
+import importlib
+import threading
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Protocol, Sequence, Type, Union, runtime_checkable
+
+from .launch_profile import get_launch_profile, get_upload_config
+from .preflight import get_upload_preflight
+from .publish_engine import PublishJob
+from .publish_scheduler import PublishSlot, get_publish_governor
+from .upload_runtime import get_upload_runtime
+
+
+class UploadTask:
+    """一个(视频, 账号)上传的参数
+
+    file、account_file为完整路径，slot为发布调度安排的发布时间；job为对应的发布任务，由create_job填写；
+    credentials为authenticate读取的账号凭据（需要时），app为平台的上传对象，在发布任务的预检中创建。
+    """
+
+    def __init__(self, title: str, file: Path, tags: Optional[List[str]], account_file: Path,
+                 slot: Optional[PublishSlot] = None, category: Any = None, thumbnail: Optional[str] = None,
+                 description: Optional[str] = None):
+        self.title = title
+        self.file = Path(file)
+        self.tags = tags or []
+        self.account_file = Path(account_file)
+        self.slot = slot or PublishSlot()
+        self.category = category
+        self.thumbnail = thumbnail
+        self.description = description
+        self.credentials: Any = None
+        self.app: Any = None
+        self.job: Optional[PublishJob] = None
+
+
+@runtime_checkable
+class PlatformUploader(Protocol):
+    """平台上传协议
+
+    platform为平台标识，type_id为前端使用的平台类型（1 小红书 2 视频号 3 抖音 4 快手 5 B站），
+    max_concurrency为该平台同时上传的任务数上限。四个阶段都在上传运行时的事件循环中执行，
+    authenticate和prepare在占用账号锁和浏览器槽位之前执行。
+    """
+
+    platform: str
+    name: str
+    type_id: Optional[int]
+    max_concurrency: int
+
+    async def prepare(self, task: UploadTask) -> None:
+        """上传前的准备（预检、转码），不占用账号锁和浏览器槽位"""
+
+    async def authenticate(self, task: UploadTask) -> None:
+        """检查账号，不可用时抛出异常"""
+
+    async def upload(self, task: UploadTask) -> Any:
+        """执行上传，返回False表示失败"""
+
+    async def finalize(self, task: UploadTask, success: bool, error: Optional[str]) -> None:
+        """上传结束后的处理，无论成功与否都会调用"""
+
+
+class BasePlatformUploader:
+    """平台上传的默认实现：包装social-auto-upload风格的上传类
+
+    uploader_class为"模块:类"，首次创建上传对象时导入；上传类的构造参数为
+    (title, file_path, tags, publish_date, account_file, *extra_args)，有其他参数的平台覆盖create_app。
+    max_concurrency可在config的social_upload.providers.<平台>.max_concurrency中覆盖。
+    """
+
+    platform = ""
+    name = ""
+    type_id: Optional[int] = None
+    description = ""
+    max_concurrency = 1
+    uploader_class = ""
+    # 扫码登录生成cookie的函数，"模块:函数"，参数为(账号id, 状态队列)；为空时不支持扫码登录
+    cookie_generator = ""
+    # 上传对象中保存视频路径的属性，预检通过后替换为预检结果
+    file_attr = "file_path"
+    # 上传对象使用的浏览器，上传运行时按(浏览器类型, 启动参数)共享
+    browser_type = "chromium"
+
+    def __init__(self):
+        config = get_upload_config(self.platform)
+        self.max_concurrency = max(1, int(config.get("max_concurrency", self.max_concurrency)))
+        self.preflight_enabled = config.get("preflight", True) is not False
+
+    @staticmethod
+    def load(target: str) -> Any:
+        """按"模块:属性"导入"""
+        module, _, attr = target.partition(":")
+        return getattr(importlib.import_module(module), attr)
+
+    def extra_args(self, task: UploadTask) -> tuple:
+        return ()
+
+    async def login(self, account_id: str, status_queue) -> Any:
+        """扫码登录并保存cookie，登录进度写入status_queue"""
+        if not self.cookie_generator:
+            raise NotImplementedError(f"{self.name}暂不支持扫码登录")
+        return await self.load(self.cookie_generator)(account_id, status_queue)
+
+    def create_app(self, task: UploadTask) -> Any:
+        """创建平台的上传对象"""
+        uploader_class = self.load(self.uploader_class)
+        return uploader_class(task.title, str(task.file), task.tags, task.slot.publish_date, task.account_file,
+                              *self.extra_args(task))
+
+    async def prepare(self, task: UploadTask) -> None:
+        source = getattr(task.app, self.file_attr)
+        prepared = await get_upload_preflight().prepare(source, self.platform)
+        setattr(task.app, self.file_attr, prepared if isinstance(source, Path) else str(prepared))
+
+    async def authenticate(self, task: UploadTask) -> None:
+        # 只检查cookie文件，登录态是否过期由上传过程自身判断，避免每次上传多启动一次浏览器
+        if not task.account_file.is_file():
+            raise FileNotFoundError(f"账号cookie文件不存在: {task.account_file.name}")
+
+    def launch_options(self, task: UploadTask) -> Dict[str, Any]:
+        """共享浏览器的启动参数，与上传对象自行启动浏览器时一致"""
+        return get_launch_profile(self.platform).launch_options(getattr(task.app, "local_executable_path", None))
+
+    async def upload(self, task: UploadTask) -> Any:
+        return await get_upload_runtime().run_uploader(task.app, self.launch_options(task), self.browser_type)
+
+    async def finalize(self, task: UploadTask, success: bool, error: Optional[str]) -> None:
+        pass
+
+    async def check(self, task: UploadTask) -> None:
+        """依次执行authenticate、create_app、prepare，作为发布任务的预检
+
+        账号不可用、平台模块导入失败或视频不满足要求时任务在此失败，由发布引擎释放预约，不打开浏览器。
+        """
+        try:
+            await self.authenticate(task)
+            task.app = self.create_app(task)
+            if self.preflight_enabled:
+                await self.prepare(task)
+        except Exception as e:
+            await self.finalize(task, False, str(e))
+            raise
+
+    async def run(self, task: UploadTask) -> Any:
+        """执行upload、finalize，作为发布任务的run"""
+        success, error = False, None
+        try:
+            result = await self.upload(task)
+            success = result is not False
+            if not success:
+                error = "上传失败"
+            return result
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            await self.finalize(task, success, error)
+
+    def create_job(self, task: UploadTask) -> PublishJob:
+        """为上传参数创建发布任务，账号锁、发布预算、平台并发上限和浏览器槽位由发布引擎统一处理"""
+        # 上传对象在预检中创建，构建任务时不读取cookie、不导入平台模块
+        task.job = PublishJob(task.account_file.name, task.file.name, partial(self.run, task),
+                              partial(self.check, task), platform=self.platform,
+                              reservation=task.slot.reservation, concurrency=self.max_concurrency)
+        return task.job
+
+    def build_jobs(self, title: str, files: Sequence[Path], tags: Optional[List[str]],
+                   account_files: Sequence[Path], category: Any = None, enable_timer: bool = False,
+                   videos_per_day: int = 1, daily_times: Optional[List[Union[int, str]]] = None,
+                   start_days: int = 0) -> List[PublishJob]:
+        """为每个(视频, 账号)创建发布任务，files和account_files为完整路径；定时发布的时间由发布调度安排"""
+        files = [Path(file) for file in files]
+        account_files = [Path(account_file) for account_file in account_files]
+        slots = get_publish_governor().plan(self.platform, [account.name for account in account_files], len(files),
+                                            enable_timer, videos_per_day or 1, daily_times, start_days or 0,
+                                            [file.name for file in files])
+        print(f"📋 {self.name}发布任务: {len(files)} 个视频 × {len(account_files)} 个账号，标题: {title}，"
+              f"Hashtag: {tags}")
+        jobs = []
+        try:
+            for index, file in enumerate(files):
+                for account_file in account_files:
+                    task = UploadTask(title, file, tags, account_file, slots[account_file.name][index], category)
+                    jobs.append(self.create_job(task))
+        except Exception as e:
+            # 任务没有提交，释放已写入台账的预约，避免占用当天配额
+            governor = get_publish_governor()
+            for account_slots in slots.values():
+                for slot in account_slots:
+                    governor.release(slot.reservation, f"创建发布任务失败: {e}")
+            raise
+        return jobs
+
+
+class XiaohongshuUploader(BasePlatformUploader):
+    platform = "xiaohongshu"
+    name = "小红书"
+    type_id = 1
+    description = "生活方式分享平台"
+    max_concurrency = 2
+    uploader_class = "uploader.xiaohongshu_uploader.main:XiaoHongShuVideo"
+    cookie_generator = "services.myUtils.login:xiaohongshu_cookie_gen"
+
+    def extra_args(self, task: UploadTask) -> tuple:
+        return (task.thumbnail,)
+
+
+class TencentUploader(BasePlatformUploader):
+    platform = "wechat"
+    name = "视频号"
+    type_id = 2
+    description = "微信生态短视频平台"
+    max_concurrency = 1
+    uploader_class = "uploader.tencent_uploader.main:TencentVideo"
+    cookie_generator = "services.myUtils.login:get_tencent_cookie"
+
+    def extra_args(self, task: UploadTask) -> tuple:
+        category = task.category
+        if category is None:
+            category = self.load("utils.constant:TencentZoneTypes").LIFESTYLE.value
+        return (category,)
+
+
+class DouyinUploader(BasePlatformUploader):
+    platform = "douyin"
+    name = "抖音"
+    type_id = 3
+    description = "短视频平台，适合娱乐内容"
+    max_concurrency = 2
+    uploader_class = "uploader.douyin_uploader.main:DouYinVideo"
+    cookie_generator = "services.myUtils.login:douyin_cookie_gen"
+
+    def create_app(self, task: UploadTask) -> Any:
+        uploader_class = self.load(self.uploader_class)
+        # 直传模式的分片进度实时写入发布任务
+        return uploader_class(task.title, str(task.file), task.tags, task.slot.publish_date, task.account_file,
+                              task.thumbnail, progress_callback=task.job.report_progress)
+
+
+class KuaishouUploader(BasePlatformUploader):
+    platform = "kuaishou"
+    name = "快手"
+    type_id = 4
+    description = "短视频平台，适合生活记录"
+    max_concurrency = 2
+    uploader_class = "uploader.ks_uploader.main:KSVideo"
+    cookie_generator = "services.myUtils.login:get_ks_cookie"
+
+
+# B站默认分区：生活 > 日常
+BILIBILI_DEFAULT_TID = 21
+
+
+class BilibiliUploader(BasePlatformUploader):
+    """B站走HTTP分片上传，不打开浏览器"""
+
+    platform = "bilibili"
+    name = "B站"
+    type_id = 5
+    description = "弹幕视频网站，适合年轻用户"
+    max_concurrency = 3
+    uploader_class = "uploader.bilibili_uploader.main:BilibiliUploader"
+    file_attr = "file"
+
+    async def authenticate(self, task: UploadTask) -> None:
+        await super().authenticate(task)
+        module = "uploader.bilibili_uploader.main"
+        read_cookie_json_file = self.load(f"{module}:read_cookie_json_file")
+        extract_keys_from_json = self.load(f"{module}:extract_keys_from_json")
+        try:
+            cookie_data = extract_keys_from_json(read_cookie_json_file(task.account_file))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"B站cookie文件格式错误，请重新登录: {e}")
+        if not {"SESSDATA", "bili_jct"} <= set(cookie_data):
+            raise ValueError("B站cookie缺少SESSDATA或bili_jct，请重新登录")
+        task.credentials = cookie_data
+
+    def create_app(self, task: UploadTask) -> Any:
+        publish_at = task.slot.publish_at
+        dtime = int(publish_at.timestamp()) if publish_at else 0
+        uploader_class = self.load(self.uploader_class)
+        # 分片上传的进度实时写入发布任务
+        return uploader_class(task.credentials, task.file, task.title, task.description or task.title,
+                              task.category or BILIBILI_DEFAULT_TID, task.tags, dtime,
+                              progress_callback=task.job.report_progress)
+
+    async def upload(self, task: UploadTask) -> Any:
+        return await task.app.upload_async()
+
+
+class TiktokUploader(BasePlatformUploader):
+    platform = "tiktok"
+    name = "TikTok"
+    description = "海外短视频平台"
+    max_concurrency = 1
+    uploader_class = "uploader.tk_uploader.main:TiktokVideo"
+    browser_type = "firefox"
+
+    def launch_options(self, task: UploadTask) -> Dict[str, Any]:
+        return get_launch_profile(self.platform).launch_options()
+
+
+class BaijiahaoUploader(BasePlatformUploader):
+    platform = "baijiahao"
+    name = "百家号"
+    description = "百度内容创作平台"
+    max_concurrency = 1
+    uploader_class = "uploader.baijiahao_uploader.main:BaiJiaHaoVideo"
+
+    def launch_options(self, task: UploadTask) -> Dict[str, Any]:
+        return get_launch_profile(self.platform).launch_options(task.app.local_executable_path,
+                                                                proxy=task.app.proxy_setting)
+
+
+# 平台注册表，按前端平台类型排序
+PLATFORM_UPLOADERS: Dict[str, Type[BasePlatformUploader]] = {
+    uploader.platform: uploader for uploader in (
+        XiaohongshuUploader, TencentUploader, DouyinUploader, KuaishouUploader, BilibiliUploader,
+        TiktokUploader, BaijiahaoUploader,
+    )
+}
+
+_platform_uploaders: Dict[str, BasePlatformUploader] = {}
+_platform_uploaders_lock = threading.Lock()
+
+
+def get_platform_class(platform: Union[str, int]) -> Type[BasePlatformUploader]:
+    """按平台标识、平台类型或中文名称查找平台，不支持时抛出ValueError"""
+    if isinstance(platform, str) and platform.isdigit():
+        platform = int(platform)
+    for uploader in PLATFORM_UPLOADERS.values():
+        if platform in (uploader.platform, uploader.name) or (uploader.type_id is not None
+                                                             and platform == uploader.type_id):
+            return uploader
+    raise ValueError(f"不支持的平台: {platform}")
+
+
+def get_platform_uploader(platform: Union[str, int]) -> BasePlatformUploader:
+    """获取平台上传实现（每个平台一个实例）"""
+    uploader_class = get_platform_class(platform)
+    with _platform_uploaders_lock:
+        uploader = _platform_uploaders.get(uploader_class.platform)
+        if uploader is None:
+            uploader = _platform_uploaders[uploader_class.platform] = uploader_class()
+        return uploader
+
+
+def list_platform_uploaders() -> List[BasePlatformUploader]:
+    return [get_platform_uploader(platform) for platform in PLATFORM_UPLOADERS]
+
+
+def get_platform_name(platform: Union[str, int], default: str = "未知平台") -> str:
+    try:
+        return get_platform_class(platform).name
+    except ValueError:
+        return default
+
+
+async def publish_video(platform: Union[str, int], title: str, file: Path, tags: Optional[List[str]],
+                        account_file: Path, publish_at=None, on_progress: Optional[Callable[[float], Any]] = None,
+                        **kwargs) -> Dict[str, Any]:
+    """发布单个视频到单个账号，在上传运行时中执行并返回发布结果
+
+    on_progress在上传过程中以进度（0~100）调用，kwargs为UploadTask的其他参数。
+    """
+    uploader = get_platform_uploader(platform)
+    task = UploadTask(title, file, tags, account_file, PublishSlot(publish_at), **kwargs)
+    job = uploader.create_job(task)
+    job.on_progress = on_progress
+    return (await get_upload_runtime().publish([job]))[0]
+
+
+def track_progress(jobs: List[PublishJob], record: Dict[str, Any]):
+    """把一批发布任务的上传进度（各任务进度的平均值）实时写入任务记录的progress/updated_at
+
+    没有进度上报的任务按0计算，整批任务都没有上报时progress保持不变。
+    """
+    def on_progress(_progress: float):
+        record["progress"] = round(sum(job.progress or 0 for job in jobs) / len(jobs), 1)
+        record["updated_at"] = datetime.now()
+
+    for job in jobs:
+        job.on_progress = on_progress
@@ -1,90 +1,45 @@
-import asyncio
+from functools import partial
 from pathlib import Path
 
 from conf import BASE_DIR
-from uploader.douyin_uploader.main import DouYinVideo
-from uploader.ks_uploader.main import KSVideo
-from uploader.tencent_uploader.main import TencentVideo
-from uploader.xiaohongshu_uploader.main import XiaoHongShuVideo
-from utils.constant import TencentZoneTypes
-from utils.files_times import generate_schedule_time_next_day
+from services.myUtils.platforms import PLATFORM_UPLOADERS, get_platform_uploader
+from services.myUtils.upload_runtime import get_upload_runtime
 
 
-def post_video_tencent(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0):
+def build_jobs(platform,title,files,tags,account_file,category=None,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0):
     # 生成文件的完整路径
     account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
     files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times,start_days)
-    else:
-        publish_datetimes = [0 for i in range(len(files))]
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            print(f"文件路径{str(file)}")
-            # 打印视频文件名、标题和 hashtag
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            app = TencentVideo(title, str(file), tags, publish_datetimes[index], cookie, category)
-            asyncio.run(app.main(), debug=False)
+    # 平台上传实现从注册表获取，发布时间由发布调度安排（定时发布会预约配额）
+    return get_platform_uploader(platform).build_jobs(title, files, tags, account_file, category, enableTimer,
+                                                      videos_per_day, daily_times, start_days)
 
 
-def post_video_DouYin(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0):
-    # 生成文件的完整路径
-    account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
-    files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times,start_days)
-    else:
-        publish_datetimes = [0 for i in range(len(files))]
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            print(f"文件路径{str(file)}")
-            # 打印视频文件名、标题和 hashtag
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            app = DouYinVideo(title, str(file), tags, publish_datetimes[index], cookie, category)
-            asyncio.run(app.main(), debug=False)
+def post_video(platform, *args, **kwargs):
+    # 发布任务在上传运行时中执行：不同账号并发上传，同一账号依次上传
+    return get_upload_runtime().publish_sync(build_jobs(platform, *args, **kwargs))
 
 
-def post_video_ks(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0):
-    # 生成文件的完整路径
-    account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
-    files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times,start_days)
-    else:
-        publish_datetimes = [0 for i in range(len(files))]
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            print(f"文件路径{str(file)}")
-            # 打印视频文件名、标题和 hashtag
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            app = KSVideo(title, str(file), tags, publish_datetimes[index], cookie)
-            asyncio.run(app.main(), debug=False)
+build_jobs_tencent = partial(build_jobs, "wechat")
+build_jobs_douyin = partial(build_jobs, "douyin")
+build_jobs_ks = partial(build_jobs, "kuaishou")
+build_jobs_xhs = partial(build_jobs, "xiaohongshu")
+build_jobs_bilibili = partial(build_jobs, "bilibili")
 
-def post_video_xhs(title,files,tags,account_file,category=TencentZoneTypes.LIFESTYLE.value,enableTimer=False,videos_per_day = 1, daily_times=None,start_days = 0):
-    # 生成文件的完整路径
-    account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
-    files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    file_num = len(files)
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(file_num, videos_per_day, daily_times,start_days)
-    else:
-        publish_datetimes = 0
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            # 打印视频文件名、标题和 hashtag
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            app = XiaoHongShuVideo(title, file, tags, publish_datetimes, cookie)
-            asyncio.run(app.main(), debug=False)
+post_video_tencent = partial(post_video, "wechat")
+post_video_DouYin = partial(post_video, "douyin")
+post_video_ks = partial(post_video, "kuaishou")
+post_video_xhs = partial(post_video, "xiaohongshu")
+post_video_bilibili = partial(post_video, "bilibili")
+
+
+# 平台类型（1 小红书 2 视频号 3 抖音 4 快手 5 B站）对应的任务构建函数，供异步调用方直接提交到运行时
+PUBLISH_JOB_BUILDERS = {
+    uploader.type_id: partial(build_jobs, platform)
+    for platform, uploader in PLATFORM_UPLOADERS.items() if uploader.type_id is not None
+}
 
 
 
 # post_video("333",["demo.mp4"],"d","d")
-# post_video_DouYin("333",["demo.mp4"],"d","d")
\ No newline at end of file
+# post_video_DouYin("333",["demo.mp4"],"d","d")
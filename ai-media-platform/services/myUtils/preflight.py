@@ -0,0 +1,400 @@
+# -*- coding: utf-8 -*-
+"""
+上传预检 - 打开浏览器前用ffprobe检查视频是否满足平台限制（时长、大小、分辨率、编码、宽高比）
+不满足且无法修正的视频直接失败；编码或分辨率不符合时转码，仅封装格式不符合时只重新封装；
+转码结果按文件内容哈希缓存，同一视频发布到多个账号或平台只处理一次；缓存按最近使用时间和总大小淘汰
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .launch_profile import get_upload_config
+
+try:
+    from services.media.ffmpeg_pool import FFmpegError, FFmpegProcessPool
+    MEDIA_AVAILABLE = True
+except ImportError:
+    MEDIA_AVAILABLE = False
+
+DEFAULT_CACHE_DIR = Path("./cache/upload_preflight")
+
+# 预检转码同时运行的FFmpeg进程数
+DEFAULT_WORKERS = 2
+
+GB = 1024 ** 3
+
+# 转码结果和索引记录超过该时间（秒）没有使用时淘汰
+DEFAULT_CACHE_TTL = 7 * 24 * 3600
+# 转码结果的总大小上限，超过时从最久未使用的开始淘汰
+DEFAULT_CACHE_MAX_SIZE = 20 * GB
+# 最近该时间（秒）内使用过的转码结果不因总大小淘汰，避免删除等待上传的文件
+EVICT_GRACE = 6 * 3600
+
+# 各平台网页端上传的限制，可在config的social_upload.providers.<平台>.constraints中按项覆盖；
+# resolution为(长边, 短边)上限，aspect_ratio为宽/高的范围
+BASE_CONSTRAINTS: Dict[str, Any] = {
+    "extensions": [".mp4", ".mov"],
+    "video_codecs": ["h264", "hevc"],
+    "audio_codecs": ["aac", "mp3"],
+    "pix_fmts": ["yuv420p", "yuvj420p"],
+    "min_duration": 1,
+    "max_duration": 3600,
+    "max_size": 4 * GB,
+    "resolution": [3840, 2160],
+    "min_short_side": 360,
+    "max_fps": 60,
+    "aspect_ratio": [1 / 3, 3],
+}
+
+PLATFORM_CONSTRAINTS: Dict[str, Dict[str, Any]] = {
+    "douyin": {"max_duration": 3600, "max_size": 16 * GB},
+    "kuaishou": {"max_duration": 900, "max_size": 4 * GB},
+    "wechat": {"min_duration": 3, "max_duration": 8 * 3600, "max_size": 20 * GB, "audio_codecs": ["aac"]},
+    "xiaohongshu": {"max_duration": 3600, "max_size": 20 * GB, "aspect_ratio": [9 / 16, 16 / 9]},
+    "tiktok": {"min_duration": 3, "max_duration": 3600, "max_size": 10 * GB, "resolution": [4096, 2160],
+               "aspect_ratio": [9 / 16, 16 / 9]},
+    "bilibili": {"extensions": [".mp4", ".mov", ".flv", ".mkv"], "max_duration": 10 * 3600, "max_size": 16 * GB,
+                 "resolution": [7680, 4320], "max_fps": 120},
+}
+
+# 转码参数，与FFmpeg进程池的重新编码设置一致
+VIDEO_ENCODE_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p"]
+AUDIO_ENCODE_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+
+# 预检结果
+ACTION_OK = "ok"
+ACTION_REMUX = "remux"
+ACTION_TRANSCODE = "transcode"
+ACTION_REJECT = "reject"
+
+
+class PreflightError(Exception):
+    """视频不满足平台限制且无法通过转码修正"""
+
+
+def get_constraints(platform: str) -> Dict[str, Any]:
+    """平台的上传限制：通用限制 < 平台默认 < 配置覆盖"""
+    constraints = dict(BASE_CONSTRAINTS)
+    constraints.update(PLATFORM_CONSTRAINTS.get(platform, {}))
+    constraints.update(get_upload_config(platform).get("constraints") or {})
+    return constraints
+
+
+def _first_stream(probe: Dict, codec_type: str) -> Optional[Dict]:
+    for stream in probe.get("streams", []):
+        if stream.get("codec_type") == codec_type:
+            return stream
+    return None
+
+
+def _display_size(video: Dict) -> Tuple[int, int]:
+    """显示尺寸：竖拍视频常以横向尺寸加旋转信息存储"""
+    width, height = int(video.get("width") or 0), int(video.get("height") or 0)
+    rotation = video.get("tags", {}).get("rotate")
+    for side_data in video.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    try:
+        if abs(int(float(rotation or 0))) % 180 == 90:
+            width, height = height, width
+    except ValueError:
+        pass
+    return width, height
+
+
+def _frame_rate(video: Dict) -> float:
+    num, _, den = str(video.get("avg_frame_rate") or video.get("r_frame_rate") or "0/1").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2)
+
+
+def plan(probe: Dict, file: Path, constraints: Dict[str, Any]) -> Dict[str, Any]:
+    """根据ffprobe结果决定如何处理视频
+
+    返回{"action", "reasons", "video_filters", "copy_video", "copy_audio"}；
+    时长超限、没有视频流这类无法修正的问题返回reject。
+    """
+    reasons: List[str] = []
+    video = _first_stream(probe, "video")
+    audio = _first_stream(probe, "audio")
+    if video is None:
+        return {"action": ACTION_REJECT, "reasons": ["没有视频流"]}
+
+    duration = float(probe.get("format", {}).get("duration") or video.get("duration") or 0)
+    if duration < constraints["min_duration"]:
+        return {"action": ACTION_REJECT, "reasons": [f"时长{duration:.1f}s短于{constraints['min_duration']}s"]}
+    if duration > constraints["max_duration"]:
+        return {"action": ACTION_REJECT, "reasons": [f"时长{duration:.0f}s超过{constraints['max_duration']}s"]}
+
+    filters: List[str] = []
+    width, height = _display_size(video)
+    if not width or not height:
+        return {"action": ACTION_REJECT, "reasons": ["无法读取视频分辨率"]}
+
+    # 分辨率：超过上限时缩小，短边不足时放大
+    max_long, max_short = constraints["resolution"]
+    long_side, short_side = max(width, height), min(width, height)
+    scale = min(1.0, max_long / long_side, max_short / short_side)
+    if short_side * scale < constraints["min_short_side"]:
+        scale = constraints["min_short_side"] / short_side
+    new_width, new_height = width, height
+    if scale != 1.0:
+        new_width, new_height = _even(width * scale), _even(height * scale)
+        reasons.append(f"分辨率{width}x{height}调整为{new_width}x{new_height}")
+        filters.append(f"scale={new_width}:{new_height}")
+
+    # 宽高比超出范围时加黑边
+    min_ratio, max_ratio = constraints["aspect_ratio"]
+    ratio = new_width / new_height
+    if ratio < min_ratio or ratio > max_ratio:
+        pad_width = _even(math.ceil(new_height * min_ratio)) if ratio < min_ratio else new_width
+        pad_height = _even(math.ceil(new_width / max_ratio)) if ratio > max_ratio else new_height
+        reasons.append(f"宽高比{ratio:.2f}超出范围，填充为{pad_width}x{pad_height}")
+        filters.append(f"pad={pad_width}:{pad_height}:(ow-iw)/2:(oh-ih)/2")
+
+    fps = _frame_rate(video)
+    if fps > constraints["max_fps"]:
+        reasons.append(f"帧率{fps:.0f}超过{constraints['max_fps']}")
+        filters.append(f"fps={constraints['max_fps']}")
+
+    copy_video = not filters
+    if video.get("codec_name") not in constraints["video_codecs"]:
+        reasons.append(f"视频编码{video.get('codec_name')}不支持")
+        copy_video = False
+    elif video.get("pix_fmt") not in constraints["pix_fmts"]:
+        reasons.append(f"像素格式{video.get('pix_fmt')}不支持")
+        copy_video = False
+
+    copy_audio = audio is None or audio.get("codec_name") in constraints["audio_codecs"]
+    if not copy_audio:
+        reasons.append(f"音频编码{audio.get('codec_name')}不支持")
+
+    if not copy_video or not copy_audio:
+        action = ACTION_TRANSCODE
+    elif file.suffix.lower() not in constraints["extensions"]:
+        reasons.append(f"封装格式{file.suffix}不支持")
+        action = ACTION_REMUX
+    else:
+        action = ACTION_OK
+    return {"action": action, "reasons": reasons, "video_filters": filters,
+            "copy_video": copy_video, "copy_audio": copy_audio, "duration": duration}
+
+
+def build_args(source: Path, output: Path, decision: Dict[str, Any]) -> List[str]:
+    """构造转码/重新封装的FFmpeg参数，不需要处理的流直接复制"""
+    args = ["-i", str(source), "-map", "0:v:0", "-map", "0:a:0?"]
+    if decision["copy_video"]:
+        args += ["-c:v", "copy"]
+    else:
+        if decision["video_filters"]:
+            args += ["-vf", ",".join(decision["video_filters"])]
+        args += VIDEO_ENCODE_ARGS
+    args += ["-c:a", "copy"] if decision["copy_audio"] else AUDIO_ENCODE_ARGS
+    args += ["-movflags", "+faststart", "-y", str(output)]
+    return args
+
+
+class UploadPreflight:
+    """上传预检
+
+    prepare返回可以上传的文件路径（原文件或缓存中的转码结果），无法修正时抛出PreflightError。
+    同一文件的同一限制并发预检时只处理一次；拒绝结果按文件路径、大小和修改时间缓存。
+    超过cache_ttl（秒）没有使用的转码结果和索引记录被淘汰，转码结果总大小超过cache_max_size时淘汰最久未使用的。
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, cache_dir: Path = DEFAULT_CACHE_DIR,
+                 cache_ttl: float = DEFAULT_CACHE_TTL, cache_max_size: int = DEFAULT_CACHE_MAX_SIZE):
+        # 上传对象按绝对路径读取转码结果
+        self.cache_dir = Path(cache_dir).resolve()
+        self.index_path = self.cache_dir / "index.json"
+        self.cache_ttl = cache_ttl
+        self.cache_max_size = cache_max_size
+        self.pool = FFmpegProcessPool(max_workers=workers, temp_root=self.cache_dir / "tmp") \
+            if MEDIA_AVAILABLE else None
+        self._index = self._load_index()
+        # 同一预检的锁和等待数，预检全部结束后删除
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        if self.pool is not None:
+            self._evict()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+        index.setdefault("files", {})
+        index.setdefault("outputs", {})
+        return index
+
+    def _save_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        tmp_path.replace(self.index_path)
+
+    def _evict(self):
+        """淘汰过期的索引记录和转码结果，转码结果总大小超过上限时从最久未使用的开始删除"""
+        now = time.time()
+        files = self._index["files"]
+        for identity in [k for k, record in files.items() if now - record.get("used_at", 0) > self.cache_ttl]:
+            del files[identity]
+
+        outputs = self._index["outputs"]
+        used_at = {name: record.get("used_at", record.get("created_at", 0)) for name, record in outputs.items()}
+        for name in list(outputs):
+            output = self.cache_dir / name
+            if not output.exists():
+                del outputs[name]
+            elif now - used_at[name] > self.cache_ttl:
+                output.unlink(missing_ok=True)
+                del outputs[name]
+
+        sizes = {name: (self.cache_dir / name).stat().st_size for name in outputs}
+        total = sum(sizes.values())
+        for name in sorted(outputs, key=used_at.get):
+            if total <= self.cache_max_size or now - used_at[name] < EVICT_GRACE:
+                break
+            (self.cache_dir / name).unlink(missing_ok=True)
+            total -= sizes[name]
+            del outputs[name]
+        self._save_index()
+
+    @staticmethod
+    def _signature(constraints: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(constraints, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    async def _content_hash(self, file: Path, identity: str) -> str:
+        """文件内容的sha256，按路径、大小和修改时间缓存"""
+        record = self._index["files"].get(identity, {})
+        if record.get("sha256"):
+            return record["sha256"]
+
+        def digest() -> str:
+            sha256 = hashlib.sha256()
+            with open(file, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    sha256.update(block)
+            return sha256.hexdigest()
+
+        content_hash = await asyncio.to_thread(digest)
+        record["sha256"] = content_hash
+        record["used_at"] = time.time()
+        self._index["files"][identity] = record
+        return content_hash
+
+    async def prepare(self, file_path, platform: str) -> Path:
+        """检查视频是否满足平台限制，返回实际上传的文件"""
+        file = Path(file_path)
+        if self.pool is None:
+            return file
+        stat = file.stat()
+        constraints = get_constraints(platform)
+        identity = f"{file.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        signature = self._signature(constraints)
+        key = f"{identity}|{signature}"
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                return await self._prepare(file, platform, stat, constraints, identity, signature)
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def _prepare(self, file: Path, platform: str, stat: os.stat_result, constraints: Dict[str, Any], identity: str,
+                       signature: str) -> Path:
+        started = time.perf_counter()
+        record = self._index["files"].get(identity)
+        if record is not None:
+            record["used_at"] = time.time()
+        rejected = (record or {}).get("rejected", {}).get(signature)
+        if rejected:
+            raise PreflightError(f"{file.name}不满足{platform}的上传要求: {rejected}")
+
+        try:
+            probe = await self.pool.probe(str(file))
+        except FileNotFoundError:
+            # 没有安装ffprobe时不做检查
+            print("⚠️ 未找到ffprobe，跳过上传预检")
+            return file
+        except FFmpegError as e:
+            self._reject(identity, signature, "无法解析的视频文件")
+            raise PreflightError(f"{file.name}无法解析: {e}")
+
+        decision = plan(probe, file, constraints)
+        if decision["action"] == ACTION_OK:
+            if stat.st_size > constraints["max_size"]:
+                raise self._size_error(file, platform, identity, signature, stat.st_size, constraints)
+            return file
+        reasons = "，".join(decision["reasons"])
+        if decision["action"] == ACTION_REJECT:
+            self._reject(identity, signature, reasons)
+            raise PreflightError(f"{file.name}不满足{platform}的上传要求: {reasons}")
+
+        content_hash = await self._content_hash(file, identity)
+        output = self.cache_dir / f"{content_hash[:16]}_{signature}.mp4"
+        outputs = self._index["outputs"]
+        if not output.exists():
+            print(f"🎬 {file.name}需要{'转码' if decision['action'] == ACTION_TRANSCODE else '重新封装'}"
+                  f"（{platform}）: {reasons}")
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_output = output.with_suffix(".tmp.mp4")
+            try:
+                await self.pool.run(build_args(file, tmp_output, decision), duration=decision["duration"])
+            except FFmpegError:
+                tmp_output.unlink(missing_ok=True)
+                raise
+            tmp_output.replace(output)
+            outputs[output.name] = {"source": str(file), "platform": platform, "action": decision["action"],
+                                    "created_at": time.time()}
+            print(f"✅ 预检处理完成: {output.name}，耗时 {time.perf_counter() - started:.1f}s")
+        outputs.setdefault(output.name, {"source": str(file), "platform": platform, "action": decision["action"],
+                                         "created_at": time.time()})["used_at"] = time.time()
+        # 淘汰时保存索引
+        self._evict()
+
+        size = output.stat().st_size
+        if size > constraints["max_size"]:
+            raise self._size_error(file, platform, identity, signature, size, constraints)
+        return output
+
+    def _reject(self, identity: str, signature: str, reason: str):
+        record = self._index["files"].setdefault(identity, {})
+        record.setdefault("rejected", {})[signature] = reason
+        record["used_at"] = time.time()
+        self._save_index()
+
+    def _size_error(self, file: Path, platform: str, identity: str, signature: str, size: int,
+                    constraints: Dict[str, Any]) -> PreflightError:
+        reason = f"文件大小{size / GB:.1f}GB超过{constraints['max_size'] / GB:.0f}GB"
+        self._reject(identity, signature, reason)
+        return PreflightError(f"{file.name}不满足{platform}的上传要求: {reason}")
+
+
+_upload_preflight: Optional[UploadPreflight] = None
+
+
+def get_upload_preflight() -> UploadPreflight:
+    """获取上传预检实例（在上传运行时的事件循环中使用）"""
+    global _upload_preflight
+    if _upload_preflight is None:
+        _upload_preflight = UploadPreflight()
+    return _upload_preflight
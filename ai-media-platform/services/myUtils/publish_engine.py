@@ -0,0 +1,194 @@
+"""
+并发发布引擎 - 并发调度(视频, 账号)上传任务
+同一账号同一时间只运行一个上传任务（避免同一cookie被多个浏览器同时使用触发风控），
+所有任务共享全局浏览器槽位上限；一批任务的耗时约为 单账号任务数 × 单次上传耗时
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .publish_scheduler import PublishDeferred, PublishGovernor
+
+# 同时打开的上传浏览器数量上限
+DEFAULT_BROWSER_SLOTS = 3
+
+
+class PublishJob:
+    """一个(视频, 账号)上传任务
+
+    run为无参协程函数，返回False表示上传失败，抛出异常同样记为失败，其余返回值记为成功。
+    支持进度回调的上传对象把report_progress作为回调，上传过程中progress/uploaded_bytes/total_bytes实时更新，
+    on_progress不为空时每次上报后以最新progress调用，用于把进度写入调用方的任务记录（在运行时线程中调用）。
+    preflight为可选的预检协程函数，在等待账号锁和浏览器槽位之前执行，抛出异常时任务直接失败。
+    platform不为空时由发布调度检查该平台的发布预算，reservation为定时发布在台账中的预约id。
+    concurrency为该平台同时上传的任务数上限（平台注册表中声明），为空时只受浏览器槽位限制。
+    """
+
+    def __init__(self, account: str, file: str, run: Callable[[], Awaitable[Any]],
+                 preflight: Optional[Callable[[], Awaitable[Any]]] = None,
+                 platform: Optional[str] = None, reservation: Optional[int] = None,
+                 concurrency: Optional[int] = None,
+                 on_progress: Optional[Callable[[float], Any]] = None):
+        self.account = account
+        self.file = file
+        self.run = run
+        self.preflight = preflight
+        self.platform = platform
+        self.reservation = reservation
+        self.concurrency = concurrency
+        self.on_progress = on_progress
+        self.uploaded_bytes = 0
+        self.total_bytes = 0
+
+    @property
+    def progress(self) -> Optional[float]:
+        """上传进度（0~100），没有进度上报时为None"""
+        if not self.total_bytes:
+            return None
+        return round(self.uploaded_bytes * 100 / self.total_bytes, 1)
+
+    def report_progress(self, uploaded_bytes: int, total_bytes: int):
+        self.uploaded_bytes = uploaded_bytes
+        self.total_bytes = total_bytes
+        if self.on_progress is not None and self.total_bytes:
+            self.on_progress(self.progress)
+
+
+class PublishEngine:
+    """并发发布引擎
+
+    账号锁和浏览器槽位属于引擎实例，同一事件循环中的多次run共享这些限制。
+    account_interval为同一账号两次上传之间的间隔（秒），间隔期间不占用浏览器槽位。
+    governor为发布调度，设置后带platform的任务在上传前检查发布预算、上传后记录结果。
+    带concurrency的任务另受所属平台的并发上限限制，平台上限按该平台第一个任务的声明创建。
+    """
+
+    def __init__(self, browser_slots: int = DEFAULT_BROWSER_SLOTS, account_interval: float = 0.0,
+                 governor: Optional[PublishGovernor] = None):
+        self.browser_slots = max(1, browser_slots)
+        self.account_interval = account_interval
+        self.governor = governor
+        self._slots = asyncio.Semaphore(self.browser_slots)
+        self._account_locks: Dict[str, asyncio.Lock] = {}
+        self._platform_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _platform_slot(self, job: PublishJob):
+        if job.platform is None or not job.concurrency:
+            return contextlib.nullcontext()
+        slot = self._platform_slots.get(job.platform)
+        if slot is None:
+            slot = self._platform_slots[job.platform] = asyncio.Semaphore(max(1, job.concurrency))
+        return slot
+
+    def _account_lock(self, account: str) -> asyncio.Lock:
+        lock = self._account_locks.get(account)
+        if lock is None:
+            lock = self._account_locks[account] = asyncio.Lock()
+        return lock
+
+    def _release(self, job: PublishJob, reason: str):
+        try:
+            self.governor.release(job.reservation, reason)
+        except Exception as e:
+            print(f"⚠️ 释放发布预约失败: {job.file} -> {job.account} - {e}")
+
+    @staticmethod
+    def _result(job: PublishJob, success: bool, error: Optional[str], elapsed: float) -> Dict[str, Any]:
+        return {"account": job.account, "file": job.file, "success": success, "error": error, "elapsed": elapsed,
+                "progress": job.progress}
+
+    async def _run_job(self, job: PublishJob, account_interval: float,
+                       preflight: Optional[asyncio.Future] = None) -> Dict[str, Any]:
+        governed = self.governor is not None and job.platform is not None
+
+        # 预检（及必要的转码）不占用账号锁和浏览器槽位，不满足平台要求的视频不再打开浏览器
+        if preflight is not None:
+            started = time.perf_counter()
+            try:
+                await preflight
+            except Exception as e:
+                print(f"❌ 预检未通过: {job.file} -> {job.account} - {e}")
+                if governed:
+                    self._release(job, str(e))
+                return self._result(job, False, str(e), round(time.perf_counter() - started, 1))
+
+        # 先拿账号锁再拿浏览器槽位，等待同账号任务时不占用槽位
+        async with self._account_lock(job.account):
+            ledger_id = job.reservation
+            if governed:
+                # 发布预算不允许时不打开浏览器；错开同平台上传的等待同样不占用槽位
+                try:
+                    ledger_id = await self.governor.admit(job.platform, job.account, job.file, job.reservation)
+                except PublishDeferred as e:
+                    print(f"⏸️ 暂缓发布: {job.file} -> {job.account} - {e}")
+                    self._release(job, str(e))
+                    return self._result(job, False, str(e), 0.0)
+                except Exception as e:
+                    # 台账读写失败只影响该任务，不中断整批发布
+                    print(f"❌ 发布调度失败: {job.file} -> {job.account} - {e}")
+                    self._release(job, f"发布调度失败: {e}")
+                    return self._result(job, False, str(e), 0.0)
+
+            # 先拿平台并发名额再拿浏览器槽位，等待同平台任务时不占用槽位
+            async with self._platform_slot(job), self._slots:
+                started = time.perf_counter()
+                print(f"🚀 开始上传: {job.file} -> {job.account}")
+                exception = None
+                try:
+                    success = await job.run() is not False
+                    error = None if success else "上传失败"
+                except Exception as e:
+                    success, error, exception = False, str(e), e
+                elapsed = round(time.perf_counter() - started, 1)
+
+            if governed:
+                try:
+                    self.governor.record(job.platform, job.account, ledger_id, success, error, exception)
+                except Exception as e:
+                    print(f"⚠️ 记录发布结果失败: {job.file} -> {job.account} - {e}")
+            if success:
+                print(f"✅ 上传成功: {job.file} -> {job.account}，耗时 {elapsed}s")
+            else:
+                print(f"❌ 上传失败: {job.file} -> {job.account} - {error}")
+            if account_interval > 0:
+                await asyncio.sleep(account_interval)
+
+        return self._result(job, success, error, elapsed)
+
+    async def _run_account(self, jobs: List[PublishJob], account_interval: float,
+                           preflights: List[Optional[asyncio.Future]]) -> List[Dict[str, Any]]:
+        return [await self._run_job(job, account_interval, preflight) for job, preflight in zip(jobs, preflights)]
+
+    async def run(self, jobs: List[PublishJob], account_interval: Optional[float] = None) -> List[Dict[str, Any]]:
+        """并发执行一批任务，按传入顺序返回每个任务的结果；account_interval未指定时使用引擎的设置"""
+        if account_interval is None:
+            account_interval = self.account_interval
+        by_account: Dict[str, List[int]] = {}
+        for index, job in enumerate(jobs):
+            by_account.setdefault(job.account, []).append(index)
+
+        started = time.perf_counter()
+        # 所有任务的预检同时开始，排在后面的任务在等待账号锁期间完成转码
+        preflights = [asyncio.ensure_future(job.preflight()) if job.preflight is not None else None for job in jobs]
+        try:
+            account_results = await asyncio.gather(*(
+                self._run_account([jobs[i] for i in indexes], account_interval, [preflights[i] for i in indexes])
+                for indexes in by_account.values()
+            ))
+        finally:
+            for preflight in preflights:
+                if preflight is not None and not preflight.done():
+                    preflight.cancel()
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        for indexes, account_result in zip(by_account.values(), account_results):
+            for index, result in zip(indexes, account_result):
+                results[index] = result
+
+        succeeded = sum(1 for result in results if result["success"])
+        print(f"📊 发布完成: {succeeded}/{len(jobs)} 成功，{len(by_account)} 个账号，"
+              f"耗时 {time.perf_counter() - started:.1f}s")
+        return results
+
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+发布调度 - 按平台和账号的发布预算安排发布时间，并在上传前检查是否允许发布
+每次发布（立即发布或定时发布）记入SQLite发布台账：账号每天的发布数不超过配额，同一账号的定时发布保持最小间隔，
+同一平台不同账号的发布时间和上传开始时间互相错开；上传因平台限流失败（ThrottledError）时账号进入指数退避，
+退避期间不再为该账号打开浏览器
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from .launch_profile import get_upload_config
+
+# 导入时解析为绝对路径，上传过程中切换工作目录（social-auto-upload）不影响台账位置
+DEFAULT_DB_PATH = Path("./publish_schedule.db").resolve()
+
+# 各平台的发布预算，可在config的social_upload.providers.<平台>.publish_budget中按项覆盖：
+# daily_quota 每个账号每天最多发布数；min_gap 同一账号两次定时发布的最小间隔（秒）；
+# platform_interval 同一平台不同账号的发布时间、上传开始时间的最小间隔（秒）
+DEFAULT_BUDGET: Dict[str, Any] = {"daily_quota": 5, "min_gap": 3600, "platform_interval": 30}
+
+PLATFORM_BUDGETS: Dict[str, Dict[str, Any]] = {
+    "douyin": {"daily_quota": 5},
+    "kuaishou": {"daily_quota": 5},
+    "wechat": {"daily_quota": 5},
+    "xiaohongshu": {"daily_quota": 3, "min_gap": 2 * 3600, "platform_interval": 60},
+    "tiktok": {"daily_quota": 5, "platform_interval": 60},
+    "bilibili": {"daily_quota": 10, "min_gap": 1800},
+}
+
+# 限流退避：首次15分钟，每次翻倍，最长24小时
+BACKOFF_BASE = 15 * 60
+BACKOFF_MAX = 24 * 3600
+# 退避剩余时间不超过该值时等待退避结束，否则任务直接失败（秒）
+MAX_ADMIT_WAIT = 10 * 60
+
+# 没有开始上传的预约超过该时间（秒）后不再占用配额
+RESERVATION_TTL = 24 * 3600
+
+# 与generate_schedule_time_next_day一致的默认发布时刻
+DEFAULT_DAILY_TIMES = [6, 11, 14, 16, 22]
+
+# 台账状态：planned 已预约未开始；running 上传中；done 已完成；failed 失败（不占用配额）
+STATUS_PLANNED = "planned"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class PublishDeferred(Exception):
+    """发布预算不允许现在发布（配额用完或账号限流退避中）"""
+
+
+class ThrottledError(Exception):
+    """平台限流（接口返回429或页面出现限流提示），由上传实现抛出，发布调度据此让账号退避"""
+
+
+class PublishSlot:
+    """一次发布的安排：publish_at为定时发布时间（立即发布为None），reservation为台账中的预约id"""
+
+    def __init__(self, publish_at: Optional[datetime] = None, reservation: Optional[int] = None):
+        self.publish_at = publish_at
+        self.reservation = reservation
+
+    @property
+    def publish_date(self) -> Union[datetime, int]:
+        """上传对象的publish_date参数，立即发布为0"""
+        return self.publish_at or 0
+
+
+def get_budget(platform: str) -> Dict[str, Any]:
+    """平台的发布预算：默认预算 < 平台默认 < 配置覆盖"""
+    budget = dict(DEFAULT_BUDGET)
+    budget.update(PLATFORM_BUDGETS.get(platform, {}))
+    budget.update(get_upload_config(platform).get("publish_budget") or {})
+    return budget
+
+
+def _parse_daily_time(value: Union[int, str]) -> timedelta:
+    """发布时刻：整数小时或"HH:MM"字符串"""
+    if isinstance(value, str):
+        hour, _, minute = value.partition(":")
+        return timedelta(hours=int(hour), minutes=int(minute or 0))
+    return timedelta(hours=int(value))
+
+
+class PublishGovernor:
+    """发布调度
+
+    plan在构建发布任务时安排定时发布时间并预约配额；admit/record由发布引擎在上传前后调用。
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path).resolve()
+        self._lock = threading.Lock()
+        # 每个平台下一次允许开始上传的时间，用于错开不同账号的上传
+        self._next_start: Dict[str, float] = {}
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS publish_ledger (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    platform TEXT NOT NULL,
+                    account TEXT NOT NULL,
+                    file TEXT,
+                    publish_at REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    error TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_publish_ledger_account '
+                         'ON publish_ledger(platform, account, publish_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_publish_ledger_publish_at ON publish_ledger(publish_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS publish_backoff (
+                    platform TEXT NOT NULL,
+                    account TEXT NOT NULL,
+                    strikes INTEGER NOT NULL,
+                    until REAL NOT NULL,
+                    reason TEXT,
+                    PRIMARY KEY (platform, account)
+                )
+            ''')
+            conn.commit()
+
+    # 台账查询
+
+    @staticmethod
+    def _active_clause() -> str:
+        """占用配额的记录：上传中、已完成，以及未过期的预约"""
+        return (f"(status IN ('{STATUS_RUNNING}', '{STATUS_DONE}') "
+                f"OR (status = '{STATUS_PLANNED}' AND created_at > ?))")
+
+    def _entries(self, conn: sqlite3.Connection, platform: str, start: float, end: float,
+                 account: Optional[str] = None) -> List[sqlite3.Row]:
+        sql = (f"SELECT id, account, publish_at FROM publish_ledger WHERE platform = ? "
+               f"AND publish_at >= ? AND publish_at < ? AND {self._active_clause()}")
+        params: List[Any] = [platform, start, end, time.time() - RESERVATION_TTL]
+        if account is not None:
+            sql += " AND account = ?"
+            params.append(account)
+        return conn.execute(sql, params).fetchall()
+
+    def _backoff_until(self, conn: sqlite3.Connection, platform: str, account: str) -> float:
+        row = conn.execute("SELECT until FROM publish_backoff WHERE platform = ? AND account = ?",
+                           (platform, account)).fetchone()
+        return row["until"] if row else 0.0
+
+    def _reserve(self, conn: sqlite3.Connection, platform: str, account: str, file: Optional[str],
+                 publish_at: float, status: str = STATUS_PLANNED) -> int:
+        now = time.time()
+        cursor = conn.execute(
+            "INSERT INTO publish_ledger (platform, account, file, publish_at, status, created_at, started_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (platform, account, file, publish_at, status, now, now if status == STATUS_RUNNING else None))
+        return cursor.lastrowid
+
+    # 定时发布
+
+    def _slot_allowed(self, conn: sqlite3.Connection, platform: str, account: str, slot: datetime,
+                      budget: Dict[str, Any]) -> bool:
+        day_start = slot.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_entries = self._entries(conn, platform, day_start.timestamp(),
+                                    (day_start + timedelta(days=1)).timestamp(), account)
+        if len(day_entries) >= budget["daily_quota"]:
+            return False
+        ts = slot.timestamp()
+        nearby = self._entries(conn, platform, ts - budget["min_gap"], ts + budget["min_gap"], account)
+        return not nearby
+
+    def _stagger(self, conn: sqlite3.Connection, platform: str, slot: datetime, budget: Dict[str, Any]) -> datetime:
+        """与同平台其他账号的发布时间错开platform_interval"""
+        interval = budget["platform_interval"]
+        for _ in range(100):
+            ts = slot.timestamp()
+            if not self._entries(conn, platform, ts - interval + 1, ts + interval):
+                break
+            slot += timedelta(seconds=interval)
+        return slot
+
+    def plan(self, platform: str, accounts: Sequence[str], total_videos: int, enable_timer: bool = False,
+             videos_per_day: int = 1, daily_times: Optional[List[Union[int, str]]] = None,
+             start_days: int = 0, files: Optional[Sequence[str]] = None) -> Dict[str, List[PublishSlot]]:
+        """安排每个账号每个视频的发布时间，返回{账号: [PublishSlot, ...]}（与视频顺序一致）
+
+        不定时发布时全部为立即发布，配额在上传前由admit检查；定时发布从start_days+1天起按daily_times的前
+        videos_per_day个时刻依次安排，跳过配额已满、与该账号其他发布间隔不足或处于退避期的时刻，
+        并与同平台其他账号错开，安排的时间写入台账作为预约。
+        """
+        if not enable_timer:
+            return {account: [PublishSlot() for _ in range(total_videos)] for account in accounts}
+        daily_times = daily_times or DEFAULT_DAILY_TIMES
+        if videos_per_day <= 0 or videos_per_day > len(daily_times):
+            raise ValueError("每天发布数量必须在1和发布时刻数量之间")
+        offsets = sorted(_parse_daily_time(value) for value in daily_times[:videos_per_day])
+        budget = get_budget(platform)
+        if budget["daily_quota"] <= 0:
+            raise ValueError(f"{platform}的每日发布配额为0，无法安排定时发布")
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        slots: Dict[str, List[PublishSlot]] = {}
+        with self._lock, self._connect() as conn:
+            for account in accounts:
+                backoff_until = self._backoff_until(conn, platform, account)
+                account_slots: List[PublishSlot] = []
+                day = start_days + 1
+                while len(account_slots) < total_videos:
+                    for offset in offsets:
+                        if len(account_slots) >= total_videos:
+                            break
+                        slot = self._stagger(conn, platform, today + timedelta(days=day) + offset, budget)
+                        if slot.timestamp() < backoff_until or not self._slot_allowed(conn, platform, account,
+                                                                                      slot, budget):
+                            continue
+                        file = files[len(account_slots)] if files else None
+                        reservation = self._reserve(conn, platform, account, file, slot.timestamp())
+                        account_slots.append(PublishSlot(slot, reservation))
+                    day += 1
+                slots[account] = account_slots
+                print(f"📅 {platform}/{account} 定时发布: "
+                      f"{', '.join(s.publish_at.strftime('%m-%d %H:%M') for s in account_slots)}")
+            conn.commit()
+        return slots
+
+    # 发布引擎调用
+
+    async def admit(self, platform: str, account: str, file: Optional[str] = None,
+                    reservation: Optional[int] = None) -> int:
+        """上传前检查发布预算，允许时返回台账记录id；配额用完或退避时间较长时抛出PublishDeferred
+
+        不同账号在同一平台的上传开始时间相隔platform_interval，等待期间不占用浏览器。
+        """
+        budget = get_budget(platform)
+        with self._lock, self._connect() as conn:
+            wait = self._backoff_until(conn, platform, account) - time.time()
+            if wait > MAX_ADMIT_WAIT:
+                raise PublishDeferred(f"{platform}账号{account}触发限流，退避中，{wait / 60:.0f}分钟后再试")
+            if reservation is None:
+                # 立即发布占用当天的配额
+                day_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                used = len(self._entries(conn, platform, day_start.timestamp(),
+                                         (day_start + timedelta(days=1)).timestamp(), account))
+                if used >= budget["daily_quota"]:
+                    raise PublishDeferred(f"{platform}账号{account}今日发布配额已用完"
+                                          f"（{budget['daily_quota']}条），请改为定时发布")
+                reservation = self._reserve(conn, platform, account, file, time.time(), STATUS_RUNNING)
+            conn.commit()
+
+            start_at = max(time.time() + max(wait, 0.0), self._next_start.get(platform, 0.0))
+            self._next_start[platform] = start_at + budget["platform_interval"]
+
+        delay = start_at - time.time()
+        if delay > 0:
+            print(f"⏳ {platform}/{account} 等待 {delay:.0f}s 后开始上传")
+            await asyncio.sleep(delay)
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE publish_ledger SET status = ?, started_at = ? WHERE id = ?",
+                         (STATUS_RUNNING, time.time(), reservation))
+            conn.commit()
+        return reservation
+
+    def record(self, platform: str, account: str, reservation: Optional[int], success: bool,
+               error: Optional[str] = None, exception: Optional[BaseException] = None):
+        """记录上传结果：成功时清除退避；失败时释放配额，exception为ThrottledError时延长退避"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            if reservation is not None:
+                conn.execute("UPDATE publish_ledger SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                             (STATUS_DONE if success else STATUS_FAILED, now, error, reservation))
+            if success:
+                conn.execute("DELETE FROM publish_backoff WHERE platform = ? AND account = ?", (platform, account))
+            elif isinstance(exception, ThrottledError):
+                row = conn.execute("SELECT strikes FROM publish_backoff WHERE platform = ? AND account = ?",
+                                   (platform, account)).fetchone()
+                strikes = (row["strikes"] if row else 0) + 1
+                backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (strikes - 1))
+                conn.execute("INSERT OR REPLACE INTO publish_backoff (platform, account, strikes, until, reason) "
+                             "VALUES (?, ?, ?, ?, ?)", (platform, account, strikes, now + backoff, error))
+                print(f"🐢 {platform}/{account} 触发限流，第{strikes}次，退避 {backoff / 60:.0f} 分钟")
+            conn.commit()
+
+    def release(self, reservation: Optional[int], reason: str):
+        """任务没有开始上传（预检失败或被推迟），释放预约占用的配额"""
+        if reservation is None:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE publish_ledger SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                         (STATUS_FAILED, time.time(), reason, reservation))
+            conn.commit()
+
+    # 查询
+
+    def timeline(self, platform: Optional[str] = None, account: Optional[str] = None,
+                 hours: float = 7 * 24) -> Dict[str, Any]:
+        """即将发布的时间线、各账号今日已用配额和退避状态"""
+        now = time.time()
+        day_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        filters, params = "", []
+        if platform:
+            filters += " AND platform = ?"
+            params.append(platform)
+        if account:
+            filters += " AND account = ?"
+            params.append(account)
+
+        with self._lock, self._connect() as conn:
+            # 上传中的任务、未过期的预约，以及已上传完成、尚未到发布时间的定时发布
+            upcoming = conn.execute(
+                f"SELECT id, platform, account, file, publish_at, status FROM publish_ledger "
+                f"WHERE (status = '{STATUS_RUNNING}' OR (status = '{STATUS_PLANNED}' AND created_at > ?) "
+                f"OR (status = '{STATUS_DONE}' AND publish_at > ?)) "
+                f"AND publish_at < ?{filters} ORDER BY publish_at",
+                [now - RESERVATION_TTL, now, now + hours * 3600, *params]).fetchall()
+            used = conn.execute(
+                f"SELECT platform, account, COUNT(*) AS used FROM publish_ledger "
+                f"WHERE publish_at >= ? AND publish_at < ? AND {self._active_clause()}{filters} "
+                f"GROUP BY platform, account",
+                [day_start, day_start + 86400, now - RESERVATION_TTL, *params]).fetchall()
+            backoffs = conn.execute(
+                f"SELECT platform, account, strikes, until, reason FROM publish_backoff "
+                f"WHERE until > ?{filters}", [now, *params]).fetchall()
+
+        return {
+            "upcoming": [{
+                "id": row["id"],
+                "platform": row["platform"],
+                "account": row["account"],
+                "file": row["file"],
+                "publish_at": datetime.fromtimestamp(row["publish_at"]).isoformat(),
+                "status": row["status"],
+            } for row in upcoming],
+            "quota": [{
+                "platform": row["platform"],
+                "account": row["account"],
+                "used_today": row["used"],
+                "daily_quota": get_budget(row["platform"])["daily_quota"],
+            } for row in used],
+            "backoff": [{
+                "platform": row["platform"],
+                "account": row["account"],
+                "strikes": row["strikes"],
+                "until": datetime.fromtimestamp(row["until"]).isoformat(),
+                "reason": row["reason"],
+            } for row in backoffs],
+        }
+
+
+_publish_governor: Optional[PublishGovernor] = None
+_publish_governor_lock = threading.Lock()
+
+
+def get_publish_governor(db_path: Path = DEFAULT_DB_PATH) -> PublishGovernor:
+    """获取发布调度实例"""
+    global _publish_governor
+    with _publish_governor_lock:
+        if _publish_governor is None:
+            _publish_governor = PublishGovernor(db_path)
+        return _publish_governor
@@ -0,0 +1,199 @@
+"""
+上传运行时 - 在独立线程中运行一个常驻事件循环，统一执行所有上传任务
+运行时持有唯一的Playwright实例、共享浏览器和发布引擎（带发布调度）；API所在的事件循环通过异步队列提交任务，
+上传不再占用线程池线程，也不再为每次上传新建事件循环和启动Playwright
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .publish_engine import DEFAULT_BROWSER_SLOTS, PublishEngine, PublishJob
+from .publish_scheduler import get_publish_governor
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+
+class UploadRuntime:
+    """上传运行时
+
+    submit/publish/upload在任意事件循环中调用，publish_sync供同步代码调用；
+    playwright/browser/run_uploader只能在运行时的事件循环内（即提交的任务中）调用。
+    """
+
+    def __init__(self, browser_slots: int = DEFAULT_BROWSER_SLOTS):
+        self.browser_slots = browser_slots
+        self.engine: Optional[PublishEngine] = None
+
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()
+        self._tasks = set()
+
+        self._playwright = None
+        self._playwright_lock: Optional[asyncio.Lock] = None
+        self._browsers: Dict[Tuple[str, bool, Optional[str], str], Any] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动运行时线程（首次提交任务时自动调用）"""
+        with self._start_lock:
+            if self.running:
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="upload-runtime", daemon=True)
+            self._thread.start()
+            self._started.wait()
+            print(f"✅ 上传运行时已启动，浏览器槽位: {self.browser_slots}")
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._playwright_lock = asyncio.Lock()
+        self.engine = PublishEngine(self.browser_slots, governor=get_publish_governor())
+        dispatcher = loop.create_task(self._dispatch())
+        self._started.set()
+
+        try:
+            loop.run_forever()
+        finally:
+            dispatcher.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(dispatcher, *self._tasks, return_exceptions=True))
+            # 还在队列中的任务不再执行
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+            loop.run_until_complete(self._close_playwright())
+            loop.close()
+            self._loop = self._queue = None
+
+    async def _dispatch(self):
+        """从队列取出任务并在运行时的事件循环中执行"""
+        while True:
+            factory, future = await self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            task = asyncio.get_running_loop().create_task(self._execute(factory, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _execute(factory: Callable[[], Awaitable[Any]], future: concurrent.futures.Future):
+        try:
+            future.set_result(await factory())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+
+    def _submit(self, factory: Callable[[], Awaitable[Any]]) -> concurrent.futures.Future:
+        self.start()
+        future = concurrent.futures.Future()
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (factory, future))
+        return future
+
+    async def submit(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """把无参协程函数提交到运行时执行并等待结果"""
+        return await asyncio.wrap_future(self._submit(factory))
+
+    async def publish(self, jobs: List[PublishJob], account_interval: Optional[float] = None) -> List[Dict[str, Any]]:
+        """在运行时中执行一批发布任务，账号锁和浏览器槽位在所有请求间共享"""
+        return await self.submit(lambda: self.engine.run(jobs, account_interval))
+
+    def publish_sync(self, jobs: List[PublishJob], account_interval: Optional[float] = None) -> List[Dict[str, Any]]:
+        """publish的同步版本，阻塞到整批任务完成"""
+        return self._submit(lambda: self.engine.run(jobs, account_interval)).result()
+
+    async def upload(self, app) -> Any:
+        """在运行时中执行单个social-auto-upload风格的上传对象"""
+        return await self.submit(lambda: self.run_uploader(app))
+
+    async def playwright(self):
+        """运行时共享的Playwright实例"""
+        async with self._playwright_lock:
+            if self._playwright is None:
+                if not PLAYWRIGHT_AVAILABLE:
+                    raise RuntimeError("Playwright未安装")
+                self._playwright = await async_playwright().start()
+            return self._playwright
+
+    async def browser(self, headless: bool = True, executable_path: Optional[str] = None,
+                      browser_type: str = "chromium", **options):
+        """共享浏览器，按(浏览器类型, 是否无头, 可执行文件, 其他启动参数)区分；断开后重新启动"""
+        playwright = await self.playwright()
+        options = {k: v for k, v in options.items() if v is not None}
+        key = (browser_type, headless, executable_path, repr(sorted(options.items())))
+        async with self._playwright_lock:
+            browser = self._browsers.get(key)
+            if browser is None or not browser.is_connected():
+                options["headless"] = headless
+                if executable_path:
+                    options["executable_path"] = executable_path
+                browser = self._browsers[key] = await getattr(playwright, browser_type).launch(**options)
+            return browser
+
+    async def run_uploader(self, app, launch_options: Optional[Dict[str, Any]] = None,
+                           browser_type: str = "chromium") -> Any:
+        """执行上传对象
+
+        提供upload(playwright, browser)的复用共享的Playwright实例；给出launch_options时传入按启动参数共享的浏览器，
+        上传对象只在其上新建上下文，不再为每个任务启动浏览器。没有upload方法的调用main()。
+        """
+        if hasattr(app, "upload"):
+            playwright = await self.playwright()
+            if launch_options is None:
+                return await app.upload(playwright)
+            return await app.upload(playwright, await self.browser(browser_type=browser_type, **launch_options))
+        return await app.main()
+
+    async def _close_playwright(self):
+        for browser in self._browsers.values():
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._browsers.clear()
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def shutdown(self, timeout: float = 30.0):
+        """停止运行时：取消未完成的任务并关闭浏览器（应用关闭时调用）"""
+        with self._start_lock:
+            if not self.running:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+            print("✅ 上传运行时已关闭")
+
+
+_upload_runtime: Optional[UploadRuntime] = None
+_upload_runtime_lock = threading.Lock()
+
+
+def get_upload_runtime(browser_slots: int = DEFAULT_BROWSER_SLOTS) -> UploadRuntime:
+    """获取上传运行时实例"""
+    global _upload_runtime
+    with _upload_runtime_lock:
+        if _upload_runtime is None:
+            _upload_runtime = UploadRuntime(browser_slots)
+        return _upload_runtime
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+小红书请求签名服务 - 常驻的无头浏览器为每个a1保留一个已加载的小红书页面，签名时直接调用window._webmsxyw
+签名在独立线程的事件循环中执行，同一a1的并发签名排队使用同一个页面；
+同步调用（XhsClient的sign回调）和异步调用（/sign接口）共用同一个实例
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .launch_profile import LaunchProfile, get_launch_profile
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+SIGN_PAGE_URL = "https://www.xiaohongshu.com"
+
+# 最多同时保留的签名页面（每个a1一个），超出时关闭最久未使用的页面
+MAX_PAGES = 8
+# 页面闲置超过该时间（秒）后关闭
+PAGE_IDLE_TTL = 30 * 60
+# 签名脚本加载的超时，毫秒
+PAGE_READY_TIMEOUT = 30_000
+SIGN_RETRIES = 3
+# 同步调用等待签名结果的超时（秒），包括首次加载页面
+SIGN_TIMEOUT = 60
+
+
+class _SignPage:
+    """一个a1对应的浏览器上下文和页面"""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    async def close(self):
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+
+
+class XhsSigner:
+    """小红书签名服务
+
+    sign在任意线程中同步调用，sign_async在任意事件循环中调用；
+    不能在签名服务自己的线程中调用sign。
+    """
+
+    def __init__(self, max_pages: int = MAX_PAGES, idle_ttl: float = PAGE_IDLE_TTL):
+        self.max_pages = max_pages
+        self.idle_ttl = idle_ttl
+        # 签名页面固定无头启动，拦截设置沿用小红书的上传配置
+        upload_profile = get_launch_profile("xiaohongshu")
+        self.profile = LaunchProfile(headless=True, block_resources=upload_profile.block_resources,
+                                     blocked_resource_types=upload_profile.blocked_resource_types,
+                                     blocked_domains=upload_profile.blocked_domains)
+
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()
+
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._pages: "OrderedDict[str, _SignPage]" = OrderedDict()
+        self._page_locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动签名线程（首次签名时自动调用）"""
+        with self._start_lock:
+            if self.running:
+                return
+            if not PLAYWRIGHT_AVAILABLE:
+                raise RuntimeError("Playwright未安装")
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="xhs-signer", daemon=True)
+            self._thread.start()
+            self._started.wait()
+            print("✅ 小红书签名服务已启动")
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._browser_lock = asyncio.Lock()
+        self._started.set()
+
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(self._close_browser())
+            loop.close()
+            self._loop = None
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(**self.profile.launch_options())
+            return self._browser
+
+    async def _open_page(self, a1: str) -> _SignPage:
+        """打开小红书首页并写入a1，重新加载后等待签名函数就绪"""
+        browser = await self._ensure_browser()
+        context = await self.profile.new_context(browser)
+        sign_page = _SignPage(context, await context.new_page())
+        try:
+            await sign_page.page.goto(SIGN_PAGE_URL)
+            await context.add_cookies([{"name": "a1", "value": a1, "domain": ".xiaohongshu.com", "path": "/"}])
+            await sign_page.page.reload()
+            await sign_page.page.wait_for_function("typeof window._webmsxyw === 'function'",
+                                                   timeout=PAGE_READY_TIMEOUT)
+        except Exception:
+            await sign_page.close()
+            raise
+        return sign_page
+
+    @contextlib.asynccontextmanager
+    async def _page_lock(self, a1: str) -> AsyncIterator[None]:
+        """持有a1的页面锁；退出时a1没有页面则删除锁，等待期间锁已被删除的改用新的锁"""
+        while True:
+            lock = self._page_locks.setdefault(a1, asyncio.Lock())
+            async with lock:
+                if self._page_locks.get(a1) is lock:
+                    try:
+                        yield
+                    finally:
+                        if a1 not in self._pages:
+                            del self._page_locks[a1]
+                    return
+
+    async def _get_page(self, a1: str) -> _SignPage:
+        """取a1对应的页面，没有时打开；同一a1只打开一次"""
+        async with self._page_lock(a1):
+            sign_page = self._pages.get(a1)
+            if sign_page is not None and time.monotonic() - sign_page.last_used > self.idle_ttl:
+                await self._close_page(a1)
+                sign_page = None
+            if sign_page is None:
+                sign_page = await self._open_page(a1)
+                self._pages[a1] = sign_page
+            self._pages.move_to_end(a1)
+            sign_page.last_used = time.monotonic()
+        # 释放a1的锁后再淘汰其他页面，避免两个a1互相等待对方的锁
+        await self._evict()
+        return sign_page
+
+    async def _close_page(self, a1: str):
+        """关闭a1的页面，调用方持有a1的锁"""
+        sign_page = self._pages.pop(a1, None)
+        if sign_page is not None:
+            await sign_page.close()
+
+    async def _discard(self, a1: str, sign_page: _SignPage):
+        """在a1的锁内关闭页面；页面已被替换时不处理"""
+        async with self._page_lock(a1):
+            if self._pages.get(a1) is sign_page:
+                await self._close_page(a1)
+
+    async def _evict(self):
+        """页面超出上限时关闭最久未使用的页面"""
+        while len(self._pages) > self.max_pages:
+            oldest = next(iter(self._pages))
+            async with self._page_lock(oldest):
+                # 等锁期间页面可能刚被使用过，重新确认仍是最久未使用的页面
+                if len(self._pages) > self.max_pages and next(iter(self._pages)) == oldest:
+                    await self._close_page(oldest)
+
+    async def _sign(self, uri: str, data: Any, a1: str) -> Dict[str, str]:
+        for attempt in range(SIGN_RETRIES):
+            sign_page = await self._get_page(a1)
+            try:
+                async with sign_page.lock:
+                    encrypt_params = await sign_page.page.evaluate(
+                        "([url, data]) => window._webmsxyw(url, data)", [uri, data])
+                return {
+                    "x-s": encrypt_params["X-s"],
+                    "x-t": str(encrypt_params["X-t"])
+                }
+            except Exception as e:
+                # 页面跳转或签名函数失效时重新打开页面
+                print(f"⚠️ 小红书签名失败（第{attempt + 1}次）: {e}")
+                await self._discard(a1, sign_page)
+        raise Exception("小红书签名失败，请检查a1或网络")
+
+    def _submit(self, uri: str, data: Any, a1: str) -> concurrent.futures.Future:
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._sign(uri, data, a1), self._loop)
+
+    def sign(self, uri: str, data: Any = None, a1: str = "", web_session: str = "") -> Dict[str, str]:
+        """同步签名，返回{"x-s", "x-t"}；参数与XhsClient的sign回调一致"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("不能在签名服务线程中同步签名")
+        return self._submit(uri, data, a1).result(SIGN_TIMEOUT)
+
+    async def sign_async(self, uri: str, data: Any = None, a1: str = "", web_session: str = "") -> Dict[str, str]:
+        """异步签名"""
+        return await asyncio.wrap_future(self._submit(uri, data, a1))
+
+    async def _close_browser(self):
+        for a1 in list(self._pages):
+            await self._close_page(a1)
+        self._page_locks.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def shutdown(self, timeout: float = 30.0):
+        """停止签名服务并关闭浏览器（应用关闭时调用）"""
+        with self._start_lock:
+            if not self.running:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+            print("✅ 小红书签名服务已关闭")
+
+
+_xhs_signer: Optional[XhsSigner] = None
+_xhs_signer_lock = threading.Lock()
+
+
+def get_xhs_signer() -> XhsSigner:
+    """获取小红书签名服务实例"""
+    global _xhs_signer
+    with _xhs_signer_lock:
+        if _xhs_signer is None:
+            _xhs_signer = XhsSigner()
+        return _xhs_signer
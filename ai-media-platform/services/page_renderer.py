@@ -0,0 +1,189 @@
+"""
+页面渲染服务 - 用无头浏览器渲染客户端渲染的文章页面
+只在静态抓取提取到的正文过短时使用：复用同一个浏览器和页面池，拦截图片、字体和媒体请求，
+渲染并发受页面池大小限制，渲染后的DOM快照缓存到磁盘
+"""
+
+import asyncio
+import hashlib
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+try:
+    from playwright.async_api import async_playwright, Error as PlaywrightError
+    from services.base_social_media import set_init_script
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+DEFAULT_CACHE_DIR = Path("./cache/rendered_pages")
+
+# 渲染时不需要的资源类型
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+
+# 静态提取的正文少于该字数时才启用渲染
+MIN_CONTENT_CHARS = 200
+
+
+class PageRenderer:
+    """无头浏览器渲染池"""
+
+    def __init__(self, max_pages: int = 2, timeout: float = 20.0, cache_dir: Path = DEFAULT_CACHE_DIR,
+                 cache_ttl: float = 3600.0, user_agent: Optional[str] = None):
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.cache_dir = Path(cache_dir)
+        self.cache_ttl = cache_ttl
+        self.user_agent = user_agent
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._start_lock = asyncio.Lock()
+        self._idle_pages: asyncio.Queue = asyncio.Queue()
+        self._page_slots = asyncio.Semaphore(max_pages)
+
+    @property
+    def available(self) -> bool:
+        return PLAYWRIGHT_AVAILABLE
+
+    def _cache_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.html.z"
+
+    def _read_cache(self, url: str) -> Optional[str]:
+        path = self._cache_path(url)
+        try:
+            if time.time() - path.stat().st_mtime > self.cache_ttl:
+                return None
+            return zlib.decompress(path.read_bytes()).decode("utf-8")
+        except (OSError, zlib.error):
+            return None
+
+    def _write_cache(self, url: str, html: str):
+        path = self._cache_path(url)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            tmp_path.write_bytes(zlib.compress(html.encode("utf-8")))
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"写入渲染缓存失败: {e}")
+
+    async def _ensure_started(self):
+        """首次渲染时启动浏览器"""
+        async with self._start_lock:
+            if self._context is not None:
+                return
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._context = await self._browser.new_context(
+                user_agent=self.user_agent,
+                java_script_enabled=True,
+                viewport={"width": 1280, "height": 2000}
+            )
+            await set_init_script(self._context)
+            await self._context.route("**/*", self._block_resources)
+            logger.info(f"渲染浏览器已启动，页面池大小: {self.max_pages}")
+
+    @staticmethod
+    async def _block_resources(route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _acquire_page(self):
+        try:
+            return self._idle_pages.get_nowait()
+        except asyncio.QueueEmpty:
+            return await self._context.new_page()
+
+    async def render(self, url: str, wait_selector: Optional[str] = None) -> Optional[str]:
+        """渲染页面并返回DOM快照，浏览器不可用或渲染失败时返回None
+
+        wait_selector为正文容器的选择器，出现后立即取快照；未指定时等待网络空闲。
+        """
+        if not PLAYWRIGHT_AVAILABLE:
+            return None
+
+        cached = self._read_cache(url)
+        if cached is not None:
+            logger.info(f"使用缓存的渲染结果: {url}")
+            return cached
+
+        async with self._page_slots:
+            try:
+                await self._ensure_started()
+            except Exception as e:
+                logger.error(f"启动渲染浏览器失败: {e}")
+                return None
+
+            page = await self._acquire_page()
+            reusable = False
+            started = time.perf_counter()
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=self.timeout * 1000)
+                try:
+                    if wait_selector:
+                        await page.wait_for_selector(wait_selector, timeout=self.timeout * 1000)
+                    else:
+                        await page.wait_for_load_state("networkidle", timeout=self.timeout * 1000)
+                except PlaywrightError:
+                    # 等待超时时仍然使用当前的DOM
+                    pass
+                html = await page.content()
+                reusable = True
+            except Exception as e:
+                logger.warning(f"页面渲染失败: {url} - {e}")
+                return None
+            finally:
+                # 渲染成功的页面清空后放回池中，失败或被取消的页面直接关闭
+                if reusable:
+                    try:
+                        await page.goto("about:blank")
+                        self._idle_pages.put_nowait(page)
+                    except Exception:
+                        reusable = False
+                if not reusable:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+
+        logger.info(f"页面渲染完成: {url}，耗时 {time.perf_counter() - started:.1f}s，长度 {len(html)}")
+        self._write_cache(url, html)
+        return html
+
+    async def close(self):
+        """关闭浏览器（应用关闭时调用）"""
+        while not self._idle_pages.empty():
+            self._idle_pages.get_nowait()
+        if self._context is not None:
+            await self._context.close()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._context = self._browser = self._playwright = None
+
+
+_page_renderer: Optional[PageRenderer] = None
+
+
+def get_page_renderer(config: Optional[dict] = None) -> PageRenderer:
+    """获取页面渲染池实例"""
+    global _page_renderer
+    if _page_renderer is None:
+        config = config or {}
+        _page_renderer = PageRenderer(
+            max_pages=config.get("max_pages", 2),
+            timeout=config.get("timeout", 20.0),
+            cache_dir=Path(config.get("cache_dir", DEFAULT_CACHE_DIR)),
+            cache_ttl=config.get("cache_ttl", 3600.0),
+            user_agent=config.get("user_agent")
+        )
+    return _page_renderer
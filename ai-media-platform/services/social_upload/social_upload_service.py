@@ -21,16 +21,9 @@ LEGACY_SOCIAL_DIR = PROJECT_ROOT / 'social-auto-upload'
 if LEGACY_SOCIAL_DIR.exists() and str(LEGACY_SOCIAL_DIR) not in sys.path:
     sys.path.insert(0, str(LEGACY_SOCIAL_DIR))
 
-# 导入各平台上传模块
-try:
-    from uploader.douyin_uploader.main import post_video_DouYin
-    from uploader.ks_uploader.main import post_video_ks
-    from uploader.xiaohongshu_uploader.main import post_video_xhs
-    from uploader.bilibili_uploader.main import post_video_bilibili
-    from uploader.tencent_uploader.main import post_video_tencent
-    from uploader.baijiahao_uploader.main import post_video_baijiahao
-except ImportError as e:
-    logger.warning(f"部分上传模块导入失败: {e}")
+# 各平台的上传实现统一来自平台注册表，首次上传时才导入对应平台的模块
+from services.myUtils.platforms import list_platform_uploaders, publish_video
+from services.myUtils.preflight import get_constraints
 
 
 class SocialPlatform(str, Enum):
@@ -41,6 +34,7 @@ class SocialPlatform(str, Enum):
     BILIBILI = "bilibili"       # B站
     WECHAT_VIDEO = "wechat"     # 微信视频号
     BAIJIAHAO = "baijiahao"     # 百家号
+    TIKTOK = "tiktok"           # TikTok
 
 
 class UploadRequest(BaseModel):
@@ -94,34 +88,32 @@ class SocialUploadService:
         self.storage_config = config.get("storage", {})
 
     async def upload_video(self, request: UploadRequest) -> UploadResponse:
-        """上传视频到指定平台"""
+        """上传视频到指定平台
+
+        平台的上传实现从注册表获取，在上传运行时中执行；账号cookie文件由account_info.account_file指定。
+        """
         start_time = time.time()
 
         try:
-            if request.platform == SocialPlatform.DOUYIN:
-                result = await self._upload_to_douyin(request)
-            elif request.platform == SocialPlatform.KUAISHOU:
-                result = await self._upload_to_kuaishou(request)
-            elif request.platform == SocialPlatform.XIAOHONGSHU:
-                result = await self._upload_to_xiaohongshu(request)
-            elif request.platform == SocialPlatform.BILIBILI:
-                result = await self._upload_to_bilibili(request)
-            elif request.platform == SocialPlatform.WECHAT_VIDEO:
-                result = await self._upload_to_wechat_video(request)
-            elif request.platform == SocialPlatform.BAIJIAHAO:
-                result = await self._upload_to_baijiahao(request)
-            else:
-                raise ValueError(f"不支持的平台: {request.platform}")
-
-            upload_time = time.time() - start_time
+            account_file = (request.account_info or {}).get("account_file")
+            if not account_file:
+                raise ValueError("缺少账号cookie文件（account_info.account_file）")
+
+            result = await publish_video(
+                request.platform,
+                request.title,
+                Path(request.video_path),
+                request.tags or [],
+                Path(account_file),
+                thumbnail=request.cover_image,
+                description=request.description
+            )
 
             return UploadResponse(
                 platform=request.platform,
-                success=result.get("success", False),
-                video_url=result.get("video_url"),
-                post_id=result.get("post_id"),
-                error_message=result.get("error_message"),
-                upload_time=upload_time
+                success=result["success"],
+                error_message=result["error"],
+                upload_time=time.time() - start_time
             )
 
         except Exception as e:
@@ -133,179 +125,6 @@ class SocialUploadService:
                 upload_time=time.time() - start_time
             )
 
-    async def _upload_to_douyin(self, request: UploadRequest) -> Dict:
-        """上传到抖音"""
-        try:
-            # 使用原有的抖音上传逻辑
-            cookies = request.cookies or {}
-            account_info = request.account_info or {}
-
-            # 构建上传参数
-            upload_params = {
-                "video_path": request.video_path,
-                "title": request.title,
-                "description": request.description or "",
-                "tags": request.tags or [],
-                "cookies": cookies,
-                "account_info": account_info
-            }
-
-            # 调用原有上传函数
-            result = await asyncio.to_thread(post_video_DouYin, upload_params)
-
-            return {
-                "success": True,
-                "video_url": result.get("video_url"),
-                "post_id": result.get("post_id")
-            }
-
-        except Exception as e:
-            logger.error(f"抖音上传失败: {e}")
-            return {
-                "success": False,
-                "error_message": str(e)
-            }
-
-    async def _upload_to_kuaishou(self, request: UploadRequest) -> Dict:
-        """上传到快手"""
-        try:
-            cookies = request.cookies or {}
-            account_info = request.account_info or {}
-
-            upload_params = {
-                "video_path": request.video_path,
-                "title": request.title,
-                "description": request.description or "",
-                "tags": request.tags or [],
-                "cookies": cookies,
-                "account_info": account_info
-            }
-
-            result = await asyncio.to_thread(post_video_ks, upload_params)
-
-            return {
-                "success": True,
-                "video_url": result.get("video_url"),
-                "post_id": result.get("post_id")
-            }
-
-        except Exception as e:
-            logger.error(f"快手上传失败: {e}")
-            return {
-                "success": False,
-                "error_message": str(e)
-            }
-
-    async def _upload_to_xiaohongshu(self, request: UploadRequest) -> Dict:
-        """上传到小红书"""
-        try:
-            cookies = request.cookies or {}
-            account_info = request.account_info or {}
-
-            upload_params = {
-                "video_path": request.video_path,
-                "title": request.title,
-                "description": request.description or "",
-                "tags": request.tags or [],
-                "cookies": cookies,
-                "account_info": account_info
-            }
-
-            result = await asyncio.to_thread(post_video_xhs, upload_params)
-
-            return {
-                "success": True,
-                "video_url": result.get("video_url"),
-                "post_id": result.get("post_id")
-            }
-
-        except Exception as e:
-            logger.error(f"小红书上传失败: {e}")
-            return {
-                "success": False,
-                "error_message": str(e)
-            }
-
-    async def _upload_to_bilibili(self, request: UploadRequest) -> Dict:
-        """上传到B站"""
-        try:
-            # B站上传逻辑
-            upload_params = {
-                "video_path": request.video_path,
-                "title": request.title,
-                "description": request.description or "",
-                "tags": request.tags or [],
-                "account_info": request.account_info or {}
-            }
-
-            result = await asyncio.to_thread(post_video_bilibili, upload_params)
-
-            return {
-                "success": True,
-                "video_url": result.get("video_url"),
-                "post_id": result.get("post_id")
-            }
-
-        except Exception as e:
-            logger.error(f"B站上传失败: {e}")
-            return {
-                "success": False,
-                "error_message": str(e)
-            }
-
-    async def _upload_to_wechat_video(self, request: UploadRequest) -> Dict:
-        """上传到微信视频号"""
-        try:
-            upload_params = {
-                "video_path": request.video_path,
-                "title": request.title,
-                "description": request.description or "",
-                "tags": request.tags or [],
-                "cookies": request.cookies or {},
-                "account_info": request.account_info or {}
-            }
-
-            result = await asyncio.to_thread(post_video_tencent, upload_params)
-
-            return {
-                "success": True,
-                "video_url": result.get("video_url"),
-                "post_id": result.get("post_id")
-            }
-
-        except Exception as e:
-            logger.error(f"微信视频号上传失败: {e}")
-            return {
-                "success": False,
-                "error_message": str(e)
-            }
-
-    async def _upload_to_baijiahao(self, request: UploadRequest) -> Dict:
-        """上传到百家号"""
-        try:
-            upload_params = {
-                "video_path": request.video_path,
-                "title": request.title,
-                "description": request.description or "",
-                "tags": request.tags or [],
-                "account_info": request.account_info or {}
-            }
-
-            result = await asyncio.to_thread(post_video_baijiahao, upload_params)
-
-            return {
-                "success": True,
-                "video_url": result.get("video_url"),
-                "post_id": result.get("post_id")
-            }
-
-        except Exception as e:
-            logger.error(f"百家号上传失败: {e}")
-            return {
-                "success": False,
-                "error_message": str(e)
-            }
-
     async def batch_upload(self, request: BatchUploadRequest) -> BatchUploadResponse:
         """批量上传到多个平台"""
         start_time = time.time()
@@ -380,57 +199,20 @@ class SocialUploadService:
         return True
 
     async def get_supported_platforms(self) -> List[Dict]:
-        """获取支持的平台列表"""
-        return [
-            {
-                "platform": SocialPlatform.DOUYIN,
-                "name": "抖音",
-                "description": "短视频平台，适合娱乐内容",
-                "max_video_size": "2GB",
-                "max_video_duration": "15分钟",
-                "supported_formats": ["mp4", "mov"]
-            },
-            {
-                "platform": SocialPlatform.KUAISHOU,
-                "name": "快手",
-                "description": "短视频平台，适合生活记录",
-                "max_video_size": "2GB",
-                "max_video_duration": "10分钟",
-                "supported_formats": ["mp4", "mov"]
-            },
-            {
-                "platform": SocialPlatform.XIAOHONGSHU,
-                "name": "小红书",
-                "description": "生活方式分享平台",
-                "max_video_size": "500MB",
-                "max_video_duration": "5分钟",
-                "supported_formats": ["mp4", "mov"]
-            },
-            {
-                "platform": SocialPlatform.BILIBILI,
-                "name": "B站",
-                "description": "弹幕视频网站，适合年轻用户",
-                "max_video_size": "8GB",
-                "max_video_duration": "12小时",
-                "supported_formats": ["mp4", "flv", "avi"]
-            },
-            {
-                "platform": SocialPlatform.WECHAT_VIDEO,
-                "name": "微信视频号",
-                "description": "微信生态短视频平台",
-                "max_video_size": "1GB",
-                "max_video_duration": "30分钟",
-                "supported_formats": ["mp4", "mov"]
-            },
-            {
-                "platform": SocialPlatform.BAIJIAHAO,
-                "name": "百家号",
-                "description": "百度内容创作平台",
-                "max_video_size": "2GB",
-                "max_video_duration": "60分钟",
-                "supported_formats": ["mp4", "mov"]
-            }
-        ]
+        """获取支持的平台列表，大小和时长限制与上传预检一致"""
+        platforms = []
+        for uploader in list_platform_uploaders():
+            constraints = get_constraints(uploader.platform)
+            platforms.append({
+                "platform": uploader.platform,
+                "name": uploader.name,
+                "description": uploader.description,
+                "max_video_size": f"{constraints['max_size'] / 1024 ** 3:g}GB",
+                "max_video_duration": f"{constraints['max_duration'] / 60:g}分钟",
+                "supported_formats": [extension.lstrip(".") for extension in constraints["extensions"]],
+                "max_concurrency": uploader.max_concurrency
+            })
+        return platforms
 
 
 # 全局社交媒体上传服务实例
@@ -14,6 +14,8 @@ from pydantic import BaseModel
 from loguru import logger
 import base64
 
+from services.media import get_ffmpeg_pool
+
 
 class TTSProvider(str, Enum):
     """支持的TTS提供商"""
@@ -393,41 +395,13 @@ class TTSService:
         return audios
 
     async def merge_audio_files(self, audio_paths: list[str], output_path: str) -> str:
-        """合并多个音频文件"""
-        try:
-            import subprocess
-
-            # 创建文件列表
-            file_list_path = "./temp/audio_file_list.txt"
-            with open(file_list_path, "w") as f:
-                for path in audio_paths:
-                    f.write(f"file '{path}'\n")
-
-            # 使用FFmpeg合并音频
-            cmd = [
-                "ffmpeg",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", file_list_path,
-                "-c", "copy",
-                "-y",
-                output_path
-            ]
-
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            stdout, stderr = await process.communicate()
-
-            if process.returncode != 0:
-                raise ValueError(f"音频合并失败: {stderr.decode()}")
-
-            # 清理临时文件
-            Path(file_list_path).unlink(missing_ok=True)
+        """合并多个音频文件
 
+        由FFmpeg进程池执行：限制并发进程数、独立临时目录、超时控制，编码一致时直接复制流。
+        """
+        try:
+            pool = get_ffmpeg_pool(self.config.get("media", {}))
+            await pool.concat(audio_paths, output_path)
             logger.info(f"音频合并完成: {output_path}")
             return output_path
 
@@ -2,12 +2,13 @@
 import random
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright, Page
+from playwright.async_api import Playwright, async_playwright, Page, TimeoutError as PlaywrightTimeoutError
 import os
-import time
-import asyncio
 
 from conf import LOCAL_CHROME_PATH
+from services.myUtils.launch_profile import get_launch_profile
+from uploader.waits import (UPLOAD_TIMEOUT, appears, enabled, first_of, hidden, throttle_toast, throttled_error,
+                           url_matches, visible)
 from utils.base_social_media import set_init_script
 from utils.log import baijiahao_logger
 from utils.network import async_retry
@@ -44,9 +45,8 @@ async def cookie_auth(account_file):
         page = await context.new_page()
         # 访问指定的 URL
         await page.goto("https://baijiahao.baidu.com/builder/rc/home")
-        await page.wait_for_timeout(timeout=5000)
 
-        if await page.get_by_text('注册/登录百家号').count():
+        if await appears(page.get_by_text('注册/登录百家号'), 5000):
             baijiahao_logger.error("等待5秒 cookie 失效")
             return False
         else:
@@ -89,9 +89,7 @@ class BaiJiaHaoVideo(object):
             except:
                 await page.locator('div.select-wrap').nth(0).click()
         # page.locator(f'div.rc-virtual-list-holder-inner >> text={publish_date_day}').click()
-        await page.wait_for_timeout(2000)
         await page.locator(f'div.rc-virtual-list  div.cheetah-select-item >> text={publish_date_day}').click()
-        await page.wait_for_timeout(2000)
 
         # 改为随机点击一个 hour
         for _ in range(3):
@@ -101,14 +99,13 @@ class BaiJiaHaoVideo(object):
                 break
             except:
                 await page.locator('div.select-wrap').nth(1).click()
-        await page.wait_for_timeout(2000)
-        current_choice_hour = await page.locator('div.rc-virtual-list:visible div.cheetah-select-item-option').count()
-        await page.wait_for_timeout(2000)
-        await page.locator('div.rc-virtual-list:visible div.cheetah-select-item-option').nth(
-            random.randint(1, current_choice_hour-3)).click()
+        hour_options = page.locator('div.rc-virtual-list:visible div.cheetah-select-item-option')
+        # 选项渲染出来后再计数
+        await visible(hour_options)
+        current_choice_hour = await hour_options.count()
+        await hour_options.nth(random.randint(1, current_choice_hour-3)).click()
         # 2024.08.05 current_choice_hour的获取可能有问题，页面有7，这里获取了10，暂时硬编码至6
 
-        await page.wait_for_timeout(2000)
         await page.locator("button >> text=定时发布").click()
 
 
@@ -117,92 +114,80 @@ class BaiJiaHaoVideo(object):
         return
         print("视频出错了，重新上传中")
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path, proxy=self.proxy_setting)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}", user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.4324.150 Safari/537.36')
-        # context = await set_init_script(context)
-        await context.grant_permissions(['geolocation'])
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
-        baijiahao_logger.info(f"正在上传-------{self.title}.mp4")
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        baijiahao_logger.info('正在打开主页...')
-        await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
-
-        # 点击 "上传视频" 按钮
-        await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
-
-        # 等待页面跳转到指定的 URL
-        while True:
-            # 判断是是否进入视频发布页面，没进入，则自动等待到超时
-            try:
-                await page.wait_for_selector("div#formMain:visible")
-                break
-            except:
-                baijiahao_logger.info("正在等待进入视频发布页面...")
-                await asyncio.sleep(0.1)
-
-        # 填充标题和话题
-        # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
-        baijiahao_logger.info("正在填充标题和话题...")
-        await self.add_title_tags(page)
-
-        upload_status = await self.uploading_video(page)
-        if not upload_status:
-            baijiahao_logger.error(f"发现上传出错了... 文件:{self.file_path}")
-            raise
-
-        # 判断视频封面图是否生成成功
-        while True:
-            baijiahao_logger.info("正在确认封面完成, 准备去点击定时/发布...")
-            if await page.locator("div.cheetah-spin-container img").count():
-                baijiahao_logger.info("封面已完成，点击定时/发布...")
-                break
-            else:
-                baijiahao_logger.info("等待封面生成...")
-                await asyncio.sleep(3)
-
-        await self.publish_video(page, self.publish_date)
-        await page.wait_for_timeout(2000)
-        if await page.locator('div.passMod_dialog-container >> text=百度安全验证:visible').count():
-            baijiahao_logger.error("出现验证，退出")
-            raise Exception("出现验证，退出")
-        await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/clue**", timeout=5000)
-        baijiahao_logger.success("视频发布成功")
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        baijiahao_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+    async def upload(self, playwright: Playwright, browser=None) -> None:
+        """执行上传；browser为上传运行时的共享浏览器，为空时自行启动"""
+        # 在浏览器上新建上下文（使用指定的 cookie 文件），是否无头和资源拦截按平台配置
+        profile = get_launch_profile("baijiahao")
+        async with profile.open_context(
+                playwright, browser, self.local_executable_path, init_script=False,
+                launch_options={"proxy": self.proxy_setting}, storage_state=f"{self.account_file}",
+                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.4324.150 Safari/537.36') as context:
+            await context.grant_permissions(['geolocation'])
+
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 访问指定的 URL
+            await page.goto("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
+            baijiahao_logger.info(f"正在上传-------{self.title}.mp4")
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            baijiahao_logger.info('正在打开主页...')
+            await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
+
+            # 点击 "上传视频" 按钮
+            await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
+
+            # 等待进入视频发布页面
+            baijiahao_logger.info("正在等待进入视频发布页面...")
+            await visible(page.locator("div#formMain"), UPLOAD_TIMEOUT)
+
+            # 填充标题和话题
+            # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
+            baijiahao_logger.info("正在填充标题和话题...")
+            await self.add_title_tags(page)
+
+            upload_status = await self.uploading_video(page)
+            if not upload_status:
+                baijiahao_logger.error(f"发现上传出错了... 文件:{self.file_path}")
+                raise
+
+            # 判断视频封面图是否生成成功
+            baijiahao_logger.info("等待封面生成...")
+            # 封面img节点出现即可，图片请求可能被启动配置拦截
+            await page.locator("div.cheetah-spin-container img").first.wait_for(state="attached", timeout=UPLOAD_TIMEOUT)
+            baijiahao_logger.info("封面已完成，点击定时/发布...")
+
+            await self.publish_video(page, self.publish_date)
+            # 跳转到作品管理页即发布成功，出现安全验证时退出，出现限流提示时按限流失败
+            throttled = throttle_toast(page)
+            result = await first_of(
+                url_matches(page, "https://baijiahao.baidu.com/builder/rc/clue*", timeout=7000),
+                visible(page.locator('div.passMod_dialog-container >> text=百度安全验证'), 7000),
+                visible(throttled, 7000))
+            if result == 1:
+                baijiahao_logger.error("出现验证，退出")
+                raise Exception("出现验证，退出")
+            if result == 2:
+                raise await throttled_error(throttled)
+            baijiahao_logger.success("视频发布成功")
+
+            await context.storage_state(path=self.account_file)  # 保存cookie
+            baijiahao_logger.info('cookie更新完毕！')
 
 
     @async_retry(timeout=300)  # 例如，最多重试3次，超时时间为180秒
     async def uploading_video(self, page):
-        while True:
-            upload_failed = await page.locator('div .cover-overlay:has-text("上传失败")').count()
-            if upload_failed:
-                baijiahao_logger.error("发现上传出错了...")
-                # await self.handle_upload_error(page)  # 假设这是处理上传错误的函数
-                return False
-
-            uploading = await page.locator('div .cover-overlay:has-text("上传中")').count()
-            if uploading:
-                baijiahao_logger.info("正在上传视频中...")
-                await asyncio.sleep(2)  # 等待2秒再次检查
-                continue
+        upload_failed = page.locator('div .cover-overlay:has-text("上传失败")')
+        baijiahao_logger.info("正在上传视频中...")
+        # "上传中"消失或出现"上传失败"时结束等待
+        await first_of(hidden(page.locator('div .cover-overlay:has-text("上传中")'), UPLOAD_TIMEOUT),
+                       visible(upload_failed, UPLOAD_TIMEOUT))
+        if await upload_failed.count():
+            baijiahao_logger.error("发现上传出错了...")
+            # await self.handle_upload_error(page)  # 假设这是处理上传错误的函数
+            return False
 
-            # 检查上传是否成功
-            if not uploading and not upload_failed:
-                baijiahao_logger.success("视频上传完毕")
-                return True
+        baijiahao_logger.success("视频上传完毕")
+        return True
 
     async def set_schedule_publish(self, page, publish_date):
         while True:
@@ -211,7 +196,6 @@ class BaiJiaHaoVideo(object):
             try:
                 await schedule_element.click()
                 await page.wait_for_selector('div.select-wrap:visible', timeout=3000)
-                await page.wait_for_timeout(timeout=2000)
                 baijiahao_logger.info("开始点击发布定时...")
                 await self.set_schedule_time(page, publish_date)
                 break
@@ -272,7 +256,6 @@ class BaiJiaHaoVideo(object):
 
         # 点击"全网"标签
         await page.locator('div.rounded-lg.border:has-text("全网")').click()
-        await asyncio.sleep(1)  # 这里延迟是为了方便眼睛直观的观看
 
         # 点击 "上传视频" 按钮
         # await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
@@ -332,153 +315,113 @@ class BaiJiaHaoVideo(object):
                 # await page.wait_for_timeout(30000)
                 print(f"[等待完成] {title}")
                 
-                # 监听"一键成片"按钮
+                # 等待"一键成片"按钮可点击
                 print(f"[开始监听] 一键成片按钮")
-                should_exit_while_loop = False  # 添加标志变量
-                while True:
-                    # 定位"一键成片"按钮
-                    one_key_button = page.locator("button:has-text('一键成片')")
-                    
-                    # 检查按钮是否存在
-                    if await one_key_button.count() > 0:
-                        # 检查按钮是否有disabled属性
-                        is_disabled = await one_key_button.get_attribute("disabled")
-                        
-                        if is_disabled is None:
-                            # 按钮不再被禁用，点击它
-                            print(f"[发现可点击按钮] 一键成片")
-                            await one_key_button.click()  # 先点击一键成片按钮
-                            
-                            # 等待可能出现的"温馨提示"窗口
-                            print(f"[检查] 是否出现温馨提示窗口")
-                            await page.wait_for_timeout(2000)  # 等待2秒，让窗口有时间显示
-                            
+                one_key_button = page.locator("button:has-text('一键成片')")
+                await enabled(one_key_button, UPLOAD_TIMEOUT)
+                print(f"[发现可点击按钮] 一键成片")
+                # 点击前记录页面数，用于判断是否打开了新标签页
+                current_page_count = len(context.pages)
+                await one_key_button.click()  # 先点击一键成片按钮
+
+                # 等待可能出现的"温馨提示"窗口
+                print(f"[检查] 是否出现温馨提示窗口")
+                try:
+                    # 检查是否存在"温馨提示"窗口，设置较短的超时时间
+                    tip_window = page.locator("div:has-text('温馨提示') >> visible=true")
+                    if await appears(tip_window, 2000):
+                        print(f"[发现] 温馨提示窗口")
+
+                        # 定位并点击"知道了"按钮，设置较短的超时时间
+                        know_button = page.locator("button:has-text('知道了')")
+                        if await know_button.count() > 0:
                             try:
-                                # 检查是否存在"温馨提示"窗口，设置较短的超时时间
-                                tip_window = page.locator("div:has-text('温馨提示') >> visible=true")
-                                if await tip_window.count() > 0:
-                                    print(f"[发现] 温馨提示窗口")
-                                    
-                                    # 定位并点击"知道了"按钮，设置较短的超时时间
-                                    know_button = page.locator("button:has-text('知道了')")
-                                    if await know_button.count() > 0:
-                                        try:
-                                            # 设置较短的超时时间进行点击
-                                            await know_button.click(timeout=5000)
-                                            print(f"[已点击] 知道了按钮")
-                                        except Exception as e:
-                                            print(f"[警告] 点击知道了按钮时出错: {str(e)}")
-                                    else:
-                                        print(f"[警告] 未找到知道了按钮")
-                                else:
-                                    print(f"[信息] 未出现温馨提示窗口，继续执行")
+                                # 设置较短的超时时间进行点击
+                                await know_button.click(timeout=5000)
+                                print(f"[已点击] 知道了按钮")
                             except Exception as e:
-                                print(f"[警告] 处理温馨提示窗口时出错: {str(e)}")
-                                # 继续执行，不要因为这个错误中断流程
-                                
-                            # 记录到LocalStorage前打印日志
-                            print(f"[开始记录] 准备将标题 '{title}' 记录到LocalStorage")
-                            
-                            # 记录到LocalStorage
-                            await page.evaluate(
-                                f"""
-                                        (title, processedKey, batchKey) => {{
-                                            // 更新已处理列表
-                                            const processedList = JSON.parse(localStorage.getItem(processedKey) || "[]");
-                                            if (!processedList.includes(title)) {{
-                                                processedList.push(title);
-                                                localStorage.setItem(processedKey, JSON.stringify(processedList));
-                                            }}
-
-                                            // 更新当前批次记录
-                                            const batchList = JSON.parse(localStorage.getItem(batchKey) || "[]");
-                                            if (!batchList.includes(title)) {{
-                                                batchList.push(title);
-                                                localStorage.setItem(batchKey, JSON.stringify(batchList));
-                                            }}
-                                        }}
-                                        """,
-                                title, processed_key, batch_key
-                            )
-                            
-                            # 记录完成后打印日志
-                            print(f"[记录完成] 标题 '{title}' 已成功记录到LocalStorage")
-
-                            print(f"[记录完成] {title}")
-                            
-                            # 监听新打开的标签页
-                            print(f"[监听] 等待新标签页打开")
-                            # 获取当前所有页面
-                            current_pages = context.pages
-                            current_page_count = len(current_pages)
-                            
-                            # 等待新标签页打开（最多等待10秒）
-                            new_page = None
-                            max_wait_time = 10  # 最大等待时间（秒）
-                            start_time = time.time()
-                            
-                            while time.time() - start_time < max_wait_time:
-                                # 获取最新的页面列表
-                                pages = context.pages
-                                # 如果页面数量增加，说明新标签页已打开
-                                if len(pages) > current_page_count:
-                                    # 获取最新打开的页面（通常是列表中的最后一个）
-                                    new_page = pages[-1]
-                                    print(f"[发现] 新标签页已打开")
-                                    break
-                                # 短暂等待后再次检查
-                                await asyncio.sleep(0.5)
-                            
-                            # 如果找到新标签页，获取其标题和URL并保存
-                            if new_page:
-                                # 等待页面加载完成
-                                try:
-                                    await new_page.wait_for_load_state("domcontentloaded", timeout=5000)
-                                    # 获取页面标题和URL
-                                    page_title = await new_page.title()
-                                    page_url = new_page.url
-                                    
-                                    print(f"[获取] 标题: {page_title}")
-                                    print(f"[获取] URL: {page_url}")
-                                    
-                                    # 将标题和URL保存到url.txt文件
-                                    with open("url.txt", "a", encoding="utf-8") as f:
-                                        f.write(f"{page_title}\n{page_url}\n\n")
-                                    
-                                    print(f"[保存] 标题和URL已保存到url.txt")
-                                    
-                                    # 等待5秒后关闭新标签页
-                                    print(f"[等待] 5秒后将关闭新标签页")
-                                    await asyncio.sleep(5)
-                                    await new_page.close()
-                                    print(f"[关闭] 新标签页已关闭")
-                                except Exception as e:
-                                    print(f"[错误] 处理新标签页时出错: {str(e)}")
-                                    try:
-                                        # 尝试关闭页面，即使出错
-                                        await new_page.close()
-                                        print(f"[关闭] 新标签页已关闭（出错后）")
-                                    except:
-                                        pass
-                            else:
-                                print(f"[警告] 未检测到新标签页打开")
-                            
-                            # 跳出整个while循环
-                            print(f"[操作] 跳出所有循环，不再处理其他新闻")
-                            should_exit_while_loop = True  # 设置标志变量
-                            break  # 跳出while循环
-                    
-                    # 检查是否需要跳出while循环
-                    if should_exit_while_loop:
-                        break
-                        
-                    # 每秒检查一次按钮状态
-                    await page.wait_for_timeout(1000)
-                
-                # 检查是否需要跳出for循环
-                if should_exit_while_loop:
-                    print(f"[操作] 跳出for循环，完全结束处理")
-                    break  # 跳出for循环
+                                print(f"[警告] 点击知道了按钮时出错: {str(e)}")
+                        else:
+                            print(f"[警告] 未找到知道了按钮")
+                    else:
+                        print(f"[信息] 未出现温馨提示窗口，继续执行")
+                except Exception as e:
+                    print(f"[警告] 处理温馨提示窗口时出错: {str(e)}")
+                    # 继续执行，不要因为这个错误中断流程
+
+                # 记录到LocalStorage前打印日志
+                print(f"[开始记录] 准备将标题 '{title}' 记录到LocalStorage")
+
+                # 记录到LocalStorage
+                await page.evaluate(
+                    f"""
+                            (title, processedKey, batchKey) => {{
+                                // 更新已处理列表
+                                const processedList = JSON.parse(localStorage.getItem(processedKey) || "[]");
+                                if (!processedList.includes(title)) {{
+                                    processedList.push(title);
+                                    localStorage.setItem(processedKey, JSON.stringify(processedList));
+                                }}
+
+                                // 更新当前批次记录
+                                const batchList = JSON.parse(localStorage.getItem(batchKey) || "[]");
+                                if (!batchList.includes(title)) {{
+                                    batchList.push(title);
+                                    localStorage.setItem(batchKey, JSON.stringify(batchList));
+                                }}
+                            }}
+                            """,
+                    title, processed_key, batch_key
+                )
+
+                # 记录完成后打印日志
+                print(f"[记录完成] 标题 '{title}' 已成功记录到LocalStorage")
+
+                print(f"[记录完成] {title}")
+
+                # 监听新打开的标签页（最多等待10秒）
+                print(f"[监听] 等待新标签页打开")
+                new_page = None
+                if len(context.pages) > current_page_count:
+                    new_page = context.pages[-1]
+                else:
+                    try:
+                        new_page = await context.wait_for_event("page", timeout=10000)
+                    except PlaywrightTimeoutError:
+                        pass
+
+                # 如果找到新标签页，获取其标题和URL并保存
+                if new_page:
+                    print(f"[发现] 新标签页已打开")
+                    # 等待页面加载完成
+                    try:
+                        await new_page.wait_for_load_state("domcontentloaded", timeout=5000)
+                        # 获取页面标题和URL
+                        page_title = await new_page.title()
+                        page_url = new_page.url
+
+                        print(f"[获取] 标题: {page_title}")
+                        print(f"[获取] URL: {page_url}")
+
+                        # 将标题和URL保存到url.txt文件
+                        with open("url.txt", "a", encoding="utf-8") as f:
+                            f.write(f"{page_title}\n{page_url}\n\n")
+
+                        print(f"[保存] 标题和URL已保存到url.txt")
+                    except Exception as e:
+                        print(f"[错误] 处理新标签页时出错: {str(e)}")
+                    finally:
+                        try:
+                            await new_page.close()
+                            print(f"[关闭] 新标签页已关闭")
+                        except:
+                            pass
+                else:
+                    print(f"[警告] 未检测到新标签页打开")
+
+                # 只处理一条新闻
+                print(f"[操作] 跳出for循环，完全结束处理")
+                break
             except Exception as e:
                 print(f"处理新闻时出错: {str(e)}")
                 continue
@@ -488,13 +431,9 @@ class BaiJiaHaoVideo(object):
 
         print(f"[循环完成] 准备关闭浏览器")
 
-        # 暂停 1000s
-        await asyncio.sleep(1000)  # 这里延迟是为了方便眼睛直观的观看
-
         # 退出前保存 storage 信息
         await context.storage_state(path=self.account_file)  # 保存cookie
         baijiahao_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
         # 关闭浏览器上下文和浏览器实例
         await context.close()
         await browser.close()
@@ -1,8 +1,11 @@
+import asyncio
 import json
 import pathlib
 import random
 from biliup.plugins.bili_webup import BiliBili, Data
 
+from services.myUtils.launch_profile import get_upload_config
+from uploader.bilibili_uploader.upos import UposUploader
 from utils.log import bilibili_logger
 
 
@@ -40,7 +43,8 @@ def random_emoji():
 
 
 class BilibiliUploader(object):
-    def __init__(self, cookie_data, file: pathlib.Path, title, desc, tid, tags, dtime):
+    def __init__(self, cookie_data, file: pathlib.Path, title, desc, tid, tags, dtime, progress_callback=None,
+                 upload_mode=None):
         self.upload_thread_num = 3
         self.copyright = 1
         self.lines = 'AUTO'
@@ -51,6 +55,11 @@ class BilibiliUploader(object):
         self.tid = tid
         self.tags = tags
         self.dtime = dtime
+        # progress_callback(已上传字节数, 总字节数)，只在adaptive模式下调用
+        self.progress_callback = progress_callback
+        # adaptive：线路测速缓存、分片并发数自适应、断点续传；biliup：biliup固定线程数上传
+        # 未指定时按social_upload.providers.bilibili.upload_mode配置
+        self.upload_mode = upload_mode or get_upload_config("bilibili").get("upload_mode", "biliup")
         self._init_data()
 
     def _init_data(self):
@@ -63,17 +72,38 @@ class BilibiliUploader(object):
         self.data.dtime = self.dtime
 
     def upload(self):
+        if self.upload_mode == "adaptive":
+            return asyncio.run(self.upload_async())
         with BiliBili(self.data) as bili:
-            bili.login_by_cookies(self.cookie_data)
-            bili.access_token = self.cookie_data.get('access_token')
+            self._login(bili)
             video_part = bili.upload_file(str(self.file), lines=self.lines,
                                           tasks=self.upload_thread_num)  # 上传视频，默认线路AUTO自动选择，线程数量3。
-            video_part['title'] = self.title
-            self.data.append(video_part)
-            ret = bili.submit()  # 提交视频
-            if ret.get('code') == 0:
-                bilibili_logger.success(f'[+] {self.file.name}上传 成功')
-                return True
-            else:
-                bilibili_logger.error(f'[-] {self.file.name}上传 失败, error messge: {ret.get("message")}')
-                return False
+            return self._submit(bili, video_part)
+
+    async def upload_async(self):
+        """在事件循环中上传：adaptive模式分片上传后提交稿件，biliup模式在线程中执行"""
+        if self.upload_mode != "adaptive":
+            return await asyncio.to_thread(self.upload)
+        uploader = UposUploader(self.cookie_data, progress_callback=self.progress_callback)
+        video_part = await uploader.upload(pathlib.Path(self.file))
+        return await asyncio.to_thread(self._submit_part, video_part)
+
+    def _login(self, bili):
+        bili.login_by_cookies(self.cookie_data)
+        bili.access_token = self.cookie_data.get('access_token')
+
+    def _submit_part(self, video_part):
+        with BiliBili(self.data) as bili:
+            self._login(bili)
+            return self._submit(bili, video_part)
+
+    def _submit(self, bili, video_part):
+        video_part['title'] = self.title
+        self.data.append(video_part)
+        ret = bili.submit()  # 提交视频
+        if ret.get('code') == 0:
+            bilibili_logger.success(f'[+] {self.file.name}上传 成功')
+            return True
+        else:
+            bilibili_logger.error(f'[-] {self.file.name}上传 失败, error messge: {ret.get("message")}')
+            return False
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+B站视频分片上传（upos）- 线路按缓存的测速结果选择，分片并发数根据实测吞吐量自动调整；
+分片进度保存在本地，中断后重新上传同一文件时从已完成的分片继续
+"""
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qsl
+
+import httpx
+
+from conf import BASE_DIR
+from uploader.chunked_upload import (SESSION_REJECTED_STATUS, UploadSessionExpired, check_throttled, gather_chunks,
+                                     read_chunk, resumable_upload, save_state, state_path)
+from utils.log import bilibili_logger
+
+PREUPLOAD_URL = "https://member.bilibili.com/preupload"
+
+UPLOAD_DIR = Path(BASE_DIR / "cookies" / "bilibili_uploader")
+STATE_DIR = UPLOAD_DIR / "upload_state"
+LINE_CACHE_PATH = UPLOAD_DIR / "line_probe.json"
+
+# 线路测速结果的缓存时间（秒）
+LINE_CACHE_TTL = 6 * 3600
+# 测速上传的数据量
+PROBE_BYTES = 256 * 1024
+# 上传地址的授权有效期有限，超过该时间（秒）的进度不再续传
+RESUME_TTL = 2 * 3600
+
+INITIAL_CONCURRENCY = 3
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+# 吞吐量测量窗口（秒）
+MEASURE_WINDOW = 5.0
+CHUNK_RETRIES = 3
+
+# (已上传字节数, 总字节数)
+ProgressCallback = Callable[[int, int], None]
+
+
+class AdaptiveConcurrency:
+    """根据实测吞吐量调整并发数
+
+    每个测量窗口结束时与上一个窗口比较：吞吐量明显提升则沿同一方向继续调整，明显下降则反向，
+    变化不大时保持当前并发数（上行带宽已占满）。
+    """
+
+    def __init__(self, initial: int = INITIAL_CONCURRENCY, minimum: int = MIN_CONCURRENCY,
+                 maximum: int = MAX_CONCURRENCY, window: float = MEASURE_WINDOW):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(maximum, initial))
+        self.window = window
+        self.active = 0
+        self._cond = asyncio.Condition()
+        self._direction = 1
+        self._last_rate: Optional[float] = None
+        self._window_started = time.perf_counter()
+        self._window_bytes = 0
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self, transferred: int):
+        async with self._cond:
+            self.active -= 1
+            self._record(transferred)
+            self._cond.notify_all()
+
+    def _record(self, transferred: int):
+        self._window_bytes += transferred
+        elapsed = time.perf_counter() - self._window_started
+        if elapsed < self.window:
+            return
+        rate = self._window_bytes / elapsed
+        self._window_started = time.perf_counter()
+        self._window_bytes = 0
+
+        last_rate, self._last_rate = self._last_rate, rate
+        if last_rate is not None:
+            if rate < last_rate * 0.95:
+                self._direction = -self._direction
+            elif rate <= last_rate * 1.05:
+                return
+        limit = self.limit + self._direction
+        if not self.minimum <= limit <= self.maximum:
+            self._direction = -self._direction
+            return
+        bilibili_logger.info(f"[-] 上传速度 {rate / 1024 / 1024:.2f}MB/s，并发数 {self.limit} -> {limit}")
+        self.limit = limit
+
+
+class UposUploader:
+    """B站upos分片上传
+
+    cookie_data为extract_keys_from_json得到的登录信息；progress_callback在每个分片完成后调用。
+    """
+
+    def __init__(self, cookie_data: Dict[str, str], progress_callback: Optional[ProgressCallback] = None,
+                 initial_concurrency: int = INITIAL_CONCURRENCY, max_concurrency: int = MAX_CONCURRENCY):
+        self.cookies = {k: v for k, v in cookie_data.items() if k != "access_token"}
+        self.progress_callback = progress_callback
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+
+    # 线路选择
+
+    @staticmethod
+    def _load_line_cache() -> Optional[Dict[str, Any]]:
+        try:
+            with open(LINE_CACHE_PATH, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - cache.get("probed_at", 0) > LINE_CACHE_TTL:
+            return None
+        return cache
+
+    async def select_line(self, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """选择上传线路：使用缓存的测速结果，过期后重新测速"""
+        cache = self._load_line_cache()
+        if cache is not None:
+            return cache["line"]
+
+        probe = (await client.get(PREUPLOAD_URL, params={"r": "probe"})).json()
+        payload = bytes(PROBE_BYTES)
+
+        async def measure(line: Dict[str, Any]) -> float:
+            started = time.perf_counter()
+            try:
+                resp = await client.put(f"https:{line['probe_url']}", content=payload, timeout=15)
+                resp.raise_for_status()
+            except httpx.HTTPError:
+                return float("inf")
+            return time.perf_counter() - started
+
+        lines = probe["lines"]
+        durations = await asyncio.gather(*(measure(line) for line in lines))
+        results = {line["query"]: duration for line, duration in zip(lines, durations)}
+        line = lines[durations.index(min(durations))]
+        bilibili_logger.info(f"[-] 线路测速完成，选择 {line['query']}（{min(durations):.2f}s）")
+
+        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        with open(LINE_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"probed_at": time.time(), "line": line,
+                       "results": {k: (v if v != float("inf") else None) for k, v in results.items()}}, f)
+        return line
+
+    async def _new_state(self, client: httpx.AsyncClient, file: Path, size: int) -> Dict[str, Any]:
+        """预上传并初始化分片上传"""
+        line = await self.select_line(client)
+        resp = await client.get(PREUPLOAD_URL, params={
+            "name": file.name, "size": size, "r": line.get("os", "upos"), "profile": "ugcupos/bup",
+            "ssl": 0, "version": "2.14.0", "build": 2140000, **dict(parse_qsl(line.get("query", ""))),
+        })
+        check_throttled(resp.status_code, "预上传")
+        ret = resp.json()
+        if ret.get("OK") != 1:
+            raise Exception(f"预上传失败: {ret}")
+
+        state = {
+            "created_at": time.time(),
+            "url": f"https:{ret['endpoint']}/{ret['upos_uri'].replace('upos://', '')}",
+            "upos_uri": ret["upos_uri"],
+            "auth": ret["auth"],
+            "biz_id": ret["biz_id"],
+            "chunk_size": ret["chunk_size"],
+            "upload_id": None,
+            "parts": [],
+        }
+        resp = await client.post(f"{state['url']}?uploads&output=json", headers={"X-Upos-Auth": state["auth"]})
+        check_throttled(resp.status_code, "初始化分片上传")
+        state["upload_id"] = resp.json()["upload_id"]
+        return state
+
+    async def _transfer(self, client: httpx.AsyncClient, state: Dict[str, Any], file: Path, size: int,
+                        path: Path):
+        chunk_size = state["chunk_size"]
+        chunks = max(1, (size + chunk_size - 1) // chunk_size)
+        done = set(state["parts"])
+        pending = [n for n in range(1, chunks + 1) if n not in done]
+        uploaded = sum(min(chunk_size, size - (n - 1) * chunk_size) for n in done)
+        if done:
+            bilibili_logger.info(f"[-] 续传：已完成{len(done)}/{chunks}个分片")
+        self._report(uploaded, size)
+
+        limiter = AdaptiveConcurrency(self.initial_concurrency, MIN_CONCURRENCY, self.max_concurrency)
+        headers = {"X-Upos-Auth": state["auth"]}
+
+        async def upload_chunk(part_number: int):
+            nonlocal uploaded
+            offset = (part_number - 1) * chunk_size
+            length = min(chunk_size, size - offset)
+            await limiter.acquire()
+            transferred = 0
+            try:
+                data = await asyncio.to_thread(read_chunk, file, offset, length)
+                params = {"partNumber": part_number, "uploadId": state["upload_id"], "chunk": part_number - 1,
+                          "chunks": chunks, "size": length, "start": offset, "end": offset + length,
+                          "total": size}
+                for attempt in range(CHUNK_RETRIES):
+                    try:
+                        resp = await client.put(state["url"], params=params, content=data, headers=headers)
+                        check_throttled(resp.status_code, f"分片{part_number}上传")
+                        if resp.status_code in SESSION_REJECTED_STATUS:
+                            raise UploadSessionExpired(f"分片{part_number}被拒绝: HTTP {resp.status_code}")
+                        resp.raise_for_status()
+                        break
+                    except httpx.HTTPError as e:
+                        if attempt == CHUNK_RETRIES - 1:
+                            raise
+                        bilibili_logger.warning(f"[-] 分片{part_number}上传失败，重试: {e}")
+                        await asyncio.sleep(2 ** attempt)
+                transferred = length
+            finally:
+                await limiter.release(transferred)
+
+            state["parts"].append(part_number)
+            save_state(path, state)
+            uploaded += length
+            self._report(uploaded, size)
+
+        await gather_chunks(upload_chunk(n) for n in pending)
+
+        resp = await client.post(state["url"], headers=headers, params={
+            "name": file.name, "uploadId": state["upload_id"], "biz_id": state["biz_id"],
+            "output": "json", "profile": "ugcupos/bup",
+        }, json={"parts": [{"partNumber": n, "eTag": "etag"} for n in range(1, chunks + 1)]})
+        check_throttled(resp.status_code, "合并分片")
+        if resp.status_code in SESSION_REJECTED_STATUS:
+            raise UploadSessionExpired(f"合并分片被拒绝: HTTP {resp.status_code}")
+        ret = resp.json()
+        if ret.get("OK") != 1:
+            raise Exception(f"合并分片失败: {ret}")
+
+    def _report(self, uploaded: int, total: int):
+        if self.progress_callback is not None:
+            self.progress_callback(uploaded, total)
+
+    async def upload(self, file: Path) -> Dict[str, str]:
+        """上传视频文件，返回可加入稿件的分P信息"""
+        file = Path(file)
+        stat = file.stat()
+        path = state_path(STATE_DIR, file, stat)
+        started = time.perf_counter()
+
+        async with httpx.AsyncClient(
+                cookies=self.cookies, timeout=httpx.Timeout(120, connect=15),
+                limits=httpx.Limits(max_connections=self.max_concurrency + 4),
+                headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                                       "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}) as client:
+            state = await resumable_upload(
+                path, RESUME_TTL, lambda: self._new_state(client, file, stat.st_size),
+                lambda state: self._transfer(client, state, file, stat.st_size, path), bilibili_logger)
+
+        path.unlink(missing_ok=True)
+        elapsed = time.perf_counter() - started
+        bilibili_logger.success(f"[+] {file.name}分片上传完成，{stat.st_size / 1024 / 1024:.1f}MB，"
+                                f"耗时 {elapsed:.1f}s")
+        return {"title": file.stem, "filename": Path(state["upos_uri"]).stem, "desc": ""}
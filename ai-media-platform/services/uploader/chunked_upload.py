@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+分片上传的公共部分 - 续传进度的保存/读取、分片读取、分片任务的并发执行
+各平台只实现申请上传地址(new_state)和上传全部分片(transfer)；服务端拒绝续传的上传id或授权时才重新开始，
+网络超时等临时错误直接抛出，保留已完成的分片供下次续传
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from services.myUtils.publish_scheduler import ThrottledError
+
+# 服务端拒绝上传id或授权时的HTTP状态码（授权过期、上传会话不存在）
+SESSION_REJECTED_STATUS = frozenset({401, 403, 404})
+# 平台限流的HTTP状态码
+THROTTLED_STATUS = 429
+
+
+class UploadSessionExpired(Exception):
+    """服务端拒绝了上传id或授权，保存的进度不能再续传"""
+
+
+def check_throttled(status_code: int, action: str):
+    """接口返回429时抛出ThrottledError，限流时重试或重新上传只会延长限流"""
+    if status_code == THROTTLED_STATUS:
+        raise ThrottledError(f"{action}被平台限流: HTTP {status_code}")
+
+
+def state_path(state_dir: Path, file: Union[str, Path], stat: os.stat_result, *extra: Any) -> Path:
+    """续传进度文件路径，文件内容变化（大小、修改时间）后不再匹配；extra为影响分片方式的参数（如分片大小）"""
+    key = "|".join(str(part) for part in (Path(file).resolve(), stat.st_size, stat.st_mtime_ns, *extra))
+    return Path(state_dir) / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+
+def load_state(path: Path, ttl: float) -> Optional[Dict[str, Any]]:
+    """读取续传进度，不存在、损坏或超过ttl（秒）时返回None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if time.time() - state.get("created_at", 0) > ttl:
+        return None
+    return state
+
+
+def save_state(path: Path, state: Dict[str, Any]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    tmp_path.replace(path)
+
+
+def read_chunk(file: Union[str, Path], offset: int, size: int) -> bytes:
+    with open(file, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+async def gather_chunks(coros: Iterable[Awaitable[Any]]):
+    """并发执行分片任务；一个分片最终失败时停止其余分片，已完成的分片保留在进度中"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def resumable_upload(path: Path, ttl: float, new_state: Callable[[], Awaitable[Dict[str, Any]]],
+                           transfer: Callable[[Dict[str, Any]], Awaitable[Any]], logger) -> Dict[str, Any]:
+    """从保存的进度续传，没有进度时通过new_state开始新的上传，返回最终的进度
+
+    续传时服务端拒绝上传id或授权（transfer抛出UploadSessionExpired）则重新开始一次；
+    其他错误直接抛出，进度文件保留，下次重试时继续续传。
+    """
+    state = load_state(path, ttl)
+    resumed = state is not None
+    if state is None:
+        state = await new_state()
+        save_state(path, state)
+    try:
+        await transfer(state)
+    except UploadSessionExpired as e:
+        if not resumed:
+            raise
+        logger.warning(f"[-] 续传的上传会话已失效，重新上传: {e}")
+        state = await new_state()
+        save_state(path, state)
+        await transfer(state)
+    return state
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+抖音视频直传 - 浏览器只提供登录态和请求签名，视频字节由连接池httpx客户端分片并发上传到视频点播
+流程：上传凭证(auth/v5) -> ApplyUploadInner -> 分片上传(init/transfer/finish) -> CommitUploadInner -> 页面内创建作品
+视频不再经过set_input_files复制进渲染进程；分片进度保存在本地，重试时从已完成的分片继续
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import string
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+
+from conf import BASE_DIR
+from services.myUtils.publish_scheduler import ThrottledError
+from uploader.chunked_upload import (SESSION_REJECTED_STATUS, UploadSessionExpired, check_throttled, gather_chunks,
+                                     read_chunk, resumable_upload, save_state, state_path)
+from utils.log import douyin_logger
+
+UPLOAD_AUTH_URL = "https://creator.douyin.com/web/api/media/upload/auth/v5/"
+CREATE_URL = "https://creator.douyin.com/web/api/media/aweme/create_v2/"
+
+VOD_HOST = "vod.bytedanceapi.com"
+VOD_REGION = "cn-north-1"
+VOD_SERVICE = "vod"
+VOD_VERSION = "2020-11-19"
+VOD_SPACE = "aweme"
+
+CHUNK_SIZE = 5 * 1024 * 1024
+CHUNK_CONCURRENCY = 4
+CHUNK_RETRIES = 3
+
+# 上传地址的授权有效期有限，超过该时间（秒）的进度不再续传
+RESUME_TTL = 3600
+STATE_DIR = Path(BASE_DIR / "cookies" / "douyin_uploader" / "upload_state")
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """直传共享的连接池客户端（在上传运行时的事件循环中使用）"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120, connect=15),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16)
+        )
+    return _http_client
+
+
+def _quote(value: Any) -> str:
+    return quote(str(value), safe="-_.~")
+
+
+def sign_vod_request(method: str, params: Dict[str, Any], body: bytes, credentials: Dict[str, str]) -> Dict[str, str]:
+    """视频点播OpenAPI的AWS4-HMAC-SHA256签名，返回需要附加的请求头"""
+    amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    headers = {
+        "x-amz-date": amz_date,
+        "x-amz-security-token": credentials["SessionToken"],
+    }
+    payload_hash = hashlib.sha256(body).hexdigest()
+    if method == "POST":
+        headers["x-amz-content-sha256"] = payload_hash
+
+    signed_headers = ";".join(sorted(headers))
+    canonical_request = "\n".join([
+        method,
+        "/",
+        "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params.items())),
+        "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+        signed_headers,
+        payload_hash,
+    ])
+    scope = f"{date}/{VOD_REGION}/{VOD_SERVICE}/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode()).hexdigest()
+    ])
+
+    key = ("AWS4" + credentials["SecretAccessKey"]).encode()
+    for part in (date, VOD_REGION, VOD_SERVICE, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    headers["authorization"] = (f"AWS4-HMAC-SHA256 Credential={credentials['AccessKeyID']}/{scope}, "
+                                f"SignedHeaders={signed_headers}, Signature={signature}")
+    return headers
+
+
+class DouyinDirectUploader:
+    """抖音视频直传
+
+    context为已登录账号的浏览器上下文，凭证接口通过context.request发送（共享cookie）；
+    作品创建在creator.douyin.com的页面内发起，由页面的安全SDK完成签名。
+    progress_callback(已上传字节数, 总字节数)在每个分片完成后调用，续传时从已完成的分片开始计算。
+    """
+
+    def __init__(self, context, chunk_size: int = CHUNK_SIZE, concurrency: int = CHUNK_CONCURRENCY,
+                 state_dir: Path = STATE_DIR, progress_callback: Optional[Callable[[int, int], Any]] = None):
+        self.context = context
+        self.chunk_size = chunk_size
+        self.concurrency = max(1, concurrency)
+        self.state_dir = Path(state_dir)
+        self.client = get_http_client()
+        self.progress_callback = progress_callback
+        self._credentials: Optional[Dict[str, str]] = None
+
+    async def _get_credentials(self) -> Dict[str, str]:
+        if self._credentials is None:
+            resp = await self.context.request.get(UPLOAD_AUTH_URL)
+            check_throttled(resp.status, "获取上传凭证")
+            data = await resp.json()
+            auth = data.get("auth")
+            if not auth:
+                raise Exception(f"获取上传凭证失败: {data.get('status_msg') or data}")
+            self._credentials = json.loads(auth) if isinstance(auth, str) else auth
+        return self._credentials
+
+    async def _vod(self, method: str, action: str, params: Optional[Dict[str, Any]] = None,
+                   payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        params = {"Action": action, "Version": VOD_VERSION, "SpaceName": VOD_SPACE, **(params or {})}
+        body = json.dumps(payload).encode() if payload is not None else b""
+        headers = sign_vod_request(method, params, body, await self._get_credentials())
+        query = "&".join(f"{_quote(k)}={_quote(v)}" for k, v in sorted(params.items()))
+        resp = await self.client.request(method, f"https://{VOD_HOST}/?{query}", content=body or None,
+                                         headers=headers)
+        check_throttled(resp.status_code, action)
+        data = resp.json()
+        error = data.get("ResponseMetadata", {}).get("Error")
+        if resp.status_code != 200 or error:
+            raise Exception(f"{action}失败: {error or resp.status_code}")
+        return data["Result"]
+
+    async def _new_state(self, size: int) -> Dict[str, Any]:
+        """申请上传地址并初始化分片上传"""
+        result = await self._vod("GET", "ApplyUploadInner", {
+            "FileType": "video", "IsInner": 1, "FileSize": size,
+            "s": "".join(random.choices(string.ascii_lowercase + string.digits, k=11)),
+        })
+        address = result["InnerUploadAddress"]["UploadNodes"][0]
+        store = address["StoreInfos"][0]
+        state = {
+            "created_at": time.time(),
+            "upload_url": f"https://{address['UploadHost']}/upload/v1/{store['StoreUri']}",
+            "store_auth": store["Auth"],
+            "session_key": address["SessionKey"],
+            "upload_id": None,
+            "parts": {},
+        }
+        data = await self._store_request(state, {"uploadmode": "part", "phase": "init"})
+        state["upload_id"] = data["uploadid"]
+        return state
+
+    async def _store_request(self, state: Dict[str, Any], params: Dict[str, Any], content: bytes = b"",
+                             headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        resp = await self.client.post(state["upload_url"], params=params, content=content,
+                                      headers={"Authorization": state["store_auth"], **(headers or {})})
+        check_throttled(resp.status_code, f"分片上传({params.get('phase')})")
+        if resp.status_code in SESSION_REJECTED_STATUS:
+            raise UploadSessionExpired(f"分片上传被拒绝({params.get('phase')}): HTTP {resp.status_code}")
+        data = resp.json()
+        if resp.status_code != 200 or data.get("code") != 2000:
+            raise Exception(f"分片上传失败({params.get('phase')}): {data.get('message') or resp.status_code}")
+        return data.get("data") or {}
+
+    def _part_size(self, size: int, part_number: int) -> int:
+        return min(self.chunk_size, size - (part_number - 1) * self.chunk_size)
+
+    def _report_progress(self, uploaded: int, size: int):
+        if self.progress_callback is not None:
+            self.progress_callback(uploaded, size)
+
+    async def _upload_part(self, state: Dict[str, Any], file_path: str, size: int, part_number: int,
+                           save):
+        offset = (part_number - 1) * self.chunk_size
+        data = await asyncio.to_thread(read_chunk, file_path, offset, self._part_size(size, part_number))
+        crc = format(zlib.crc32(data) & 0xffffffff, "08x")
+        for attempt in range(CHUNK_RETRIES):
+            try:
+                await self._store_request(
+                    state,
+                    {"uploadid": state["upload_id"], "part_number": part_number, "part_offset": offset,
+                     "phase": "transfer"},
+                    content=data,
+                    headers={"Content-CRC32": crc, "Content-Type": "application/octet-stream"},
+                )
+                break
+            except (UploadSessionExpired, ThrottledError):
+                raise
+            except Exception as e:
+                if attempt == CHUNK_RETRIES - 1:
+                    raise
+                douyin_logger.warning(f"  [-] 分片{part_number}上传失败，重试: {e}")
+                await asyncio.sleep(2 ** attempt)
+        state["parts"][str(part_number)] = crc
+        save()
+
+    async def _transfer(self, state: Dict[str, Any], file_path: str, size: int, path: Path):
+        part_count = max(1, (size + self.chunk_size - 1) // self.chunk_size)
+        pending = [n for n in range(1, part_count + 1) if str(n) not in state["parts"]]
+        if len(pending) < part_count:
+            douyin_logger.info(f"  [-] 续传：已完成{part_count - len(pending)}/{part_count}个分片")
+        uploaded = sum(self._part_size(size, int(n)) for n in state["parts"])
+        self._report_progress(uploaded, size)
+
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run(part_number: int):
+            nonlocal uploaded
+            async with slots:
+                await self._upload_part(state, file_path, size, part_number,
+                                        lambda: save_state(path, state))
+            uploaded += self._part_size(size, part_number)
+            self._report_progress(uploaded, size)
+
+        await gather_chunks(run(n) for n in pending)
+        await self._store_request(
+            state, {"uploadid": state["upload_id"], "phase": "finish", "uploadmode": "part"},
+            content=",".join(f"{n}:{state['parts'][str(n)]}" for n in range(1, part_count + 1)).encode(),
+        )
+
+    async def upload(self, file_path: str) -> Dict[str, Any]:
+        """上传视频文件，返回 {"vid", "poster_uri", "meta"}"""
+        stat = os.stat(file_path)
+        path = state_path(self.state_dir, file_path, stat, self.chunk_size)
+        started = time.perf_counter()
+
+        state = await resumable_upload(
+            path, RESUME_TTL, lambda: self._new_state(stat.st_size),
+            lambda state: self._transfer(state, file_path, stat.st_size, path), douyin_logger)
+
+        result = await self._vod("POST", "CommitUploadInner", payload={
+            "SessionKey": state["session_key"],
+            "Functions": [{"name": "GetMeta"}, {"name": "Snapshot", "input": {"SnapshotTime": 0}}],
+        })
+        path.unlink(missing_ok=True)
+
+        video = result["Results"][0]
+        douyin_logger.success(f"  [-] 视频直传完成: {stat.st_size / 1024 / 1024:.1f}MB，"
+                              f"耗时 {time.perf_counter() - started:.1f}s")
+        return {"vid": video["Vid"], "poster_uri": video.get("PosterUri", ""), "meta": video.get("VideoMeta", {})}
+
+    @staticmethod
+    def _caption(title: str, tags: List[str]):
+        """作品描述和话题位置信息"""
+        text = title
+        text_extra = []
+        for tag in tags:
+            text += " "
+            start = len(text)
+            text += f"#{tag}"
+            text_extra.append({"start": start, "end": len(text), "type": 1, "hashtag_name": tag,
+                               "hashtag_id": "0", "user_id": "", "caption_start": start, "caption_end": len(text)})
+        return text, text_extra
+
+    async def create_aweme(self, page, video: Dict[str, Any], title: str, tags: List[str],
+                           publish_date=0) -> Dict[str, Any]:
+        """在页面内创建作品；page需停留在creator.douyin.com，请求由页面的安全SDK签名"""
+        text, text_extra = self._caption(title, tags)
+        payload = {
+            "item": {
+                "common": {
+                    "text": text,
+                    "text_extra": json.dumps(text_extra, ensure_ascii=False),
+                    "item_title": title[:30],
+                    "activity": "[]",
+                    "challenges": "[]",
+                    "mentions": "[]",
+                    "hashtag_source": "",
+                    "timing": int(publish_date.timestamp()) if publish_date else 0,
+                    "visibility_type": 0,
+                    "download": 1,
+                    "creation_id": "".join(random.choices(string.ascii_lowercase + string.digits, k=8))
+                                   + str(int(time.time() * 1000)),
+                    "media_type": 4,
+                    "video_id": video["vid"],
+                },
+                "cover": {"poster": video["poster_uri"], "poster_delay": 0},
+            }
+        }
+        resp = await page.evaluate("""async ({url, payload}) => {
+            const resp = await fetch(url, {
+                method: "POST",
+                credentials: "include",
+                headers: {"content-type": "application/json"},
+                body: JSON.stringify(payload),
+            });
+            return {status: resp.status, text: await resp.text()};
+        }""", {"url": CREATE_URL, "payload": payload})
+        check_throttled(resp["status"], "创建作品")
+        try:
+            data = json.loads(resp["text"])
+        except json.JSONDecodeError:
+            raise Exception(f"创建作品失败: HTTP {resp['status']}")
+        if data.get("status_code") != 0:
+            raise Exception(f"创建作品失败: {data.get('status_msg') or data}")
+        return data
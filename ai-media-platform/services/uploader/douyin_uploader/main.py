@@ -3,9 +3,12 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright, Page
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH
+from services.myUtils.launch_profile import get_launch_profile, get_upload_config
+from uploader.douyin_uploader.direct_upload import DouyinDirectUploader
+from uploader.waits import (UPLOAD_TIMEOUT, click_until_url, first_of, response, throttle_toast, url_matches, visible,
+                           wait_for_upload)
 from utils.base_social_media import set_init_script
 from utils.log import douyin_logger
 
@@ -64,7 +67,8 @@ async def douyin_cookie_gen(account_file):
 
 
 class DouYinVideo(object):
-    def __init__(self, title, file_path, tags, publish_date: datetime, account_file, thumbnail_path=None):
+    def __init__(self, title, file_path, tags, publish_date: datetime, account_file, thumbnail_path=None,
+                 direct_upload=None, progress_callback=None):
         self.title = title  # 视频标题
         self.file_path = file_path
         self.tags = tags
@@ -73,75 +77,71 @@ class DouYinVideo(object):
         self.date_format = '%Y年%m月%d日 %H:%M'
         self.local_executable_path = LOCAL_CHROME_PATH
         self.thumbnail_path = thumbnail_path
+        # 直传模式：视频字节走HTTP分片上传，未指定时按social_upload.providers.douyin.upload_mode配置
+        if direct_upload is None:
+            direct_upload = get_upload_config("douyin").get("upload_mode") == "direct"
+        self.direct_upload = direct_upload
+        # progress_callback(已上传字节数, 总字节数)，只在直传模式下调用
+        self.progress_callback = progress_callback
 
     async def set_schedule_time_douyin(self, page, publish_date):
         # 选择包含特定文本内容的 label 元素
         label_element = page.locator("[class^='radio']:has-text('定时发布')")
         # 在选中的 label 元素下点击 checkbox
         await label_element.click()
-        await asyncio.sleep(1)
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
 
-        await asyncio.sleep(1)
+        # 日期输入框在选中定时发布后出现，click会自动等待
         await page.locator('.semi-input[placeholder="日期和时间"]').click()
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
 
-        await asyncio.sleep(1)
-
     async def handle_upload_error(self, page):
         douyin_logger.info('视频出错了，重新上传中')
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=False)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-        douyin_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        douyin_logger.info(f'[-] 正在打开主页...')
-        await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
+    async def upload(self, playwright: Playwright, browser=None) -> None:
+        """执行上传；browser为上传运行时的共享浏览器，为空时自行启动"""
+        # 在浏览器上新建上下文（使用指定的 cookie 文件），是否无头和资源拦截按平台配置
+        profile = get_launch_profile("douyin")
+        async with profile.open_context(playwright, browser, self.local_executable_path,
+                                        storage_state=f"{self.account_file}") as context:
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 访问指定的 URL
+            await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+            douyin_logger.info(f'[+]正在上传-------{self.title}.mp4')
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            douyin_logger.info(f'[-] 正在打开主页...')
+            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload")
+            # 自定义封面需要页面内的封面编辑器，只在页面上传模式中支持
+            if self.direct_upload and not self.thumbnail_path:
+                await self.publish_direct(context, page)
+            else:
+                await self.publish_in_page(page)
+
+            await context.storage_state(path=self.account_file)  # 保存cookie
+            douyin_logger.success('  [-]cookie更新完毕！')
+    
+    async def publish_in_page(self, page: Page):
+        """在上传页面中选择文件、填写信息并发布"""
         # 点击 "上传视频" 按钮
         await page.locator("div[class^='container'] input").set_input_files(self.file_path)
 
         # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 尝试等待第一个 URL
-                await page.wait_for_url(
-                    "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page", timeout=3000)
-                douyin_logger.info("[+] 成功进入version_1发布页面!")
-                break  # 成功进入页面后跳出循环
-            except Exception:
-                try:
-                    # 如果第一个 URL 超时，再尝试等待第二个 URL
-                    await page.wait_for_url(
-                        "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
-                        timeout=3000)
-                    douyin_logger.info("[+] 成功进入version_2发布页面!")
-
-                    break  # 成功进入页面后跳出循环
-                except:
-                    print("  [-] 超时未进入视频发布页面，重新尝试...")
-                    await asyncio.sleep(0.5)  # 等待 0.5 秒后重新尝试
+        await url_matches(page,
+                          "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page",
+                          "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
+                          timeout=UPLOAD_TIMEOUT)
+        douyin_logger.info("[+] 成功进入发布页面!")
         # 填充标题和话题
         # 检查是否存在包含输入框的元素
         # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
         douyin_logger.info(f'  [-] 正在填充标题和话题...')
         title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
-        if await title_container.count():
+        # 等待标题输入框或旧版的标题编辑器渲染出来
+        if await first_of(visible(title_container), visible(page.locator(".notranslate"))) == 0:
             await title_container.fill(self.title[:30])
         else:
             titlecontainer = page.locator(".notranslate")
@@ -157,25 +157,19 @@ class DouYinVideo(object):
             await page.press(css_selector, "Space")
         douyin_logger.info(f'总共添加{len(self.tags)}个话题')
 
-        while True:
-            # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
-            try:
-                #  新版：定位重新上传
-                number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-                if number > 0:
-                    douyin_logger.success("  [-]视频上传完毕")
-                    break
-                else:
-                    douyin_logger.info("  [-] 正在上传视频中...")
-                    await asyncio.sleep(2)
-
-                    if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-                        douyin_logger.error("  [-] 发现上传出错了... 准备重试")
-                        await self.handle_upload_error(page)
-            except:
-                douyin_logger.info("  [-] 正在上传视频中...")
-                await asyncio.sleep(2)
-        
+        # 上传完成的标志：出现"重新上传"按钮，或视频点播的提交接口返回
+        douyin_logger.info("  [-] 正在上传视频中...")
+        reupload_button = page.locator('[class^="long-card"] div:has-text("重新上传")')
+        upload_done = await wait_for_upload(
+            lambda: first_of(visible(reupload_button, UPLOAD_TIMEOUT), response(page, r"Action=CommitUpload")),
+            failed=page.locator('div.progress-div > div:has-text("上传失败")'),
+            retry=lambda: self.handle_upload_error(page),
+            throttled=throttle_toast(page),
+        )
+        if not upload_done:
+            raise Exception("视频上传失败")
+        douyin_logger.success("  [-]视频上传完毕")
+
         #上传视频封面
         await self.set_thumbnail(page, self.thumbnail_path)
 
@@ -193,38 +187,28 @@ class DouYinVideo(object):
         if self.publish_date != 0:
             await self.set_schedule_time_douyin(page, self.publish_date)
 
-        # 判断视频是否发布成功
-        while True:
-            # 判断视频是否发布成功
-            try:
-                publish_button = page.get_by_role('button', name="发布", exact=True)
-                if await publish_button.count():
-                    await publish_button.click()
-                await page.wait_for_url("https://creator.douyin.com/creator-micro/content/manage**",
-                                        timeout=3000)  # 如果自动跳转到作品页面，则代表发布成功
-                douyin_logger.success("  [-]视频发布成功")
-                break
-            except:
-                douyin_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        douyin_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
-    
+        # 点击发布，自动跳转到作品页面则代表发布成功
+        douyin_logger.info("  [-] 视频正在发布中...")
+        await click_until_url(page, page.get_by_role('button', name="发布", exact=True),
+                              "https://creator.douyin.com/creator-micro/content/manage*")
+        douyin_logger.success("  [-]视频发布成功")
+
+    async def publish_direct(self, context, page: Page):
+        """直传模式：视频分片直传到视频点播，再在页面内创建作品"""
+        douyin_logger.info("  [-] 直传模式，正在分片上传视频...")
+        uploader = DouyinDirectUploader(context, progress_callback=self.progress_callback)
+        video = await uploader.upload(self.file_path)
+        await uploader.create_aweme(page, video, self.title, self.tags, self.publish_date)
+        douyin_logger.success("  [-]视频发布成功")
+
     async def set_thumbnail(self, page: Page, thumbnail_path: str):
         if thumbnail_path:
             await page.click('text="选择封面"')
             await page.wait_for_selector("div.semi-modal-content:visible")
             await page.click('text="设置竖封面"')
-            await page.wait_for_timeout(2000)  # 等待2秒
-            # 定位到上传区域并点击
+            # 定位到上传区域并点击，set_input_files会等待上传控件出现
             await page.locator("div[class^='semi-upload upload'] >> input.semi-upload-hidden-input").set_input_files(thumbnail_path)
-            await page.wait_for_timeout(2000)  # 等待2秒
+            # 封面处理完成后"完成"按钮才可用，click会等待按钮可见且可用
             await page.locator("div[class^='extractFooter'] button:visible:has-text('完成')").click()
             # finish_confirm_element = page.locator("div[class^='confirmBtn'] >> div:has-text('完成')")
             # if await finish_confirm_element.count():
@@ -237,7 +221,6 @@ class DouYinVideo(object):
         #     "div.semi-select-single").nth(0).click()
         await page.locator('div.semi-select span:has-text("输入地理位置")').click()
         await page.keyboard.press("Backspace")
-        await page.wait_for_timeout(2000)
         await page.keyboard.type(location)
         await page.wait_for_selector('div[role="listbox"] [role="option"]', timeout=5000)
         await page.locator('div[role="listbox"] [role="option"]').first.click()
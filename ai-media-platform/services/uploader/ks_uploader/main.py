@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright
+from playwright.async_api import Playwright, async_playwright, TimeoutError as PlaywrightTimeoutError
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH
+from services.myUtils.launch_profile import get_launch_profile
+from uploader.waits import appears, click_until_url, first_of, hidden, visible
 from utils.base_social_media import set_init_script
 from utils.files_times import get_absolute_path
 from utils.log import kuaishou_logger
@@ -75,122 +76,77 @@ class KSVideo(object):
         kuaishou_logger.error("视频出错了，重新上传中")
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
+    async def upload(self, playwright: Playwright, browser=None) -> None:
+        """执行上传；browser为上传运行时的共享浏览器，为空时自行启动"""
+        # 在浏览器上新建上下文（使用指定的 cookie 文件），是否无头和资源拦截按平台配置
         print(self.local_executable_path)
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(
-                headless=False,
-                executable_path=self.local_executable_path,
-            )
-        else:
-            browser = await playwright.chromium.launch(
-                headless=False
-            )  # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://cp.kuaishou.com/article/publish/video")
-        kuaishou_logger.info('正在上传-------{}.mp4'.format(self.title))
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        kuaishou_logger.info('正在打开主页...')
-        await page.wait_for_url("https://cp.kuaishou.com/article/publish/video")
-        # 点击 "上传视频" 按钮
-        upload_button = page.locator("button[class^='_upload-btn']")
-        await upload_button.wait_for(state='visible')  # 确保按钮可见
-
-        async with page.expect_file_chooser() as fc_info:
-            await upload_button.click()
-        file_chooser = await fc_info.value
-        await file_chooser.set_files(self.file_path)
-
-        await asyncio.sleep(2)
-
-        # if not await page.get_by_text("封面编辑").count():
-        #     raise Exception("似乎没有跳转到到编辑页面")
-
-        await asyncio.sleep(1)
-
-        # 等待按钮可交互
-        new_feature_button = page.locator('button[type="button"] span:text("我知道了")')
-        if await new_feature_button.count() > 0:
-            await new_feature_button.click()
-
-        kuaishou_logger.info("正在填充标题和话题...")
-        await page.get_by_text("描述").locator("xpath=following-sibling::div").click()
-        kuaishou_logger.info("clear existing title")
-        await page.keyboard.press("Backspace")
-        await page.keyboard.press("Control+KeyA")
-        await page.keyboard.press("Delete")
-        kuaishou_logger.info("filling new  title")
-        await page.keyboard.type(self.title)
-        await page.keyboard.press("Enter")
+        profile = get_launch_profile("kuaishou")
+        async with profile.open_context(playwright, browser, self.local_executable_path,
+                                        storage_state=f"{self.account_file}") as context:
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 访问指定的 URL
+            await page.goto("https://cp.kuaishou.com/article/publish/video")
+            kuaishou_logger.info('正在上传-------{}.mp4'.format(self.title))
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            kuaishou_logger.info('正在打开主页...')
+            await page.wait_for_url("https://cp.kuaishou.com/article/publish/video")
+            # 点击 "上传视频" 按钮
+            upload_button = page.locator("button[class^='_upload-btn']")
+            await upload_button.wait_for(state='visible')  # 确保按钮可见
+
+            async with page.expect_file_chooser() as fc_info:
+                await upload_button.click()
+            file_chooser = await fc_info.value
+            await file_chooser.set_files(self.file_path)
+
+            # if not await page.get_by_text("封面编辑").count():
+            #     raise Exception("似乎没有跳转到到编辑页面")
+
+            # 进入编辑页面后可能先弹出新功能提示，挡住描述输入框
+            new_feature_button = page.locator('button[type="button"] span:text("我知道了")')
+            description_editor = page.get_by_text("描述").locator("xpath=following-sibling::div")
+            if await first_of(visible(new_feature_button), visible(description_editor)) == 0:
+                await new_feature_button.click()
+
+            kuaishou_logger.info("正在填充标题和话题...")
+            await description_editor.click()
+            kuaishou_logger.info("clear existing title")
+            await page.keyboard.press("Backspace")
+            await page.keyboard.press("Control+KeyA")
+            await page.keyboard.press("Delete")
+            kuaishou_logger.info("filling new  title")
+            await page.keyboard.type(self.title)
+            await page.keyboard.press("Enter")
+
+            # 快手只能添加3个话题
+            for index, tag in enumerate(self.tags[:3], start=1):
+                kuaishou_logger.info("正在添加第%s个话题" % index)
+                await page.keyboard.type(f"#{tag} ")
+
+            # "上传中"提示消失代表上传完毕，最多等待 2 分钟
+            uploading = page.locator("text=上传中")
+            if await appears(uploading, 3000):
+                kuaishou_logger.info("正在上传视频中...")
+            try:
+                await hidden(uploading, timeout=120_000)
+                kuaishou_logger.success("视频上传完毕")
+            except PlaywrightTimeoutError:
+                kuaishou_logger.warning("等待超时，视频上传可能未完成。")
 
-        # 快手只能添加3个话题
-        for index, tag in enumerate(self.tags[:3], start=1):
-            kuaishou_logger.info("正在添加第%s个话题" % index)
-            await page.keyboard.type(f"#{tag} ")
-            await asyncio.sleep(2)
+            # 定时任务
+            if self.publish_date != 0:
+                await self.set_schedule_time(page, self.publish_date)
 
-        max_retries = 60  # 设置最大重试次数,最大等待时间为 2 分钟
-        retry_count = 0
+            # 点击发布（弹出确认框时点击确认发布），页面跳转到作品管理则代表发布成功
+            kuaishou_logger.info("视频正在发布中...")
+            await click_until_url(page, page.get_by_text("发布", exact=True),
+                                  "https://cp.kuaishou.com/article/manage/video?status=2&from=publish",
+                                  confirm=page.get_by_text("确认发布"))
+            kuaishou_logger.success("视频发布成功")
 
-        while retry_count < max_retries:
-            try:
-                # 获取包含 '上传中' 文本的元素数量
-                number = await page.locator("text=上传中").count()
-
-                if number == 0:
-                    kuaishou_logger.success("视频上传完毕")
-                    break
-                else:
-                    if retry_count % 5 == 0:
-                        kuaishou_logger.info("正在上传视频中...")
-                    await asyncio.sleep(2)
-            except Exception as e:
-                kuaishou_logger.error(f"检查上传状态时发生错误: {e}")
-                await asyncio.sleep(2)  # 等待 2 秒后重试
-            retry_count += 1
-
-        if retry_count == max_retries:
-            kuaishou_logger.warning("超过最大重试次数，视频上传可能未完成。")
-
-        # 定时任务
-        if self.publish_date != 0:
-            await self.set_schedule_time(page, self.publish_date)
-
-        # 判断视频是否发布成功
-        while True:
-            try:
-                publish_button = page.get_by_text("发布", exact=True)
-                if await publish_button.count() > 0:
-                    await publish_button.click()
-
-                await asyncio.sleep(1)
-                confirm_button = page.get_by_text("确认发布")
-                if await confirm_button.count() > 0:
-                    await confirm_button.click()
-
-                # 等待页面跳转，确认发布成功
-                await page.wait_for_url(
-                    "https://cp.kuaishou.com/article/manage/video?status=2&from=publish",
-                    timeout=5000,
-                )
-                kuaishou_logger.success("视频发布成功")
-                break
-            except Exception as e:
-                kuaishou_logger.info(f"视频正在发布中... 错误: {e}")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(1)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        kuaishou_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+            await context.storage_state(path=self.account_file)  # 保存cookie
+            kuaishou_logger.info('cookie更新完毕！')
 
     async def main(self):
         async with async_playwright() as playwright:
@@ -201,12 +157,10 @@ class KSVideo(object):
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M:%S")
         await page.locator("label:text('发布时间')").locator('xpath=following-sibling::div').locator(
             '.ant-radio-input').nth(1).click()
-        await asyncio.sleep(1)
 
+        # 日期输入框在选中定时发布后出现，click会自动等待
         await page.locator('div.ant-picker-input input[placeholder="选择日期时间"]').click()
-        await asyncio.sleep(1)
 
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
-        await asyncio.sleep(1)
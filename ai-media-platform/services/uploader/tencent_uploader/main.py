@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
+import re
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright
+from playwright.async_api import Playwright, async_playwright, expect
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH
+from services.myUtils.launch_profile import get_launch_profile
+from uploader.waits import UPLOAD_TIMEOUT, appears, click_until_url, throttle_toast, wait_for_upload
 from utils.base_social_media import set_init_script
 from utils.files_times import get_absolute_path
 from utils.log import tencent_logger
@@ -133,46 +135,41 @@ class TencentVideo(object):
         file_input = page.locator('input[type="file"]')
         await file_input.set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium (这里使用系统内浏览器，用chromium 会造成h264错误
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://channels.weixin.qq.com/platform/post/create")
-        tencent_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        await page.wait_for_url("https://channels.weixin.qq.com/platform/post/create")
-        # await page.wait_for_selector('input[type="file"]', timeout=10000)
-        file_input = page.locator('input[type="file"]')
-        await file_input.set_input_files(self.file_path)
-        # 填充标题和话题
-        await self.add_title_tags(page)
-        # 添加商品
-        # await self.add_product(page)
-        # 合集功能
-        await self.add_collection(page)
-        # 原创选择
-        await self.add_original(page)
-        # 检测上传状态
-        await self.detect_upload_status(page)
-        if self.publish_date != 0:
-            await self.set_schedule_time_tencent(page, self.publish_date)
-        # 添加短标题
-        await self.add_short_title(page)
-
-        await self.click_publish(page)
-
-        await context.storage_state(path=f"{self.account_file}")  # 保存cookie
-        tencent_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+    async def upload(self, playwright: Playwright, browser=None) -> None:
+        """执行上传；browser为上传运行时的共享浏览器，为空时自行启动"""
+        # 在浏览器上新建上下文（使用指定的 cookie 文件），是否无头和资源拦截按平台配置
+        profile = get_launch_profile("wechat")
+        async with profile.open_context(playwright, browser, self.local_executable_path,
+                                        storage_state=f"{self.account_file}") as context:
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 访问指定的 URL
+            await page.goto("https://channels.weixin.qq.com/platform/post/create")
+            tencent_logger.info(f'[+]正在上传-------{self.title}.mp4')
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            await page.wait_for_url("https://channels.weixin.qq.com/platform/post/create")
+            # await page.wait_for_selector('input[type="file"]', timeout=10000)
+            file_input = page.locator('input[type="file"]')
+            await file_input.set_input_files(self.file_path)
+            # 填充标题和话题
+            await self.add_title_tags(page)
+            # 添加商品
+            # await self.add_product(page)
+            # 合集功能
+            await self.add_collection(page)
+            # 原创选择
+            await self.add_original(page)
+            # 检测上传状态
+            await self.detect_upload_status(page)
+            if self.publish_date != 0:
+                await self.set_schedule_time_tencent(page, self.publish_date)
+            # 添加短标题
+            await self.add_short_title(page)
+
+            await self.click_publish(page)
+
+            await context.storage_state(path=f"{self.account_file}")  # 保存cookie
+            tencent_logger.success('  [-]cookie更新完毕！')
 
     async def add_short_title(self, page):
         short_title_element = page.get_by_text("短标题", exact=True).locator("..").locator(
@@ -183,44 +180,25 @@ class TencentVideo(object):
             await short_title_element.fill(short_title)
 
     async def click_publish(self, page):
-        while True:
-            try:
-                publish_buttion = page.locator('div.form-btns button:has-text("发表")')
-                if await publish_buttion.count():
-                    await publish_buttion.click()
-                await page.wait_for_url("https://channels.weixin.qq.com/platform/post/list", timeout=5000)
-                tencent_logger.success("  [-]视频发布成功")
-                break
-            except Exception as e:
-                current_url = page.url
-                if "https://channels.weixin.qq.com/platform/post/list" in current_url:
-                    tencent_logger.success("  [-]视频发布成功")
-                    break
-                else:
-                    tencent_logger.exception(f"  [-] Exception: {e}")
-                    tencent_logger.info("  [-] 视频正在发布中...")
-                    await asyncio.sleep(0.5)
+        tencent_logger.info("  [-] 视频正在发布中...")
+        await click_until_url(page, page.locator('div.form-btns button:has-text("发表")'),
+                              "https://channels.weixin.qq.com/platform/post/list*")
+        tencent_logger.success("  [-]视频发布成功")
 
     async def detect_upload_status(self, page):
-        while True:
-            # 匹配删除按钮，代表视频上传完毕，如果不存在，代表视频正在上传，则等待
-            try:
-                # 匹配删除按钮，代表视频上传完毕
-                if "weui-desktop-btn_disabled" not in await page.get_by_role("button", name="发表").get_attribute(
-                        'class'):
-                    tencent_logger.info("  [-]视频上传完毕")
-                    break
-                else:
-                    tencent_logger.info("  [-] 正在上传视频中...")
-                    await asyncio.sleep(2)
-                    # 出错了视频出错
-                    if await page.locator('div.status-msg.error').count() and await page.locator(
-                            'div.media-status-content div.tag-inner:has-text("删除")').count():
-                        tencent_logger.error("  [-] 发现上传出错了...准备重试")
-                        await self.handle_upload_error(page)
-            except:
-                tencent_logger.info("  [-] 正在上传视频中...")
-                await asyncio.sleep(2)
+        # 发表按钮去掉禁用样式，代表视频上传完毕；出现错误提示时删除视频重新上传
+        tencent_logger.info("  [-] 正在上传视频中...")
+        publish_button = page.get_by_role("button", name="发表")
+        upload_done = await wait_for_upload(
+            lambda: expect(publish_button).not_to_have_class(re.compile("weui-desktop-btn_disabled"),
+                                                             timeout=UPLOAD_TIMEOUT),
+            failed=page.locator('div.status-msg.error'),
+            retry=lambda: self.handle_upload_error(page),
+            throttled=throttle_toast(page),
+        )
+        if not upload_done:
+            raise Exception("视频上传失败")
+        tencent_logger.info("  [-]视频上传完毕")
 
     async def add_title_tags(self, page):
         await page.locator("div.input-editor").click()
@@ -258,8 +236,8 @@ class TencentVideo(object):
                 await page.locator('div.form-content:visible').click()  # 下拉菜单
                 await page.locator(
                     f'div.form-content:visible ul.weui-desktop-dropdown__list li.weui-desktop-dropdown__list-ele:has-text("{self.category}")').first.click()
-                await page.wait_for_timeout(1000)
-            if await page.locator('button:has-text("声明原创"):visible').count():
+            # 声明原创按钮在选择原创类型后出现
+            if await appears(page.locator('button:has-text("声明原创"):visible'), 1000):
                 await page.locator('button:has-text("声明原创"):visible').click()
 
     async def main(self):
@@ -2,12 +2,13 @@
 import re
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright
+from playwright.async_api import Playwright, async_playwright, expect
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH
+from services.myUtils.launch_profile import get_launch_profile
 from uploader.tk_uploader.tk_config import Tk_Locator
+from uploader.waits import UPLOAD_TIMEOUT, click_until_url, disappears, enabled, wait_for_upload
 from utils.base_social_media import set_init_script
 from utils.files_times import get_absolute_path
 from utils.log import tiktok_logger
@@ -126,11 +127,8 @@ class TiktokVideo(object):
         hour_selector = f"span.tiktok-timepicker-left:has-text('{hour_str}')"
         minute_selector = f"span.tiktok-timepicker-right:has-text('{minute_str}')"
 
-        # pick hour first
-        await page.wait_for_timeout(1000)  # 等待500毫秒
+        # pick hour first, click() waits for the picker to open and stop animating
         await self.locator_base.locator(hour_selector).click()
-        # click time button again
-        await page.wait_for_timeout(1000)  # 等待500毫秒
         # pick minutes after
         await self.locator_base.locator(minute_selector).click()
 
@@ -145,55 +143,53 @@ class TiktokVideo(object):
         file_chooser = await fc_info.value
         await file_chooser.set_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        # context = await set_init_script(context)
-        page = await context.new_page()
+    async def upload(self, playwright: Playwright, browser=None) -> None:
+        """执行上传；browser为上传运行时的共享浏览器，为空时自行启动"""
+        # 在浏览器上新建上下文（使用指定的 cookie 文件），是否无头和资源拦截按平台配置
+        profile = get_launch_profile("tiktok")
+        async with profile.open_context(playwright, browser, self.local_executable_path, init_script=False,
+                                        storage_state=f"{self.account_file}") as context:
+            page = await context.new_page()
 
-        # change language to eng first
-        await self.change_language(page)
-        await page.goto("https://www.tiktok.com/tiktokstudio/upload")
-        tiktok_logger.info(f'[+]Uploading-------{self.title}.mp4')
+            # change language to eng first
+            await self.change_language(page)
+            await page.goto("https://www.tiktok.com/tiktokstudio/upload")
+            tiktok_logger.info(f'[+]Uploading-------{self.title}.mp4')
 
-        await page.wait_for_url("https://www.tiktok.com/tiktokstudio/upload", timeout=10000)
+            await page.wait_for_url("https://www.tiktok.com/tiktokstudio/upload", timeout=10000)
 
-        try:
-            await page.wait_for_selector('iframe[data-tt="Upload_index_iframe"], div.upload-container', timeout=10000)
-            tiktok_logger.info("Either iframe or div appeared.")
-        except Exception as e:
-            tiktok_logger.error("Neither iframe nor div appeared within the timeout.")
+            try:
+                await page.wait_for_selector('iframe[data-tt="Upload_index_iframe"], div.upload-container', timeout=10000)
+                tiktok_logger.info("Either iframe or div appeared.")
+            except Exception as e:
+                tiktok_logger.error("Neither iframe nor div appeared within the timeout.")
 
-        await self.choose_base_locator(page)
+            await self.choose_base_locator(page)
 
-        upload_button = self.locator_base.locator(
-            'button:has-text("Select video"):visible')
-        await upload_button.wait_for(state='visible')  # 确保按钮可见
+            upload_button = self.locator_base.locator(
+                'button:has-text("Select video"):visible')
+            await upload_button.wait_for(state='visible')  # 确保按钮可见
 
-        async with page.expect_file_chooser() as fc_info:
-            await upload_button.click()
-        file_chooser = await fc_info.value
-        await file_chooser.set_files(self.file_path)
+            async with page.expect_file_chooser() as fc_info:
+                await upload_button.click()
+            file_chooser = await fc_info.value
+            await file_chooser.set_files(self.file_path)
 
-        await self.add_title_tags(page)
-        # detect upload status
-        await self.detect_upload_status(page)
-        if self.thumbnail_path:
-            tiktok_logger.info(f'[+] Uploading thumbnail file {self.title}.png')
-            await self.upload_thumbnails(page)
+            await self.add_title_tags(page)
+            # detect upload status
+            await self.detect_upload_status(page)
+            if self.thumbnail_path:
+                tiktok_logger.info(f'[+] Uploading thumbnail file {self.title}.png')
+                await self.upload_thumbnails(page)
 
-        if self.publish_date != 0:
-            await self.set_schedule_time(page, self.publish_date)
+            if self.publish_date != 0:
+                await self.set_schedule_time(page, self.publish_date)
 
-        await self.click_publish(page)
-        tiktok_logger.success(f"video_id: {await self.get_last_video_id(page)}")
+            await self.click_publish(page)
+            tiktok_logger.success(f"video_id: {await self.get_last_video_id(page)}")
 
-        await context.storage_state(path=f"{self.account_file}")  # save cookie
-        tiktok_logger.info('  [-] update cookie！')
-        await asyncio.sleep(2)  # close delay for look the video status
-        # close all
-        await context.close()
-        await browser.close()
+            await context.storage_state(path=f"{self.account_file}")  # save cookie
+            tiktok_logger.info('  [-] update cookie！')
 
     async def add_title_tags(self, page):
 
@@ -208,10 +204,8 @@ class TiktokVideo(object):
 
         await page.keyboard.press("End")
 
-        await page.wait_for_timeout(1000)  # 等待1秒
-
         await page.keyboard.insert_text(self.title)
-        await page.wait_for_timeout(1000)  # 等待1秒
+        await expect(editor_locator).to_contain_text(self.title)
         await page.keyboard.press("End")
 
         await page.keyboard.press("Enter")
@@ -220,10 +214,10 @@ class TiktokVideo(object):
         for index, tag in enumerate(self.tags, start=1):
             tiktok_logger.info("Setting the %s tag" % index)
             await page.keyboard.press("End")
-            await page.wait_for_timeout(1000)  # 等待1秒
             await page.keyboard.insert_text("#" + tag + " ")
+            # wait for the editor to turn the text into a hashtag before closing the suggestion list
+            await expect(editor_locator).to_contain_text("#" + tag)
             await page.keyboard.press("Space")
-            await page.wait_for_timeout(1000)  # 等待1秒
 
             await page.keyboard.press("Backspace")
             await page.keyboard.press("End")
@@ -237,7 +231,8 @@ class TiktokVideo(object):
             await file_chooser.set_files(self.thumbnail_path)
         await self.locator_base.locator('div.cover-edit-panel:not(.hide-panel)').get_by_role(
             "button", name="Confirm").click()
-        await page.wait_for_timeout(3000)  # wait 3s, fix it later
+        # wait for the cover editor to close
+        await disappears(self.locator_base.locator('div.cover-edit-panel:not(.hide-panel)'), 10_000)
 
     async def change_language(self, page):
         # set the language to english
@@ -253,20 +248,9 @@ class TiktokVideo(object):
         await page.locator('#creator-tools-selection-menu-header >> text=English (US)').click()
 
     async def click_publish(self, page):
-        success_flag_div = 'div.common-modal-confirm-modal'
-        while True:
-            try:
-                publish_button = self.locator_base.locator('div.button-group button').nth(0)
-                if await publish_button.count():
-                    await publish_button.click()
-
-                await page.wait_for_url("https://www.tiktok.com/tiktokstudio/content",  timeout=3000)
-                tiktok_logger.success("  [-] video published success")
-                break
-            except Exception as e:
-                tiktok_logger.exception(f"  [-] Exception: {e}")
-                tiktok_logger.info("  [-] video publishing")
-                await asyncio.sleep(0.5)
+        publish_button = self.locator_base.locator('div.button-group button').nth(0)
+        await click_until_url(page, publish_button, "https://www.tiktok.com/tiktokstudio/content*", timeout=3000)
+        tiktok_logger.success("  [-] video published success")
 
     async def get_last_video_id(self, page):
         await page.wait_for_selector('div[data-tt="components_PostTable_Container"]')
@@ -278,23 +262,14 @@ class TiktokVideo(object):
 
 
     async def detect_upload_status(self, page):
-        while True:
-            try:
-                # if await self.locator_base.locator('div.btn-post > button').get_attribute("disabled") is None:
-                if await self.locator_base.locator(
-                        'div.button-group > button >> text=Post').get_attribute("disabled") is None:
-                    tiktok_logger.info("  [-]video uploaded.")
-                    break
-                else:
-                    tiktok_logger.info("  [-] video uploading...")
-                    await asyncio.sleep(2)
-                    if await self.locator_base.locator(
-                            'button[aria-label="Select file"]').count():
-                        tiktok_logger.info("  [-] found some error while uploading now retry...")
-                        await self.handle_upload_error(page)
-            except:
-                tiktok_logger.info("  [-] video uploading...")
-                await asyncio.sleep(2)
+        tiktok_logger.info("  [-] video uploading...")
+        post_button = self.locator_base.locator('div.button-group > button >> text=Post')
+        select_file_button = self.locator_base.locator('button[aria-label="Select file"]')
+        # the post button is enabled once the upload finishes; "Select file" shows up when it fails
+        if not await wait_for_upload(lambda: enabled(post_button, UPLOAD_TIMEOUT), failed=select_file_button,
+                                     retry=lambda: self.handle_upload_error(page)):
+            raise Exception("video upload failed")
+        tiktok_logger.info("  [-]video uploaded.")
 
     async def choose_base_locator(self, page):
         # await page.wait_for_selector('div.upload-container')
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+上传页面的等待工具 - 用Playwright的自动等待代替固定时长的sleep和轮询
+条件一满足立即继续：元素出现/消失/可用、页面跳转、上传接口返回
+"""
+import asyncio
+import re
+import time
+from fnmatch import fnmatchcase
+from typing import Awaitable, Callable, Optional
+
+from playwright.async_api import Error as PlaywrightError, Locator, Page, TimeoutError as PlaywrightTimeoutError
+
+from services.myUtils.publish_scheduler import ThrottledError
+
+# 单步操作（元素出现、页面跳转）的超时，毫秒
+STEP_TIMEOUT = 30_000
+# 视频上传、封面生成等长耗时操作的超时，毫秒
+UPLOAD_TIMEOUT = 30 * 60_000
+
+# 平台的提示框（toast/message）
+TOAST_SELECTOR = "[class*='toast'], [class*='Toast'], [class*='message-notice'], [class*='el-message'], [role='alert']"
+# 限流提示的文字，只在提示框中匹配，页面正文中的配额说明等不算限流
+THROTTLE_TEXT = re.compile(r"操作(过于|太)?频繁|操作太快|请求过快|稍后再试|发布(次数|数量)?已达(到)?上限|too many requests",
+                           re.IGNORECASE)
+
+
+def visible(locator: Locator, timeout: float = STEP_TIMEOUT) -> Awaitable:
+    """元素出现"""
+    return locator.first.wait_for(state="visible", timeout=timeout)
+
+
+def hidden(locator: Locator, timeout: float = STEP_TIMEOUT) -> Awaitable:
+    """元素消失（不存在时立即满足）"""
+    return locator.first.wait_for(state="hidden", timeout=timeout)
+
+
+async def enabled(locator: Locator, timeout: float = STEP_TIMEOUT):
+    """元素可用（没有disabled属性），超时抛出PlaywrightTimeoutError；元素被页面重新渲染时等待新的元素"""
+    deadline = time.monotonic() + timeout / 1000
+    while True:
+        # Playwright中timeout为0表示不限时，剩余时间至少保留1毫秒
+        remaining = max(1.0, (deadline - time.monotonic()) * 1000)
+        handle = await locator.first.element_handle(timeout=remaining)
+        try:
+            await handle.wait_for_element_state("enabled", timeout=remaining)
+            return
+        except PlaywrightTimeoutError:
+            raise
+        except PlaywrightError:
+            # 等待的元素已从页面移除，重新定位
+            continue
+
+
+def url_matches(page: Page, *patterns: str, timeout: float = STEP_TIMEOUT) -> Awaitable:
+    """页面跳转到任一URL，pattern支持*通配符；前端路由的跳转同样生效"""
+    return page.wait_for_url(lambda url: any(fnmatchcase(url, pattern) for pattern in patterns), timeout=timeout)
+
+
+def response(page: Page, url_pattern: str, timeout: float = UPLOAD_TIMEOUT) -> Awaitable:
+    """URL匹配正则url_pattern的请求成功返回，用于等待上传完成的接口"""
+    regex = re.compile(url_pattern)
+    return page.wait_for_response(lambda resp: resp.ok and regex.search(resp.url) is not None, timeout=timeout)
+
+
+def throttle_toast(page: Page) -> Locator:
+    """页面上的限流提示"""
+    return page.locator(TOAST_SELECTOR).filter(has_text=THROTTLE_TEXT)
+
+
+async def throttled_error(toast: Locator) -> ThrottledError:
+    """根据出现的限流提示创建ThrottledError"""
+    try:
+        text = (await toast.first.inner_text(timeout=1000)).strip()
+    except PlaywrightTimeoutError:
+        text = ""
+    return ThrottledError(f"平台限流: {text or '操作过于频繁'}")
+
+
+async def first_of(*conditions: Awaitable) -> int:
+    """同时等待多个条件，返回最先满足的条件序号，其余条件取消；全部超时时抛出最后一个错误"""
+    tasks = [asyncio.ensure_future(condition) for condition in conditions]
+    pending = set(tasks)
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task in done:
+                    if task.exception() is None:
+                        return tasks.index(task)
+                    error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # 避免未读取的异常告警
+
+
+async def appears(locator: Locator, timeout: float) -> bool:
+    """可选元素（弹窗、提示）在timeout内是否出现，不抛出超时"""
+    try:
+        await visible(locator, timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def disappears(locator: Locator, timeout: float) -> bool:
+    """元素在timeout内是否消失，不抛出超时"""
+    try:
+        await hidden(locator, timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def wait_for_upload(done: Callable[[], Awaitable], failed: Optional[Locator] = None,
+                          retry: Optional[Callable[[], Awaitable]] = None,
+                          timeout: float = UPLOAD_TIMEOUT, max_retries: int = 3,
+                          throttled: Optional[Locator] = None) -> bool:
+    """等待视频上传完成
+
+    done为返回等待条件的函数（每轮重新创建），failed为上传失败的提示元素；
+    出现失败提示时调用retry重新上传，超过重试次数或没有retry时返回False。
+    throttled为限流提示元素，出现时抛出ThrottledError，不再重试。
+    """
+    for attempt in range(max_retries + 1):
+        conditions = [done()]
+        if failed is not None:
+            conditions.append(visible(failed, timeout))
+        if throttled is not None:
+            conditions.append(visible(throttled, timeout))
+        index = await first_of(*conditions)
+        if index == 0:
+            return True
+        if throttled is not None and index == len(conditions) - 1:
+            raise await throttled_error(throttled)
+        if retry is None or attempt == max_retries:
+            return False
+        await retry()
+        # 等旧的失败提示消失后再开始下一轮等待，一直不消失时下一轮会立即再次重试
+        await disappears(failed, STEP_TIMEOUT)
+    return False
+
+
+async def click_until(button: Locator, done: Callable[[], Awaitable], confirm: Optional[Locator] = None,
+                      timeout: float = 5_000, attempts: int = 20, throttled: Optional[Locator] = None):
+    """点击按钮直到done返回的条件满足，done创建的条件应在timeout毫秒内超时
+
+    按钮不存在时只等待条件；confirm为点击后可能弹出的确认按钮，出现时点击；
+    throttled为限流提示元素，出现时抛出ThrottledError，不再继续点击。
+    """
+    for attempt in range(attempts):
+        if await button.count():
+            await button.first.click()
+        conditions = [done()]
+        if confirm is not None:
+            conditions.append(visible(confirm, timeout))
+        if throttled is not None:
+            conditions.append(visible(throttled, timeout))
+        try:
+            index = await first_of(*conditions)
+            if index == 0:
+                return
+            if throttled is not None and index == len(conditions) - 1:
+                raise await throttled_error(throttled)
+            await confirm.first.click()
+            await done()
+            return
+        except PlaywrightTimeoutError:
+            if attempt == attempts - 1:
+                raise
+
+
+def click_until_url(page: Page, button: Locator, *patterns: str, confirm: Optional[Locator] = None,
+                    timeout: float = 5_000, attempts: int = 20) -> Awaitable:
+    """点击按钮直到页面跳转到任一URL，每次点击后最多等待timeout毫秒；出现限流提示时抛出ThrottledError"""
+    return click_until(button, lambda: url_matches(page, *patterns, timeout=timeout),
+                       confirm=confirm, timeout=timeout, attempts=attempts, throttled=throttle_toast(page))
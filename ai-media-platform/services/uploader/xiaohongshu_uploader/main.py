@@ -3,9 +3,10 @@ from datetime import datetime
 
 from playwright.async_api import Playwright, async_playwright, Page
 import os
-import asyncio
 
 from conf import LOCAL_CHROME_PATH
+from services.myUtils.launch_profile import get_launch_profile
+from uploader.waits import UPLOAD_TIMEOUT, click_until_url, first_of, visible
 from utils.base_social_media import set_init_script
 from utils.log import xiaohongshu_logger
 
@@ -89,168 +90,119 @@ class XiaoHongShuVideo(object):
         label_element = page.locator("label:has-text('定时发布')")
         # # 在选中的 label 元素下点击 checkbox
         await label_element.click()
-        await asyncio.sleep(1)
         publish_date_hour = publish_date.strftime("%Y-%m-%d %H:%M")
         print(f"publish_date_hour: {publish_date_hour}")
 
-        await asyncio.sleep(1)
+        # 日期输入框在选中定时发布后出现，click会自动等待
         await page.locator('.el-input__inner[placeholder="选择日期和时间"]').click()
         await page.keyboard.press("Control+KeyA")
         await page.keyboard.type(str(publish_date_hour))
         await page.keyboard.press("Enter")
 
-        await asyncio.sleep(1)
-
     async def handle_upload_error(self, page):
         xiaohongshu_logger.info('视频出错了，重新上传中')
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=False)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(
-            viewport={"width": 1600, "height": 900},
-            storage_state=f"{self.account_file}"
-        )
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
-        xiaohongshu_logger.info(f'[+]正在上传-------{self.title}.mp4')
-        # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
-        xiaohongshu_logger.info(f'[-] 正在打开主页...')
-        await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
-        # 点击 "上传视频" 按钮
-        await page.locator("div[class^='upload-content'] input[class='upload-input']").set_input_files(self.file_path)
+    async def upload(self, playwright: Playwright, browser=None) -> None:
+        """执行上传；browser为上传运行时的共享浏览器，为空时自行启动"""
+        # 在浏览器上新建上下文（使用指定的 cookie 文件），是否无头和资源拦截按平台配置
+        profile = get_launch_profile("xiaohongshu")
+        async with profile.open_context(playwright, browser, self.local_executable_path,
+                                        viewport={"width": 1600, "height": 900},
+                                        storage_state=f"{self.account_file}") as context:
+            # 创建一个新的页面
+            page = await context.new_page()
+            # 访问指定的 URL
+            await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
+            xiaohongshu_logger.info(f'[+]正在上传-------{self.title}.mp4')
+            # 等待页面跳转到指定的 URL，没进入，则自动等待到超时
+            xiaohongshu_logger.info(f'[-] 正在打开主页...')
+            await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
+            # 点击 "上传视频" 按钮
+            await page.locator("div[class^='upload-content'] input[class='upload-input']").set_input_files(self.file_path)
 
-        # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 等待upload-input元素出现
-                upload_input = await page.wait_for_selector('input.upload-input', timeout=3000)
-                # 获取下一个兄弟元素
-                preview_new = await upload_input.query_selector(
-                    'xpath=following-sibling::div[contains(@class, "preview-new")]')
-                if preview_new:
-                    # 在preview-new元素中查找包含"上传成功"的stage元素
-                    stage_elements = await preview_new.query_selector_all('div.stage')
-                    upload_success = False
-                    for stage in stage_elements:
-                        text_content = await page.evaluate('(element) => element.textContent', stage)
-                        if '上传成功' in text_content:
-                            upload_success = True
-                            break
-                    if upload_success:
-                        xiaohongshu_logger.info("[+] 检测到上传成功标识!")
-                        break  # 成功检测到上传成功后跳出循环
-                    else:
-                        print("  [-] 未找到上传成功标识，继续等待...")
-                else:
-                    print("  [-] 未找到预览元素，继续等待...")
-                    await asyncio.sleep(1)
-            except Exception as e:
-                print(f"  [-] 检测过程出错: {str(e)}，重新尝试...")
-                await asyncio.sleep(0.5)  # 等待0.5秒后重新尝试
+            # 上传控件后的预览区域出现"上传成功"代表视频上传完毕
+            print("  [-] 正在上传视频中...")
+            await visible(page.locator('input.upload-input ~ div[class*="preview-new"] div.stage:has-text("上传成功")'),
+                          timeout=UPLOAD_TIMEOUT)
+            xiaohongshu_logger.info("[+] 检测到上传成功标识!")
 
-        # 填充标题和话题
-        # 检查是否存在包含输入框的元素
-        # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
-        xiaohongshu_logger.info(f'  [-] 正在填充标题和话题...')
-        title_container = page.locator('div.plugin.title-container').locator('input.d-text')
-        if await title_container.count():
-            await title_container.fill(self.title[:30])
-        else:
-            titlecontainer = page.locator(".notranslate")
-            await titlecontainer.click()
-            await page.keyboard.press("Backspace")
-            await page.keyboard.press("Control+KeyA")
-            await page.keyboard.press("Delete")
-            await page.keyboard.type(self.title)
-            await page.keyboard.press("Enter")
-        css_selector = ".ql-editor" # 不能加上 .ql-blank 属性，这样只能获取第一次非空状态
-        for index, tag in enumerate(self.tags, start=1):
-            await page.type(css_selector, "#" + tag)
-            await page.press(css_selector, "Space")
-        xiaohongshu_logger.info(f'总共添加{len(self.tags)}个话题')
+            # 填充标题和话题
+            # 检查是否存在包含输入框的元素
+            # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
+            xiaohongshu_logger.info(f'  [-] 正在填充标题和话题...')
+            title_container = page.locator('div.plugin.title-container').locator('input.d-text')
+            # 等待标题输入框或旧版的标题编辑器渲染出来
+            if await first_of(visible(title_container), visible(page.locator(".notranslate"))) == 0:
+                await title_container.fill(self.title[:30])
+            else:
+                titlecontainer = page.locator(".notranslate")
+                await titlecontainer.click()
+                await page.keyboard.press("Backspace")
+                await page.keyboard.press("Control+KeyA")
+                await page.keyboard.press("Delete")
+                await page.keyboard.type(self.title)
+                await page.keyboard.press("Enter")
+            css_selector = ".ql-editor" # 不能加上 .ql-blank 属性，这样只能获取第一次非空状态
+            for index, tag in enumerate(self.tags, start=1):
+                await page.type(css_selector, "#" + tag)
+                await page.press(css_selector, "Space")
+            xiaohongshu_logger.info(f'总共添加{len(self.tags)}个话题')
 
-        # while True:
-        #     # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
-        #     try:
-        #         #  新版：定位重新上传
-        #         number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-        #         if number > 0:
-        #             xiaohongshu_logger.success("  [-]视频上传完毕")
-        #             break
-        #         else:
-        #             xiaohongshu_logger.info("  [-] 正在上传视频中...")
-        #             await asyncio.sleep(2)
+            # while True:
+            #     # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
+            #     try:
+            #         #  新版：定位重新上传
+            #         number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
+            #         if number > 0:
+            #             xiaohongshu_logger.success("  [-]视频上传完毕")
+            #             break
+            #         else:
+            #             xiaohongshu_logger.info("  [-] 正在上传视频中...")
+            #             await asyncio.sleep(2)
 
-        #             if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-        #                 xiaohongshu_logger.error("  [-] 发现上传出错了... 准备重试")
-        #                 await self.handle_upload_error(page)
-        #     except:
-        #         xiaohongshu_logger.info("  [-] 正在上传视频中...")
-        #         await asyncio.sleep(2)
+            #             if await page.locator('div.progress-div > div:has-text("上传失败")').count():
+            #                 xiaohongshu_logger.error("  [-] 发现上传出错了... 准备重试")
+            #                 await self.handle_upload_error(page)
+            #     except:
+            #         xiaohongshu_logger.info("  [-] 正在上传视频中...")
+            #         await asyncio.sleep(2)
         
-        # 上传视频封面
-        # await self.set_thumbnail(page, self.thumbnail_path)
+            # 上传视频封面
+            # await self.set_thumbnail(page, self.thumbnail_path)
 
-        # 更换可见元素
-        # await self.set_location(page, "青岛市")
+            # 更换可见元素
+            # await self.set_location(page, "青岛市")
 
-        # # 頭條/西瓜
-        # third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
-        # # 定位是否有第三方平台
-        # if await page.locator(third_part_element).count():
-        #     # 检测是否是已选中状态
-        #     if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
-        #         await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
+            # # 頭條/西瓜
+            # third_part_element = '[class^="info"] > [class^="first-part"] div div.semi-switch'
+            # # 定位是否有第三方平台
+            # if await page.locator(third_part_element).count():
+            #     # 检测是否是已选中状态
+            #     if 'semi-switch-checked' not in await page.eval_on_selector(third_part_element, 'div => div.className'):
+            #         await page.locator(third_part_element).locator('input.semi-switch-native-control').click()
 
-        if self.publish_date != 0:
-            await self.set_schedule_time_xiaohongshu(page, self.publish_date)
+            if self.publish_date != 0:
+                await self.set_schedule_time_xiaohongshu(page, self.publish_date)
 
-        # 判断视频是否发布成功
-        while True:
-            try:
-                # 等待包含"定时发布"文本的button元素出现并点击
-                if self.publish_date != 0:
-                    await page.locator('button:has-text("定时发布")').click()
-                else:
-                    await page.locator('button:has-text("发布")').click()
-                await page.wait_for_url(
-                    "https://creator.xiaohongshu.com/publish/success?**",
-                    timeout=3000
-                )  # 如果自动跳转到作品页面，则代表发布成功
-                xiaohongshu_logger.success("  [-]视频发布成功")
-                break
-            except:
-                xiaohongshu_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
+            # 点击发布（定时发布时为"定时发布"按钮），自动跳转到发布成功页面则代表发布成功
+            xiaohongshu_logger.info("  [-] 视频正在发布中...")
+            button_text = "定时发布" if self.publish_date != 0 else "发布"
+            await click_until_url(page, page.locator(f'button:has-text("{button_text}")'),
+                                  "https://creator.xiaohongshu.com/publish/success?*")
+            xiaohongshu_logger.success("  [-]视频发布成功")
 
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        xiaohongshu_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+            await context.storage_state(path=self.account_file)  # 保存cookie
+            xiaohongshu_logger.success('  [-]cookie更新完毕！')
     
     async def set_thumbnail(self, page: Page, thumbnail_path: str):
         if thumbnail_path:
             await page.click('text="选择封面"')
             await page.wait_for_selector("div.semi-modal-content:visible")
             await page.click('text="设置竖封面"')
-            await page.wait_for_timeout(2000)  # 等待2秒
-            # 定位到上传区域并点击
+            # 定位到上传区域并点击，set_input_files会等待上传控件出现
             await page.locator("div[class^='semi-upload upload'] >> input.semi-upload-hidden-input").set_input_files(thumbnail_path)
-            await page.wait_for_timeout(2000)  # 等待2秒
+            # 封面处理完成后"完成"按钮才可用，click会等待按钮可见且可用
             await page.locator("div[class^='extractFooter'] button:visible:has-text('完成')").click()
             # finish_confirm_element = page.locator("div[class^='confirmBtn'] >> div:has-text('完成')")
             # if await finish_confirm_element.count():
@@ -268,25 +220,19 @@ class XiaoHongShuVideo(object):
         print("点击地点输入框完成")
         
         # 输入位置名称
-        print(f"等待1秒后输入位置名称: {location}")
-        await page.wait_for_timeout(1000)
+        print(f"输入位置名称: {location}")
         await page.keyboard.type(location)
         print(f"位置名称输入完成: {location}")
         
         # 等待下拉列表加载
         print("等待下拉列表加载...")
         dropdown_selector = 'div.d-popover.d-popover-default.d-dropdown.--size-min-width-large'
-        await page.wait_for_timeout(3000)
         try:
-            await page.wait_for_selector(dropdown_selector, timeout=3000)
+            await page.wait_for_selector(dropdown_selector, timeout=6000)
             print("下拉列表已加载")
         except:
             print("下拉列表未按预期显示，可能结构已变化")
         
-        # 增加等待时间以确保内容加载完成
-        print("额外等待1秒确保内容渲染完成...")
-        await page.wait_for_timeout(1000)
-        
         # 尝试更灵活的XPath选择器
         print("尝试使用更灵活的XPath选择器...")
         flexible_xpath = (
@@ -295,15 +241,14 @@ class XiaoHongShuVideo(object):
             f'//div[contains(@class, "d-grid") and contains(@class, "d-options")]'
             f'//div[contains(@class, "name") and text()="{location}"]'
         )
-        await page.wait_for_timeout(3000)
         
-        # 尝试定位元素
+        # 尝试定位元素，搜索结果返回后选项才会出现
         print(f"尝试定位包含'{location}'的选项...")
         try:
             # 先尝试使用更灵活的选择器
             location_option = await page.wait_for_selector(
                 flexible_xpath,
-                timeout=3000
+                timeout=6000
             )
             
             if location_option:
@@ -3,10 +3,20 @@
 """
 
 from .video_service import get_video_service, VideoProvider, VideoRequest, VideoResponse
+from .task_registry import get_video_task_registry, VideoTaskRegistry, VideoTaskStatus
+from .scene_pipeline import ScenePipeline, ScenePipelineResult
+from .admission import GpuAdmissionController, estimate_job_cost
 
 __all__ = [
     "get_video_service",
     "VideoProvider",
     "VideoRequest",
-    "VideoResponse"
+    "VideoResponse",
+    "get_video_task_registry",
+    "VideoTaskRegistry",
+    "VideoTaskStatus",
+    "ScenePipeline",
+    "ScenePipelineResult",
+    "GpuAdmissionController",
+    "estimate_job_cost"
 ]
\ No newline at end of file
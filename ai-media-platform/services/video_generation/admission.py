@@ -0,0 +1,260 @@
+"""
+GPU容量准入控制 - 在提交到ComfyUI之前控制每个节点的在途计算量
+任务成本按 宽 × 高 × 帧数 × 步数 估算；超出节点容量的任务在本地排队，
+按用户公平分配出队顺序，并根据各节点学习到的吞吐量估算开始和完成时间
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from .task_registry import VideoTaskRegistry
+
+
+def estimate_job_cost(width: int, height: int, frames: int, steps: int) -> int:
+    """估算视频生成任务的GPU成本"""
+    return width * height * frames * steps
+
+
+# 参考任务：640x640、81帧、4步，单卡约240秒
+REFERENCE_COST = estimate_job_cost(640, 640, 81, 4)
+REFERENCE_SECONDS = 240
+
+# 吞吐量指数滑动平均系数
+THROUGHPUT_ALPHA = 0.3
+
+
+class _AdmissionJob:
+    """准入队列中的任务"""
+
+    def __init__(self, task_id: str, user_id: str, cost: int, future: asyncio.Future):
+        self.task_id = task_id
+        self.user_id = user_id
+        self.cost = cost
+        self.future = future
+        self.enqueued_at = time.time()
+        self.node: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.eta_start: Optional[float] = None
+        self.eta_finish: Optional[float] = None
+
+
+class GpuAdmissionController:
+    """GPU准入控制器
+
+    - 每个ComfyUI节点的在途成本不超过node_capacity（默认两个参考任务：一个执行、一个在ComfyUI排队），
+      GPU保持满载但不会堆积大量任务；空闲节点总是接收一个任务，避免超大任务永远无法执行
+    - 本地队列按用户公平出队：优先调度已获得成本最少的用户，同一用户内先进先出
+    - 每个节点的吞吐量（成本/秒）根据完成任务的实际耗时滑动更新，用于估算ETA
+    """
+
+    def __init__(self, nodes: List[str], node_capacity: Optional[float] = None,
+                 registry: Optional[VideoTaskRegistry] = None):
+        if not nodes:
+            raise ValueError("至少需要一个ComfyUI节点")
+        self.nodes = list(nodes)
+        self.node_capacity = node_capacity or REFERENCE_COST * 2
+        self.registry = registry
+
+        self.throughput: Dict[str, float] = {node: REFERENCE_COST / REFERENCE_SECONDS for node in self.nodes}
+        self.running: Dict[str, Dict[str, _AdmissionJob]] = {node: {} for node in self.nodes}
+        self.last_finished_at: Dict[str, float] = {}
+        self.queues: Dict[str, List[_AdmissionJob]] = {}
+        self.served: Dict[str, float] = {}
+        self.jobs: Dict[str, _AdmissionJob] = {}
+
+    def outstanding(self, node: str) -> int:
+        return sum(job.cost for job in self.running[node].values())
+
+    def submit(self, task_id: str, user_id: str, cost: int) -> Dict:
+        """提交任务到本地准入队列，返回当前ETA"""
+        job = _AdmissionJob(task_id, user_id, cost, asyncio.get_running_loop().create_future())
+        self.jobs[task_id] = job
+        if user_id not in self.served:
+            # 新用户从当前活跃用户的最小份额开始，既不插队也不被历史份额拖累
+            self.served[user_id] = min(self.served.values(), default=0)
+        self.queues.setdefault(user_id, []).append(job)
+        self._dispatch()
+        return self.eta(task_id)
+
+    async def wait_admitted(self, task_id: str) -> str:
+        """等待任务获准提交，返回分配的ComfyUI节点"""
+        job = self.jobs[task_id]
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            self.release(task_id, succeeded=False)
+            raise
+
+    def restore(self, task_id: str, user_id: str, cost: int, node: str, started_at: float):
+        """服务重启后登记已提交到ComfyUI的任务，使其计入节点在途成本"""
+        if node not in self.running:
+            self.nodes.append(node)
+            self.running[node] = {}
+            self.throughput[node] = REFERENCE_COST / REFERENCE_SECONDS
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(node)
+        job = _AdmissionJob(task_id, user_id, cost, future)
+        job.node = node
+        job.started_at = started_at
+        self.jobs[task_id] = job
+        self.running[node][task_id] = job
+        self.served.setdefault(user_id, 0)
+        self._refresh_etas()
+
+    def release(self, task_id: str, succeeded: bool = True):
+        """任务结束（或取消）时释放容量，成功的任务用于更新节点吞吐量"""
+        job = self.jobs.pop(task_id, None)
+        if job is None:
+            return
+
+        if job.node is None:
+            queue = self.queues.get(job.user_id, [])
+            if job in queue:
+                queue.remove(job)
+            if not job.future.done():
+                job.future.cancel()
+        else:
+            self.running[job.node].pop(task_id, None)
+            now = time.time()
+            if succeeded:
+                # ComfyUI串行执行，任务的实际执行时间从上一个任务完成时算起
+                began = max(job.started_at, self.last_finished_at.get(job.node, 0))
+                service_time = now - began
+                if service_time > 1:
+                    observed = job.cost / service_time
+                    self.throughput[job.node] = (
+                        (1 - THROUGHPUT_ALPHA) * self.throughput[job.node] + THROUGHPUT_ALPHA * observed
+                    )
+            self.last_finished_at[job.node] = now
+
+        self._forget_idle_user(job.user_id)
+        self._dispatch()
+
+    def _forget_idle_user(self, user_id: str):
+        """用户没有排队和执行中的任务后清除其份额记录"""
+        if self.queues.get(user_id):
+            return
+        if any(job.user_id == user_id for jobs in self.running.values() for job in jobs.values()):
+            return
+        self.queues.pop(user_id, None)
+        self.served.pop(user_id, None)
+
+    def _pick_node(self, cost: int) -> Optional[str]:
+        """选择能容纳该任务且预计最早空闲的节点"""
+        candidates = [
+            node for node in self.nodes
+            if not self.running[node] or self.outstanding(node) + cost <= self.node_capacity
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda node: self.outstanding(node) / self.throughput[node])
+
+    def _next_user(self, served: Dict[str, float], queues: Dict[str, List[_AdmissionJob]]) -> Optional[str]:
+        """份额最少的用户优先；份额相同时执行中任务少的优先，再按排队先后"""
+        waiting = [user for user, jobs in queues.items() if jobs]
+        if not waiting:
+            return None
+        running_counts: Dict[str, int] = {}
+        for jobs in self.running.values():
+            for job in jobs.values():
+                running_counts[job.user_id] = running_counts.get(job.user_id, 0) + 1
+        return min(waiting, key=lambda user: (
+            served.get(user, 0), running_counts.get(user, 0), queues[user][0].enqueued_at
+        ))
+
+    def _dispatch(self):
+        """按公平顺序放行队首任务，直到节点容量用尽"""
+        while True:
+            user_id = self._next_user(self.served, self.queues)
+            if user_id is None:
+                break
+            job = self.queues[user_id][0]
+            node = self._pick_node(job.cost)
+            if node is None:
+                break
+
+            self.queues[user_id].pop(0)
+            job.node = node
+            job.started_at = time.time()
+            self.running[node][job.task_id] = job
+            self.served[user_id] = self.served.get(user_id, 0) + job.cost
+            if not job.future.done():
+                job.future.set_result(node)
+            logger.info(f"视频任务 {job.task_id} 获准提交到 {node} (成本 {job.cost:,})")
+
+        self._refresh_etas()
+
+    def _refresh_etas(self):
+        """模拟各节点串行执行，估算执行中和排队任务的开始、完成时间"""
+        now = time.time()
+        available_at: Dict[str, float] = {}
+
+        for node in self.nodes:
+            previous_finish = self.last_finished_at.get(node, 0)
+            for job in sorted(self.running[node].values(), key=lambda j: j.started_at):
+                job.eta_start = max(job.started_at, previous_finish)
+                # 已超过预计时间的任务视为即将完成
+                job.eta_finish = max(job.eta_start + job.cost / self.throughput[node], now + 1)
+                previous_finish = job.eta_finish
+            available_at[node] = max(previous_finish, now)
+
+        # 按公平出队顺序推演排队任务
+        served = dict(self.served)
+        queues = {user: list(jobs) for user, jobs in self.queues.items()}
+        position = 0
+        while True:
+            user_id = self._next_user(served, queues)
+            if user_id is None:
+                break
+            job = queues[user_id].pop(0)
+            position += 1
+            node = min(self.nodes, key=lambda n: available_at[n] + job.cost / self.throughput[n])
+            job.eta_start = available_at[node]
+            job.eta_finish = job.eta_start + job.cost / self.throughput[node]
+            available_at[node] = job.eta_finish
+            served[user_id] = served.get(user_id, 0) + job.cost
+            self._publish(job, f"本地排队中，第 {position} 位，预计 {max(0, job.eta_start - now):.0f} 秒后开始")
+
+        for jobs in self.running.values():
+            for job in jobs.values():
+                self._publish(job)
+
+    def _publish(self, job: _AdmissionJob, message: Optional[str] = None):
+        if self.registry is None:
+            return
+        fields = {"eta_start": round(job.eta_start), "eta_finish": round(job.eta_finish)}
+        if message:
+            fields["message"] = message
+        self.registry.update(job.task_id, **fields)
+
+    def eta(self, task_id: str) -> Dict:
+        """获取任务的预计开始、完成时间"""
+        job = self.jobs.get(task_id)
+        if job is None:
+            return {}
+        return {
+            "node": job.node,
+            "cost": job.cost,
+            "eta_start": job.eta_start,
+            "eta_finish": job.eta_finish
+        }
+
+    def snapshot(self) -> Dict:
+        """当前节点负载与排队情况"""
+        return {
+            "node_capacity": self.node_capacity,
+            "nodes": [
+                {
+                    "node": node,
+                    "outstanding_cost": self.outstanding(node),
+                    "running": list(self.running[node]),
+                    "throughput": round(self.throughput[node], 1)
+                }
+                for node in self.nodes
+            ],
+            "queued": sum(len(jobs) for jobs in self.queues.values()),
+            "users": {user: len(jobs) for user, jobs in self.queues.items() if jobs}
+        }
@@ -0,0 +1,221 @@
+"""
+视频提供商任务轮询器 - 自适应轮询外部视频生成任务
+按提供商学习历史生成耗时，首轮查询安排在预计完成时间附近，之后指数退避并加入随机抖动；
+所有任务由同一个调度协程通过共享的连接池客户端查询
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+
+# 没有历史数据时各提供商的预计耗时（秒）
+DEFAULT_ESTIMATES = {
+    "runway": 60,
+    "pika": 45,
+}
+
+DEFAULT_HISTORY_PATH = Path("./temp/provider_durations.json")
+
+# 查询函数：返回None表示任务仍在进行，返回其他值表示完成；失败时抛出异常
+CheckFunc = Callable[[httpx.AsyncClient], Awaitable[Optional[Any]]]
+
+
+class _PollEntry:
+    """单个轮询中的任务"""
+
+    def __init__(self, provider: str, check: CheckFunc, started_at: float,
+                 deadline: float, future: asyncio.Future):
+        self.provider = provider
+        self.check = check
+        self.started_at = started_at
+        self.deadline = deadline
+        self.future = future
+        self.attempts = 0
+
+
+class ProviderPoller:
+    """外部提供商任务轮询器
+
+    - 每个提供商保留最近history_size次耗时，取中位数作为预计完成时间
+    - 首次查询在预计完成时间的first_poll_ratio处，之后从min_interval开始指数退避，上限max_interval
+    - 所有任务放在同一个按到期时间排序的堆中，由一个调度协程统一查询
+    """
+
+    def __init__(self, min_interval: float = 2, max_interval: float = 60,
+                 first_poll_ratio: float = 0.7, history_size: int = 20,
+                 history_path: Path = DEFAULT_HISTORY_PATH):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.first_poll_ratio = first_poll_ratio
+        self.history_size = history_size
+        self.history_path = Path(history_path)
+        self.history: Dict[str, List[float]] = self._load_history()
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._heap: List = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享的连接池客户端，提交任务、查询状态和下载结果都复用它"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(300, connect=15),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+            )
+        return self._client
+
+    def _load_history(self) -> Dict[str, List[float]]:
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_history(self):
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.history_path, "w", encoding="utf-8") as f:
+                json.dump(self.history, f)
+        except OSError as e:
+            logger.warning(f"保存提供商耗时历史失败: {e}")
+
+    def estimate(self, provider: str) -> float:
+        """预计完成耗时（秒）：历史耗时中位数，没有历史时使用默认值"""
+        durations = self.history.get(provider)
+        if not durations:
+            return DEFAULT_ESTIMATES.get(provider, 60)
+        ordered = sorted(durations)
+        return ordered[len(ordered) // 2]
+
+    def record(self, provider: str, duration: float):
+        """记录一次完成耗时"""
+        durations = self.history.setdefault(provider, [])
+        durations.append(round(duration, 1))
+        del durations[:-self.history_size]
+        self._save_history()
+
+    def _next_delay(self, entry: _PollEntry) -> float:
+        if entry.attempts == 0:
+            elapsed = time.time() - entry.started_at
+            delay = self.estimate(entry.provider) * self.first_poll_ratio - elapsed
+            return max(self.min_interval, delay)
+        delay = min(self.max_interval, self.min_interval * (2 ** (entry.attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def wait(self, provider: str, check: CheckFunc, started_at: Optional[float] = None,
+                   timeout: Optional[float] = None) -> Any:
+        """等待任务完成并返回check的结果
+
+        started_at为任务提交时间，默认当前时间；timeout默认为预计耗时的10倍（至少10分钟）。
+        """
+        started_at = started_at or time.time()
+        timeout = timeout or max(600, self.estimate(provider) * 10)
+        loop = asyncio.get_running_loop()
+        entry = _PollEntry(provider, check, started_at, started_at + timeout, loop.create_future())
+
+        self._schedule(entry)
+        self._ensure_scheduler()
+        try:
+            result = await entry.future
+        finally:
+            # 调用方被取消时不再查询该任务
+            if not entry.future.done():
+                entry.future.cancel()
+
+        self.record(provider, time.time() - started_at)
+        return result
+
+    def _schedule(self, entry: _PollEntry):
+        due = time.time() + self._next_delay(entry)
+        heapq.heappush(self._heap, (due, next(self._counter), entry))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_scheduler(self):
+        if self._scheduler is None or self._scheduler.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler = asyncio.create_task(self._run())
+
+    async def _run(self):
+        """调度协程：等待最早到期的任务，并发执行所有到期的查询"""
+        while self._heap:
+            due = self._heap[0][0]
+            delay = due - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            batch = []
+            while self._heap and self._heap[0][0] <= now:
+                batch.append(heapq.heappop(self._heap)[2])
+            await asyncio.gather(*(self._poll_once(entry) for entry in batch))
+
+    async def _poll_once(self, entry: _PollEntry):
+        if entry.future.done():
+            return
+        if time.time() > entry.deadline:
+            entry.future.set_exception(
+                TimeoutError(f"{entry.provider}任务超时（{entry.deadline - entry.started_at:.0f}s）"))
+            return
+
+        entry.attempts += 1
+        try:
+            result = await entry.check(self.client)
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            # 网络抖动或限流时不终止任务，按退避继续查询
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            if status_code is not None and status_code < 500 and status_code != 429:
+                entry.future.set_exception(e)
+                return
+            logger.warning(f"{entry.provider}任务状态查询失败，稍后重试: {e}")
+            result = None
+        except Exception as e:
+            if not entry.future.done():
+                entry.future.set_exception(e)
+            return
+
+        if entry.future.done():
+            return
+        if result is not None:
+            entry.future.set_result(result)
+        else:
+            self._schedule(entry)
+
+    async def close(self):
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+
+# 全局轮询器实例
+_provider_poller: Optional[ProviderPoller] = None
+
+
+def get_provider_poller(config: Optional[Dict] = None) -> ProviderPoller:
+    """获取提供商轮询器实例，config为视频生成模型配置中的polling段"""
+    global _provider_poller
+    if _provider_poller is None:
+        config = config or {}
+        _provider_poller = ProviderPoller(
+            min_interval=config.get("min_interval", 2),
+            max_interval=config.get("max_interval", 60)
+        )
+    return _provider_poller
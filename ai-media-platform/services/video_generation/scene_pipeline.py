@@ -0,0 +1,161 @@
+"""
+多场景视频流水线 - 场景并行生成、连续前缀提前拼接、旁白一次性混流
+整体耗时取决于最慢的场景，而不是所有阶段耗时之和
+"""
+
+import asyncio
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+from loguru import logger
+
+from .video_service import VideoService, VideoProvider, VideoRequest, VideoResponse
+
+
+class ScenePipelineResult(BaseModel):
+    """场景流水线结果"""
+    job_id: str
+    output_path: str
+    scenes: List[VideoResponse]
+    failed_scenes: List[int]  # 生成失败（已跳过）的场景序号，从1开始
+    has_narration: bool = False
+    total_time: float
+
+
+class ScenePipeline:
+    """多场景视频流水线
+
+    - 场景按有限并发提交到视频生成后端
+    - 一旦从第一个场景开始的连续若干场景完成，立即在后台把它们拼接到已有前缀上
+    - 旁白音频与视频生成同时合并，最后一次FFmpeg调用完成剩余拼接并混入旁白
+    - 每个任务使用独立的工作目录，并发任务之间互不干扰
+    """
+
+    def __init__(self, video_service: VideoService, tts_service=None,
+                 max_concurrency: Optional[int] = None, work_dir: Path = Path("./temp/scene_jobs")):
+        self.video_service = video_service
+        self.tts_service = tts_service
+        self.max_concurrency = max_concurrency or video_service.max_concurrent_scenes
+        self.work_dir = Path(work_dir)
+
+    async def run(self, scenes: List[str], output_path: str,
+                  provider: VideoProvider = VideoProvider.RUNWAY,
+                  scene_duration: int = 5,
+                  narration_paths: Optional[List[str]] = None) -> ScenePipelineResult:
+        """生成多场景视频并输出到output_path"""
+        if not scenes:
+            raise ValueError("场景列表不能为空")
+
+        start_time = time.time()
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self.work_dir / job_id
+        job_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"场景流水线 {job_id} 启动: {len(scenes)} 个场景，并发 {self.max_concurrency}")
+
+        narration_task = None
+        scene_tasks: List[asyncio.Task] = []
+        try:
+            # 旁白合并与视频生成同时进行
+            if narration_paths:
+                narration_task = asyncio.create_task(self._prepare_narration(narration_paths, job_dir))
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            scene_tasks = [
+                asyncio.create_task(self._generate_scene(semaphore, index, scene, provider, scene_duration))
+                for index, scene in enumerate(scenes)
+            ]
+
+            finished: dict = {}
+            next_index = 0
+            ready_segments: List[str] = []
+            prefix_path: Optional[str] = None
+            prefix_count = 0
+            merge_task: Optional[asyncio.Task] = None
+
+            for completed in asyncio.as_completed(scene_tasks):
+                index, response = await completed
+                finished[index] = response
+
+                # 推进连续完成的前缀
+                while next_index in finished:
+                    segment = finished[next_index]
+                    if segment is not None and segment.video_path:
+                        ready_segments.append(segment.video_path)
+                    next_index += 1
+
+                # 还有场景未完成时，在后台把新完成的连续片段拼接到前缀上
+                if ready_segments and next_index < len(scenes):
+                    if merge_task is not None:
+                        prefix_path = await merge_task
+                    prefix_count += 1
+                    segments = ([prefix_path] if prefix_path else []) + ready_segments
+                    ready_segments = []
+                    target = str(job_dir / f"prefix_{prefix_count}.mp4")
+                    merge_task = asyncio.create_task(self._merge_prefix(segments, target))
+
+            if merge_task is not None:
+                prefix_path = await merge_task
+
+            final_segments = ([prefix_path] if prefix_path else []) + ready_segments
+            if not final_segments:
+                raise ValueError("所有场景均生成失败，无法合成视频")
+
+            narration_path = await narration_task if narration_task else None
+
+            # 最后一次FFmpeg调用：拼接剩余片段并混入旁白
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            await self.video_service.merge_videos(final_segments, output_path, audio_path=narration_path)
+
+            scene_results = [finished[i] for i in range(len(scenes)) if finished[i] is not None]
+            failed_scenes = [i + 1 for i in range(len(scenes)) if finished[i] is None]
+            total_time = time.time() - start_time
+            logger.info(f"场景流水线 {job_id} 完成: {output_path}，耗时 {total_time:.1f}s，失败场景 {failed_scenes}")
+
+            return ScenePipelineResult(
+                job_id=job_id,
+                output_path=output_path,
+                scenes=scene_results,
+                failed_scenes=failed_scenes,
+                has_narration=narration_path is not None,
+                total_time=total_time
+            )
+
+        finally:
+            # 异常退出时取消仍在运行的场景，避免占用生成后端
+            for task in scene_tasks + ([narration_task] if narration_task else []):
+                if not task.done():
+                    task.cancel()
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    async def _generate_scene(self, semaphore: asyncio.Semaphore, index: int, scene: str,
+                              provider: VideoProvider, duration: int) -> Tuple[int, Optional[VideoResponse]]:
+        """生成单个场景，失败时返回None而不是抛出异常，保证其他场景继续"""
+        async with semaphore:
+            try:
+                request = VideoRequest(provider=provider, prompt=scene, duration=duration)
+                response = await self.video_service.generate_video(request)
+                if not response.video_path:
+                    logger.warning(f"场景{index + 1}未返回本地视频文件，跳过拼接")
+                    return index, None
+                return index, response
+            except Exception as e:
+                logger.error(f"场景{index + 1}生成失败: {e}")
+                return index, None
+
+    async def _merge_prefix(self, segments: List[str], target: str) -> str:
+        """把若干片段拼接为新的前缀文件"""
+        if len(segments) == 1:
+            return segments[0]
+        return await self.video_service.merge_videos(segments, target)
+
+    async def _prepare_narration(self, narration_paths: List[str], job_dir: Path) -> str:
+        """准备旁白音轨：多段时调用TTSService.merge_audio_files合并"""
+        if len(narration_paths) == 1:
+            return narration_paths[0]
+        if self.tts_service is None:
+            raise ValueError("多段旁白需要提供tts_service进行合并")
+        return await self.tts_service.merge_audio_files(narration_paths, str(job_dir / "narration.mp3"))
@@ -0,0 +1,235 @@
+"""
+视频生成任务注册表 - 持久化记录异步视频生成任务
+记录ComfyUI节点、prompt_id、进度和输出路径，并向SSE/WebSocket订阅者推送状态更新
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from loguru import logger
+
+
+class VideoTaskStatus(str, Enum):
+    """视频生成任务状态"""
+    PENDING = "pending"        # 已提交到本服务，尚未送达ComfyUI
+    QUEUED = "queued"          # 已送达ComfyUI，在队列中等待
+    PROCESSING = "processing"  # ComfyUI正在执行
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+TERMINAL_STATUSES = {VideoTaskStatus.COMPLETED.value, VideoTaskStatus.FAILED.value}
+
+DEFAULT_DB_PATH = Path("./video_tasks.db")
+
+# 允许通过update()修改的字段
+_UPDATABLE_FIELDS = {
+    "status", "progress", "message", "comfyui_node", "prompt_id",
+    "output_path", "result", "error", "eta_start", "eta_finish",
+}
+
+# 后续版本新增的列，旧数据库启动时自动补齐
+_MIGRATED_COLUMNS = {
+    "eta_start": "REAL",
+    "eta_finish": "REAL",
+}
+
+
+class VideoTaskRegistry:
+    """视频生成任务注册表
+
+    任务记录保存在SQLite中，服务重启后仍可查询；内存中保留一份缓存，
+    状态查询直接读取本地数据，不再每次都代理到ComfyUI API包装器。
+    """
+
+    def __init__(self, db_path: Path = DEFAULT_DB_PATH):
+        self.db_path = Path(db_path)
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._init_db()
+        self._load_tasks()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        """初始化任务表"""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS video_tasks (
+                    task_id TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER DEFAULT 0,
+                    message TEXT,
+                    comfyui_node TEXT,
+                    prompt_id TEXT,
+                    output_path TEXT,
+                    result TEXT,
+                    error TEXT,
+                    eta_start REAL,
+                    eta_finish REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            existing = {row[1] for row in conn.execute('PRAGMA table_info(video_tasks)')}
+            for column, column_type in _MIGRATED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f'ALTER TABLE video_tasks ADD COLUMN {column} {column_type}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_video_tasks_status ON video_tasks(status)')
+            conn.commit()
+
+    def _load_tasks(self):
+        """从数据库加载已有任务到内存缓存"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('SELECT * FROM video_tasks').fetchall()
+
+        for row in rows:
+            task = dict(row)
+            task["params"] = json.loads(task["params"]) if task["params"] else {}
+            task["result"] = json.loads(task["result"]) if task["result"] else None
+            self._tasks[task["task_id"]] = task
+
+        logger.info(f"视频任务注册表加载完成: {len(self._tasks)} 个任务 ({self.db_path})")
+
+    def _save(self, task: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO video_tasks (
+                    task_id, provider, params, status, progress, message,
+                    comfyui_node, prompt_id, output_path, result, error,
+                    eta_start, eta_finish, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                task["task_id"],
+                task["provider"],
+                json.dumps(task["params"], ensure_ascii=False),
+                task["status"],
+                task["progress"],
+                task.get("message"),
+                task.get("comfyui_node"),
+                task.get("prompt_id"),
+                task.get("output_path"),
+                json.dumps(task["result"], ensure_ascii=False) if task.get("result") is not None else None,
+                task.get("error"),
+                task.get("eta_start"),
+                task.get("eta_finish"),
+                task["created_at"],
+                task["updated_at"],
+            ))
+            conn.commit()
+
+    def create(self, provider: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """创建新任务"""
+        now = time.time()
+        task = {
+            "task_id": str(uuid.uuid4()),
+            "provider": provider,
+            "params": params,
+            "status": VideoTaskStatus.PENDING.value,
+            "progress": 0,
+            "message": "任务已提交，等待执行",
+            "comfyui_node": None,
+            "prompt_id": None,
+            "output_path": None,
+            "result": None,
+            "error": None,
+            "eta_start": None,
+            "eta_finish": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._tasks[task["task_id"]] = task
+        self._save(task)
+        return dict(task)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务快照"""
+        task = self._tasks.get(task_id)
+        return dict(task) if task else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """按创建时间倒序列出任务"""
+        tasks = [t for t in self._tasks.values() if status is None or t["status"] == status]
+        tasks.sort(key=lambda t: t["created_at"], reverse=True)
+        return [dict(t) for t in tasks[:limit]]
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """获取尚未结束的任务（用于服务重启后的恢复）"""
+        return [dict(t) for t in self._tasks.values() if t["status"] not in TERMINAL_STATUSES]
+
+    def update(self, task_id: Optional[str], **fields) -> Optional[Dict[str, Any]]:
+        """更新任务字段，持久化并通知订阅者
+
+        task_id为None时直接返回，便于同步调用路径复用同一套上报代码。
+        """
+        if task_id is None or task_id not in self._tasks:
+            return None
+
+        unknown = set(fields) - _UPDATABLE_FIELDS
+        if unknown:
+            raise ValueError(f"不支持更新的任务字段: {unknown}")
+
+        task = self._tasks[task_id]
+        if isinstance(fields.get("status"), VideoTaskStatus):
+            fields["status"] = fields["status"].value
+        if "progress" in fields:
+            fields["progress"] = max(0, min(100, int(fields["progress"])))
+
+        changed = {k: v for k, v in fields.items() if task.get(k) != v}
+        if not changed:
+            return dict(task)
+
+        task.update(changed)
+        task["updated_at"] = time.time()
+        self._save(task)
+        self._notify(task)
+        return dict(task)
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        """订阅任务更新，返回的队列会立即收到一次当前状态"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        task = self._tasks.get(task_id)
+        if task:
+            queue.put_nowait(dict(task))
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        """取消订阅"""
+        subscribers = self._subscribers.get(task_id)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(task_id, None)
+
+    def _notify(self, task: Dict[str, Any]):
+        for queue in self._subscribers.get(task["task_id"], ()):
+            snapshot = dict(task)
+            try:
+                queue.put_nowait(snapshot)
+            except asyncio.QueueFull:
+                # 慢订阅者只需要最新状态，丢弃最旧的一条
+                queue.get_nowait()
+                queue.put_nowait(snapshot)
+
+
+# 全局任务注册表实例
+_video_task_registry: Optional[VideoTaskRegistry] = None
+
+
+def get_video_task_registry(db_path: Path = DEFAULT_DB_PATH) -> VideoTaskRegistry:
+    """获取视频任务注册表实例"""
+    global _video_task_registry
+    if _video_task_registry is None:
+        _video_task_registry = VideoTaskRegistry(db_path)
+    return _video_task_registry
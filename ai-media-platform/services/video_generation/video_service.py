@@ -6,13 +6,20 @@
 import asyncio
 import json
 import time
-from typing import Dict, List, Optional, Union
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 from enum import Enum
 from pathlib import Path
 import httpx
 from pydantic import BaseModel
 from loguru import logger
 
+from services.media import get_ffmpeg_pool
+from .provider_poller import get_provider_poller
+
+if TYPE_CHECKING:
+    from .scene_pipeline import ScenePipelineResult
+
 
 class VideoProvider(str, Enum):
     """支持的视频生成提供商"""
@@ -59,6 +66,10 @@ class VideoService:
         self.api_keys = config.get("api_keys", {})
         self.models_config = config.get("models", {}).get("video_generation", {})
         self.storage_config = config.get("storage", {})
+        # 多场景生成时同时提交到后端的最大场景数
+        self.max_concurrent_scenes = self.models_config.get("max_concurrent_scenes", 3)
+        # 外部任务统一由自适应轮询器查询，并共享其连接池客户端
+        self.poller = get_provider_poller(self.models_config.get("polling", {}))
 
     async def generate_video(self, request: VideoRequest) -> VideoResponse:
         """生成视频"""
@@ -107,68 +118,67 @@ class VideoService:
             "ratio": "16:9"
         }
 
-        async with httpx.AsyncClient(timeout=300) as client:
-            # 1. 提交生成任务
-            response = await client.post(
-                f"{base_url}/videos",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            task_data = response.json()
-            task_id = task_data.get("id")
-
-            if not task_id:
-                raise ValueError("Runway任务创建失败")
-
-            # 2. 轮询任务状态
-            video_url = None
-            while True:
-                await asyncio.sleep(10)  # 每10秒查询一次
-
-                status_response = await client.get(
-                    f"{base_url}/videos/{task_id}",
-                    headers=headers
-                )
-                status_response.raise_for_status()
-                status_data = status_response.json()
-
-                status = status_data.get("status")
-                if status == "succeeded":
-                    video_url = status_data.get("url")
-                    break
-                elif status == "failed":
-                    error_msg = status_data.get("failure_reason", "生成失败")
-                    raise ValueError(f"Runway视频生成失败: {error_msg}")
-                elif status in ["running", "pending"]:
-                    continue
-                else:
-                    raise ValueError(f"未知状态: {status}")
-
-            if not video_url:
-                raise ValueError("Runway视频生成失败：未获取到视频URL")
-
-            # 3. 下载视频
-            video_path = await self._download_video(video_url, "runway")
-
-            generation_time = time.time() - start_time
-            file_size = Path(video_path).stat().st_size if video_path else None
-
-            # Runway计费（约$0.05/秒）
-            cost = request.duration * 0.05
-
-            return VideoResponse(
-                provider="runway",
-                video_url=video_url,
-                video_path=video_path,
-                duration=float(request.duration),
-                width=request.width,
-                height=request.height,
-                fps=request.fps,
-                file_size=file_size,
-                generation_time=generation_time,
-                cost=cost
+        client = self.poller.client
+
+        # 1. 提交生成任务
+        response = await client.post(
+            f"{base_url}/videos",
+            headers=headers,
+            json=payload
+        )
+        response.raise_for_status()
+        task_data = response.json()
+        task_id = task_data.get("id")
+
+        if not task_id:
+            raise ValueError("Runway任务创建失败")
+
+        # 2. 自适应轮询任务状态
+        async def check_status(client: httpx.AsyncClient) -> Optional[str]:
+            status_response = await client.get(
+                f"{base_url}/videos/{task_id}",
+                headers=headers
             )
+            status_response.raise_for_status()
+            status_data = status_response.json()
+
+            status = status_data.get("status")
+            if status == "succeeded":
+                video_url = status_data.get("url")
+                if not video_url:
+                    raise ValueError("Runway视频生成失败：未获取到视频URL")
+                return video_url
+            elif status == "failed":
+                error_msg = status_data.get("failure_reason", "生成失败")
+                raise ValueError(f"Runway视频生成失败: {error_msg}")
+            elif status in ["running", "pending"]:
+                return None
+            else:
+                raise ValueError(f"未知状态: {status}")
+
+        video_url = await self.poller.wait("runway", check_status, started_at=start_time)
+
+        # 3. 下载视频
+        video_path = await self._download_video(video_url, "runway")
+
+        generation_time = time.time() - start_time
+        file_size = Path(video_path).stat().st_size if video_path else None
+
+        # Runway计费（约$0.05/秒）
+        cost = request.duration * 0.05
+
+        return VideoResponse(
+            provider="runway",
+            video_url=video_url,
+            video_path=video_path,
+            duration=float(request.duration),
+            width=request.width,
+            height=request.height,
+            fps=request.fps,
+            file_size=file_size,
+            generation_time=generation_time,
+            cost=cost
+        )
 
     async def _call_pika(self, request: VideoRequest) -> VideoResponse:
         """调用Pika Labs API"""
@@ -195,58 +205,58 @@ class VideoService:
             }
         }
 
-        async with httpx.AsyncClient(timeout=300) as client:
-            response = await client.post(
-                f"{base_url}/generate",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            task_id = data.get("task_id")
-            if not task_id:
-                raise ValueError("Pika任务创建失败")
-
-            # 轮询结果
-            while True:
-                await asyncio.sleep(8)
-
-                status_response = await client.get(
-                    f"{base_url}/task/{task_id}",
-                    headers=headers
-                )
-                status_response.raise_for_status()
-                status_data = status_response.json()
-
-                status = status_data.get("status")
-                if status == "completed":
-                    video_url = status_data.get("video_url")
-                    break
-                elif status == "failed":
-                    raise ValueError("Pika视频生成失败")
-                else:
-                    continue
-
-            video_path = await self._download_video(video_url, "pika")
-            generation_time = time.time() - start_time
-            file_size = Path(video_path).stat().st_size if video_path else None
-
-            # Pika计费（约$0.03/秒）
-            cost = request.duration * 0.03
-
-            return VideoResponse(
-                provider="pika",
-                video_url=video_url,
-                video_path=video_path,
-                duration=float(request.duration),
-                width=request.width,
-                height=request.height,
-                fps=request.fps,
-                file_size=file_size,
-                generation_time=generation_time,
-                cost=cost
+        client = self.poller.client
+        response = await client.post(
+            f"{base_url}/generate",
+            headers=headers,
+            json=payload
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        task_id = data.get("task_id")
+        if not task_id:
+            raise ValueError("Pika任务创建失败")
+
+        # 自适应轮询结果
+        async def check_status(client: httpx.AsyncClient) -> Optional[str]:
+            status_response = await client.get(
+                f"{base_url}/task/{task_id}",
+                headers=headers
             )
+            status_response.raise_for_status()
+            status_data = status_response.json()
+
+            status = status_data.get("status")
+            if status == "completed":
+                return status_data.get("video_url") or ""
+            elif status == "failed":
+                raise ValueError("Pika视频生成失败")
+            return None
+
+        video_url = await self.poller.wait("pika", check_status, started_at=start_time)
+        if not video_url:
+            raise ValueError("Pika视频生成失败：未获取到视频URL")
+
+        video_path = await self._download_video(video_url, "pika")
+        generation_time = time.time() - start_time
+        file_size = Path(video_path).stat().st_size if video_path else None
+
+        # Pika计费（约$0.03/秒）
+        cost = request.duration * 0.03
+
+        return VideoResponse(
+            provider="pika",
+            video_url=video_url,
+            video_path=video_path,
+            duration=float(request.duration),
+            width=request.width,
+            height=request.height,
+            fps=request.fps,
+            file_size=file_size,
+            generation_time=generation_time,
+            cost=cost
+        )
 
     async def _call_doubao_video(self, request: VideoRequest) -> VideoResponse:
         """调用豆包视频生成API"""
@@ -310,68 +320,14 @@ class VideoService:
 
     async def _call_stable_video(self, request: VideoRequest) -> VideoResponse:
         """调用Stable Video Diffusion（本地部署）"""
-        start_time = time.time()
-
-        try:
-            # 这里需要本地部署Stable Video Diffusion模型
-            # 需要GPU支持，推荐配置RTX 3080以上
-
-            # 模拟本地生成过程
-            logger.info("本地Stable Video Diffusion生成中...")
-            await asyncio.sleep(120)  # 本地生成需要更长时间
-
-            # 这里应该是实际的模型推理代码
-            video_path = f"./temp/stable_video_{int(time.time())}.mp4"
-
-            generation_time = time.time() - start_time
-            file_size = Path(video_path).stat().st_size if Path(video_path).exists() else None
-
-            return VideoResponse(
-                provider="stable_video",
-                video_url="",
-                video_path=video_path,
-                duration=float(request.duration),
-                width=request.width,
-                height=request.height,
-                fps=request.fps,
-                file_size=file_size,
-                generation_time=generation_time,
-                cost=0.0  # 本地部署无直接成本
-            )
-
-        except Exception as e:
-            logger.error(f"Stable Video Diffusion生成失败: {e}")
-            raise
+        # 需要本地部署Stable Video Diffusion模型（GPU推荐RTX 3080以上）并接入推理服务；
+        # 当前未接入推理服务，没有可等待的任务，直接报错而不是阻塞到超时
+        raise ValueError("本地Stable Video Diffusion未配置推理服务，请选择其他视频生成提供商")
 
     async def _call_animatediff(self, request: VideoRequest) -> VideoResponse:
         """调用AnimateDiff（本地部署）"""
-        start_time = time.time()
-
-        try:
-            # AnimateDiff本地部署实现
-            logger.info("本地AnimateDiff生成中...")
-            await asyncio.sleep(90)
-
-            video_path = f"./temp/animatediff_{int(time.time())}.mp4"
-            generation_time = time.time() - start_time
-            file_size = Path(video_path).stat().st_size if Path(video_path).exists() else None
-
-            return VideoResponse(
-                provider="animatediff",
-                video_url="",
-                video_path=video_path,
-                duration=float(request.duration),
-                width=request.width,
-                height=request.height,
-                fps=request.fps,
-                file_size=file_size,
-                generation_time=generation_time,
-                cost=0.0
-            )
-
-        except Exception as e:
-            logger.error(f"AnimateDiff生成失败: {e}")
-            raise
+        # 同Stable Video Diffusion，本地推理服务接入前直接报错
+        raise ValueError("本地AnimateDiff未配置推理服务，请选择其他视频生成提供商")
 
     async def _download_video(self, video_url: str, provider: str) -> str:
         """下载视频文件"""
@@ -381,17 +337,17 @@ class VideoService:
             temp_dir.mkdir(exist_ok=True)
 
             # 生成文件名
+            # 并发下载时同一秒内可能有多个文件，附加随机后缀避免互相覆盖
             timestamp = int(time.time())
-            filename = f"{provider}_video_{timestamp}.mp4"
+            filename = f"{provider}_video_{timestamp}_{uuid.uuid4().hex[:8]}.mp4"
             file_path = temp_dir / filename
 
             # 下载文件
-            async with httpx.AsyncClient(timeout=300) as client:
-                async with client.stream("GET", video_url) as response:
-                    response.raise_for_status()
-                    with open(file_path, "wb") as f:
-                        async for chunk in response.aiter_bytes(chunk_size=8192):
-                            f.write(chunk)
+            async with self.poller.client.stream("GET", video_url) as response:
+                response.raise_for_status()
+                with open(file_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(chunk_size=8192):
+                        f.write(chunk)
 
             logger.info(f"视频下载完成: {file_path}")
             return str(file_path)
@@ -400,66 +356,32 @@ class VideoService:
             logger.error(f"视频下载失败: {e}")
             raise
 
-    async def generate_video_from_scenes(self, scenes: List[str], provider: VideoProvider = VideoProvider.RUNWAY) -> List[VideoResponse]:
-        """批量生成场景视频"""
-        tasks = []
-        for i, scene in enumerate(scenes):
-            request = VideoRequest(
-                provider=provider,
-                prompt=scene,
-                duration=5  # 每个场景5秒
-            )
-            tasks.append(self.generate_video(request))
-
-        # 并行生成
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # 处理结果
-        videos = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                logger.error(f"场景{i+1}生成失败: {result}")
-            else:
-                videos.append(result)
-
-        return videos
-
-    async def merge_videos(self, video_paths: List[str], output_path: str) -> str:
-        """合并多个视频文件"""
+    async def generate_video_from_scenes(self, scenes: List[str], provider: VideoProvider = VideoProvider.RUNWAY,
+                                         output_path: Optional[str] = None,
+                                         narration_paths: Optional[List[str]] = None,
+                                         tts_service=None) -> "ScenePipelineResult":
+        """生成多场景视频并拼接为一个文件
+
+        由场景流水线执行：场景按max_concurrent_scenes有限并发生成，连续完成的前缀提前拼接，
+        narration_paths为旁白音频（多段时用tts_service合并），在最后一次拼接中混入；
+        output_path为空时输出到./temp/scene_videos下。失败的场景跳过，序号记录在结果的failed_scenes中。
+        """
+        from .scene_pipeline import ScenePipeline
+
+        if output_path is None:
+            output_path = str(Path("./temp/scene_videos") / f"scenes_{int(time.time())}_{uuid.uuid4().hex[:8]}.mp4")
+        pipeline = ScenePipeline(self, tts_service=tts_service, max_concurrency=self.max_concurrent_scenes)
+        return await pipeline.run(scenes, output_path, provider=provider, narration_paths=narration_paths)
+
+    async def merge_videos(self, video_paths: List[str], output_path: str, audio_path: Optional[str] = None) -> str:
+        """合并多个视频文件
+
+        audio_path不为空时，在同一次FFmpeg调用中把该音轨混入输出视频。
+        由FFmpeg进程池执行：限制并发进程数、独立临时目录、超时控制，编码一致时直接复制流。
+        """
         try:
-            import subprocess
-
-            # 创建文件列表
-            file_list_path = "./temp/file_list.txt"
-            with open(file_list_path, "w") as f:
-                for path in video_paths:
-                    f.write(f"file '{path}'\n")
-
-            # 使用FFmpeg合并视频
-            cmd = [
-                "ffmpeg",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", file_list_path,
-                "-c", "copy",
-                "-y",  # 覆盖输出文件
-                output_path
-            ]
-
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            stdout, stderr = await process.communicate()
-
-            if process.returncode != 0:
-                raise ValueError(f"视频合并失败: {stderr.decode()}")
-
-            # 清理临时文件
-            Path(file_list_path).unlink(missing_ok=True)
-
+            pool = get_ffmpeg_pool(self.config.get("media", {}))
+            await pool.concat(video_paths, output_path, audio_path=audio_path)
             logger.info(f"视频合并完成: {output_path}")
             return output_path
 